@@ -23,6 +23,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../l
 import aet_config
 import aet_utils
 import mod_dmis
+import period_stats
+import ts_csv
 
 mmHaPerDay_to_cms = 0.001 * 10000 / 86400    # 0.001 (mm/m) * 10000 (m2/hectare) / 86400 (seconds/day)
 
@@ -232,19 +234,16 @@ class ETCell():
 
         crops_dict = {}
         try:
-            # Get list of 0 based line numbers to skip
-            # Ignore header but assume header was set as 1's based index
-            data_skip = [i for i in range(cfg.input_cet['header_lines']) if i + 1 != cfg.input_cet['names_line']]
             for ctCount in range(0, self.numUsedCropTypes, 1):
                 input_cet_path = os.path.join(cfg.input_cet['ws'], cfg.input_cet['name_format'].replace('%c', '%02d' % self.usedCropTypes[ctCount]) % self.cell_id)
                 if not os.path.isfile(input_cet_path):
                     logging.error('ERROR:  input crop et file {} does not exist'.format(input_cet_path))
                     return False
                 logging.debug('  {0}'.format(input_cet_path))
-                crop_df = pd.read_csv(input_cet_path, engine = 'python',
-                        header = cfg.input_cet['names_line'] - len(data_skip) - 1,
-                        skiprows = data_skip, sep = cfg.input_cet['delimiter'],
-                        comment = "#", na_values = ['NaN'])
+                crop_df = ts_csv.read_ts_csv(input_cet_path,
+                        cfg.input_cet['header_lines'], cfg.input_cet['names_line'],
+                        cfg.input_cet['delimiter'], comment = "#",
+                        na_values = ['NaN'])
 
                 # Check fields
 
@@ -263,15 +262,9 @@ class ETCell():
 
                 # Convert date strings to datetimes and index on date
 
-                if cfg.input_cet['fields']['date'] is not None:
-                    crop_df['date'] = pd.to_datetime(crop_df['date'])
-                else:
-                    if cfg.time_step == 'day':
-                        crop_df['date'] = crop_df[['year', 'month', 'day']].apply(
-                            lambda s : datetime.datetime(*s),axis = 1)
-                    else:
-                        crop_df['date'] = crop_df[['year', 'month', 'day', 'hour']].apply(
-                        lambda s : datetime.datetime(*s),axis = 1)
+                crop_df['date'] = ts_csv.ts_dates(crop_df,
+                        cfg.input_cet['fields']['date'] is not None,
+                        cfg.time_step != 'day')
                 crop_df.set_index('date', inplace = True)
 
                 # if cell_count == 0 and ctCount == 0:
@@ -816,8 +809,8 @@ class ETCell():
 
                 # compute annual sums
 
-                unadj_ann_df = self.etcCropIRs_df.resample('AS').apply( aggregation_func)
-                adj_ann_df = adj_daily_df.resample('AS').apply( aggregation_func)
+                unadj_ann_df = period_stats.aggregate(self.etcCropIRs_df, 'AS', aggregation_func)
+                adj_ann_df = period_stats.aggregate(adj_daily_df, 'AS', aggregation_func)
                 del aggregation_func
 
                 # compute annual ratios for retaining annual totals
@@ -863,7 +856,7 @@ class ETCell():
                 aggregation_func = {}
                 for col_name in list(daily_df.columns):
                     aggregation_func.update({col_name: np.sum})
-                annual_df = daily_df.resample('AS').apply( aggregation_func)
+                annual_df = period_stats.aggregate(daily_df, 'AS', aggregation_func)
                 del aggregation_func
 
                 # compute annual ratios
@@ -878,7 +871,7 @@ class ETCell():
                 daily_df['et'] = apply_annual_ratios(cfg.start_dt, daily_df.index, daily_df['smoothed'].values, annual_df['ratios'].values)
                 aggregation_func.update({'et': np.sum})
                 del annual_df
-                annual_df = daily_df.resample('AS').apply( aggregation_func)
+                annual_df = period_stats.aggregate(daily_df, 'AS', aggregation_func)
                 del aggregation_func
                 # print "annual df\n", annual_df.head(5)
                 self.etcData_df['et'] = daily_df['et'].values
@@ -909,7 +902,7 @@ class ETCell():
                 aggregation_func = {}
                 for col_name in list(daily_df.columns):
                     aggregation_func.update({col_name: np.sum})
-                annual_df = daily_df.resample('AS').apply( aggregation_func)
+                annual_df = period_stats.aggregate(daily_df, 'AS', aggregation_func)
                 del aggregation_func
 
                 # compute annual ratios
@@ -937,7 +930,7 @@ class ETCell():
                 aggregation_func = {}
                 for col_name in list(daily_df.columns):
                     aggregation_func.update({col_name: np.sum})
-                annual_df = daily_df.resample('AS').apply( aggregation_func)
+                annual_df = period_stats.aggregate(daily_df, 'AS', aggregation_func)
                 del aggregation_func
 
                 # compute annual ratios
@@ -956,7 +949,7 @@ class ETCell():
             aggregation_func = {}
             for col_name in list(daily_df.columns):
                 aggregation_func.update({col_name: np.sum})
-            monthly_df = daily_df.resample('MS').apply( aggregation_func)
+            monthly_df = period_stats.aggregate(daily_df, 'MS', aggregation_func)
             del aggregation_func
             self.etcData_df['nirfrac'] = compute_daily_fractions(cfg.start_dt, daily_df.index, daily_df['nir'].values, monthly_df['nir'].values)
             del daily_df, monthly_df
@@ -1039,10 +1032,10 @@ class ETCell():
                     aggregation_func.update({fn: np.sum})
             if cfg.monthly_output_aet_flag:
                 # monthly_output_aet_df = self.etcData_df.resample('MS').apply( aggregation_func)
-                monthly_output_aet_df = self.etcData_df.resample('M').apply( aggregation_func)
+                monthly_output_aet_df = period_stats.aggregate(self.etcData_df, 'M', aggregation_func)
             if cfg.annual_output_aet_flag:
                 # annual_output_aet_df = self.etcData_df.resample('AS').apply( aggregation_func)
-                annual_output_aet_df = self.etcData_df.resample('A').apply( aggregation_func)
+                annual_output_aet_df = period_stats.aggregate(self.etcData_df, 'A', aggregation_func)
 
             # set up output fields
 
@@ -1320,10 +1313,10 @@ class ETCell():
                 aggregation_func.update({col_name: np.sum})
             if cfg.monthly_output_cir_flag:
                 # monthly_output_cir_df = self.etcCropIRs_df.resample('MS').apply( aggregation_func)
-                monthly_output_cir_df = self.etcCropIRs_df.resample('M').apply( aggregation_func)
+                monthly_output_cir_df = period_stats.aggregate(self.etcCropIRs_df, 'M', aggregation_func)
             if cfg.annual_output_cir_flag:
                 # annual_output_cir_df = self.etcCropIRs_df.resample('AS').apply( aggregation_func)
-                annual_output_cir_df = self.etcCropIRs_df.resample('A').apply( aggregation_func)
+                annual_output_cir_df = period_stats.aggregate(self.etcCropIRs_df, 'A', aggregation_func)
 
             # set up output fields
 
@@ -1555,10 +1548,10 @@ class ETCell():
                 aggregation_func.update({col_name: np.sum})
             if cfg.monthly_output_cet_flag:
                 # monthly_output_cet_df = self.etcCropETs_df.resample('MS').apply( aggregation_func)
-                monthly_output_cet_df = self.etcCropETs_df.resample('M').apply( aggregation_func)
+                monthly_output_cet_df = period_stats.aggregate(self.etcCropETs_df, 'M', aggregation_func)
             if cfg.annual_output_cet_flag:
                 # annual_output_cet_df = self.etcCropETs_df.resample('AS').apply( aggregation_func)
-                annual_output_cet_df = self.etcCropETs_df.resample('A').apply( aggregation_func)
+                annual_output_cet_df = period_stats.aggregate(self.etcCropETs_df, 'A', aggregation_func)
 
             # set up output fields
 
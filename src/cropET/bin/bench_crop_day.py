@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+"""bench_crop_day.py
+Micro-benchmark of the crop day loop
+Times init_crop_day_loop() and run_crop_day_loop() for each active crop of
+    one ET cell and reports the cost per simulated day and the size of the
+    crop cycle state objects
+Output files are not written
+
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import crop_et_data
+import crop_cycle
+import et_cell
+import util
+
+
+def main(ini_path, etcid_to_run=None, repeats=3, log_level=logging.WARNING):
+    """Time the crop day loop of one ET cell
+
+    Parameters
+    ---------
+    ini_path : str
+        absolute file path of INI file
+    etcid_to_run : str
+        et cell id to time, None [default] times the first cell
+    repeats : int
+        number of times each crop is run, the fastest run is reported
+        3 [default]
+    log_level : logging.lvl
+
+    Returns
+    -------
+    : float
+        seconds per simulated cell/crop day
+
+    """
+
+    util.console_logger(log_level=log_level)
+
+    data = crop_et_data.CropETData()
+    data.read_cet_ini(ini_path, False)
+    data.set_crop_params()
+    data.set_crop_coeffs()
+    if data.co2_flag:
+        data.set_crop_co2()
+
+    cells = et_cell.ETCellData()
+    cells.set_cell_properties(data)
+    cells.set_cell_crops(data)
+    cells.set_cell_cuttings(data)
+    cells.filter_crops(data)
+    cells.filter_cells(data)
+    cells.set_static_crop_params(data.crop_params)
+    cells.set_static_crop_coeffs(data.crop_coeffs)
+    if data.spatial_cal_flag:
+        cells.set_spatial_crop_params(data.spatial_cal_ws)
+
+    if etcid_to_run is None:
+        etcid_to_run = sorted(cells.et_cells_dict.keys())[0]
+    cell = cells.et_cells_dict[etcid_to_run]
+    if not cell.set_input_timeseries(1, data, cells):
+        sys.exit()
+
+    # Day loop engine used by run_crop_day_loop()
+    if data.jit_flag:
+        engine = 'jit kernel'
+    elif data.array_loop_flag:
+        engine = 'array loop'
+    else:
+        engine = 'data frame loop'
+
+    crop_count = 0
+    total_days = 0
+    total_seconds = 0.
+    for crop_num, crop in sorted(cell.crop_params.items()):
+        if not cell.crop_flags.get(crop_num, 0):
+            continue
+        crop_count += 1
+        seconds = []
+        for i in range(repeats):
+            clock_start = time.perf_counter()
+            foo, foo_day = crop_cycle.init_crop_day_loop(data, cell, crop)
+            crop_cycle.run_crop_day_loop(data, cell, crop, foo, foo_day)
+            seconds.append(time.perf_counter() - clock_start)
+        total_days += len(foo.crop_df.index)
+        total_seconds += min(seconds)
+
+    print('\nCell {}, {} crops, {} engine'.format(
+        etcid_to_run, crop_count, engine))
+    print('  {:.2f} us per cell/crop day ({} days, {:.3f} s)'.format(
+        1e6 * total_seconds / total_days, total_days, total_seconds))
+    print('  Crop cycle state: {} bytes, daily data: {} bytes'.format(
+        object_size(foo), object_size(foo_day)))
+    return total_seconds / total_days
+
+
+def object_size(obj):
+    """Return size of object and its instance dict if any, not attributes"""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def is_valid_file(parser, arg):
+    """Check that file exists
+
+    Parameters
+    ---------
+    parser : argparse.ArgumentParser
+    arg : str
+        file path
+
+    Returns
+    -------
+    arg : str
+
+    """
+
+    if not os.path.isfile(arg):
+        parser.error('The file {} does not exist!'.format(arg))
+    else:
+        return arg
+
+
+def parse_args():
+    """initialize parser
+
+    Parameters
+    ---------
+    None
+
+    Returns
+    -------
+    args : argparser.parse_args method
+
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Crop ET day loop micro-benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '-i', '--ini', required=True, metavar='PATH',
+        type=lambda x: is_valid_file(parser, x), help='Input file')
+    parser.add_argument(
+        '-c', '--etcid', metavar='etcid_to_run', default=None,
+        help="ET cell id to time, default is the first cell")
+    parser.add_argument(
+        '-n', '--repeats', default=3, type=int, metavar='N',
+        help="Runs per crop, the fastest is reported")
+    parser.add_argument(
+        '-v', '--verbose', action="store_const",
+        dest='log_level', const=logging.INFO, default=logging.WARNING,
+        help="Print info level comments")
+    args = parser.parse_args()
+
+    # Convert INI path to an absolute path if necessary
+    if args.ini and os.path.isfile(os.path.abspath(args.ini)):
+        args.ini = os.path.abspath(args.ini)
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(ini_path=args.ini, etcid_to_run=args.etcid, repeats=args.repeats,
+         log_level=args.log_level)
@@ -0,0 +1,213 @@
+"""climate_cache.py
+Defines cache_path, cell_input_paths, load_climate, save_climate, file_hash
+Called by et_cell.py and run_manifest.py
+
+Processed ET cell climate (climate_df, refet_df and the long term DOY
+    arrays in et_cell.climate) is saved to .npz files in the climate cache
+    folder so repeat runs skip reading input files and process_climate()
+Files are named by a fingerprint of the input file contents, the INI
+    settings used to read them and the cell properties used by
+    process_climate(), changed inputs get a new fingerprint and the old
+    files are simply no longer used
+
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Increment if the cached frames or process_climate() change
+CACHE_VERSION = 1
+
+# ETCell data frames saved in cache files
+FRAME_NAMES = ['climate_df', 'refet_df']
+
+# Content hashes of input files by (path, size, modified time)
+_file_hashes = {}
+
+
+def cache_path(data, et_cell):
+    """Return climate cache file path for ET cell
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance
+
+    Returns
+    -------
+    : str or None
+        None if the cache is not enabled or an input file is missing
+
+    """
+
+    if not data.climate_cache_ws:
+        return None
+    input_paths = cell_input_paths(data, et_cell)
+    settings = [
+        CACHE_VERSION, str(et_cell.refet_id), et_cell.aridity_rating,
+        et_cell.air_pressure, data.refet, data.weather, data.start_dt,
+        data.end_dt, data.co2_flag, data.phenology_option]
+    if data.phenology_option > 0:
+        settings.append(data.hist_temps)
+    if data.refet_ratios_path:
+        settings.extend([
+            data.et_ratios_delimiter, data.et_ratios_header_lines,
+            data.et_ratios_name_field, data.et_ratios_id_field,
+            data.et_ratios_month_field, data.et_ratios_ratio_field])
+
+    fingerprint = hashlib.md5(repr(settings).encode('utf-8'))
+    for input_path in input_paths:
+        input_hash = file_hash(input_path)
+        if input_hash is None:
+            return None
+        fingerprint.update(input_hash.encode('utf-8'))
+    return os.path.join(
+        data.climate_cache_ws, '{}.npz'.format(fingerprint.hexdigest()))
+
+
+def cell_input_paths(data, et_cell):
+    """Return input time series file paths read for ET cell
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance
+
+    Returns
+    -------
+    : list
+        RefET and weather file paths, historical temperature and RefET
+        ratio file paths if used
+
+    """
+
+    input_paths = [
+        os.path.join(data.refet['ws'],
+                     data.refet['name_format'] % et_cell.refet_id),
+        os.path.join(data.weather['ws'],
+                     data.weather['name_format'] % et_cell.refet_id)]
+    if data.phenology_option > 0:
+        input_paths.append(os.path.join(
+            data.hist_temps['ws'],
+            data.hist_temps['name_format'] % et_cell.refet_id))
+    if data.refet_ratios_path:
+        input_paths.append(data.refet_ratios_path)
+    return input_paths
+
+
+def load_climate(path, et_cell):
+    """Set processed climate from cache file
+
+    Parameters
+    ---------
+    path : str
+        file path from cache_path()
+    et_cell :
+        ETCell instance, updated in place
+
+    Returns
+    -------
+    : boolean
+        True if the cache file was read
+
+    """
+
+    if not path or not os.path.isfile(path):
+        return False
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            frames = {}
+            for name in FRAME_NAMES:
+                columns = [str(col) for col in npz[name + '__columns']]
+                frame_df = pd.DataFrame(
+                    {col: npz['{}__{}'.format(name, i)]
+                     for i, col in enumerate(columns)},
+                    index=pd.DatetimeIndex(
+                        npz[name + '__index'],
+                        name=str(npz[name + '__index_name'])),
+                    columns=columns)
+                frames[name] = frame_df
+            climate = {
+                key.split('__', 1)[1]: npz[key]
+                for key in npz.files if key.startswith('climate__')}
+    except Exception:
+        logging.warning('  Unable to read climate cache file {}'.format(path))
+        return False
+    for name, frame_df in frames.items():
+        setattr(et_cell, name, frame_df)
+    et_cell.climate = climate
+    logging.debug('  Processed climate read from {}'.format(path))
+    return True
+
+
+def save_climate(path, et_cell):
+    """Save processed climate to cache file
+
+    Parameters
+    ---------
+    path : str
+        file path from cache_path()
+    et_cell :
+        ETCell instance after process_climate()
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Frames with object columns are not cached
+
+    """
+
+    if not path:
+        return
+    arrays = {}
+    for name in FRAME_NAMES:
+        frame_df = getattr(et_cell, name)
+        if (frame_df.dtypes == object).any():
+            return
+        arrays[name + '__index'] = frame_df.index.values
+        arrays[name + '__index_name'] = np.array(str(frame_df.index.name))
+        arrays[name + '__columns'] = np.array(
+            [str(col) for col in frame_df.columns])
+        for i, col in enumerate(frame_df.columns):
+            arrays['{}__{}'.format(name, i)] = frame_df[col].values
+    for key, values in et_cell.climate.items():
+        arrays['climate__' + key] = values
+
+    # Write to temporary file first so readers never see a partial file
+    try:
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+    except (IOError, OSError):
+        logging.warning('  Unable to write climate cache file {}'.format(
+            path))
+
+
+def file_hash(path):
+    """Return md5 of file contents or None if file does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                md5.update(chunk)
+        _file_hashes[key] = md5.hexdigest()
+    return _file_hashes[key]
@@ -0,0 +1,232 @@
+"""climate_stream.py
+Defines ClimateStream class, rolling_mean
+Called by et_cell.py and stream_cycle.py
+
+Climate state carried between the windows of a streaming run
+    (see stream_cycle.py) so ETCell.process_climate() gives the same
+    values window by window as for the full period:
+    30 day rolling means (t30, 30t), the snow accumulation and the long
+    term DOY means of t30, 30t and cumulative GDD (ETCell.climate)
+The long term means are summed by DOY in the first pass over the windows
+    and used by all windows of the second pass
+Sums use compensated (Kahan) summation in day order, as pandas does, so
+    streaming results match the full period results
+
+"""
+
+import math
+
+import numpy as np
+
+import util
+
+# Rolling mean window of t30 and 30t [days]
+T30_WINDOW = 30
+
+# Daily fields averaged by DOY over the period (process_climate() names)
+DOY_FIELDS = ['t30', '30t', 'main_cgdd', 'hist_cgdd']
+
+# Long term DOY arrays (ETCell.climate) of each DOY field
+CLIMATE_NAMES = {
+    't30': 'main_t30_lt', '30t': 'hist_t30_lt',
+    'main_cgdd': 'main_cgdd_0_lt', 'hist_cgdd': 'hist_cgdd_0_lt'}
+
+
+@util.jit
+def rolling_mean(values, start_i, window, state):
+    """Rolling mean continuing from carried values
+
+    Same values as Series.rolling(window, min_periods=1).mean() of the
+    full series
+
+    Parameters
+    ---------
+    values : ndarray
+        float64 values, the last (up to window) values of the previous call
+        followed by the new values
+    start_i : int
+        index of the first new value
+    window : int
+        rolling window [days]
+    state : ndarray
+        float64 running sum, add and remove compensations, number of
+        values, negative values and same values, last value;
+        zeros before the first call, updated in place
+
+    Returns
+    -------
+    : ndarray
+        rolling means of the new values
+
+    """
+
+    output = np.empty(values.shape[0] - start_i)
+    sum_x = state[0]
+    comp_add = state[1]
+    comp_remove = state[2]
+    nobs = state[3]
+    neg_ct = state[4]
+    n_same = state[5]
+    prev_value = state[6]
+    for i in range(start_i, values.shape[0]):
+        if i >= window:
+            val = values[i - window]
+            if val == val:
+                nobs -= 1
+                y = -val - comp_remove
+                t = sum_x + y
+                comp_remove = t - sum_x - y
+                sum_x = t
+                if math.copysign(1.0, val) < 0:
+                    neg_ct -= 1
+        val = values[i]
+        if i == 0:
+            prev_value = val
+        if val == val:
+            nobs += 1
+            y = val - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if math.copysign(1.0, val) < 0:
+                neg_ct += 1
+            # Runs of the same value average to the value exactly
+            if val == prev_value:
+                n_same += 1
+            else:
+                n_same = 1
+            prev_value = val
+        if nobs > 0:
+            result = sum_x / nobs
+            if n_same >= nobs:
+                result = prev_value
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+        else:
+            result = np.nan
+        output[i - start_i] = result
+    state[0] = sum_x
+    state[1] = comp_add
+    state[2] = comp_remove
+    state[3] = nobs
+    state[4] = neg_ct
+    state[5] = n_same
+    state[6] = prev_value
+    return output
+
+
+class ClimateStream:
+    """Climate state of one ET cell carried between windows
+
+    Attributes
+    ----------
+    climate : dict
+        long term DOY arrays (see ETCell.climate), None until
+        end_first_pass()
+    snow_flag : boolean
+        True if there is snow in any window of the first pass
+    snow_accum : float
+        snow accumulation at the end of the last window [mm]
+
+    """
+
+    def __init__(self):
+        self.climate = None
+        self.snow_flag = False
+        self._doy_sums = np.zeros((367, len(DOY_FIELDS)))
+        self._doy_comp = np.zeros((367, len(DOY_FIELDS)))
+        self._doy_nobs = np.zeros((367, len(DOY_FIELDS)), dtype=np.int64)
+        self._doy_found = np.zeros(367, dtype=bool)
+        self.start_pass()
+
+    def start_pass(self):
+        """Reset the state carried between windows for a pass from the start
+
+        Returns
+        -------
+        None
+
+        """
+
+        self.snow_accum = 0.0
+        self._rolling = {}
+
+    def rolling_mean(self, field, values):
+        """Return T30_WINDOW day rolling mean continuing the previous window
+
+        Parameters
+        ---------
+        field : str
+            field name, each field is carried separately
+        values : ndarray
+            daily values of the window
+
+        Returns
+        -------
+        : ndarray
+
+        """
+
+        tail, state = self._rolling.get(field, (np.empty(0), np.zeros(7)))
+        values = np.concatenate([tail, np.asarray(values, dtype=np.float64)])
+        output = rolling_mean(values, len(tail), T30_WINDOW, state)
+        self._rolling[field] = (values[-T30_WINDOW:].copy(), state)
+        return output
+
+    def add_doy_values(self, doy, values):
+        """Add daily values of a first pass window to the DOY sums
+
+        Parameters
+        ---------
+        doy : ndarray
+            day of year of each day
+        values : ndarray
+            (day, DOY_FIELDS) float values, NaN values are skipped
+
+        Returns
+        -------
+        None
+
+        """
+
+        doy = np.asarray(doy, dtype=np.int64)
+        # Each run of increasing DOY (a year) adds at most once to each DOY
+        year_starts = np.concatenate(
+            [[0], np.nonzero(np.diff(doy) <= 0)[0] + 1, [len(doy)]])
+        for start, end in zip(year_starts[:-1], year_starts[1:]):
+            year_doy = doy[start:end]
+            year_values = values[start:end]
+            valid = year_values == year_values
+            sums = self._doy_sums[year_doy]
+            comp = self._doy_comp[year_doy]
+            y = np.where(valid, year_values - comp, 0.0)
+            t = sums + y
+            self._doy_comp[year_doy] = np.where(valid, (t - sums) - y, comp)
+            self._doy_sums[year_doy] = t
+            self._doy_nobs[year_doy] += valid
+            self._doy_found[year_doy] = True
+
+    def end_first_pass(self):
+        """Compute the long term DOY means of the first pass
+
+        Returns
+        -------
+        None
+
+        Notes
+        -----
+        Same arrays as the DOY groupby means of process_climate(), with the
+            DOY 1 value copied into DOY 0
+
+        """
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(
+                self._doy_nobs > 0, self._doy_sums / self._doy_nobs, np.nan)
+        means = means[self._doy_found]
+        self.climate = {}
+        for i, field in enumerate(DOY_FIELDS):
+            self.climate[CLIMATE_NAMES[field]] = np.insert(
+                means[:, i], 0, means[0, i])
@@ -8,7 +8,6 @@ import datetime
 import logging
 import math
 import sys
-import util
 
 import grow_root
 import runoff
@@ -100,8 +99,9 @@ def compute_crop_et(data, et_cell, crop, foo, foo_day, debug_flag=False):
     # Assume that winter time is constrained to Nov-March in northern hemisphere
     # Also set up kc_max for non-growing seasons for other crops
     # Kc_max for wintertime land use (Nov-Mar)for non-growing season crops
+    # foo_day.winter is set by the day loop (see util.is_winter)
 
-    if util.is_winter(et_cell, foo_day):
+    if foo_day.winter:
         if crop.class_number not in [44, 45, 46]:
             # Note that these are ETr based.  (Allen 12/2007)
             # Multiply by 1.2 (plus adj?) for ETo base
@@ -0,0 +1,250 @@
+"""crop_calibration.py
+Defines CropCalibration class, load_calibration_cell, grid_search
+Called by user calibration scripts
+
+Growing season parameters (t30_for_pl_or_gu_or_cgdd, cgdd_for_efc,
+    cgdd_for_termination, ...) are calibrated by rerunning the crop day
+    loop of one cell and crop for candidate parameter values
+The INI, static files and cell input time series are read once, each run
+    only copies the crop parameters and returns the growing season
+    statistics in memory, no output files are written or read
+
+Example
+-------
+    data, et_cell = crop_calibration.load_calibration_cell(ini_path, '1000')
+    calib = crop_calibration.CropCalibration(data, et_cell, 3)
+    calib.season_stats({'t30_for_pl_or_gu_or_cgdd': 12.0})
+    crop_calibration.grid_search(
+        calib, {'t30_for_pl_or_gu_or_cgdd': [10, 11, 12, 13]}, obs_df)
+
+season_error() can also be minimized with any optimizer taking a function
+    of the parameter values (scipy.optimize.minimize for example)
+
+"""
+
+import copy
+import itertools
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                             '../../lib')))
+import crop_cycle
+import crop_et_data
+import crop_parameters
+import mod_crop_et
+import period_stats
+
+# Error of a year without growing season [days]
+MISSING_SEASON_ERROR = 366.0
+
+
+def load_calibration_cell(ini_path, cell_id):
+    """Read project data and the input time series of one cell
+
+    Parameters
+    ---------
+    ini_path : str
+        absolute file path of INI file
+    cell_id : str
+        ET cell id
+
+    Returns
+    -------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance with input time series set
+
+    """
+
+    data = crop_et_data.CropETData()
+    data.read_cet_ini(ini_path)
+    cells = mod_crop_et.read_project_cells(data)
+    try:
+        et_cell = cells.et_cells_dict[cell_id]
+    except KeyError:
+        logging.error('\nERROR: CellID {} not in the project cells'.format(
+            cell_id))
+        sys.exit()
+    if not et_cell.set_input_timeseries(1, data, cells):
+        sys.exit()
+    return data, et_cell
+
+
+class CropCalibration:
+    """Growing season of one cell and crop for candidate parameters
+
+    Attributes
+    ----------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance with input time series set
+    crop :
+        CropParameters instance of et_cell, base parameter values
+
+    """
+
+    def __init__(self, data, et_cell, crop_num):
+        """Set the cell and crop to calibrate
+
+        Parameters
+        ---------
+        data :
+            configuration data from INI file
+        et_cell :
+            ETCell instance with input time series set
+        crop_num : int
+            crop class number
+
+        """
+
+        self.data = data
+        self.et_cell = et_cell
+        self.crop = et_cell.crop_params[crop_num]
+        # Daily climate features are built once for all runs
+        et_cell.climate_features(data)
+
+    def crop_params(self, params=None):
+        """Return copy of the crop parameters with candidate values
+
+        Parameters
+        ---------
+        params : dict
+            CropParameters attribute name to value, None [default] for the
+            base values
+
+        Returns
+        -------
+        : CropParameters
+
+        """
+
+        crop = copy.copy(self.crop)
+        for name, value in (params or {}).items():
+            if name not in crop_parameters.CropParameters.__slots__:
+                raise ValueError('Unknown crop parameter {}'.format(name))
+            setattr(crop, name, value)
+        return crop
+
+    def season_stats(self, params=None):
+        """Run the crop day loop and return growing season of each year
+
+        Parameters
+        ---------
+        params : dict
+            CropParameters attribute name to value, None [default] for the
+            base values
+
+        Returns
+        -------
+        : pandas.DataFrame
+            Start_DOY, End_DOY and GS_Length indexed by year, same values
+            as the growing season output files, NaN for years without a
+            growing season
+
+        """
+
+        crop = self.crop_params(params)
+        foo, foo_day = crop_cycle.init_crop_day_loop(
+            self.data, self.et_cell, crop)
+        crop_cycle.run_crop_day_loop(
+            self.data, self.et_cell, crop, foo, foo_day)
+        season_df = period_stats.season_stats(
+            foo.crop_df.index, foo.crop_df['doy'].values,
+            foo.crop_df['season'].values)
+        return pd.DataFrame(
+            {'Start_DOY': season_df['start_doy'].values,
+             'End_DOY': season_df['end_doy'].values,
+             'GS_Length': season_df['length'].values},
+            index=pd.Index(season_df.index.year, name='Year'))
+
+    def mean_season(self, params=None):
+        """Return mean growing season start and end DOY
+
+        Parameters
+        ---------
+        params : dict
+            CropParameters attribute name to value, None [default] for the
+            base values
+
+        Returns
+        -------
+        : tuple
+            mean start and end DOY of the years after the first, as
+            displayed by mod_crop_et.py --cal
+
+        """
+
+        gs_df = self.season_stats(params)[1:]
+        return gs_df['Start_DOY'].mean(), gs_df['End_DOY'].mean()
+
+    def season_error(self, params, observed_df):
+        """Return root mean square error of the growing season dates
+
+        Parameters
+        ---------
+        params : dict
+            CropParameters attribute name to value
+        observed_df : pandas.DataFrame
+            observed Start_DOY and/or End_DOY indexed by year, NaN values
+            are skipped
+
+        Returns
+        -------
+        : float
+            root mean square error [days] over the observed years and
+            fields, simulated years without growing season count
+            MISSING_SEASON_ERROR days
+
+        """
+
+        gs_df = self.season_stats(params)
+        errors = []
+        for field in ['Start_DOY', 'End_DOY']:
+            if field not in observed_df.columns:
+                continue
+            obs = observed_df[field].dropna()
+            sim = gs_df[field].reindex(obs.index)
+            errors.append(np.where(
+                np.isnan(sim.values), MISSING_SEASON_ERROR,
+                sim.values - obs.values))
+        if not errors:
+            raise ValueError('observed_df has no Start_DOY or End_DOY')
+        errors = np.concatenate(errors)
+        return float(np.sqrt(np.mean(errors ** 2)))
+
+
+def grid_search(calibration, param_grid, observed_df):
+    """Return season error of each combination of candidate values
+
+    Parameters
+    ---------
+    calibration : CropCalibration
+        cell and crop to calibrate
+    param_grid : dict
+        CropParameters attribute name to list of candidate values
+    observed_df : pandas.DataFrame
+        observed Start_DOY and/or End_DOY indexed by year
+
+    Returns
+    -------
+    : pandas.DataFrame
+        parameter values and 'error' (see CropCalibration.season_error) of
+        each combination, smallest error first
+
+    """
+
+    names = list(param_grid.keys())
+    rows = []
+    for values in itertools.product(*[param_grid[name] for name in names]):
+        params = dict(zip(names, values))
+        params['error'] = calibration.season_error(params, observed_df)
+        rows.append(params)
+    return pd.DataFrame(rows, columns=names + ['error']).sort_values(
+        'error', kind='mergesort').reset_index(drop=True)
@@ -36,13 +36,23 @@ class CropCoeff:
             Crop name
         data : ndarray
             Crop coefficient curve values
+        kc_table : list
+            curve values as floats
+        kc_slope : list
+            change in curve value to the next line
 
     Notes
     -----
     See comments in code
+    kc_table and kc_slope are built once when the curve is read, the day
+        loop interpolates with kc_bas() without numpy scalar indexing
 
     """
 
+    __slots__ = [
+        'curve_no', 'curve_type_no', 'curve_types', 'data', 'gdd_type_name',
+        'kc_slope', 'kc_table', 'lentry', 'name']
+
     def __init__(self):
         """ """
         self.name = None
@@ -87,6 +97,29 @@ class CropCoeff:
         self.data = values.astype(float)
         self.lentry = len(np.where(self.data > 0.0)[0]) - 1
 
+        # Lookup tables for kc_bas()
+        self.kc_table = self.data.tolist()
+        self.kc_slope = (self.data[1:] - self.data[:-1]).tolist()
+
+    def kc_bas(self, n_curve, int_curve):
+        """Interpolate basal crop coefficient
+
+        Parameters
+        ----------
+        n_curve : float
+            position on curve in lines (tenths of season or days after EFC)
+        int_curve : int
+            curve line at or below n_curve
+
+        Returns
+        -------
+        : float
+
+        """
+
+        return (self.kc_table[int_curve] +
+                (n_curve - int_curve) * self.kc_slope[int_curve])
+
 def read_crop_coefs_txt(data):
     """Read crop coefficients from text file
     Parameters
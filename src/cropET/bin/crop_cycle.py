@@ -1,25 +1,41 @@
 """crop_cycle.py
 Defines DayData class
-Defines crop_cycle_mp, crop_cycle, crop_day_loop_mp, crop_day_loop,
-    write_crop_output
-Called by mod_crop_et.py
+Defines crop_cycle, crop_day_loop, init_crop_day_loop, run_crop_day_loop,
+    queue_crop_output, queue_follower_output, crop_output_flag,
+    crop_day_loop_df, day_loop_inputs, set_crop_df_outputs,
+    check_season_start, crop_day_loop_arrays, crop_curve_arrays,
+    kernel_inputs, set_kernel_outputs, crop_day_loop_kernel, crop_cycle_batch,
+    crop_day_loop_batch, crop_output_paths, atomic_output_path,
+    write_crop_output, write_gs_output
+Called by mod_crop_et.py, crop_scheduler.py and stream_cycle.py
 
 """
 
+import contextlib
 import datetime
 import logging
-import multiprocessing as mp
 import os
 import numpy as np
 import pandas as pd
 import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                             '../../lib')))
 
 import calculate_height
 import compute_crop_et
 import compute_crop_gdd
+import crop_day_batch
+import crop_day_kernel
 from initialize_crop_cycle import InitializeCropCycle
 import kcb_daily
+import period_stats
+import results_cube
+import text_writer
+import typed_ts
+import util
 
+# Climate feature of each crop CO2 type (see ETCell.climate_features)
+CO2_FIELDS = {'GRASS': 'co2_grass', 'TREE': 'co2_tree', 'C4': 'co2_c4'}
 
 class DayData:
     """Daily crop data container
@@ -33,55 +49,26 @@ class DayData:
 
     """
 
+    __slots__ = [
+        'co2', 'date', 'day', 'doy', 'doy_prev', 'etref', 'etref_array',
+        'month', 'precip', 'rh_min', 'sdays', 'snow_depth', 't30', 'tdew',
+        'tmax', 'tmean', 'tmin', 'u2', 'winter', 'year']
+
     def __init__(self):
         self.etref_array = np.zeros(30)
 
-def crop_cycle_mp(data, et_cell, mp_procs=1):
-    """Compute crop et for all crops using multiprocessing
-
-    Parameters
-    ---------
-    data :
-
-    et_cell :
-
-    mp_procs :
-        number of cores to use for multiprocessing
-
-    Returns
-    -------
-    None
-
-    Notes
-    -----
-    crop_day_loop_mp() will unpack arguments and call crop_day_loop()
-
-    """
-
-    crop_count = 0
-    crop_mp_list = []
-    for crop_num, crop in sorted(et_cell.crop_params.items()):
-        if et_cell.crop_flags[crop_num] != 0:
-
-            # Force debug_flag false when multiprocessing
-            crop_count += 1
-            crop_mp_list.append([crop_count, data, et_cell, crop, False,
-                                 mp_procs])
-    results = []
-    if crop_mp_list:
-        pool = mp.Pool(mp_procs)
-        results = pool.imap(crop_day_loop_mp, crop_mp_list, chunksize=1)
-        pool.close()
-        pool.join()
-        del pool, results
-
-def crop_cycle(data, et_cell, debug_flag=False, mp_procs=1):
+def crop_cycle(data, et_cell, debug_flag=False, mp_procs=1,
+               output_writer=None, memo=None):
     """Compute crop ET for all crops
 
     Args:
         data ():
         et_cell ():
         debug_flag (bool): If True, write debug level comments to debug.txt
+        output_writer (OutputWriter): If set, crop output files are written
+            by the background writer thread
+        memo (SimulationMemo): If set, results are also written for the
+            cells with the same simulation inputs
 
     Returns:
         None
@@ -94,44 +81,12 @@ def crop_cycle(data, et_cell, debug_flag=False, mp_procs=1):
                 logging.debug('  NOT USED')
             continue
         crop_count += 1
-        crop_day_loop(crop_count, data, et_cell, crop, debug_flag, mp_procs)
-
-def crop_day_loop_mp(tup):
-    """Compute crop et for each daily timestep using multiprocessing
-
-
-    mp.Pool needs all inputs are packed into single tuple
-    Tuple is unpacked and and single processing version of function is called
-
-    Parameters
-    ---------
-    crop_count : int
-        count of crop being computed
-    data :
-
-    et_cell :
-
-    crop :
-
-    debug_flag : boolean
-        True : write debug level comments to debug.txt
-        False
-    mp_procs : int
-        number of cores to use for multiprocessing
-
-    Returns
-    -------
-
-    Notes
-    -----
-    Calls crop_day_loop
-
-    """
-
-    return crop_day_loop(*tup)
+        followers = () if memo is None else memo.followers(et_cell, crop_num)
+        crop_day_loop(crop_count, data, et_cell, crop, debug_flag, mp_procs,
+                      output_writer, followers)
 
 def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
-                  mp_procs=1):
+                  mp_procs=1, output_writer=None, followers=()):
     """Compute crop et for each daily timestep
 
     Parameters
@@ -149,6 +104,12 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
         False
     mp_procs : int
         number of cores to use for multiprocessing
+    output_writer : OutputWriter
+        background writer for output files, None [default] writes files
+        before returning
+    followers : list
+        (crop_count, ETCell) of cells with the same simulation inputs,
+        their output files are written from the results of et_cell
 
     Returns
     -------
@@ -159,7 +120,7 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
     Notes
     -----
     mp_procs always set to 1 if calling directly
-    mp_procs can be greater than one if called through crop_day_loop_mp
+    mp_procs can be greater than one if called through crop_scheduler.crop_task
 
     """
 
@@ -173,6 +134,39 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
                 crop.class_number, et_cell.crop_flags[crop.class_number]))
         logging.debug('  GDD trigger DOY: {}'.format(crop.gdd_trigger_doy))
 
+    foo, foo_day = init_crop_day_loop(data, et_cell, crop)
+    run_crop_day_loop(data, et_cell, crop, foo, foo_day, debug_flag)
+
+    # Write output files
+    queue_crop_output(crop_count, data, et_cell, crop, foo, output_writer)
+    queue_follower_output(data, et_cell, crop, foo, followers, output_writer)
+    return True
+
+def init_crop_day_loop(data, et_cell, crop, dataframe_flag=True):
+    """Initialize crop cycle state for start of day loop
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    dataframe_flag : boolean
+        True [default] : build crop data frame
+        False : crop_df is None, set it with foo.setup_dataframe() before
+        run_crop_day_loop() (kernel state only runs)
+
+    Returns
+    -------
+    foo : InitializeCropCycle
+        crop cycle state
+    foo_day : DayData
+        daily data container
+
+    """
+
     # 'foo' is holder of all these global variables for now
     foo = InitializeCropCycle()
 
@@ -185,7 +179,10 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
         foo.setup_co2(et_cell, crop)
 
     # Initialize crop data frame
-    foo.setup_dataframe(et_cell)
+    if dataframe_flag:
+        foo.setup_dataframe(et_cell)
+    else:
+        foo.crop_df = None
     foo_day = DayData()
     foo_day.sdays = 0
     foo_day.doy_prev = 0
@@ -193,7 +190,98 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
     # At very start for crop, set up for next season
     if not foo.in_season and foo.crop_setup_flag:
         foo.setup_crop(crop)
+    return foo, foo_day
+
+def run_crop_day_loop(data, et_cell, crop, foo, foo_day, debug_flag=False):
+    """Run daily timesteps for single cell and crop with selected engine
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    foo :
+        crop cycle state, crop_df is filled in place
+    foo_day :
+        daily data container
+    debug_flag : boolean
+        True : write debug level comments to debug.txt
+        False [default]
+
+    Returns
+    -------
+    None
+
+    """
+
+    if (data.jit_flag and not debug_flag and
+            crop_day_loop_kernel(data, et_cell, crop, foo, foo_day)):
+        pass
+    elif data.array_loop_flag:
+        crop_day_loop_arrays(data, et_cell, crop, foo, foo_day, debug_flag)
+    else:
+        crop_day_loop_df(data, et_cell, crop, foo, foo_day, debug_flag)
+
+def queue_crop_output(crop_count, data, et_cell, crop, foo,
+                      output_writer=None):
+    """Write crop output files now or queue them on the background writer"""
+    if not crop_output_flag(data):
+        return
+    if output_writer is None:
+        write_crop_output(crop_count, data, et_cell, crop, foo)
+    else:
+        output_writer.put(crop_count, data, et_cell, crop, foo)
+
+def queue_follower_output(data, et_cell, crop, foo, followers,
+                          output_writer=None):
+    """Write crop results of et_cell for cells with the same inputs"""
+    for crop_count, follower_cell in followers:
+        follower_cell.share_input_timeseries(et_cell)
+        queue_crop_output(
+            crop_count, data, follower_cell,
+            follower_cell.crop_params[crop.class_number], foo, output_writer)
+
+def crop_output_flag(data):
+    """Return True if any crop output files are written"""
+    return (data.cet_out['daily_output_flag'] or
+            data.cet_out['monthly_output_flag'] or
+            data.cet_out['annual_output_flag'] or
+            data.gs_output_flag or
+            data.cet_out['cube_ws'] is not None)
+
+def crop_day_loop_df(data, et_cell, crop, foo, foo_day, debug_flag=False):
+    """Run daily timesteps reading and writing data frames by label
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    foo :
+        crop cycle state, crop_df is filled in place
+    foo_day :
+        daily data container
+    debug_flag : boolean
+        True : write debug level comments to debug.txt
+        False
+
+    Returns
+    -------
+    None
 
+    Notes
+    -----
+    Original day loop, kept for array_loop_flag = False
+
+    """
+
+    func_str = 'crop_day_loop()'
     for step_dt, step_doy in foo.crop_df[['doy']].iterrows():
         if debug_flag:
             logging.debug(
@@ -235,6 +323,7 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
         foo_day.month = int(step_dt.month)
         foo_day.day = int(step_dt.day)
         foo_day.date = step_dt
+        foo_day.winter = util.is_winter(et_cell, foo_day)
         foo_day.tdew = float(et_cell.climate_df.at[step_dt, 'tdew'])
         foo_day.u2 = float(et_cell.climate_df.at[step_dt, 'wind'])
         foo_day.precip = float(et_cell.climate_df.at[step_dt, 'ppt'])
@@ -334,15 +423,688 @@ def crop_day_loop(crop_count, data, et_cell, crop, debug_flag=False,
                     '  Crop {} - {} growing season active for 1 day'.format(
                         crop.class_number, foo_day.year))
 
-    # Write output files
-    if (data.cet_out['daily_output_flag'] or
-            data.cet_out['monthly_output_flag'] or
-            data.cet_out['annual_output_flag'] or
-            data.gs_output_flag):
-        write_crop_output(crop_count, data, et_cell, crop, foo)
+def day_loop_inputs(data, et_cell, crop, foo):
+    """Pull daily inputs for crop from climate data frame as arrays
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    foo :
+        crop cycle state, crop_df index sets the days
+
+    Returns
+    -------
+    : dict
+        NumPy arrays keyed by DayData attribute name
+
+    Notes
+    -----
+    Arrays are the cell climate features (see ETCell.climate_features)
+        shared by all crops of the cell, they must not be modified
+    Temperature fields are picked using data.phenology_option
+
+    """
+
+    if (data.phenology_option == 0 or
+            (data.phenology_option == 1 and not crop.is_annual) or
+            (data.phenology_option == 2 and crop.is_annual)):
+        temp_fields = ['tmean', 'tmin', 'tmax', 't30']
+    else:
+        temp_fields = ['meant', 'mint', 'maxt', '30t']
+    day_fields = {
+        'tdew': 'tdew', 'u2': 'wind', 'precip': 'ppt', 'rh_min': 'rh_min',
+        'etref': 'etref', 'snow_depth': 'snow_depth',
+        'tmean': temp_fields[0], 'tmin': temp_fields[1],
+        'tmax': temp_fields[2], 't30': temp_fields[3],
+        'doy': 'doy', 'year': 'year', 'month': 'month', 'day': 'day',
+        'winter': 'winter'}
+    features = et_cell.climate_features(data)
+    inputs = {key: features[field] for key, field in day_fields.items()}
+    if data.co2_flag:
+        inputs['co2'] = features[CO2_FIELDS[crop.co2_type]]
+    return inputs
+
+def set_crop_df_outputs(foo, out, season_array, cutting_array):
+    """Assign daily output arrays to crop data frame
+
+    Parameters
+    ---------
+    foo :
+        crop cycle state, crop_df is filled in place
+    out : dict
+        float output arrays keyed by crop_df column name
+    season_array : ndarray
+
+    cutting_array : ndarray
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Columns are set in same order as data frame day loop creates them
+
+    """
+
+    for field in ['et_act', 'et_pot', 'et_bas', 'kc_act', 'kc_bas',
+                  'irrigation', 'runoff', 'dperc', 'niwr']:
+        foo.crop_df[field] = out[field]
+    foo.crop_df['season'] = season_array
+    foo.crop_df['cutting'] = cutting_array
+    foo.crop_df['p_rz'] = out['p_rz']
+    foo.crop_df['p_eft'] = out['p_eft']
+
+def check_season_start(crop, year, season_count):
+    """Warn if growing season did not start (or lasted 1 day) in year
+
+    Parameters
+    ---------
+    crop :
+
+    year : int
+
+    season_count : int
+        number of in season days in year
+
+    Returns
+    -------
+    None
+
+    """
+
+    if season_count == 0:
+        logging.warning(
+            '  Crop {} - {} growing season never started'.format(
+                crop.class_number, year))
+    elif season_count == 1:
+        logging.warning(
+            '  Crop {} - {} growing season active for 1 day'.format(
+                crop.class_number, year))
+
+def crop_day_loop_arrays(data, et_cell, crop, foo, foo_day, debug_flag=False):
+    """Run daily timesteps using climate and output arrays
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    foo :
+        crop cycle state, crop_df is filled in place
+    foo_day :
+        daily data container
+    debug_flag : boolean
+        True : write debug level comments to debug.txt
+        False
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Climate columns are pulled once from climate_df as lists of native
+    Python values and outputs are collected in preallocated arrays.
+    crop_df columns are assigned once after the loop.
+    Results are identical to crop_day_loop_df().
+
+    """
+
+    func_str = 'crop_day_loop()'
+    dt_index = foo.crop_df.index
+    n_days = len(dt_index)
+    inputs = {
+        key: values.tolist() for key, values in
+        day_loop_inputs(data, et_cell, crop, foo).items()}
+    doy_list = inputs['doy']
+    year_list = inputs['year']
+    month_list = inputs['month']
+    day_list = inputs['day']
+    tdew_list = inputs['tdew']
+    u2_list = inputs['u2']
+    precip_list = inputs['precip']
+    rh_min_list = inputs['rh_min']
+    etref_list = inputs['etref']
+    snow_depth_list = inputs['snow_depth']
+    tmean_list = inputs['tmean']
+    tmin_list = inputs['tmin']
+    tmax_list = inputs['tmax']
+    t30_list = inputs['t30']
+    winter_list = inputs['winter']
+    if data.co2_flag:
+        co2_list = inputs['co2']
+
+    # Preallocate outputs
+    out = {
+        field: np.full(n_days, np.nan)
+        for field in crop_day_kernel.OUT_FIELDS}
+    season_array = np.zeros(n_days, dtype=np.int64)
+    cutting_array = np.zeros(n_days, dtype=np.int64)
+    year_start_i = 0
+
+    for i in range(n_days):
+        step_dt = dt_index[i]
+        if debug_flag:
+            logging.debug(
+                '\n{}: DOY {}  Date {}'.format(
+                    func_str, doy_list[i], step_dt.date()))
+            logging.debug((
+                '{}: PPT {:.6f}  Wind {:.6f}  ' +
+                'Tdew {:.6f} ETref {:.6f}').format(
+                func_str, precip_list[i], u2_list[i], tdew_list[i],
+                et_cell.refet_df.at[step_dt, 'etref']))
+
+            # Log climate values at time step, as crop_day_loop_df() does
+            #   (climate fields, not the phenology option fields)
+            logging.debug((
+                '{}: tmax {:.6f}  tmin {:.6f}  ' +
+                'tmean {:.6f}  t30 {:.6f}').format(
+                func_str, et_cell.climate_df.at[step_dt, 'tmax'],
+                et_cell.climate_df.at[step_dt, 'tmin'],
+                et_cell.climate_df.at[step_dt, 'tmean'],
+                et_cell.climate_df.at[step_dt, 't30']))
+
+        # End of season for each crop, set up for non-growing and dormant season
+        if not foo.in_season and foo.dormant_setup_flag:
+            foo.setup_dormant(et_cell, crop)
+        if debug_flag:
+            logging.debug(
+                '{}: in_season[{}]  crop_setup[{}]  dormant_setup[{}]'.format(
+                    func_str, foo.in_season, foo.crop_setup_flag,
+                    foo.dormant_setup_flag))
+
+        # Track variables for each day
+        foo_day.sdays += 1
+        foo_day.doy = doy_list[i]
+        foo_day.year = year_list[i]
+        foo_day.month = month_list[i]
+        foo_day.day = day_list[i]
+        foo_day.date = step_dt
+        foo_day.winter = winter_list[i]
+        foo_day.tdew = tdew_list[i]
+        foo_day.u2 = u2_list[i]
+        foo_day.precip = precip_list[i]
+        foo_day.rh_min = rh_min_list[i]
+        foo_day.etref = etref_list[i]
+        foo_day.snow_depth = snow_depth_list[i]
+        foo_day.tmean = tmean_list[i]
+        foo_day.tmin = tmin_list[i]
+        foo_day.tmax = tmax_list[i]
+        foo_day.t30 = t30_list[i]
+        if data.co2_flag:
+            foo_day.co2 = co2_list[i]
+
+        compute_crop_gdd.compute_crop_gdd(crop, foo, foo_day)
+        calculate_height.calculate_height(crop, foo, debug_flag)
+        kcb_daily.kcb_daily(data, et_cell, crop, foo, foo_day, debug_flag)
+        compute_crop_et.compute_crop_et(data, et_cell, crop, foo, foo_day,
+                                        debug_flag)
+
+        out['et_act'][i] = foo.etc_act
+        out['et_pot'][i] = foo.etc_pot
+        out['et_bas'][i] = foo.etc_bas
+        out['kc_act'][i] = foo.kc_act
+        out['kc_bas'][i] = foo.kc_bas
+        out['irrigation'][i] = foo.irr_sim
+        out['runoff'][i] = foo.sro
+        out['dperc'][i] = foo.dperc
+        out['p_rz'][i] = foo.p_rz
+        out['p_eft'][i] = foo.p_eft
+        out['niwr'][i] = foo.niwr + 0
+        season_array[i] = int(foo.in_season)
+        cutting_array[i] = int(foo.cutting)
+
+        if debug_flag:
+            logging.debug((
+                '{}: ETref  {:.6f}  Precip {:.6f}  T30 {:.6f}').format(
+                    func_str, foo_day.etref, foo_day.precip, foo_day.t30))
+            logging.debug((
+                '{}: ETact  {:.6f}  ETpot {:.6f}   ETbas {:.6f}').format(
+                    func_str, foo.etc_act, foo.etc_pot, foo.etc_bas))
+            logging.debug((
+                '{}: Irrig  {:.6f}  Runoff {:.6f}  ' +
+                'DPerc {:.6f}  NIWR {:.6f}').format(
+                    func_str, foo.irr_sim, foo.sro, foo.dperc, foo.niwr))
+
+        # Check that season started
+        if foo_day.year != year_list[year_start_i]:
+            year_start_i = i
+        if foo_day.month == 12 and foo_day.day == 31:
+            check_season_start(
+                crop, foo_day.year, season_array[year_start_i:i + 1].sum())
+
+    set_crop_df_outputs(foo, out, season_array, cutting_array)
+
+def crop_curve_arrays(data, et_cell):
+    """Return crop curve arrays of the day loop kernels
+
+    Parameters
+    ---------
+    data :
+        configuration data, crop_curves are built by set_crop_coeffs()
+    et_cell :
+
+    Returns
+    -------
+    : tuple
+        curves, curve_valid, lentries (see build_curve_arrays())
+
+    Notes
+    -----
+    Cells without curve overrides (see crop_tables.py) use the shared arrays
+
+    """
+
+    if getattr(et_cell.crop_coeffs, 'overrides', None) == {}:
+        return data.crop_curves
+    return crop_day_kernel.build_curve_arrays(et_cell.crop_coeffs)
+
+def kernel_inputs(data, et_cell, crop, foo):
+    """Build kernel crop parameter and daily input arrays
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    foo :
+        crop cycle state, crop_df index sets the days
+
+    Returns
+    -------
+    cp : ndarray
+        crop parameters (see crop_day_kernel.build_crop_param_array)
+    inputs : dict
+        daily input arrays (see day_loop_inputs) with co2 and pl_gu_doy
+    None if crop or inputs are not supported by kernel
+
+    """
+
+    cp = crop_day_kernel.build_crop_param_array(data, et_cell, crop)
+    if cp is None:
+        return None
+    inputs = day_loop_inputs(data, et_cell, crop, foo)
+    n_days = len(inputs['doy'])
+    if not data.co2_flag:
+        inputs['co2'] = np.ones(n_days, dtype=np.float64)
+
+    # Planting or greenup day of year for each day (see kcb_daily)
+    pl_gu_doy = np.zeros(n_days, dtype=np.int64)
+    if crop.flag_for_means_to_estimate_pl_or_gu == 3:
+        month_of_pl_or_gu = int(crop.date_of_pl_or_gu)
+        day_of_pl_or_gu = int(round(
+            (crop.date_of_pl_or_gu - month_of_pl_or_gu) * 30.4))
+        if day_of_pl_or_gu < 0.5:
+            day_of_pl_or_gu = 15
+        try:
+            for year in np.unique(inputs['year']):
+                pl_gu_doy[inputs['year'] == year] = datetime.datetime(
+                    int(year), month_of_pl_or_gu,
+                    day_of_pl_or_gu).timetuple().tm_yday
+        except ValueError:
+            return None
+    inputs['pl_gu_doy'] = pl_gu_doy
+    return cp, inputs
+
+def set_kernel_outputs(crop, foo, foo_day, st, etref_array, day_state,
+                       inputs, out, season_array, cutting_array, events):
+    """Copy kernel state and outputs back to crop cycle
+
+    Parameters
+    ---------
+    crop :
+
+    foo :
+        crop cycle state, updated in place
+    foo_day :
+        daily data container, updated in place
+    st, etref_array, day_state : ndarray
+        final kernel state
+    inputs : dict
+        daily input arrays
+    out : ndarray
+        daily output values [day, OUT_FIELDS]
+    season_array, cutting_array, events : ndarray
+        integer daily outputs
+
+    Returns
+    -------
+    None
+
+    """
+
+    crop_day_kernel.unpack_state(foo, st)
+    foo_day.etref_array = etref_array
+    foo_day.sdays = int(day_state[0])
+    foo_day.doy_prev = int(day_state[1])
+
+    # Log events and season checks in day order
+    for i in np.where((events > 0) | (
+            (inputs['month'] == 12) & (inputs['day'] == 31)))[0]:
+        year = int(inputs['year'][i])
+        if events[i] & crop_day_kernel.EVENT_ADJUST_SEASON:
+            logging.info('ADJUSTING GROWING SEASON (NOT CENTERING ON JULY 15)')
+        if events[i] & crop_day_kernel.EVENT_KILLING_FROST:
+            logging.info(
+                "Killing frost for crop %d of %.1f was found on DOY %d of %d" %
+                (crop.class_number, crop.killing_frost_temperature,
+                 inputs['doy'][i], year))
+        if events[i] & crop_day_kernel.EVENT_NO_KILLING_FROST:
+            logging.info("No killing frost in year %d" % (year))
+        if events[i] & crop_day_kernel.EVENT_KC_MULT:
+            logging.warning("kcmult > 1.")
+        if events[i] & crop_day_kernel.EVENT_KS:
+            logging.warning("ks > 1.")
+        if inputs['month'][i] == 12 and inputs['day'][i] == 31:
+            year_mask = inputs['year'][:i + 1] == year
+            check_season_start(crop, year, season_array[:i + 1][year_mask].sum())
+
+    set_crop_df_outputs(
+        foo, {field: out[:, i] for i, field in
+              enumerate(crop_day_kernel.OUT_FIELDS)},
+        season_array, cutting_array)
+
+def crop_day_loop_kernel(data, et_cell, crop, foo, foo_day):
+    """Run daily timesteps with compiled kernel
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    foo :
+        crop cycle state, crop_df is filled in place
+    foo_day :
+        daily data container
+
+    Returns
+    -------
+    : boolean
+        True : kernel ran all days
+        False : crop or inputs not supported by kernel,
+            foo and foo_day are unchanged
+
+    Notes
+    -----
+    See crop_day_kernel.py
+    Kernel does not write debug level comments
+
+    """
+
+    kernel_args = kernel_inputs(data, et_cell, crop, foo)
+    if kernel_args is None:
+        return False
+    cp, inputs = kernel_args
+    n_days = len(inputs['doy'])
+
+    curves, curve_valid, lentries = crop_curve_arrays(data, et_cell)
+    st = crop_day_kernel.pack_state(foo)
+    etref_array = np.array(foo_day.etref_array, dtype=np.float64)
+    day_state = np.array([foo_day.sdays, foo_day.doy_prev], dtype=np.int64)
+    out = np.full((n_days, len(crop_day_kernel.OUT_FIELDS)), np.nan)
+    season_array = np.zeros(n_days, dtype=np.int64)
+    cutting_array = np.zeros(n_days, dtype=np.int64)
+    events = np.zeros(n_days, dtype=np.int64)
+    try:
+        status, day_i = crop_day_kernel.crop_day_kernel(
+            st, cp, curves, curve_valid, lentries, etref_array, day_state,
+            inputs['doy'], inputs['year'], inputs['month'], inputs['day'],
+            inputs['pl_gu_doy'], inputs['u2'], inputs['precip'],
+            inputs['rh_min'], inputs['etref'], inputs['snow_depth'],
+            inputs['tmean'], inputs['tmin'], inputs['tmax'], inputs['t30'],
+            inputs['co2'], out, season_array, cutting_array, events)
+    except (ArithmeticError, IndexError):
+        status, day_i = crop_day_kernel.STATUS_UNSUPPORTED, -1
+    if status != crop_day_kernel.STATUS_OK:
+        logging.debug(
+            '  Crop {} - kernel stopped on day {}, using python day loop'.format(
+                crop.class_number, day_i))
+        return False
+
+    set_kernel_outputs(
+        crop, foo, foo_day, st, etref_array, day_state, inputs, out,
+        season_array, cutting_array, events)
     return True
 
-def write_crop_output(crop_count, data, et_cell, crop, foo):
+def crop_cycle_batch(data, et_cells, output_writer=None, memo=None):
+    """Compute crop ET for all crops, running each crop for all cells at once
+
+    Parameters
+    ---------
+    data :
+
+    et_cells : list
+        ETCell instances with input time series set
+    output_writer : OutputWriter
+        background writer for output files, None [default] writes files
+        directly
+    memo : SimulationMemo
+        results are also written for the cells with the same simulation
+        inputs, None [default] writes results of et_cells only
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Cells are grouped by crop, daily calendar and crop curves, each group
+        is simulated together by crop_day_loop_batch()
+    Output files are the same as crop_cycle() for each cell
+
+    """
+
+    crop_counts = {et_cell.cell_id: 0 for et_cell in et_cells}
+    crop_nums = sorted(set(
+        crop_num for et_cell in et_cells
+        for crop_num in et_cell.crop_params.keys()
+        if et_cell.crop_flags[crop_num] != 0))
+    for crop_num in crop_nums:
+        # Cells in group must share same days and crop curves
+        #   (see crop_curve_arrays), cells with curve overrides are grouped
+        #   by their crop coefficients
+        cell_groups = {}
+        for et_cell in et_cells:
+            if (crop_num not in et_cell.crop_params.keys() or
+                    et_cell.crop_flags[crop_num] == 0):
+                continue
+            crop_counts[et_cell.cell_id] += 1
+            dt_index = et_cell.refet_df.index
+            if getattr(et_cell.crop_coeffs, 'overrides', None) == {}:
+                curve_key = None
+            else:
+                curve_key = id(et_cell.crop_coeffs)
+            cell_groups.setdefault(
+                (dt_index[0], dt_index[-1], len(dt_index), curve_key),
+                []).append((crop_counts[et_cell.cell_id], et_cell))
+        for cell_group in cell_groups.values():
+            crop_day_loop_batch(
+                data, crop_num, cell_group, output_writer, memo)
+
+def crop_day_loop_batch(data, crop_num, cell_group, output_writer=None,
+                        memo=None):
+    """Compute crop et for each daily timestep for group of cells
+
+    Parameters
+    ---------
+    data :
+
+    crop_num : int
+        crop class number
+    cell_group : list
+        crop count and ETCell instance for each cell, cells must share
+        same daily calendar and crop curves
+    output_writer : OutputWriter
+        background writer for output files, None [default] writes files
+        directly
+    memo : SimulationMemo
+        results are also written for the cells with the same simulation
+        inputs, None [default] writes results of cell_group only
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Cells crop_day_batch() does not support are rerun with
+        run_crop_day_loop() one cell at a time
+
+    """
+
+    crop = cell_group[0][1].crop_params[crop_num]
+    logging.warning('Crop {} - {} ({} cells)'.format(
+        crop.class_number, crop.name, len(cell_group)))
+
+    # Initialize each cell, unsupported crops go straight to python loop
+    runs, cell_loops = [], []
+    for crop_count, et_cell in cell_group:
+        crop = et_cell.crop_params[crop_num]
+        foo, foo_day = init_crop_day_loop(data, et_cell, crop)
+        kernel_args = kernel_inputs(data, et_cell, crop, foo)
+        if kernel_args is None:
+            cell_loops.append((crop_count, et_cell, crop, foo, foo_day))
+        else:
+            runs.append((crop_count, et_cell, crop, foo, foo_day) + kernel_args)
+
+    if runs:
+        # Stack kernel arrays by cell (see crop_day_batch.py)
+        n_cells = len(runs)
+        inputs = runs[0][6]
+        n_days = len(inputs['doy'])
+        cp = np.stack([run[5] for run in runs], axis=1)
+        st = np.stack(
+            [crop_day_kernel.pack_state(run[3]) for run in runs], axis=1)
+        etref_array = np.stack(
+            [np.array(run[4].etref_array, dtype=np.float64) for run in runs],
+            axis=1)
+        day_state = np.array(
+            [runs[0][4].sdays, runs[0][4].doy_prev], dtype=np.int64)
+        cell_inputs = {
+            field: np.stack([run[6][field] for run in runs], axis=1)
+            for field in ['pl_gu_doy', 'u2', 'precip', 'rh_min', 'etref',
+                          'snow_depth', 'tmean', 'tmin', 'tmax', 't30', 'co2']}
+        curves, curve_valid, lentries = crop_curve_arrays(data, runs[0][1])
+        out = np.full(
+            (n_days, len(crop_day_kernel.OUT_FIELDS), n_cells), np.nan)
+        season_array = np.zeros((n_days, n_cells), dtype=np.int64)
+        cutting_array = np.zeros((n_days, n_cells), dtype=np.int64)
+        events = np.zeros((n_days, n_cells), dtype=np.int64)
+        failed = np.full(n_cells, -1, dtype=np.int64)
+        crop_day_batch.crop_day_batch(
+            st, cp, curves, curve_valid, lentries, etref_array, day_state,
+            inputs['doy'], inputs['year'], inputs['month'], inputs['day'],
+            cell_inputs['pl_gu_doy'], cell_inputs['u2'],
+            cell_inputs['precip'], cell_inputs['rh_min'],
+            cell_inputs['etref'], cell_inputs['snow_depth'],
+            cell_inputs['tmean'], cell_inputs['tmin'], cell_inputs['tmax'],
+            cell_inputs['t30'], cell_inputs['co2'], out, season_array,
+            cutting_array, events, failed)
+
+        for j, (crop_count, et_cell, crop, foo, foo_day, _, run_inputs) in \
+                enumerate(runs):
+            if failed[j] >= 0:
+                logging.debug(
+                    '  Cell {} crop {} - batch stopped on day {}, '
+                    'running cell alone'.format(
+                        et_cell.cell_id, crop.class_number, failed[j]))
+                cell_loops.append((crop_count, et_cell, crop, foo, foo_day))
+                continue
+            set_kernel_outputs(
+                crop, foo, foo_day, st[:, j], etref_array[:, j], day_state,
+                run_inputs, out[:, :, j], season_array[:, j],
+                cutting_array[:, j], events[:, j])
+            queue_crop_output(
+                crop_count, data, et_cell, crop, foo, output_writer)
+            if memo is not None:
+                queue_follower_output(
+                    data, et_cell, crop, foo,
+                    memo.followers(et_cell, crop_num), output_writer)
+
+    for crop_count, et_cell, crop, foo, foo_day in cell_loops:
+        run_crop_day_loop(data, et_cell, crop, foo, foo_day)
+        queue_crop_output(crop_count, data, et_cell, crop, foo, output_writer)
+        if memo is not None:
+            queue_follower_output(
+                data, et_cell, crop, foo, memo.followers(et_cell, crop_num),
+                output_writer)
+
+def crop_output_paths(data, et_cell, crop):
+    """Return output file paths of one cell and crop
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    Returns
+    -------
+    : dict
+        'daily', 'monthly', 'annual', 'gs' and 'cube' file paths of the
+        outputs write_crop_output() writes for the INI settings
+
+    """
+
+    output_paths = {}
+    output_name = data.cet_out['name_format'].replace(
+        '%c', '%02d' % int(crop.class_number)) % et_cell.cell_id
+    for output_type in ['daily', 'monthly', 'annual']:
+        if data.cet_out['{}_output_flag'.format(output_type)]:
+            output_paths[output_type] = os.path.join(
+                data.cet_out['{}_output_ws'.format(output_type)], output_name)
+    if data.gs_output_flag:
+        if data.gs_name_format is None:
+            # default filename spec
+            output_paths['gs'] = os.path.join(
+                data.gs_output_ws, '{0}_gs_crop_{1:02d}.csv'.format(
+                    et_cell.cell_id, int(crop.class_number)))
+        else:
+            # user filename spec or function of cet name spec
+            output_paths['gs'] = os.path.join(
+                data.gs_output_ws, data.gs_name_format.replace(
+                    '%c', '%02d' % int(crop.class_number)) % et_cell.cell_id)
+    if data.cet_out['cube_ws'] is not None:
+        output_paths['cube'] = results_cube.chunk_path(
+            data.cet_out['cube_ws'], et_cell.cell_id, crop.class_number)
+    return output_paths
+
+@contextlib.contextmanager
+def atomic_output_path(output_path):
+    """Yield temporary file path that is renamed to output_path when closed
+
+    A run that stops while writing leaves a .tmp file instead of a
+        truncated output file
+
+    """
+    temp_path = '{}.{}.tmp'.format(output_path, os.getpid())
+    try:
+        yield temp_path
+    except BaseException:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, output_path)
+
+def write_crop_output(crop_count, data, et_cell, crop, foo,
+                      output_stream=None):
     """Write output files for each cell and crop
 
     Parameters
@@ -357,6 +1119,12 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
 
     foo :
 
+    output_stream : CropOutputStream
+        window of a streaming run (see stream_cycle.py), csv files are
+        appended to the stream files and growing season statistics are
+        written when the stream is closed
+        None [default] : full period
+
     Returns
     -------
     None
@@ -391,6 +1159,12 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
     p_rz_field = 'P_rz'
     p_eft_field = 'P_eft'
 
+    output_paths = crop_output_paths(data, et_cell, crop)
+    if data.cet_out['cube_ws'] is not None:
+        results_cube.write_cube_chunk(
+            data.cet_out['cube_ws'], et_cell.cell_id, crop.class_number,
+            foo.crop_df, et_cell.climate_df['ppt'])
+
     # Merge crop and weather data frames to form daily output
     if (data.cet_out['daily_output_flag'] or
             data.cet_out['monthly_output_flag'] or
@@ -424,8 +1198,8 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
             season_field: np.sum, cutting_field: np.sum}
         # dri dm approach produces 'TypeError: ("'dict' object is not callable",
         # a u'occurred at index DOY')
-        monthly_output_df = daily_output_df.resample('MS').apply(
-            monthly_resample_func)
+        monthly_output_df = period_stats.aggregate(
+            daily_output_df, 'MS', monthly_resample_func)
     if data.cet_out['annual_output_flag']:
         annual_resample_func = {
             pmet_field: np.sum, etact_field: np.sum, etpot_field: np.sum,
@@ -436,78 +1210,40 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
             season_field: np.sum, cutting_field: np.sum}
         # dri dm approach produces 'TypeError: ("'dict' object is not callable",
         # a u'occurred at index DOY')
-        annual_output_df = daily_output_df.resample('AS').apply(
-            annual_resample_func)
+        annual_output_df = period_stats.aggregate(
+            daily_output_df, 'AS', annual_resample_func)
 
     # Get growing season start and end DOY for each year
     # Compute growing season length for each year
     if data.gs_output_flag:
-        # dri dm approach produces 'TypeError: ("'dict' object is not callable",
-        # a u'occurred at index DOY')
-        gs_output_df = daily_output_df.resample('AS').apply(
-            {year_field: np.mean})
-        gs_output_df[gs_start_doy_field] = np.nan
-        gs_output_df[gs_end_doy_field] = np.nan
+        gs_output_df = period_stats.aggregate(
+            daily_output_df, 'AS', {year_field: np.mean})
+        season_df = period_stats.season_stats(
+            daily_output_df.index, daily_output_df[doy_field].values,
+            daily_output_df[season_field].values)
+        gs_output_df[gs_start_doy_field] = season_df['start_doy']
+        gs_output_df[gs_end_doy_field] = season_df['end_doy']
         gs_output_df[gs_start_date_field] = None
         gs_output_df[gs_end_date_field] = None
-        gs_output_df[gs_length_field] = np.nan
-        for year_i, (year, group) in enumerate(daily_output_df.groupby(
-                [year_field])):
-            if not np.any(group[season_field].values):
-                logging.debug('  Skipping, season flag was never set to 1')
-                continue
-            else:
-                season_diff = np.diff(group[season_field].values)
-                try:
-                    start_i = np.where(season_diff == 1)[0][0] + 1
-
-                    # gs_output_pd.set_value(
-                    #     group.index[0], gs_start_doy_field,
-                    #     int(group.ix[start_i, doy_field]))
-                    # Replacement for set_value Future Warning
-                    # gs_output_df.at[group.index[0], gs_start_doy_field] = int(
-                    #     group.ix[start_i, doy_field])
-                    # Replacement for .ix deprecation 4/22/2020
-                    gs_output_df.at[group.index[0], gs_start_doy_field] = int(
-                        group.loc[group.index[start_i], doy_field])
-                except:
-                    # gs_output_pd.set_value(
-                    #     group.index[0], gs_start_doy_field,
-                    #     int(min(group[doy_field].values)))
-                    # Replacement for set_value Future Warning
-                    gs_output_df.at[group.index[0], gs_start_doy_field] = int(
-                        min(group[doy_field].values))
-
-                try:
-                    end_i = np.where(season_diff == -1)[0][0] + 1
-                    # gs_output_pd.set_value(
-                    #     group.index[0], gs_end_doy_field,
-                    #     int(group.ix[end_i, doy_field]))
-                    # Replacement for set_value Future Warning
-                    # gs_output_df.at[group.index[0], gs_end_doy_field] = int(
-                    #     group.ix[end_i, doy_field])
-                    # Replacement for .ix deprecation 4/22/2020
-                    gs_output_df.at[group.index[0], gs_end_doy_field] = int(
-                        group.loc[group.index[end_i], doy_field])
-                except:
-                    # gs_output_pd.set_value(
-                    #     group.index[0], gs_end_doy_field,
-                    #     int(max(group[doy_field].values)))
-                    # Replacement for set_value Future Warning
-                    gs_output_df.at[group.index[0], gs_end_doy_field] = int(
-                        max(group[doy_field].values))
-                del season_diff
-            # gs_output_pd.set_value(
-            #     group.index[0], gs_length_field,
-            #     int(sum(group[season_field].values)))
-            # Replacement for set_value Future Warning
-            gs_output_df.at[group.index[0], gs_length_field] = int(
-                sum(group[season_field].values))
+        gs_output_df[gs_length_field] = season_df['length']
+        del season_df
 
     base_columns = []
     open_mode = 'w'
     print_index = True
     print_header = True
+    output_path_func = atomic_output_path
+    if output_stream is not None:
+        # Stream files are renamed into place when the stream is closed
+        output_paths = output_stream.temp_paths
+        output_path_func = contextlib.nullcontext
+        if not output_stream.first_window:
+            open_mode = 'a'
+            print_header = False
+
+    # Typed (parquet/hdf5) files keep numeric fields, text formats of
+    #   date attributes and flags (*_formats) only apply to csv files
+    csv_flag = data.cet_out['file_type'] == 'csv'
 
     # Write daily cet
     if data.cet_out['daily_output_flag']:
@@ -516,27 +1252,18 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
         daily_output_df[day_field] = daily_output_df.index.day
 
         # format date attributes if values are formatted
+        daily_formats = {season_field: ' %1d'}
         if data.cet_out['daily_float_format'] is not None:
-            daily_output_df[year_field] = daily_output_df[year_field].map(
-                lambda x: ' %4d' % x)
-            daily_output_df[month_field] = daily_output_df[month_field].map(
-                lambda x: ' %2d' % x)
-            daily_output_df[day_field] = daily_output_df[day_field].map(
-                lambda x: ' %2d' % x)
-            daily_output_df[doy_field] = daily_output_df[doy_field].map(
-                lambda x: ' %3d' % x)
+            daily_formats.update({
+                year_field: ' %4d', month_field: ' %2d', day_field: ' %2d',
+                doy_field: ' %3d'})
 
         # This will convert negative "zeros" to positive
 
         daily_output_df[niwr_field] = np.round(daily_output_df[niwr_field], 6)
         # daily_output_df[niwr_field] = np.round(
         # daily_output_df[niwr_field].values, 6)
-        daily_output_df[season_field] = daily_output_df[season_field].map(
-            lambda x: ' %1d' % x)
-        daily_output_path = os.path.join(
-            data.cet_out['daily_output_ws'],
-            data.cet_out['name_format'].replace(
-                 '%c', '%02d' % int(crop.class_number)) % et_cell.cell_id)
+        daily_output_path = output_paths['daily']
 
         # Set output column order
         daily_output_columns = base_columns + [year_field, month_field,
@@ -557,18 +1284,26 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
 
         # Most crops do not have cuttings, so append if needed
         if data.cutting_flag and crop.cutting_crop:
-            daily_output_df[cutting_field] = daily_output_df[cutting_field].map(
-                lambda x: ' %1d' % x)
+            daily_formats[cutting_field] = ' %1d'
             daily_output_columns.append(cutting_field)
 
-        with open(daily_output_path, open_mode, newline='') as daily_output_f:
-            daily_output_f.write('# {0:2d} - {1}\n'.format(
-                crop.class_number, crop.name))
-            daily_output_df.to_csv(
-                daily_output_f, header=print_header, index=print_index,
-                sep=',', columns=daily_output_columns,
-                float_format=data.cet_out['daily_float_format'],
-                date_format=data.cet_out['daily_date_format'])
+        with output_path_func(daily_output_path) as temp_path:
+            if not csv_flag:
+                write_typed_output(data, daily_output_df, temp_path,
+                                   daily_output_columns, print_index)
+            else:
+                with open(temp_path, open_mode,
+                          newline='') as daily_output_f:
+                    if print_header:
+                        daily_output_f.write('# {0:2d} - {1}\n'.format(
+                            crop.class_number, crop.name))
+                    text_writer.write_csv(
+                        daily_output_df, daily_output_f, header=print_header,
+                        index=print_index, sep=',',
+                        columns=daily_output_columns,
+                        float_format=data.cet_out['daily_float_format'],
+                        date_format=data.cet_out['daily_date_format'],
+                        formats=daily_formats)
         del daily_output_df, daily_output_path, daily_output_columns
 
     # Write monthly cet
@@ -577,17 +1312,12 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
         monthly_output_df[month_field] = monthly_output_df.index.month
 
         # format date attributes if values are formatted
+        monthly_formats = {}
         if data.cet_out['monthly_float_format'] is not None:
-            monthly_output_df[year_field] = \
-                monthly_output_df[year_field].map(lambda x: ' %4d' % x)
-            monthly_output_df[month_field] = \
-                monthly_output_df[month_field].map(lambda x: ' %2d' % x)
-            monthly_output_df[season_field] = \
-                monthly_output_df[season_field].map(lambda x: ' %2d' % x)
-        monthly_output_path = os.path.join(
-            data.cet_out['monthly_output_ws'],
-            data.cet_out['name_format'].replace(
-                '%c', '%02d' % int(crop.class_number)) % et_cell.cell_id)
+            monthly_formats.update({
+                year_field: ' %4d', month_field: ' %2d',
+                season_field: ' %2d'})
+        monthly_output_path = output_paths['monthly']
         monthly_output_columns = base_columns + [year_field, month_field,
                                                  pmet_field, etact_field,
                                                  etpot_field, etbas_field,
@@ -597,28 +1327,32 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
                                                  p_rz_field, p_eft_field,
                                                  niwr_field, season_field]
         if data.cutting_flag and crop.cutting_crop:
-            monthly_output_df[cutting_field] = \
-                monthly_output_df[cutting_field].map(lambda x: ' %1d' % x)
+            monthly_formats[cutting_field] = ' %1d'
             monthly_output_columns.append(cutting_field)
-        with open(monthly_output_path, open_mode, newline='') as monthly_output_f:
-            monthly_output_f.write('# {0:2d} - {1}\n'.format(
-                crop.class_number, crop.name))
-            monthly_output_df.to_csv(
-                monthly_output_f, header=print_header,
-                index=print_index, sep=',', columns=monthly_output_columns,
-                float_format=data.cet_out['monthly_float_format'],
-                date_format=data.cet_out['monthly_date_format'])
+        with output_path_func(monthly_output_path) as temp_path:
+            if not csv_flag:
+                write_typed_output(data, monthly_output_df, temp_path,
+                                   monthly_output_columns, print_index)
+            else:
+                with open(temp_path, open_mode,
+                          newline='') as monthly_output_f:
+                    if print_header:
+                        monthly_output_f.write('# {0:2d} - {1}\n'.format(
+                            crop.class_number, crop.name))
+                    text_writer.write_csv(
+                        monthly_output_df, monthly_output_f,
+                        header=print_header, index=print_index, sep=',',
+                        columns=monthly_output_columns,
+                        float_format=data.cet_out['monthly_float_format'],
+                        date_format=data.cet_out['monthly_date_format'],
+                        formats=monthly_formats)
         del monthly_output_df, monthly_output_path, monthly_output_columns
 
     # Write annual cet
     if data.cet_out['annual_output_flag']:
         annual_output_df[year_field] = annual_output_df.index.year
-        annual_output_df[season_field] = annual_output_df[season_field].map(
-            lambda x: ' %3d' % x)
-        annual_output_path = os.path.join(
-            data.cet_out['annual_output_ws'],
-            data.cet_out['name_format'].replace(
-                '%c', '%02d' % int(crop.class_number)) % et_cell.cell_id)
+        annual_formats = {season_field: ' %3d'}
+        annual_output_path = output_paths['annual']
         annual_output_columns = base_columns + [year_field, pmet_field,
                                                 etact_field, etpot_field,
                                                 etbas_field, kc_field,
@@ -632,78 +1366,149 @@ def write_crop_output(crop_count, data, et_cell, crop, foo):
         except:
             pass
         if data.cutting_flag and crop.cutting_crop:
-            annual_output_df[cutting_field] = annual_output_df[
-                cutting_field].map(lambda x: ' %2d' % x)
+            annual_formats[cutting_field] = ' %2d'
             annual_output_columns.append(cutting_field)
-        with open(annual_output_path, open_mode, newline='') as annual_output_f:
-            annual_output_f.write('# {0:2d} - {1}\n'.format(
-                crop.class_number, crop.name))
-            annual_output_df.to_csv(
-                annual_output_f, header=print_header,
-                index=False, sep=',', columns=annual_output_columns,
-                float_format=data.cet_out['annual_float_format'],
-                date_format=data.cet_out['annual_date_format'])
+        with output_path_func(annual_output_path) as temp_path:
+            if not csv_flag:
+                write_typed_output(data, annual_output_df, temp_path,
+                                   annual_output_columns, False)
+            else:
+                with open(temp_path, open_mode,
+                          newline='') as annual_output_f:
+                    if print_header:
+                        annual_output_f.write('# {0:2d} - {1}\n'.format(
+                            crop.class_number, crop.name))
+                    text_writer.write_csv(
+                        annual_output_df, annual_output_f,
+                        header=print_header, index=False, sep=',',
+                        columns=annual_output_columns,
+                        float_format=data.cet_out['annual_float_format'],
+                        date_format=data.cet_out['annual_date_format'],
+                        formats=annual_formats)
         del annual_output_df, annual_output_path, annual_output_columns
 
     # Write growing season statistics
     if data.gs_output_flag:
-        def doy_2_date(test_year, test_doy):
-            try:
-                return datetime.datetime.strptime(
-                    '{0}_{1}'.format(int(test_year), int(
-                        test_doy)), '%Y_%j').date().isoformat()
-            except:
-                return 'None'
-        gs_output_df[gs_start_date_field] = \
-            gs_output_df[[year_field, gs_start_doy_field]].apply(
-                lambda s: doy_2_date(*s), axis=1)
-        gs_output_df[gs_end_date_field] = gs_output_df[
-            [year_field, gs_end_doy_field]].apply(
-                lambda s: doy_2_date(*s), axis=1)
-        if data.gs_name_format is None:
-            # default filename spec
-            gs_output_path = os.path.join(
-                data.gs_output_ws, '{0}_gs_crop_{1:02d}.csv'.format(
-                    et_cell.cell_id, int(crop.class_number)))
+        if output_stream is not None:
+            output_stream.gs_frames.append(gs_output_df)
         else:
-            # user filename spec or function of cet name spec
-            gs_output_path = os.path.join(
-                data.gs_output_ws, data.gs_name_format.replace(
-                    '%c', '%02d' % int(crop.class_number)) % et_cell.cell_id)
-        gs_output_columns = [
-            year_field, gs_start_doy_field, gs_end_doy_field,
-            gs_start_date_field, gs_end_date_field, gs_length_field]
-        with open(gs_output_path, open_mode, newline='') as gs_output_f:
-            gs_output_f.write(
-                '# {0:2d} - {1}\n'.format(crop.class_number, crop.name))
-            try:
-                gs_start_doy = int(round(
-                    gs_output_df[gs_start_doy_field].mean()))
-            except:
-                gs_start_doy = np.nan
-            try:
-                gs_end_doy = int(round(gs_output_df[gs_end_doy_field].mean()))
-            except:
-                gs_end_doy = np.nan
-            if gs_start_doy is np.nan:
-                logging.info('\nSkipping Growing Season Output for'
-                             ' Cell ID: {} Crop: {:02d}'
-                             .format(et_cell.cell_id, int(crop.class_number)))
-                return
-            gs_start_dt = datetime.datetime.strptime(
-                '2001_{:03d}'. format(gs_start_doy), '%Y_%j')
-            gs_end_dt = datetime.datetime.strptime(
-                '2001_{:03d}'. format(gs_end_doy), '%Y_%j')
-            gs_output_f.write(
-                '# Mean Start Date: {dt.month}/{dt.day}  ({doy})\n'.format(
-                    dt=gs_start_dt, doy=gs_start_doy))
-            gs_output_f.write(
-                '# Mean End Date:   {dt.month}/{dt.day}  ({doy})\n'.format(
-                    dt=gs_end_dt, doy=gs_end_doy))
-            gs_output_df.to_csv(
-                gs_output_f, sep=',', columns=gs_output_columns,
-                date_format='%Y', index=False)
-        del gs_output_df, gs_output_path, gs_output_columns
+            write_gs_output(data, et_cell, crop, gs_output_df,
+                            output_paths['gs'])
+        del gs_output_df
+
+def write_gs_output(data, et_cell, crop, gs_output_df, gs_output_path):
+    """Write growing season statistics file for each cell and crop
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    gs_output_df : pandas.DataFrame
+        growing season start, end and length of each year
+    gs_output_path : str
+        output file path
+
+    Returns
+    -------
+    None
+
+    """
+
+    year_field = 'Year'
+    gs_start_doy_field = 'Start_DOY'
+    gs_end_doy_field = 'End_DOY'
+    gs_start_date_field = 'Start_Date'
+    gs_end_date_field = 'End_Date'
+    gs_length_field = 'GS_Length'
+    csv_flag = data.cet_out['file_type'] == 'csv'
+
+    def doy_2_date(test_year, test_doy):
+        try:
+            return datetime.datetime.strptime(
+                '{0}_{1}'.format(int(test_year), int(
+                    test_doy)), '%Y_%j').date().isoformat()
+        except:
+            return 'None'
+    gs_output_df[gs_start_date_field] = \
+        gs_output_df[[year_field, gs_start_doy_field]].apply(
+            lambda s: doy_2_date(*s), axis=1)
+    gs_output_df[gs_end_date_field] = gs_output_df[
+        [year_field, gs_end_doy_field]].apply(
+            lambda s: doy_2_date(*s), axis=1)
+    gs_output_columns = [
+        year_field, gs_start_doy_field, gs_end_doy_field,
+        gs_start_date_field, gs_end_date_field, gs_length_field]
+    if not csv_flag:
+        with atomic_output_path(gs_output_path) as temp_path:
+            write_typed_output(data, gs_output_df, temp_path,
+                               gs_output_columns, False)
+        return
+    with atomic_output_path(gs_output_path) as temp_path, \
+            open(temp_path, 'w', newline='') as gs_output_f:
+        gs_output_f.write(
+            '# {0:2d} - {1}\n'.format(crop.class_number, crop.name))
+        try:
+            gs_start_doy = int(round(
+                gs_output_df[gs_start_doy_field].mean()))
+        except:
+            gs_start_doy = np.nan
+        try:
+            gs_end_doy = int(round(gs_output_df[gs_end_doy_field].mean()))
+        except:
+            gs_end_doy = np.nan
+        if gs_start_doy is np.nan:
+            logging.info('\nSkipping Growing Season Output for'
+                         ' Cell ID: {} Crop: {:02d}'
+                         .format(et_cell.cell_id, int(crop.class_number)))
+            return
+        gs_start_dt = datetime.datetime.strptime(
+            '2001_{:03d}'. format(gs_start_doy), '%Y_%j')
+        gs_end_dt = datetime.datetime.strptime(
+            '2001_{:03d}'. format(gs_end_doy), '%Y_%j')
+        gs_output_f.write(
+            '# Mean Start Date: {dt.month}/{dt.day}  ({doy})\n'.format(
+                dt=gs_start_dt, doy=gs_start_doy))
+        gs_output_f.write(
+            '# Mean End Date:   {dt.month}/{dt.day}  ({doy})\n'.format(
+                dt=gs_end_dt, doy=gs_end_doy))
+        text_writer.write_csv(
+            gs_output_df, gs_output_f, sep=',', columns=gs_output_columns,
+            date_format='%Y', index=False)
+
+def write_typed_output(data, output_df, output_path, output_columns,
+                       index_flag):
+    """Write crop output columns to typed (parquet/hdf5) file
+
+    Parameters
+    ---------
+    data :
+
+    output_df : pandas.DataFrame
+        daily, monthly, annual or growing season output
+    output_path : str
+        output file path
+    output_columns : list
+        output field names
+    index_flag : boolean
+        True : write Date index as first field
+        False : do not write index
+
+    Returns
+    -------
+    None
+
+    """
+
+    output_df = output_df[output_columns]
+    if index_flag:
+        output_df = output_df.reset_index()
+    typed_ts.write_typed_ts(
+        output_df, output_path, data.cet_out['file_type'],
+        compression=data.cet_out['compression'])
 
 if __name__ == '__main__':
     pass
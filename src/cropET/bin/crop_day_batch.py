@@ -0,0 +1,1126 @@
+"""crop_day_batch.py
+Batched day loop for a single crop across many ET cells
+Defines crop_day_batch
+Called by crop_cycle.py
+
+State and parameter arrays are the crop_day_kernel arrays stacked by cell
+    (state [STATE_FIELDS, cell], parameters [N_PARAMS, cell]) so each state
+    field is a vector over cells.  All cells share the same daily calendar
+    and are advanced one day at a time.  Branches in the kernel functions
+    become masked updates and must be kept in sync with crop_day_kernel.py.
+
+Cells that reach a path the kernel does not support are flagged in the
+    failed array and should be rerun by the caller one cell at a time.
+
+"""
+
+import math
+
+import numpy as np
+
+from crop_day_kernel import (
+    EVENT_ADJUST_SEASON, EVENT_KC_MULT, EVENT_KILLING_FROST, EVENT_KS,
+    EVENT_NO_KILLING_FROST, MAX_LINES_IN_CROP_CURVE_TABLE,
+    P_ALFALFA_1ST, P_BEEF_CUTTINGS, P_CGDD_EFC, P_CGDD_TERM, P_CLASS_NUMBER,
+    P_CN2_DORMANT, P_CO2_FLAG, P_CROP_ONE_FLAG, P_CROP_ONE_REDUCER,
+    P_CURVE_NUMBER, P_CURVE_TYPE, P_CUTTING_CROP, P_DAIRY_CUTTINGS,
+    P_DATE_PL_GU, P_DAYS_AFTER_PL_IRR, P_END_ROOT_FRAC, P_FLAG_PL_GU,
+    P_GDD_TRIGGER_DOY, P_GS_LIMIT_FLAG, P_HEIGHT_INITIAL, P_HEIGHT_MAX,
+    P_INVOKE_STRESS, P_KC_MAX, P_KILLING_FROST, P_LATITUDE, P_REFET_TYPE,
+    P_T30_PL_GU_CGDD, P_TBASE, P_TIME_EFC, P_TIME_HARVEST, P_WINTER_CROP,
+    P_WSCC, P_ZR_INITIAL, P_ZR_MAX, REFET_ETO, REFET_ETR, S_AW, S_AW3, S_CGDD,
+    S_CGDD_AT_PLANTING, S_CGDD_PENALTY, S_CN2, S_CROP_SETUP_FLAG, S_CUM_EVAP,
+    S_CUM_EVAP_PREV, S_CUTTING, S_CYCLE, S_DEPL_ROOT, S_DEPL_SURFACE,
+    S_DEPL_ZE, S_DEPL_ZEP, S_DORMANT_SETUP_FLAG, S_DOY_START_CYCLE, S_DPERC,
+    S_ETC_ACT, S_ETC_BAS, S_ETC_POT, S_ETREF_30, S_FC, S_FW_IRR, S_FW_STD,
+    S_GDD, S_GDD_PENALTY, S_HEIGHT, S_HEIGHT_MAX, S_HEIGHT_MIN, S_IN_SEASON,
+    S_IRR_AUTO, S_IRR_FLAG, S_IRR_MIN, S_IRR_SIM, S_KC_ACT, S_KC_BAS,
+    S_KC_BAS_MID, S_KC_BAS_PREV, S_KC_MIN, S_KC_POT, S_KR2, S_LONGTERM_PL,
+    S_MAD, S_MAD_INI, S_MAD_MID, S_N_CGDD, S_N_PL_EC, S_NIWR, S_P_EFT, S_P_RZ,
+    S_PPT_INF, S_PPT_INF_PREV, S_REAL_START, S_REW, S_S, S_S1, S_S2, S_S3,
+    S_S4, S_SRO, S_STRESS_EVENT, S_T2DAYS, S_TEW, S_TEW2, S_TEW3,
+    S_TOTWATIN_ZE, S_WT_IRR, S_ZR, S_ZR_MAX, S_ZR_MIN)
+
+# State rows copied to output array each day (see crop_day_kernel.OUT_FIELDS)
+OUT_ROWS = [
+    S_ETC_ACT, S_ETC_POT, S_ETC_BAS, S_KC_ACT, S_KC_BAS, S_IRR_SIM, S_SRO,
+    S_DPERC, S_NIWR, S_P_RZ, S_P_EFT]
+
+# Builtin pow() and math.sin() are used instead of np.power() and np.sin()
+#   since vectorized numpy versions can differ from libm in the last bit
+_pow = np.frompyfunc(pow, 2, 1)
+_sin = np.frompyfunc(math.sin, 1, 1)
+
+
+def _max(a, b):
+    """Elementwise builtin max(a, b), keeps a unless b > a"""
+    return np.where(b > a, b, a)
+
+
+def _min(a, b):
+    """Elementwise builtin min(a, b), keeps a unless b < a"""
+    return np.where(b < a, b, a)
+
+
+def _fpow(x, y):
+    """Elementwise builtin x ** y as float array"""
+    return _pow(x, y).astype(np.float64)
+
+
+def setup_crop(st, cp):
+    """Initialize state for beginning of crop season
+
+    See crop_day_kernel.setup_crop()
+
+    Parameters
+    ---------
+    st, cp : ndarray
+        state and parameters for cells being set up
+
+    Returns
+    -------
+    bad : ndarray
+        True for cells on unsupported path
+
+    """
+    zr_dormant = 0.0
+    st[S_HEIGHT_MIN] = cp[P_HEIGHT_INITIAL]
+    st[S_HEIGHT_MAX] = cp[P_HEIGHT_MAX]
+    st[S_ZR_MIN] = cp[P_ZR_INITIAL]
+    st[S_ZR_MAX] = cp[P_ZR_MAX]
+    st[S_HEIGHT] = st[S_HEIGHT_MIN]
+    st[S_TEW] = np.where(st[S_TEW2] < st[S_TEW3], st[S_TEW3], st[S_TEW2])
+    st[S_FW_IRR] = st[S_FW_STD]
+    st[S_IRR_AUTO] = 0.0
+    st[S_IRR_SIM] = 0.0
+    daw3 = _max(0.0, st[S_AW3] * (st[S_ZR_MAX] - zr_dormant))
+    taw3 = _max(0.0, st[S_AW] * (st[S_ZR_MAX] - zr_dormant))
+    grow = st[S_ZR_MIN] > zr_dormant
+    st[S_DEPL_ROOT] = np.where(
+        grow,
+        st[S_DEPL_ROOT] + (taw3 - daw3) * (st[S_ZR_MIN] - zr_dormant) /
+        (st[S_ZR_MAX] - zr_dormant),
+        st[S_DEPL_ROOT])
+    bad = ~grow & (st[S_ZR_MAX] > st[S_ZR_MIN])
+    st[S_DEPL_ROOT] = np.where(st[S_DEPL_ROOT] < 0., 0., st[S_DEPL_ROOT])
+    st[S_ZR] = st[S_ZR_MIN]
+    st[S_CROP_SETUP_FLAG] = 0.0
+    return bad
+
+
+def setup_dormant(st, cp):
+    """Initialize state for start of dormant season
+
+    See crop_day_kernel.setup_dormant()
+
+    Parameters
+    ---------
+    st, cp : ndarray
+        state and parameters for cells being set up
+
+    Returns
+    -------
+    bad : ndarray
+        True for cells on unsupported path
+
+    """
+    wscc = cp[P_WSCC]
+    bad = (wscc != 1) & (wscc != 2) & (wscc != 3)
+    st[S_KC_BAS] = np.select(
+        [wscc == 1, wscc == 2, wscc == 3], [0.1, 0.1, 0.2], st[S_KC_BAS])
+    st[S_FC] = np.select(
+        [wscc == 1, wscc == 2, wscc == 3], [0.0, 0.4, 0.7], st[S_FC])
+    st[S_CN2] = np.where(
+        np.isnan(cp[P_CN2_DORMANT]), st[S_CN2], cp[P_CN2_DORMANT])
+
+    zr_dormant = 0.1
+    daw3 = st[S_AW3] * (st[S_ZR_MAX] - st[S_ZR])
+    taw_root = st[S_AW] * (st[S_ZR])
+    daw_root = _max(taw_root - st[S_DEPL_ROOT], 0.0)
+    ze = 0.1
+    bad |= ~(zr_dormant < st[S_ZR])
+    aw_root = daw_root / st[S_ZR]
+    totwatinzr_dormant = (
+        (st[S_TOTWATIN_ZE] * (1 - (ze - zr_dormant) / ze)) *
+        (1 - st[S_FC]) + aw_root * zr_dormant * st[S_FC])
+    daw_below = np.where(
+        daw_root > totwatinzr_dormant, daw_root - totwatinzr_dormant, 0.0)
+    st[S_AW3] = (daw_below + daw3) / (st[S_ZR_MAX] - zr_dormant)
+    st[S_DEPL_ROOT] = st[S_AW] * zr_dormant - totwatinzr_dormant
+    st[S_ZR] = zr_dormant
+    st[S_FW_IRR] = st[S_FW_STD]
+    st[S_IRR_AUTO] = 0.0
+    st[S_IRR_SIM] = 0.0
+    st[S_DORMANT_SETUP_FLAG] = 0.0
+    st[S_CUTTING] = 0.0
+    return bad
+
+
+def compute_crop_gdd(st, cp, etref_array, sdays, doy, doy_prev, etref, tmean,
+                     tmin, tmax, snow_depth):
+    """Calculate crop growing degree days
+
+    See crop_day_kernel.compute_crop_gdd()
+    sdays and doy_prev are shared by all cells
+
+    """
+    if sdays > 30:
+        etref_lost = etref_array[0].copy()
+        etref_array[:-1] = etref_array[1:].copy()
+        etref_array[29] = etref
+        st[S_ETREF_30] = st[S_ETREF_30] + (etref - etref_lost) / 30.
+    else:
+        etref_array[sdays - 1] = etref
+        st[S_ETREF_30] = (st[S_ETREF_30] * (sdays - 1) + etref) / sdays
+
+    # Reset CGDD if new year
+    trigger_doy = cp[P_GDD_TRIGGER_DOY]
+    winter_crop = cp[P_WINTER_CROP] != 0
+    reset = (
+        (winter_crop & (doy_prev < trigger_doy) & (doy >= trigger_doy)) |
+        (~winter_crop & (doy_prev > (trigger_doy + 199)) &
+         (doy < (trigger_doy + 199))))
+    for row in [S_CGDD, S_DOY_START_CYCLE, S_REAL_START, S_IN_SEASON]:
+        st[row, reset] = 0.0
+
+    curve = cp[P_CURVE_NUMBER] > 0
+    tbase = cp[P_TBASE]
+
+    # Winter crops
+    m = curve & winter_crop
+    if m.any():
+        gdd = np.where(
+            tmin < -4.0, 0.0, np.where(tmean > tbase, tmean - tbase, 0.0))
+        gdd = _max(gdd - st[S_GDD_PENALTY], 0.0)
+        cgdd = _max(0.0, st[S_CGDD] + (gdd - st[S_CGDD_PENALTY]))
+        st[S_GDD] = np.where(m, gdd, st[S_GDD])
+        st[S_CGDD] = np.where(m, cgdd, st[S_CGDD])
+        st[S_GDD_PENALTY] = np.where(
+            m, np.where(tmin < -10, 5.0, 0.0), st[S_GDD_PENALTY])
+        st[S_CGDD_PENALTY] = np.where(
+            m, np.where((tmin < -25) & (snow_depth <= 0), cgdd * 0.1, 0.0),
+            st[S_CGDD_PENALTY])
+
+    # Corn
+    m = curve & ~winter_crop & (tbase < 0)
+    if m.any():
+        tmax_prev = np.where(tmax > 30, 30.0, tmax)
+        tmin_prev = np.where(tmin > 30, 30.0, tmin)
+        tmax_prev = np.where(tmax < -tbase, -tbase, tmax_prev)
+        tmin_prev = np.where(tmin < -tbase, -tbase, tmin_prev)
+        tmean_prev = 0.5 * (tmax_prev + tmin_prev)
+        st[S_CGDD] = np.where(m, st[S_CGDD] + (tmean_prev + tbase), st[S_CGDD])
+
+    m = curve & ~winter_crop & ~(tbase < 0) & (tmean > tbase)
+    if m.any():
+        st[S_GDD] = np.where(m, tmean - tbase, st[S_GDD])
+        st[S_CGDD] = np.where(m, st[S_CGDD] + st[S_GDD], st[S_CGDD])
+
+
+def calculate_height(st, cp):
+    """Determine height of crop based on Kc and height limits
+
+    See crop_day_kernel.calculate_height()
+
+    """
+    height_prev = st[S_HEIGHT].copy()
+    grow = (st[S_KC_BAS] > st[S_KC_MIN]) & (st[S_KC_BAS_MID] > st[S_KC_MIN])
+    height = np.where(
+        grow,
+        cp[P_HEIGHT_INITIAL] + (st[S_KC_BAS] - st[S_KC_MIN]) /
+        (st[S_KC_BAS_MID] - st[S_KC_MIN]) *
+        (cp[P_HEIGHT_MAX] - cp[P_HEIGHT_INITIAL]),
+        cp[P_HEIGHT_INITIAL])
+    st[S_HEIGHT] = _min(
+        _max(cp[P_HEIGHT_INITIAL], _max(height_prev, height)),
+        cp[P_HEIGHT_MAX])
+
+
+def _curve_index(curves, curve_number, int_curve):
+    """Clip curve indices to table, returns clipped indices and bad mask"""
+    n_curves, n_lines = curves.shape
+    bad = (
+        (curve_number < 0) | (curve_number >= n_curves) |
+        (int_curve < 0) | (int_curve + 1 >= n_lines))
+    return (np.clip(curve_number, 0, n_curves - 1),
+            np.clip(int_curve, 0, n_lines - 2), bad)
+
+
+def _curve_kc_bas(curves, curve_number, n_curve, int_curve):
+    """Interpolate crop coefficient curve
+
+    Returns
+    -------
+    kc_bas : ndarray
+
+    bad : ndarray
+        True for cells with curve index outside table
+
+    """
+    curve_number, int_curve, bad = _curve_index(
+        curves, curve_number, int_curve)
+    kc_bas = (
+        curves[curve_number, int_curve] +
+        (n_curve - int_curve) *
+        (curves[curve_number, int_curve + 1] -
+         curves[curve_number, int_curve]))
+    return kc_bas, bad
+
+
+def _int(x):
+    """Elementwise int() of float array, NaN and inf are clipped"""
+    x = np.nan_to_num(x, nan=0., posinf=1e9, neginf=-1e9)
+    return np.trunc(x).astype(np.int64)
+
+
+def _days_into_season(st, doy, offset):
+    """Days since start of cycle, wrapped to positive"""
+    days = doy - st[S_DOY_START_CYCLE] + offset
+    return np.where(days < offset, days + 365, days)
+
+
+def _bad_curve(curve_valid, curve_number):
+    """True for curve numbers not in crop coefficient curves"""
+    in_range = (curve_number >= 0) & (curve_number < len(curve_valid))
+    return ~in_range | ~curve_valid[
+        np.clip(curve_number, 0, len(curve_valid) - 1)]
+
+
+def _kcb_curve_type_1(st, cp, curves, curve_valid, lentries, doy):
+    """Basal crop coefficient from cumulative growing degree days
+
+    Returns
+    -------
+    bad : ndarray
+        True for cells on unsupported path
+
+    """
+    max_line = MAX_LINES_IN_CROP_CURVE_TABLE - 1
+    class_number = cp[P_CLASS_NUMBER]
+    alfalfa_1st = cp[P_ALFALFA_1ST] != 0
+    crop_one = (class_number == 1) & (cp[P_CROP_ONE_FLAG] != 0)
+    curve_number = cp[P_CURVE_NUMBER].astype(np.int64)
+
+    start = st[S_DOY_START_CYCLE] == doy
+    st[S_CGDD_AT_PLANTING, start] = st[S_CGDD, start]
+    cgdd_in_season = _max(0.0, st[S_CGDD] - st[S_CGDD_AT_PLANTING])
+    cgdd_efc = cp[P_CGDD_EFC].copy()
+    cgdd_term = cp[P_CGDD_TERM].copy()
+    st[S_CUTTING] = 0.0
+
+    # Alfalfa cuttings
+    cut = crop_one | (class_number == 2) | (class_number == 3) | alfalfa_1st
+    cgdd_term = np.where(cut, cp[P_CGDD_EFC], cgdd_term)
+    later = cut & (st[S_CYCLE] > 1)
+    cgdd_efc = np.where(later, cp[P_CGDD_TERM], cgdd_efc)
+    cgdd_term = np.where(later, cp[P_CGDD_TERM], cgdd_term)
+    dairy = later & (class_number == 2)
+    curve_number += np.where(
+        dairy & (st[S_CYCLE] < cp[P_DAIRY_CUTTINGS] + 0.01 - 1), 1,
+        np.where(dairy, 2, 0))
+    beef = later & (
+        (class_number == 1) | (class_number == 3) | alfalfa_1st)
+    curve_number += np.where(
+        beef & (st[S_CYCLE] < cp[P_BEEF_CUTTINGS] + 0.01 - 1), 1,
+        np.where(beef, 2, 0))
+    bad = _bad_curve(curve_valid, curve_number)
+    curve_number = np.clip(curve_number, 0, len(curve_valid) - 1)
+
+    # Initial and development periods
+    early = cgdd_in_season < cgdd_efc
+    n_cgdd = cgdd_in_season / cgdd_efc
+    int_cgdd = np.minimum(max_line, _int(n_cgdd * 10))
+    kc_early, bad_early = _curve_kc_bas(
+        curves, curve_number, n_cgdd * 10, int_cgdd)
+
+    # Mid season, before termination
+    mid = ~early & (cgdd_in_season < cgdd_term)
+    n_cgdd_mid = _max(n_cgdd, 1.0)
+    int_cgdd_mid = np.minimum(max_line, _int(n_cgdd_mid * 10))
+    lentry = lentries[curve_number]
+    interp = int_cgdd_mid < lentry
+    kc_mid, bad_mid = _curve_kc_bas(
+        curves, curve_number, n_cgdd_mid * 10, int_cgdd_mid)
+    kc_mid = np.where(interp, kc_mid, curves[curve_number, lentry])
+    bad |= early & bad_early
+    bad |= mid & interp & bad_mid
+
+    st[S_N_CGDD] = np.where(
+        early, n_cgdd, np.where(mid, n_cgdd_mid, st[S_N_CGDD]))
+    st[S_KC_BAS] = np.where(
+        early, kc_early, np.where(mid, kc_mid, st[S_KC_BAS]))
+    st[S_MAD] = np.where(
+        early, st[S_MAD_INI], np.where(mid, st[S_MAD_MID], st[S_MAD]))
+
+    # End of season, cutting crops start next cycle
+    end = ~early & ~mid
+    st[S_IN_SEASON, end] = 0.0
+    st[S_STRESS_EVENT, end] = 0.0
+    m = end & (cp[P_CUTTING_CROP] != 0)
+    st[S_CUTTING, m] = 1.0
+    st[S_CYCLE, m] += 1
+    st[S_IN_SEASON, m] = 1.0
+    st[S_CGDD_AT_PLANTING, m] = st[S_CGDD, m]
+    st[S_HEIGHT, m] = st[S_HEIGHT_MIN, m]
+    st[S_KC_BAS, m] = curves[curve_number[m], 0]
+    m = ~early & crop_one
+    st[S_KC_BAS, m] *= cp[P_CROP_ONE_REDUCER, m]
+
+    days_into_season = _days_into_season(st, doy, 1)
+    m = (cp[P_TIME_HARVEST] > 10) & (days_into_season > cp[P_TIME_HARVEST])
+    st[S_IN_SEASON, m] = 0.0
+    st[S_STRESS_EVENT, m] = 0.0
+    return bad
+
+
+def _kcb_curve_type_2(st, cp, curves, curve_valid, doy):
+    """Basal crop coefficient from percent time to effective cover
+
+    Returns
+    -------
+    bad : ndarray
+        True for cells on unsupported path
+
+    """
+    max_line = MAX_LINES_IN_CROP_CURVE_TABLE - 1
+    curve_number = cp[P_CURVE_NUMBER].astype(np.int64)
+    days_into_season = _days_into_season(st, doy, 1)
+    time_for_efc = _max(cp[P_TIME_EFC], 1.)
+    st[S_N_PL_EC] = days_into_season / time_for_efc
+    npl_ec100 = st[S_N_PL_EC] * 100
+    st[S_MAD] = np.where(st[S_N_PL_EC] < 1, st[S_MAD_INI], st[S_MAD_MID])
+
+    interp = npl_ec100 <= np.abs(cp[P_TIME_HARVEST])
+    int_pl_ec = _int(st[S_N_PL_EC] * 10.)
+    kc_bas, bad_curve = _curve_kc_bas(
+        curves, curve_number, st[S_N_PL_EC] * 10., int_pl_ec)
+    bad = _bad_curve(curve_valid, curve_number)
+    bad |= interp & ((int_pl_ec >= max_line) | bad_curve)
+    hold = ~interp & (cp[P_TIME_HARVEST] < -0.5)
+    st[S_KC_BAS] = np.where(
+        interp, kc_bas, np.where(hold, st[S_KC_BAS_PREV], st[S_KC_BAS]))
+    end = ~interp & ~hold
+    st[S_IN_SEASON, end] = 0.0
+    st[S_STRESS_EVENT, end] = 0.0
+    return bad
+
+
+def _kcb_curve_type_3(st, cp, curves, curve_valid, doy):
+    """Basal crop coefficient from percent time to effective cover
+    and days after effective cover
+
+    Returns
+    -------
+    bad : ndarray
+        True for cells on unsupported path
+
+    """
+    max_line = MAX_LINES_IN_CROP_CURVE_TABLE - 1
+    curve_number = cp[P_CURVE_NUMBER].astype(np.int64)
+    days_into_season = _days_into_season(st, doy, 1)
+    time_for_efc = _max(cp[P_TIME_EFC], 1.)
+    st[S_N_PL_EC] = days_into_season / time_for_efc
+    bad = _bad_curve(curve_valid, curve_number)
+
+    early = st[S_N_PL_EC] < 1
+    int_pl_ec = np.minimum(_int(st[S_N_PL_EC] * 10.), max_line)
+    kc_early, bad_early = _curve_kc_bas(
+        curves, curve_number, st[S_N_PL_EC] * 10, int_pl_ec)
+    st[S_MAD] = np.where(early, st[S_MAD_INI], st[S_MAD_MID])
+
+    days_after_efc = days_into_season - time_for_efc
+    interp = ~early & (days_after_efc <= np.abs(cp[P_TIME_HARVEST]))
+    n_days_after_efc = days_after_efc / 10 + 11
+    int_pl_ec = np.minimum(_int(n_days_after_efc), max_line)
+    kc_late, bad_late = _curve_kc_bas(
+        curves, curve_number, n_days_after_efc, int_pl_ec)
+    hold = ~early & ~interp & (cp[P_TIME_HARVEST] < -0.5)
+    bad |= (early & bad_early) | (interp & bad_late)
+    st[S_KC_BAS] = np.where(
+        early, kc_early, np.where(
+            interp, kc_late,
+            np.where(hold, st[S_KC_BAS_PREV], st[S_KC_BAS])))
+    end = ~early & ~interp & ~hold
+    st[S_IN_SEASON, end] = 0.0
+    st[S_STRESS_EVENT, end] = 0.0
+    return bad
+
+
+def _kcb_curve_type_4(st, cp, curves, curve_valid, doy):
+    """Basal crop coefficient from percent of time from greenup to
+    killing frost
+
+    Returns
+    -------
+    bad : ndarray
+        True for cells on unsupported path
+    events : ndarray
+        EVENT flags for day
+
+    """
+    max_line = MAX_LINES_IN_CROP_CURVE_TABLE - 1
+    curve_number = cp[P_CURVE_NUMBER].astype(np.int64)
+    trigger_doy = cp[P_GDD_TRIGGER_DOY]
+    bad = _bad_curve(curve_valid, curve_number)
+    bad |= ~(st[S_DOY_START_CYCLE] < (trigger_doy + 195))
+    length_of_season = 2 * (trigger_doy + 195 - st[S_DOY_START_CYCLE])
+    adjust = length_of_season > 366
+    events = np.where(adjust, EVENT_ADJUST_SEASON, 0)
+    length_of_season = np.where(adjust, 366.0, length_of_season)
+    m = cp[P_CLASS_NUMBER] == 47
+    length_of_season = np.where(
+        m, _max(length_of_season, 60.0), length_of_season)
+    length_of_season = np.where(
+        m & (length_of_season > 90), 100.0, length_of_season)
+
+    days_into_season = _days_into_season(st, doy, 0)
+    st[S_N_PL_EC] = days_into_season / length_of_season
+    st[S_MAD] = np.where(st[S_N_PL_EC] < 0.5, st[S_MAD_INI], st[S_MAD_MID])
+    interp = st[S_N_PL_EC] <= 1
+    int_pl_ec = np.minimum(max_line, _int(st[S_N_PL_EC] * 10))
+    kc_bas, bad_curve = _curve_kc_bas(
+        curves, curve_number, st[S_N_PL_EC] * 10, int_pl_ec)
+    bad |= interp & bad_curve
+    st[S_KC_BAS] = np.where(interp, kc_bas, st[S_KC_BAS])
+    st[S_IN_SEASON, ~interp] = 0.0
+    st[S_STRESS_EVENT, ~interp] = 0.0
+    return bad, events
+
+
+def _subset(func, m, st, cp, *args):
+    """Call batch function on cells in mask m, state is updated in place
+
+    Returns
+    -------
+    results : tuple
+        function results scattered back to all cells (False / 0 elsewhere)
+
+    """
+    idx = np.flatnonzero(m)
+    n = st.shape[1]
+    if idx.size == 0:
+        return None
+    sub_st = st[:, idx]
+    results = func(sub_st, cp[:, idx], *args)
+    st[:, idx] = sub_st
+    if results is None:
+        return None
+    elif not isinstance(results, tuple):
+        results = (results,)
+    full = []
+    for result in results:
+        array = np.zeros(n, dtype=result.dtype)
+        array[idx] = result
+        full.append(array)
+    return full
+
+
+def kcb_daily(st, cp, curves, curve_valid, lentries, sdays, doy, month, day,
+              pl_gu_doy, tmin, t30, u2, rh_min, etref, co2):
+    """Compute basal crop coefficient
+
+    See crop_day_kernel.kcb_daily()
+
+    Returns
+    -------
+    bad : ndarray
+        True for cells on unsupported path
+    events : ndarray
+        EVENT flags for day
+
+    """
+    n = st.shape[1]
+    bad = np.zeros(n, dtype=np.bool_)
+    events = np.zeros(n, dtype=np.int64)
+    gs_limit_flag = cp[P_GS_LIMIT_FLAG] != 0
+    gs_limit = np.where(gs_limit_flag, 40, 365)
+    class_number = cp[P_CLASS_NUMBER]
+    trigger_doy = cp[P_GDD_TRIGGER_DOY]
+    longterm_pl = st[S_LONGTERM_PL].copy()
+    flag_pl_gu = cp[P_FLAG_PL_GU]
+    before = doy < (trigger_doy + 195)
+
+    # Planting or greenup from cumulative GDD (1) or 30 day mean temp (2)
+    for flag, limit, early_start in [
+            (1, 40, longterm_pl - 40),
+            (2, gs_limit, np.where(gs_limit_flag, longterm_pl - 40, 1.0))]:
+        m = (flag_pl_gu == flag) & before
+        if not m.any():
+            continue
+        late = (
+            m & (longterm_pl > 0) & (doy > (longterm_pl + limit)) &
+            (st[S_REAL_START] == 0))
+        st[S_DOY_START_CYCLE, late] = doy
+        st[S_REAL_START, late] = 1.0
+        if flag == 1:
+            ready = st[S_CGDD] > cp[P_T30_PL_GU_CGDD]
+        else:
+            ready = t30 > cp[P_T30_PL_GU_CGDD]
+        m2 = m & (st[S_REAL_START] == 0) & ready
+        early = m2 & (longterm_pl > 0) & (doy < (longterm_pl - limit))
+        st[S_REAL_START, early] = 0.0
+        st[S_DOY_START_CYCLE, early] = early_start[early]
+        st[S_DOY_START_CYCLE, early & (st[S_DOY_START_CYCLE] < 1)] += 365
+        start = m2 & ~early
+        st[S_DOY_START_CYCLE, start] = doy
+        st[S_REAL_START, start] = 1.0
+        begin = m & (doy == st[S_DOY_START_CYCLE])
+        if begin.any():
+            st[S_REAL_START, begin] = 1.0
+            st[S_IN_SEASON, begin] = 1.0
+            st[S_STRESS_EVENT, begin] = 0.0
+            st[S_DORMANT_SETUP_FLAG, begin] = 1.0
+            bad |= _subset(setup_crop, begin, st, cp)[0]
+            st[S_CYCLE, begin] = 1.0
+            shift = begin & (cp[P_DATE_PL_GU] < 0.0)
+            st[S_DOY_START_CYCLE, shift] += np.trunc(cp[P_DATE_PL_GU, shift])
+            st[S_DOY_START_CYCLE, shift & (st[S_DOY_START_CYCLE] < 1)] += 365
+
+    # Planting or greenup day of year is precomputed for each day
+    begin = (flag_pl_gu == 3) & (
+        (doy == pl_gu_doy) | ((sdays == 1) & (pl_gu_doy >= trigger_doy)))
+    if begin.any():
+        st[S_DOY_START_CYCLE, begin] = pl_gu_doy[begin]
+        st[S_IN_SEASON, begin] = 1.0
+        st[S_STRESS_EVENT, begin] = 0.0
+        st[S_DORMANT_SETUP_FLAG, begin] = 1.0
+        bad |= _subset(setup_crop, begin, st, cp)[0]
+
+    m = flag_pl_gu == 4
+    st[S_IN_SEASON, m] = 1.0
+    st[S_STRESS_EVENT, m & (doy == trigger_doy)] = 0.0
+    st[S_DORMANT_SETUP_FLAG, m] = 1.0
+    bad |= (flag_pl_gu < 1) | (flag_pl_gu > 4)
+
+    st[S_MAD] = st[S_MAD_MID]
+    in_season = st[S_IN_SEASON] != 0
+    if in_season.any():
+        curve_type = cp[P_CURVE_TYPE]
+        result = _subset(
+            _kcb_curve_type_1, in_season & (curve_type == 1), st, cp,
+            curves, curve_valid, lentries, doy)
+        if result is not None:
+            bad |= result[0]
+        for ct, func in [(2, _kcb_curve_type_2), (3, _kcb_curve_type_3)]:
+            result = _subset(
+                func, in_season & (curve_type == ct), st, cp,
+                curves, curve_valid, doy)
+            if result is not None:
+                bad |= result[0]
+        result = _subset(
+            _kcb_curve_type_4, in_season & (curve_type == 4), st, cp,
+            curves, curve_valid, doy)
+        if result is not None:
+            bad |= result[0]
+            events |= result[1]
+
+        # Frost damage discount for alfalfa
+        alfalfa_1st = cp[P_ALFALFA_1ST] != 0
+        late = doy > (trigger_doy + 211)
+        m = in_season & ((class_number < 4) | alfalfa_1st)
+        if m.any():
+            cold = m & late & (tmin < -3)
+            bad |= cold & np.isnan(st[S_T2DAYS])
+            st[S_T2DAYS, cold & (st[S_T2DAYS] < 1)] = 1.0
+            st[S_T2DAYS, m & ~late] = 0.0
+            bad |= m & np.isnan(st[S_T2DAYS])
+            frost = m & (st[S_T2DAYS] > 0)
+            st[S_KC_BAS, frost] -= st[S_T2DAYS, frost] * 0.005
+            st[S_KC_BAS, frost & (st[S_KC_BAS] < 0.1)] = 0.1
+            st[S_T2DAYS, frost] += 1
+
+        # Killing frost to end season
+        m = in_season & late & (st[S_IN_SEASON] != 0)
+        frost = (
+            m & (tmin < cp[P_KILLING_FROST]) &
+            ((class_number < 44) | (class_number > 46)))
+        no_frost = (
+            m & ~frost & ((class_number == 2) | (class_number == 3) |
+                          alfalfa_1st))
+        events |= np.where(frost, EVENT_KILLING_FROST, 0)
+        if month == 12 and day == 31:
+            events |= np.where(no_frost, EVENT_NO_KILLING_FROST, 0)
+        st[S_IN_SEASON, frost] = 0.0
+        st[S_STRESS_EVENT, frost] = 0.0
+
+    st[S_KC_BAS_PREV] = st[S_KC_BAS]
+    bare = (class_number == 44) | (class_number == 45) | (class_number == 46)
+    st[S_KC_BAS, bare] = 0.1
+    st[S_KC_BAS_PREV, bare] = 0.1
+    water = (class_number == 55) | (class_number == 56) | (class_number == 57)
+    if water.any():
+        eto = cp[P_REFET_TYPE] == REFET_ETO
+        etr = cp[P_REFET_TYPE] == REFET_ETR
+        st[S_KC_BAS] = np.select(
+            [(class_number == 55) & eto, (class_number == 55) & etr,
+             (class_number == 57) & eto, (class_number == 57) & etr],
+            [1.05, 0.875, 0.85, 0.7], st[S_KC_BAS])
+        # Open water evaporation is computed by python day loop
+        bad |= class_number == 56
+        for row in [S_KC_ACT, S_KC_POT, S_KC_BAS_PREV]:
+            st[row] = np.where(water, st[S_KC_BAS], st[row])
+        for row in [S_ETC_ACT, S_ETC_POT, S_ETC_BAS]:
+            st[row] = np.where(water, st[S_KC_BAS] * etref, st[row])
+    m = ~bare & ~water & (cp[P_CO2_FLAG] != 0)
+    st[S_KC_BAS, m] *= co2[m]
+
+    st[S_HEIGHT] = _max(st[S_HEIGHT], 0.05)
+    m = cp[P_REFET_TYPE] == REFET_ETO
+    if m.any():
+        st[S_KC_BAS, m] = (
+            st[S_KC_BAS, m] +
+            (0.04 * (u2[m] - 2) - 0.004 * (rh_min[m] - 45)) *
+            _fpow(st[S_HEIGHT, m] / 3, 0.3))
+    return bad, events
+
+
+def runoff(st, precip):
+    """Curve number method for computing runoff
+
+    See crop_day_kernel.runoff()
+
+    """
+    cn_ii = _min(_max(st[S_CN2], 10.0), 100.0)
+    cn_i = cn_ii / (2.281 - 0.01281 * cn_ii)
+    cn_iii = cn_ii / (0.427 + 0.00573 * cn_ii)
+    awc_iii = 0.5 * st[S_REW]
+    awc_i = 0.7 * st[S_REW] + 0.3 * st[S_TEW]
+    awc_i = np.where(awc_i <= awc_iii, awc_iii + 0.01, awc_i)
+    depl_surface = st[S_DEPL_SURFACE]
+    cn = np.where(
+        depl_surface < awc_iii, cn_iii,
+        np.where(
+            depl_surface > awc_i, cn_i,
+            ((depl_surface - awc_iii) * cn_i +
+             (awc_i - depl_surface) * cn_iii) / (awc_i - awc_iii)))
+    st[S_S] = 250 * (100 / cn - 1)
+
+    irr = st[S_IRR_FLAG] != 0
+    sro = np.zeros_like(precip)
+    for row in [S_S4, S_S3, S_S2, S_S1]:
+        ppt_net = _max(precip - 0.2 * st[row], 0.0)
+        sro = sro + _fpow(ppt_net, 2) / (precip + 0.8 * st[row])
+    ppt_net = _max(precip - 0.2 * st[S_S], 0.0)
+    st[S_SRO] = np.where(
+        irr, 0.25 * sro, ppt_net * ppt_net / (precip + 0.8 * st[S_S]))
+    st[S_S4] = np.where(irr, st[S_S3], st[S_S4])
+    st[S_S3] = np.where(irr, st[S_S2], st[S_S3])
+    st[S_S2] = np.where(irr, st[S_S1], st[S_S2])
+    st[S_S1] = np.where(irr, st[S_S], st[S_S1])
+
+
+def grow_root(st, cp):
+    """Determine depth of root zone
+
+    See crop_day_kernel.grow_root()
+
+    """
+    end_frac = cp[P_END_ROOT_FRAC]
+    fractime = np.where(
+        (cp[P_CURVE_TYPE] == 1) & (end_frac != 0.0), st[S_N_CGDD] / end_frac,
+        np.where((cp[P_CURVE_TYPE] > 1) & (end_frac != 0.0),
+                 st[S_N_PL_EC] / end_frac, 0.0))
+    fractime = _min(_max(fractime, 0.0), 1.0)
+    zr_prev = st[S_ZR].copy()
+    st[S_ZR] = (
+        (0.5 + 0.5 * _sin(3.03 * fractime - 1.47).astype(np.float64)) *
+        (st[S_ZR_MAX] - st[S_ZR_MIN]) + st[S_ZR_MIN])
+    delta_zr = st[S_ZR] - zr_prev
+    m = delta_zr > 0
+    st[S_DEPL_ROOT, m] += delta_zr[m] * (st[S_AW, m] - st[S_AW3, m])
+    st[S_ZR] = _max(st[S_ZR], zr_prev)
+
+
+def _kr(depl, kr2, rew2use, tew2use, tew3use):
+    """Evaporation reduction coefficient"""
+    return np.where(
+        depl <= rew2use, 1.0,
+        np.where(
+            depl <= tew2use,
+            kr2 + (1 - kr2) * (tew2use - depl) / (tew2use - rew2use),
+            np.where(
+                tew3use > tew2use,
+                kr2 * (tew3use - depl) / (tew3use - tew2use), 0.0)))
+
+
+def _limit_evap(depl, depl_prev, e, te, few, tew):
+    """Limit evaporation and transpiration from evaporation layer to TEW
+
+    Returns
+    -------
+    depl, e, te : ndarray
+
+    bad : ndarray
+        True for cells still over TEW (python version warns)
+
+    """
+    over = depl > tew
+    potential_e = depl - depl_prev
+    potential_e = np.where(potential_e < 0.0001, 0.0001, potential_e)
+    e_factor = _min(_max(1 - (depl - tew) / potential_e, 0.0), 1.0)
+    e = np.where(over, e * e_factor, e)
+    te = np.where(over, te * e_factor, te)
+    depl = np.where(over, depl_prev + e / few + te, depl)
+    return depl, e, te, over & (depl > tew + 0.2)
+
+
+def compute_crop_et(st, cp, doy, month, precip, u2, rh_min, etref,
+                    snow_depth):
+    """Crop ET and soil water balance
+
+    See crop_day_kernel.compute_crop_et()
+    Open water crops (55-57) are skipped by caller
+
+    Returns
+    -------
+    bad : ndarray
+        True for cells on unsupported path
+    events : ndarray
+        EVENT flags for day
+
+    """
+    n = st.shape[1]
+    events = np.zeros(n, dtype=np.int64)
+    class_number = cp[P_CLASS_NUMBER]
+    eto_flag = cp[P_REFET_TYPE] == REFET_ETO
+    bare_mulch_sod = (
+        (class_number == 44) | (class_number == 45) | (class_number == 46))
+
+    st[S_HEIGHT] = _max(0.05, st[S_HEIGHT])
+    crop_kc_max = cp[P_KC_MAX] > 0.3
+    kc_max = np.where(crop_kc_max, cp[P_KC_MAX], 1.0)
+    if eto_flag.any():
+        kc_max[eto_flag] = (
+            (0.04 * (u2[eto_flag] - 2) - 0.004 * (rh_min[eto_flag] - 45)) *
+            _fpow(st[S_HEIGHT, eto_flag] / 3, 0.3))
+        kc_max[eto_flag] += np.where(
+            crop_kc_max, cp[P_KC_MAX], 1.2)[eto_flag]
+
+    for cn, fc in [(44, 0.0), (45, 0.4), (46, 0.7)]:
+        st[S_FC, class_number == cn] = fc
+
+    # Winter time (Nov-Mar) in northern hemisphere (see util.is_winter)
+    wscc = cp[P_WSCC]
+    if month < 4 or month > 10:
+        winter = cp[P_LATITUDE] > 0
+        for i, (cn, fc) in enumerate([(44, 0.0), (45, 0.4), (46, 0.7)]):
+            kc_winter = np.where(
+                eto_flag, [1.1, 1.0, 0.95][i], [0.9, 0.85, 0.8][i])
+            kc_max = np.where(
+                winter & ~bare_mulch_sod & (wscc == i + 1), kc_winter, kc_max)
+            m = winter & (class_number == cn)
+            kc_max = np.where(m, kc_winter, kc_max)
+            st[S_FC, m] = fc
+
+    in_season = st[S_IN_SEASON] != 0
+    bad = ~in_season & (wscc != 1) & (wscc != 2) & (wscc != 3)
+    st[S_KC_BAS] = np.where(
+        in_season, st[S_KC_BAS], np.where(class_number == 87, 0.25, 0.1))
+    kc_max = _max(kc_max, st[S_KC_BAS] + 0.05)
+    st[S_KC_MIN] = 0.1
+    kc_max = np.where(
+        ~bare_mulch_sod & (kc_max <= st[S_KC_MIN]), st[S_KC_MIN] + 0.001,
+        kc_max)
+    m = ~bare_mulch_sod & in_season
+    grow = m & (st[S_KC_BAS] > st[S_KC_MIN])
+    if grow.any():
+        st[S_FC, grow] = _min(_fpow(
+            (st[S_KC_BAS, grow] - st[S_KC_MIN, grow]) /
+            (kc_max[grow] - st[S_KC_MIN, grow]),
+            1 + 0.5 * st[S_HEIGHT, grow]), 0.99)
+    st[S_FC, m & ~grow] = 0.001
+
+    # Effective precipitation and runoff
+    st[S_PPT_INF_PREV] = st[S_PPT_INF]
+    st[S_PPT_INF] = 0.0
+    st[S_SRO] = 0.0
+    wet = precip > 0
+    if wet.any():
+        st[S_DEPL_SURFACE, wet] = (
+            st[S_WT_IRR, wet] * st[S_DEPL_ZE, wet] +
+            (1 - st[S_WT_IRR, wet]) * st[S_DEPL_ZEP, wet])
+        idx = np.flatnonzero(wet)
+        wet_st = st[:, idx]
+        runoff(wet_st, precip[idx])
+        st[:, idx] = wet_st
+        st[S_PPT_INF, wet] = precip[wet] - st[S_SRO, wet]
+
+    # Irrigations other than automatic are not currently read in
+    irr_real = 0.0
+    irr_manual = 0.0
+    irr_special = 0.0
+    st[S_FW_IRR] = np.where(
+        (irr_real + st[S_IRR_AUTO]) > 0, st[S_FW_STD], st[S_FW_IRR])
+
+    # Evaporation layer water balance
+    tew = st[S_TEW].copy()
+    watin_ze = tew - st[S_DEPL_ZE]
+    watin_ze = np.where(np.round(watin_ze, 6) <= 0., 0.001, watin_ze)
+    watin_ze = _min(watin_ze, tew)
+    watin_zep = tew - st[S_DEPL_ZEP]
+    watin_zep = np.where(np.round(watin_zep, 6) <= 0., 0.001, watin_zep)
+    watin_zep = _min(watin_zep, tew)
+    few = 1 - st[S_FC]
+    few = _min(_max(few, 0.001), st[S_FW_IRR])
+    fewp = 1 - st[S_FC] - few
+    fewp = _max(fewp, 0.001)
+    st[S_TOTWATIN_ZE] = (watin_ze * few + watin_zep * fewp) / (few + fewp)
+
+    fw_irr = np.where(st[S_FW_IRR] > 0.0001, st[S_FW_IRR], 1)
+    dperc_ze = st[S_PPT_INF] + st[S_IRR_SIM] / fw_irr - st[S_DEPL_ZE]
+    dperc_ze = _max(dperc_ze, 0.0)
+    depl_zep_prev = st[S_PPT_INF] - st[S_DEPL_ZEP]
+    depl_zep_prev = _max(depl_zep_prev, 0.0)
+    st[S_DEPL_ZE] = (
+        st[S_DEPL_ZE] - st[S_PPT_INF] - st[S_IRR_SIM] / fw_irr + dperc_ze)
+    st[S_DEPL_ZE] = _min(_max(st[S_DEPL_ZE], 0.0), tew)
+    st[S_DEPL_ZEP] = st[S_DEPL_ZEP] - st[S_PPT_INF] + depl_zep_prev
+    st[S_DEPL_ZEP] = _min(_max(st[S_DEPL_ZEP], 0.0), tew)
+
+    st[S_KR2, st[S_TEW3] < 0.1] = 0.0
+    st[S_ETREF_30] = _max(0.1, st[S_ETREF_30])
+    etr_threshold = np.where(eto_flag, 5.0, 4.0)
+    low = st[S_ETREF_30] < etr_threshold
+    tew2use = st[S_TEW2].copy()
+    tew3use = st[S_TEW3].copy()
+    rew2use = st[S_REW].copy()
+    if low.any():
+        ratio = np.sqrt(st[S_ETREF_30, low] / etr_threshold[low])
+        tew2use[low] = st[S_TEW2, low] * ratio
+        tew3use[low] = st[S_TEW3, low] * ratio
+        m = low & (rew2use > 0.8 * tew2use)
+        rew2use[m] = 0.8 * tew2use[m]
+
+    kr2 = st[S_KR2]
+    kr = _kr(st[S_DEPL_ZE], kr2, rew2use, tew2use, tew3use)
+    krp = _kr(st[S_DEPL_ZEP], kr2, rew2use, tew2use, tew3use)
+
+    watin = few * watin_ze + fewp * watin_zep
+    st[S_WT_IRR] = np.where(
+        watin > 0.0001, few * watin_ze / watin, few * watin_ze)
+    st[S_WT_IRR] = _min(_max(st[S_WT_IRR], 0.0), 1.0)
+
+    kc_bas = st[S_KC_BAS].copy()
+    ke_irr = kr * (kc_max - kc_bas) * st[S_WT_IRR]
+    ke_ppt = krp * (kc_max - kc_bas) * (1 - st[S_WT_IRR])
+    ke_irr = _min(_max(ke_irr, 0.0), few * kc_max)
+    ke_ppt = _min(_max(ke_ppt, 0.0), fewp * kc_max)
+    ke = ke_irr + ke_ppt
+
+    # Transpiration water stress
+    taw = st[S_AW] * st[S_ZR]
+    taw = _max(taw, 0.001)
+    raw = st[S_MAD] * taw / 100
+    ks = np.where(
+        st[S_DEPL_ROOT] > raw, _max((taw - st[S_DEPL_ROOT]) / (taw - raw), 0.0),
+        1.0)
+    invoke_stress = cp[P_INVOKE_STRESS]
+    ks = np.where(invoke_stress < 1, 1.0, ks)
+    stress = invoke_stress == 1
+    st[S_STRESS_EVENT, stress & (ks < 0.05) & in_season & (kc_bas > 0.3)] = 1.0
+    ks = np.where(stress & (st[S_STRESS_EVENT] != 0), 0.0, ks)
+
+    # Snow cover reduction
+    kc_mult = np.ones(n)
+    m = snow_depth > 0.01
+    if m.any():
+        k_rad = (
+            0.000000022 * doy ** 3 - 0.0000242 * doy ** 2 +
+            0.006 * doy + 0.011)
+        albedo_snow = 0.8
+        albedo_soil = 0.25
+        snow_mult = 1 - k_rad + (1 - albedo_snow) / (1 - albedo_soil) * k_rad
+        kc_mult[m] = snow_mult * 0.7
+    ke = ke * kc_mult
+    ke_irr = ke_irr * kc_mult
+    ke_ppt = ke_ppt * kc_mult
+
+    st[S_KC_ACT] = kc_mult * ks * kc_bas + ke
+    st[S_KC_POT] = kc_bas + ke
+    st[S_ETC_ACT] = st[S_KC_ACT] * etref
+    st[S_ETC_POT] = st[S_KC_POT] * etref
+    st[S_ETC_BAS] = kc_bas * etref
+
+    e_irr = ke_irr * etref
+    e_ppt = ke_ppt * etref
+
+    # Transpiration from evaporation layer
+    ze = 0.0001
+    st[S_ZR, st[S_ZR] < 0.0001] = 0.01
+    kt_prop = _min(_fpow(ze / st[S_ZR], 0.6), 1.0)
+    kt_reducer_denom = _max(1 - st[S_DEPL_ROOT] / taw, 0.001)
+    kt_reducer = few * (1 - st[S_DEPL_ZE] / tew2use) / kt_reducer_denom
+    kt_prop = _min(kt_prop * kt_reducer, 1.0)
+    te_irr = kc_mult * ks * kc_bas * etref * kt_prop
+    kt_reducer = fewp * (1 - st[S_DEPL_ZEP] / tew2use) / kt_reducer_denom
+    kt_prop = _min(kt_prop * kt_reducer, 1.0)
+    te_ppt = kc_mult * ks * kc_bas * etref * kt_prop
+
+    depl_ze_prev = st[S_DEPL_ZE].copy()
+    depl_zep_prev = st[S_DEPL_ZEP].copy()
+    depl_ze = depl_ze_prev + e_irr / few + te_irr
+    depl_ze = np.where(depl_ze < 0, 0.0, depl_ze)
+    st[S_DEPL_ZE], e_irr, te_irr, over = _limit_evap(
+        depl_ze, depl_ze_prev, e_irr, te_irr, few, tew)
+    bad |= over
+    depl_zep = _max(depl_zep_prev + e_ppt / fewp + te_ppt, 0.0)
+    st[S_DEPL_ZEP], e_ppt, te_ppt, over = _limit_evap(
+        depl_zep, depl_zep_prev, e_ppt, te_ppt, fewp, tew)
+    bad |= over
+
+    etref_divisor = np.where(etref < 0.01, 0.01, etref)
+    ke_irr = _min(_max(e_irr / etref_divisor, 0.0), 1.5)
+    ke_ppt = _min(_max(e_ppt / etref_divisor, 0.0), 1.5)
+    ke = ke_irr + ke_ppt
+
+    # Python version returns early here, rerun these cells one at a time
+    events |= np.where(kc_mult > 1, EVENT_KC_MULT, 0)
+    events |= np.where(~(kc_mult > 1) & (ks > 1), EVENT_KS, 0)
+    bad |= events != 0
+
+    st[S_KC_ACT] = kc_mult * ks * kc_bas + ke
+    st[S_KC_POT] = kc_bas + ke
+    st[S_ETC_ACT] = st[S_KC_ACT] * etref
+    st[S_ETC_POT] = st[S_KC_POT] * etref
+    st[S_ETC_BAS] = kc_bas * etref
+    st[S_CUM_EVAP_PREV] = _max(
+        st[S_CUM_EVAP_PREV] + e_irr - (st[S_PPT_INF] - depl_zep_prev), 0.0)
+
+    # Root zone water balance and irrigation
+    st[S_DEPL_ROOT] += (
+        st[S_ETC_ACT] - st[S_PPT_INF] - irr_real - irr_manual - irr_special)
+    irr_sim_prev = st[S_IRR_SIM].copy()
+    st[S_IRR_SIM] = 0.0
+    doy_to_start_irr = st[S_DOY_START_CYCLE] + cp[P_DAYS_AFTER_PL_IRR]
+    doy_to_start_irr = np.where(
+        doy_to_start_irr > 365, doy_to_start_irr - 365, doy_to_start_irr)
+    crop_doy = _days_into_season(st, doy, 1)
+    irrigate = (
+        (st[S_IRR_FLAG] != 0) & (crop_doy >= cp[P_DAYS_AFTER_PL_IRR]) &
+        (doy >= doy_to_start_irr) & in_season & (st[S_DEPL_ROOT] > raw) &
+        (kc_bas > 0.22))
+    st[S_IRR_SIM] = np.where(
+        irrigate, _max(st[S_DEPL_ROOT], st[S_IRR_MIN]), st[S_IRR_SIM])
+    st[S_DEPL_ROOT] -= st[S_IRR_SIM]
+    st[S_IRR_AUTO] = st[S_IRR_SIM]
+    st[S_IRR_SIM] += irr_real + irr_manual + irr_special
+    m = st[S_IRR_SIM] > 0
+    st[S_CUM_EVAP, m] = st[S_CUM_EVAP_PREV, m]
+    st[S_CUM_EVAP_PREV, m] = 0.0
+
+    # Deep percolation
+    dry = (
+        ((st[S_IRR_SIM] + irr_sim_prev + st[S_PPT_INF] +
+          st[S_PPT_INF_PREV]) <= 0.0001) | (st[S_ZR] < 0.2))
+    st[S_DPERC] = np.where(
+        dry, np.where(st[S_DEPL_ROOT] < 0.0, -st[S_DEPL_ROOT], 0.0),
+        np.where(st[S_DEPL_ROOT] < -20, -20.0 - st[S_DEPL_ROOT], 0.0))
+    st[S_DEPL_ROOT] += st[S_DPERC]
+    m = (invoke_stress > 0.5) & (st[S_DEPL_ROOT] > taw)
+    if m.any():
+        st[S_ETC_ACT, m] = _max(
+            st[S_ETC_ACT, m] - (st[S_DEPL_ROOT, m] - taw[m]), 0.0)
+        m2 = m & (etref > 0.1)
+        st[S_KC_ACT, m2] = st[S_ETC_ACT, m2] / etref[m2]
+        st[S_DEPL_ROOT, m] = taw[m]
+
+    # Layer 3 (between current and maximum root depth)
+    gross_dperc = st[S_DPERC] + 0.1 * st[S_IRR_SIM]
+    daw3 = _max(st[S_AW3] * (st[S_ZR_MAX] - st[S_ZR]), 0.0)
+    taw3 = _max(st[S_AW] * (st[S_ZR_MAX] - st[S_ZR]), 0.0)
+    daw3 = daw3 + gross_dperc
+    m = daw3 > taw3
+    st[S_DPERC] = np.where(m, daw3 - taw3, 0.0)
+    daw3 = np.where(m, taw3, daw3)
+    daw3 = _max(daw3, 0.0)
+    st[S_AW3] = np.where(
+        st[S_ZR_MAX] > st[S_ZR], daw3 / (st[S_ZR_MAX] - st[S_ZR]), 0.0)
+
+    # Net irrigation water requirement and effective precipitation
+    irr = st[S_IRR_SIM] > 0
+    st[S_NIWR] = np.where(
+        irr, st[S_ETC_ACT] - (precip - st[S_SRO]),
+        st[S_ETC_ACT] - (precip - st[S_SRO] - st[S_DPERC]))
+    st[S_P_RZ] = np.where(
+        irr, precip - st[S_SRO], precip - st[S_SRO] - st[S_DPERC])
+    st[S_P_EFT] = np.where(
+        irr, precip - st[S_SRO] - e_ppt,
+        precip - st[S_SRO] - st[S_DPERC] - e_ppt)
+    st[S_P_RZ] = np.where(st[S_P_RZ] <= 0, 0.0, st[S_P_RZ])
+    st[S_P_EFT] = np.where(st[S_P_EFT] <= 0, 0.0, st[S_P_EFT])
+
+    if in_season.any():
+        _subset(grow_root, in_season, st, cp)
+    return bad, events
+
+
+def crop_day_batch(st, cp, curves, curve_valid, lentries, etref_array,
+                   day_state, doy, year, month, day, pl_gu_doy, u2, precip,
+                   rh_min, etref, snow_depth, tmean, tmin, tmax, t30, co2,
+                   out, season, cutting, events, failed):
+    """Run all daily timesteps for single crop across cells
+
+    Parameters
+    ---------
+    st : ndarray
+        crop cycle state [STATE_FIELDS, cell], updated in place
+    cp : ndarray
+        crop parameters and options [N_PARAMS, cell]
+    curves, curve_valid, lentries : ndarray
+        crop curves (see crop_day_kernel.build_curve_arrays)
+    etref_array : ndarray
+        DayData 30 day ETref array [30, cell], updated in place
+    day_state : ndarray
+        DayData sdays and doy_prev (shared by all cells), updated in place
+    doy, year, month, day : ndarray
+        integer daily time series shared by all cells
+    pl_gu_doy : ndarray
+        planting or greenup day of year [day, cell]
+    u2, precip, rh_min, etref, snow_depth, tmean, tmin, tmax, t30, co2 : ndarray
+        daily climate [day, cell]
+    out : ndarray
+        daily output values [day, OUT_FIELDS, cell]
+    season, cutting, events : ndarray
+        integer daily outputs [day, cell]
+    failed : ndarray
+        day index cells hit unsupported path, -1 for cells that ran all days
+
+    Returns
+    -------
+    None
+
+    """
+    class_number = cp[P_CLASS_NUMBER]
+    water = (class_number == 55) | (class_number == 56) | (class_number == 57)
+    with np.errstate(all='ignore'):
+        for i in range(len(doy)):
+            bad = np.zeros(st.shape[1], dtype=np.bool_)
+            dormant = (
+                (st[S_IN_SEASON] == 0) & (st[S_DORMANT_SETUP_FLAG] != 0))
+            if dormant.any():
+                bad |= _subset(setup_dormant, dormant, st, cp)[0]
+            day_state[0] += 1
+            compute_crop_gdd(
+                st, cp, etref_array, day_state[0], doy[i], day_state[1],
+                etref[i], tmean[i], tmin[i], tmax[i], snow_depth[i])
+            day_state[1] = doy[i]
+            calculate_height(st, cp)
+            day_bad, day_events = kcb_daily(
+                st, cp, curves, curve_valid, lentries, day_state[0], doy[i],
+                month[i], day[i], pl_gu_doy[i], tmin[i], t30[i], u2[i],
+                rh_min[i], etref[i], co2[i])
+            bad |= day_bad
+            events[i] = day_events
+            if not water.all():
+                result = _subset(
+                    compute_crop_et, ~water, st, cp, doy[i], month[i],
+                    precip[i][~water], u2[i][~water], rh_min[i][~water],
+                    etref[i][~water], snow_depth[i][~water])
+                bad |= result[0]
+                events[i] |= result[1]
+            failed[bad & (failed < 0)] = i
+
+            out[i] = st[OUT_ROWS]
+            out[i, 8] += 0
+            season[i] = st[S_IN_SEASON]
+            cutting[i] = st[S_CUTTING]
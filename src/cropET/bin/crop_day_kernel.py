@@ -0,0 +1,1378 @@
+"""crop_day_kernel.py
+Compiled day loop kernel for a single ET cell and crop
+Defines build_crop_param_array, build_curve_arrays, pack_state,
+    unpack_state, crop_day_kernel
+Called by crop_cycle.py
+
+Kernel functions operate on typed state arrays instead of the
+    InitializeCropCycle ("foo") object so they can be compiled with numba
+    (see util.jit).  The daily physics mirrors compute_crop_gdd(),
+    calculate_height(), kcb_daily(), compute_crop_et(), runoff() and
+    grow_root() and must be kept in sync with those functions.
+
+"""
+
+import math
+
+import numpy as np
+
+import util
+
+# State array indices (see STATE_FIELDS)
+S_AW = 0
+S_AW3 = 1
+S_CGDD = 2
+S_CGDD_AT_PLANTING = 3
+S_CGDD_PENALTY = 4
+S_CN2 = 5
+S_CROP_SETUP_FLAG = 6
+S_CUM_EVAP = 7
+S_CUM_EVAP_PREV = 8
+S_CUTTING = 9
+S_CYCLE = 10
+S_DEPL_ROOT = 11
+S_DEPL_SURFACE = 12
+S_DEPL_ZE = 13
+S_DEPL_ZEP = 14
+S_DORMANT_SETUP_FLAG = 15
+S_DOY_START_CYCLE = 16
+S_DPERC = 17
+S_ETC_ACT = 18
+S_ETC_BAS = 19
+S_ETC_POT = 20
+S_ETREF_30 = 21
+S_FC = 22
+S_FW_IRR = 23
+S_FW_SPEC = 24
+S_FW_STD = 25
+S_GDD = 26
+S_GDD_PENALTY = 27
+S_HEIGHT = 28
+S_HEIGHT_MAX = 29
+S_HEIGHT_MIN = 30
+S_IN_SEASON = 31
+S_IRR_AUTO = 32
+S_IRR_FLAG = 33
+S_IRR_MIN = 34
+S_IRR_SIM = 35
+S_KC_ACT = 36
+S_KC_BAS = 37
+S_KC_BAS_MID = 38
+S_KC_BAS_PREV = 39
+S_KC_MIN = 40
+S_KC_POT = 41
+S_KR2 = 42
+S_LONGTERM_PL = 43
+S_MAD = 44
+S_MAD_INI = 45
+S_MAD_MID = 46
+S_N_CGDD = 47
+S_N_PL_EC = 48
+S_NIWR = 49
+S_P_EFT = 50
+S_P_RZ = 51
+S_PPT_INF = 52
+S_PPT_INF_PREV = 53
+S_REAL_START = 54
+S_REW = 55
+S_S = 56
+S_S1 = 57
+S_S2 = 58
+S_S3 = 59
+S_S4 = 60
+S_SRO = 61
+S_STRESS_EVENT = 62
+S_T2DAYS = 63
+S_TEW = 64
+S_TEW2 = 65
+S_TEW3 = 66
+S_TOTWATIN_ZE = 67
+S_WT_IRR = 68
+S_ZR = 69
+S_ZR_MAX = 70
+S_ZR_MIN = 71
+
+# InitializeCropCycle attribute names in state array order
+STATE_FIELDS = [
+    'aw', 'aw3', 'cgdd', 'cgdd_at_planting', 'cgdd_penalty', 'cn2',
+    'crop_setup_flag', 'cum_evap', 'cum_evap_prev', 'cutting', 'cycle',
+    'depl_root', 'depl_surface', 'depl_ze', 'depl_zep', 'dormant_setup_flag',
+    'doy_start_cycle', 'dperc', 'etc_act', 'etc_bas', 'etc_pot', 'etref_30',
+    'fc', 'fw_irr', 'fw_spec', 'fw_std', 'gdd', 'gdd_penalty', 'height',
+    'height_max', 'height_min', 'in_season', 'irr_auto', 'irr_flag',
+    'irr_min', 'irr_sim', 'kc_act', 'kc_bas', 'kc_bas_mid', 'kc_bas_prev',
+    'kc_min', 'kc_pot', 'kr2', 'longterm_pl', 'mad', 'mad_ini', 'mad_mid',
+    'n_cgdd', 'n_pl_ec', 'niwr', 'p_eft', 'p_rz', 'ppt_inf', 'ppt_inf_prev',
+    'real_start', 'rew', 's', 's1', 's2', 's3', 's4', 'sro', 'stress_event',
+    'T2Days', 'tew', 'tew2', 'tew3', 'totwatin_ze', 'wt_irr', 'zr', 'zr_max',
+    'zr_min']
+BOOL_FIELDS = [
+    'crop_setup_flag', 'dormant_setup_flag', 'in_season', 'irr_flag',
+    'real_start', 'stress_event']
+INT_FIELDS = ['cutting', 'cycle', 'doy_start_cycle', 'longterm_pl', 'T2Days']
+
+# Crop parameter and option array indices
+P_CLASS_NUMBER = 0
+P_CURVE_NUMBER = 1
+P_CURVE_TYPE = 2
+P_FLAG_PL_GU = 3
+P_GDD_TRIGGER_DOY = 4
+P_WINTER_CROP = 5
+P_TBASE = 6
+P_T30_PL_GU_CGDD = 7
+P_DATE_PL_GU = 8
+P_CGDD_EFC = 9
+P_CGDD_TERM = 10
+P_TIME_EFC = 11
+P_TIME_HARVEST = 12
+P_CUTTING_CROP = 13
+P_ALFALFA_1ST = 14
+P_KILLING_FROST = 15
+P_HEIGHT_INITIAL = 16
+P_HEIGHT_MAX = 17
+P_KC_MAX = 18
+P_WSCC = 19
+P_INVOKE_STRESS = 20
+P_DAYS_AFTER_PL_IRR = 21
+P_END_ROOT_FRAC = 22
+P_ZR_INITIAL = 23
+P_ZR_MAX = 24
+P_CN2_DORMANT = 25
+P_REFET_TYPE = 26
+P_CROP_ONE_FLAG = 27
+P_CROP_ONE_REDUCER = 28
+P_GS_LIMIT_FLAG = 29
+P_CO2_FLAG = 30
+P_DAIRY_CUTTINGS = 31
+P_BEEF_CUTTINGS = 32
+P_LATITUDE = 33
+N_PARAMS = 34
+
+REFET_ETO = 1
+REFET_ETR = 2
+
+# Output array columns, in crop_df column order
+OUT_FIELDS = [
+    'et_act', 'et_pot', 'et_bas', 'kc_act', 'kc_bas', 'irrigation', 'runoff',
+    'dperc', 'niwr', 'p_rz', 'p_eft']
+
+# Daily event flags, logged by caller after kernel returns
+EVENT_KILLING_FROST = 1
+EVENT_NO_KILLING_FROST = 2
+EVENT_ADJUST_SEASON = 4
+EVENT_KC_MULT = 8
+EVENT_KS = 16
+
+# Kernel return status
+# Any non-zero status means the kernel hit a path it does not handle
+#   (usually one where the python day loop raises or exits) and
+#   the caller should rerun crop with python day loop
+STATUS_OK = 0
+STATUS_UNSUPPORTED = 1
+
+# Rows in crop curve table (see InitializeCropCycle.max_lines_in_crop_curve_table)
+MAX_LINES_IN_CROP_CURVE_TABLE = 34
+
+
+def build_crop_param_array(data, et_cell, crop):
+    """Pack crop parameters and run options into float array
+
+    Parameters
+    ---------
+    data :
+
+    et_cell :
+
+    crop :
+
+    Returns
+    -------
+    cp : ndarray or None
+        None if crop or options are not supported by kernel
+
+    """
+    if data.refet['type'] == 'eto':
+        refet_type = REFET_ETO
+    elif data.refet['type'] == 'etr':
+        refet_type = REFET_ETR
+    else:
+        return None
+    wscc = crop.winter_surface_cover_class
+
+    # Curve number for antecedent II condition for winter covers
+    # NaN leaves cn2 unchanged in setup_dormant (see InitializeCropCycle)
+    # Winter cover classes other than 1-3 are flagged unsupported by kernel
+    #   only if they are used (open water crops never use them)
+    cn2_dormant = np.nan
+    try:
+        if wscc not in [1, 2, 3]:
+            cn2_dormant = np.nan
+        elif et_cell.stn_hydrogroup == 1:
+            cn2_dormant = et_cell.crop_params[wscc + 43].cn_coarse_soil
+        elif et_cell.stn_hydrogroup == 2:
+            cn2_dormant = et_cell.crop_params[wscc + 43].cn_medium_soil
+        elif et_cell.stn_hydrogroup == 3:
+            cn2_dormant = et_cell.crop_params[wscc + 43].cn_fine_soil
+    except KeyError:
+        return None
+
+    cp = np.zeros(N_PARAMS, dtype=np.float64)
+    cp[P_CLASS_NUMBER] = crop.class_number
+    cp[P_CURVE_NUMBER] = crop.curve_number
+    cp[P_CURVE_TYPE] = crop.curve_type
+    cp[P_FLAG_PL_GU] = crop.flag_for_means_to_estimate_pl_or_gu
+    cp[P_GDD_TRIGGER_DOY] = crop.gdd_trigger_doy
+    cp[P_WINTER_CROP] = crop.winter_crop
+    cp[P_TBASE] = crop.tbase
+    cp[P_T30_PL_GU_CGDD] = crop.t30_for_pl_or_gu_or_cgdd
+    cp[P_DATE_PL_GU] = crop.date_of_pl_or_gu
+    cp[P_CGDD_EFC] = crop.cgdd_for_efc
+    cp[P_CGDD_TERM] = crop.cgdd_for_termination
+    cp[P_TIME_EFC] = crop.time_for_efc
+    cp[P_TIME_HARVEST] = crop.time_for_harvest
+    cp[P_CUTTING_CROP] = crop.cutting_crop
+    cp[P_ALFALFA_1ST] = (
+        crop.class_number >= 4 and
+        crop.curve_name.upper() == "ALFALFA 1ST CYCLE")
+    cp[P_KILLING_FROST] = crop.killing_frost_temperature
+    cp[P_HEIGHT_INITIAL] = crop.height_initial
+    cp[P_HEIGHT_MAX] = crop.height_max
+    cp[P_KC_MAX] = crop.kc_max
+    cp[P_WSCC] = wscc
+    cp[P_INVOKE_STRESS] = crop.invoke_stress
+    cp[P_DAYS_AFTER_PL_IRR] = crop.days_after_planting_irrigation
+    cp[P_END_ROOT_FRAC] = crop.end_of_root_growth_fraction_time
+    cp[P_ZR_INITIAL] = crop.rooting_depth_initial
+    cp[P_ZR_MAX] = crop.rooting_depth_max
+    cp[P_CN2_DORMANT] = cn2_dormant
+    cp[P_REFET_TYPE] = refet_type
+    cp[P_CROP_ONE_FLAG] = data.crop_one_flag
+    cp[P_CROP_ONE_REDUCER] = data.crop_one_reducer
+    cp[P_GS_LIMIT_FLAG] = data.gs_limit_flag
+    cp[P_CO2_FLAG] = data.co2_flag
+    cp[P_DAIRY_CUTTINGS] = et_cell.dairy_cuttings
+    cp[P_BEEF_CUTTINGS] = et_cell.beef_cuttings
+    cp[P_LATITUDE] = et_cell.latitude
+    return cp
+
+
+def build_curve_arrays(crop_coeffs):
+    """Stack crop coefficient curves into 2D array indexed by curve number
+
+    Parameters
+    ---------
+    crop_coeffs : dict
+        CropCoeff objects keyed by curve number
+
+    Returns
+    -------
+    curves : ndarray
+        curve values [curve number, line]
+    curve_valid : ndarray
+        True for curve numbers present in crop_coeffs
+    lentries : ndarray
+        index of last positive value for each curve
+
+    """
+    n_curves = max(crop_coeffs.keys()) + 1 if crop_coeffs else 1
+    n_lines = max([len(c.data) for c in crop_coeffs.values()] + [1])
+    curves = np.zeros((n_curves, n_lines), dtype=np.float64)
+    curve_valid = np.zeros(n_curves, dtype=np.bool_)
+    lentries = np.zeros(n_curves, dtype=np.int64)
+    for curve_no, crop_coeff in crop_coeffs.items():
+        curves[curve_no, :len(crop_coeff.data)] = crop_coeff.data
+        curve_valid[curve_no] = True
+        lentries[curve_no] = crop_coeff.lentry
+    return curves, curve_valid, lentries
+
+
+def pack_state(foo):
+    """Copy InitializeCropCycle attributes into state array
+
+    Parameters
+    ---------
+    foo : InitializeCropCycle
+
+    Returns
+    -------
+    st : ndarray
+
+    Notes
+    -----
+    T2Days is not initialized by InitializeCropCycle, NaN marks it as unset
+
+    """
+    st = np.zeros(len(STATE_FIELDS), dtype=np.float64)
+    for i, field in enumerate(STATE_FIELDS):
+        st[i] = float(getattr(foo, field, np.nan))
+    return st
+
+
+def unpack_state(foo, st):
+    """Copy state array back into InitializeCropCycle attributes
+
+    Parameters
+    ---------
+    foo : InitializeCropCycle
+
+    st : ndarray
+
+    Returns
+    -------
+    None
+
+    """
+    for i, field in enumerate(STATE_FIELDS):
+        if np.isnan(st[i]):
+            continue
+        elif field in BOOL_FIELDS:
+            setattr(foo, field, bool(st[i]))
+        elif field in INT_FIELDS:
+            setattr(foo, field, int(st[i]))
+        else:
+            setattr(foo, field, float(st[i]))
+
+
+@util.jit
+def setup_crop(st, cp):
+    """Initialize state for beginning of crop season
+
+    See InitializeCropCycle.setup_crop()
+
+    """
+    zr_dormant = 0.0
+    st[S_HEIGHT_MIN] = cp[P_HEIGHT_INITIAL]
+    st[S_HEIGHT_MAX] = cp[P_HEIGHT_MAX]
+    st[S_ZR_MIN] = cp[P_ZR_INITIAL]
+    st[S_ZR_MAX] = cp[P_ZR_MAX]
+    st[S_HEIGHT] = st[S_HEIGHT_MIN]
+    st[S_TEW] = st[S_TEW2]
+    if st[S_TEW] < st[S_TEW3]:
+        st[S_TEW] = st[S_TEW3]
+    st[S_FW_IRR] = st[S_FW_STD]
+    st[S_IRR_AUTO] = 0.0
+    st[S_IRR_SIM] = 0.0
+    daw3 = st[S_AW3] * (st[S_ZR_MAX] - zr_dormant)
+    taw3 = st[S_AW] * (st[S_ZR_MAX] - zr_dormant)
+    daw3 = max(0.0, daw3)
+    taw3 = max(0.0, taw3)
+    if st[S_ZR_MIN] > zr_dormant:
+        st[S_DEPL_ROOT] = (
+            st[S_DEPL_ROOT] + (taw3 - daw3) *
+            (st[S_ZR_MIN] - zr_dormant) / (st[S_ZR_MAX] - zr_dormant))
+    elif st[S_ZR_MAX] > st[S_ZR_MIN]:
+        # Python version divides by zr_dormant (0) here
+        return STATUS_UNSUPPORTED
+    if st[S_DEPL_ROOT] < 0.:
+        st[S_DEPL_ROOT] = 0.
+    st[S_ZR] = st[S_ZR_MIN]
+    st[S_CROP_SETUP_FLAG] = 0.0
+    return STATUS_OK
+
+
+@util.jit
+def setup_dormant(st, cp):
+    """Initialize state for start of dormant season
+
+    See InitializeCropCycle.setup_dormant()
+
+    """
+    wscc = cp[P_WSCC]
+    if wscc != 1 and wscc != 2 and wscc != 3:
+        return STATUS_UNSUPPORTED
+    if wscc == 1:
+        st[S_KC_BAS] = 0.1
+        st[S_FC] = 0.0
+    elif wscc == 2:
+        st[S_KC_BAS] = 0.1
+        st[S_FC] = 0.4
+    elif wscc == 3:
+        st[S_KC_BAS] = 0.2
+        st[S_FC] = 0.7
+    if not math.isnan(cp[P_CN2_DORMANT]):
+        st[S_CN2] = cp[P_CN2_DORMANT]
+
+    zr_dormant = 0.1
+    daw3 = st[S_AW3] * (st[S_ZR_MAX] - st[S_ZR])
+    taw_root = st[S_AW] * (st[S_ZR])
+    daw_root = max(taw_root - st[S_DEPL_ROOT], 0.0)
+    ze = 0.1
+    if zr_dormant < st[S_ZR]:
+        aw_root = daw_root / st[S_ZR]
+        # zr_dormant is never > ze (python version references undefined fc)
+        totwatinzr_dormant = (
+            (st[S_TOTWATIN_ZE] * (1 - (ze - zr_dormant) / ze)) *
+            (1 - st[S_FC]) + aw_root * zr_dormant * st[S_FC])
+        if daw_root > totwatinzr_dormant:
+            daw_below = (daw_root - totwatinzr_dormant)
+        else:
+            daw_below = 0.0
+        st[S_AW3] = (daw_below + daw3) / (st[S_ZR_MAX] - zr_dormant)
+    else:
+        # Python version leaves totwatinzr_dormant undefined here
+        return STATUS_UNSUPPORTED
+    st[S_DEPL_ROOT] = st[S_AW] * zr_dormant - totwatinzr_dormant
+    st[S_ZR] = zr_dormant
+    st[S_FW_IRR] = st[S_FW_STD]
+    st[S_IRR_AUTO] = 0.0
+    st[S_IRR_SIM] = 0.0
+    st[S_DORMANT_SETUP_FLAG] = 0.0
+    st[S_CUTTING] = 0.0
+    return STATUS_OK
+
+
+@util.jit
+def compute_crop_gdd(st, cp, etref_array, day_state, doy, etref, tmean,
+                     tmin, tmax, snow_depth):
+    """Calculate crop growing degree days
+
+    See compute_crop_gdd.compute_crop_gdd()
+    day_state holds DayData sdays and doy_prev
+
+    """
+    sdays = day_state[0]
+    if sdays > 30:
+        etref_lost = etref_array[0]
+        for idx in range(29):
+            etref_array[idx] = etref_array[idx + 1]
+        etref_array[29] = etref
+        st[S_ETREF_30] = st[S_ETREF_30] + (etref - etref_lost) / 30.
+    else:
+        etref_array[sdays - 1] = etref
+        st[S_ETREF_30] = (st[S_ETREF_30] * (sdays - 1) + etref) / sdays
+
+    # Reset CGDD if new year
+    trigger_doy = cp[P_GDD_TRIGGER_DOY]
+    doy_prev = day_state[1]
+    if (cp[P_WINTER_CROP] != 0 and
+            (doy_prev < trigger_doy and doy >= trigger_doy)):
+        st[S_CGDD] = 0.0
+        st[S_DOY_START_CYCLE] = 0.0
+        st[S_REAL_START] = 0.0
+        st[S_IN_SEASON] = 0.0
+    elif (cp[P_WINTER_CROP] == 0 and
+          (doy_prev > (trigger_doy + 199) and doy < (trigger_doy + 199))):
+        st[S_CGDD] = 0.0
+        st[S_DOY_START_CYCLE] = 0.0
+        st[S_REAL_START] = 0.0
+        st[S_IN_SEASON] = 0.0
+    day_state[1] = doy
+
+    if cp[P_CURVE_NUMBER] > 0:
+        tbase = cp[P_TBASE]
+        if cp[P_WINTER_CROP] != 0:
+            if tmin < -4.0:
+                gdd = 0.0
+            elif tmean > tbase:
+                gdd = tmean - tbase
+            else:
+                gdd = 0.0
+            gdd -= st[S_GDD_PENALTY]
+            gdd = max(gdd, 0.0)
+            st[S_GDD] = gdd
+            st[S_CGDD] += gdd - st[S_CGDD_PENALTY]
+            st[S_CGDD] = max(0.0, st[S_CGDD])
+            if tmin < -10:
+                st[S_GDD_PENALTY] = 5.0
+            else:
+                st[S_GDD_PENALTY] = 0.0
+            if tmin < -25 and snow_depth <= 0:
+                st[S_CGDD_PENALTY] = st[S_CGDD] * 0.1
+            else:
+                st[S_CGDD_PENALTY] = 0.0
+        elif tbase < 0:
+            # Corn
+            tmax_prev = tmax
+            tmin_prev = tmin
+            if tmax > 30:
+                tmax_prev = 30.0
+            if tmin > 30:
+                tmin_prev = 30.0
+            if tmax < -tbase:
+                tmax_prev = -tbase
+            if tmin < -tbase:
+                tmin_prev = -tbase
+            tmean_prev = 0.5 * (tmax_prev + tmin_prev)
+            st[S_CGDD] += tmean_prev + tbase
+        elif tmean > tbase:
+            st[S_GDD] = tmean - tbase
+            st[S_CGDD] += st[S_GDD]
+
+
+@util.jit
+def calculate_height(st, cp):
+    """Determine height of crop based on Kc and height limits
+
+    See calculate_height.calculate_height()
+
+    """
+    height_prev = st[S_HEIGHT]
+    if (st[S_KC_BAS] > st[S_KC_MIN] and
+            st[S_KC_BAS_MID] > st[S_KC_MIN]):
+        st[S_HEIGHT] = (
+            cp[P_HEIGHT_INITIAL] + (st[S_KC_BAS] - st[S_KC_MIN]) /
+            (st[S_KC_BAS_MID] - st[S_KC_MIN]) *
+            (cp[P_HEIGHT_MAX] - cp[P_HEIGHT_INITIAL]))
+    else:
+        st[S_HEIGHT] = cp[P_HEIGHT_INITIAL]
+    st[S_HEIGHT] = min(
+        max(cp[P_HEIGHT_INITIAL], max(height_prev, st[S_HEIGHT])),
+        cp[P_HEIGHT_MAX])
+
+
+@util.jit
+def curve_kc_bas(curves, curve_number, n_curve, int_curve):
+    """Interpolate crop coefficient curve"""
+    return (
+        curves[curve_number, int_curve] +
+        (n_curve - int_curve) *
+        (curves[curve_number, int_curve + 1] -
+         curves[curve_number, int_curve]))
+
+
+@util.jit
+def kcb_daily(st, cp, curves, curve_valid, lentries, sdays, doy, year,
+              month, day, pl_gu_doy, tmin, t30, u2, rh_min, etref, co2):
+    """Compute basal crop coefficient
+
+    See kcb_daily.kcb_daily()
+
+    Returns
+    -------
+    status : int
+
+    events : int
+        EVENT flags for day
+
+    """
+    events = 0
+    if cp[P_GS_LIMIT_FLAG] != 0:
+        gs_limit = 40
+    else:
+        gs_limit = 365
+    curve_number = int(cp[P_CURVE_NUMBER])
+    class_number = cp[P_CLASS_NUMBER]
+    trigger_doy = cp[P_GDD_TRIGGER_DOY]
+    longterm_pl = st[S_LONGTERM_PL]
+    flag_pl_gu = cp[P_FLAG_PL_GU]
+
+    if flag_pl_gu == 1:
+        if doy < (trigger_doy + 195):
+            if (longterm_pl > 0 and doy > (longterm_pl + 40) and
+                    st[S_REAL_START] == 0):
+                st[S_DOY_START_CYCLE] = doy
+                st[S_REAL_START] = 1.0
+            if (st[S_REAL_START] == 0 and
+                    st[S_CGDD] > cp[P_T30_PL_GU_CGDD]):
+                if longterm_pl > 0 and doy < (longterm_pl - 40):
+                    st[S_REAL_START] = 0.0
+                    st[S_DOY_START_CYCLE] = longterm_pl - 40
+                    if st[S_DOY_START_CYCLE] < 1:
+                        st[S_DOY_START_CYCLE] += 365
+                else:
+                    st[S_DOY_START_CYCLE] = doy
+                    st[S_REAL_START] = 1.0
+            if doy == st[S_DOY_START_CYCLE]:
+                st[S_REAL_START] = 1.0
+                st[S_IN_SEASON] = 1.0
+                st[S_STRESS_EVENT] = 0.0
+                st[S_DORMANT_SETUP_FLAG] = 1.0
+                if setup_crop(st, cp) != STATUS_OK:
+                    return STATUS_UNSUPPORTED, events
+                st[S_CYCLE] = 1.0
+                if cp[P_DATE_PL_GU] < 0.0:
+                    st[S_DOY_START_CYCLE] += int(cp[P_DATE_PL_GU])
+                    if st[S_DOY_START_CYCLE] < 1:
+                        st[S_DOY_START_CYCLE] = st[S_DOY_START_CYCLE] + 365
+    elif flag_pl_gu == 2:
+        if doy < (trigger_doy + 195):
+            if (longterm_pl > 0 and doy > (longterm_pl + gs_limit) and
+                    st[S_REAL_START] == 0):
+                st[S_DOY_START_CYCLE] = doy
+                st[S_REAL_START] = 1.0
+            if st[S_REAL_START] == 0:
+                if t30 > cp[P_T30_PL_GU_CGDD]:
+                    if longterm_pl > 0 and doy < (longterm_pl - gs_limit):
+                        st[S_REAL_START] = 0.0
+                        if cp[P_GS_LIMIT_FLAG] != 0:
+                            st[S_DOY_START_CYCLE] = longterm_pl - 40
+                        else:
+                            st[S_DOY_START_CYCLE] = 1.0
+                        if st[S_DOY_START_CYCLE] < 1:
+                            st[S_DOY_START_CYCLE] += 365
+                    else:
+                        st[S_DOY_START_CYCLE] = doy
+                        st[S_REAL_START] = 1.0
+            if doy == st[S_DOY_START_CYCLE]:
+                st[S_REAL_START] = 1.0
+                st[S_IN_SEASON] = 1.0
+                st[S_STRESS_EVENT] = 0.0
+                st[S_DORMANT_SETUP_FLAG] = 1.0
+                if setup_crop(st, cp) != STATUS_OK:
+                    return STATUS_UNSUPPORTED, events
+                st[S_CYCLE] = 1.0
+                if cp[P_DATE_PL_GU] < 0.0:
+                    st[S_DOY_START_CYCLE] += int(cp[P_DATE_PL_GU])
+                    if st[S_DOY_START_CYCLE] < 1:
+                        st[S_DOY_START_CYCLE] += 365
+    elif flag_pl_gu == 3:
+        # Planting or greenup day of year is precomputed for each day
+        if (doy == pl_gu_doy or
+                (sdays == 1 and pl_gu_doy >= trigger_doy)):
+            st[S_DOY_START_CYCLE] = pl_gu_doy
+            st[S_IN_SEASON] = 1.0
+            st[S_STRESS_EVENT] = 0.0
+            st[S_DORMANT_SETUP_FLAG] = 1.0
+            if setup_crop(st, cp) != STATUS_OK:
+                return STATUS_UNSUPPORTED, events
+    elif flag_pl_gu == 4:
+        st[S_IN_SEASON] = 1.0
+        if doy == trigger_doy:
+            st[S_STRESS_EVENT] = 0.0
+        st[S_DORMANT_SETUP_FLAG] = 1.0
+    else:
+        return STATUS_UNSUPPORTED, events
+
+    st[S_MAD] = st[S_MAD_MID]
+    max_line = MAX_LINES_IN_CROP_CURVE_TABLE - 1
+    alfalfa_1st = cp[P_ALFALFA_1ST] != 0
+    if st[S_IN_SEASON] != 0:
+        curve_type = cp[P_CURVE_TYPE]
+        if curve_type == 1:
+            if st[S_DOY_START_CYCLE] == doy:
+                st[S_CGDD_AT_PLANTING] = st[S_CGDD]
+            cgdd_in_season = max(0.0, st[S_CGDD] - st[S_CGDD_AT_PLANTING])
+            cgdd_efc = cp[P_CGDD_EFC]
+            cgdd_term = cp[P_CGDD_TERM]
+            st[S_CUTTING] = 0.0
+            if ((class_number == 1 and cp[P_CROP_ONE_FLAG] != 0) or
+                    class_number == 2 or class_number == 3 or alfalfa_1st):
+                cgdd_term = cp[P_CGDD_EFC]
+                if st[S_CYCLE] > 1:
+                    cgdd_efc = cp[P_CGDD_TERM]
+                    cgdd_term = cp[P_CGDD_TERM]
+                    if class_number == 2:
+                        if st[S_CYCLE] < cp[P_DAIRY_CUTTINGS] + 0.01 - 1:
+                            curve_number = curve_number + 1
+                        else:
+                            curve_number = curve_number + 2
+                    elif (class_number == 1 or class_number == 3 or
+                          alfalfa_1st):
+                        if st[S_CYCLE] < cp[P_BEEF_CUTTINGS] + 0.01 - 1:
+                            curve_number = curve_number + 1
+                        else:
+                            curve_number = curve_number + 2
+            if (curve_number < 0 or curve_number >= len(curve_valid) or
+                    not curve_valid[curve_number]):
+                return STATUS_UNSUPPORTED, events
+            if cgdd_in_season < cgdd_efc:
+                st[S_N_CGDD] = cgdd_in_season / cgdd_efc
+                int_cgdd = min(max_line, int(st[S_N_CGDD] * 10))
+                st[S_KC_BAS] = curve_kc_bas(
+                    curves, curve_number, st[S_N_CGDD] * 10, int_cgdd)
+                st[S_MAD] = st[S_MAD_INI]
+            else:
+                if cgdd_in_season < cgdd_term:
+                    st[S_N_CGDD] = cgdd_in_season / cgdd_efc
+                    st[S_N_CGDD] = max(st[S_N_CGDD], 1.0)
+                    int_cgdd = min(max_line, int(st[S_N_CGDD] * 10))
+                    st[S_MAD] = st[S_MAD_MID]
+                    lentry = lentries[curve_number]
+                    if int_cgdd < lentry:
+                        st[S_KC_BAS] = curve_kc_bas(
+                            curves, curve_number, st[S_N_CGDD] * 10, int_cgdd)
+                    else:
+                        st[S_KC_BAS] = curves[curve_number, lentry]
+                else:
+                    st[S_IN_SEASON] = 0.0
+                    st[S_STRESS_EVENT] = 0.0
+                    if cp[P_CUTTING_CROP] != 0:
+                        st[S_CUTTING] = 1.0
+                        st[S_CYCLE] += 1
+                        st[S_IN_SEASON] = 1.0
+                        st[S_CGDD_AT_PLANTING] = st[S_CGDD]
+                        st[S_HEIGHT] = st[S_HEIGHT_MIN]
+                        st[S_KC_BAS] = curves[curve_number, 0]
+                if class_number == 1 and cp[P_CROP_ONE_FLAG] != 0:
+                    st[S_KC_BAS] *= cp[P_CROP_ONE_REDUCER]
+            days_into_season = doy - st[S_DOY_START_CYCLE] + 1
+            if days_into_season < 1:
+                days_into_season += 365
+            if (cp[P_TIME_HARVEST] > 10 and
+                    days_into_season > cp[P_TIME_HARVEST]):
+                st[S_IN_SEASON] = 0.0
+                st[S_STRESS_EVENT] = 0.0
+        elif curve_type == 2:
+            if not curve_valid[curve_number]:
+                return STATUS_UNSUPPORTED, events
+            days_into_season = doy - st[S_DOY_START_CYCLE] + 1
+            if days_into_season < 1:
+                days_into_season += 365
+            time_for_efc = max(cp[P_TIME_EFC], 1.)
+            st[S_N_PL_EC] = float(days_into_season) / time_for_efc
+            npl_ec100 = st[S_N_PL_EC] * 100
+            if st[S_N_PL_EC] < 1:
+                st[S_MAD] = st[S_MAD_INI]
+            else:
+                st[S_MAD] = st[S_MAD_MID]
+            if npl_ec100 <= abs(cp[P_TIME_HARVEST]):
+                int_pl_ec = int(st[S_N_PL_EC] * 10.)
+                if int_pl_ec >= max_line:
+                    # Python version indexes curve with a float here
+                    return STATUS_UNSUPPORTED, events
+                st[S_KC_BAS] = curve_kc_bas(
+                    curves, curve_number, st[S_N_PL_EC] * 10., int_pl_ec)
+            else:
+                if cp[P_TIME_HARVEST] < -0.5:
+                    st[S_KC_BAS] = st[S_KC_BAS_PREV]
+                else:
+                    st[S_IN_SEASON] = 0.0
+                    st[S_STRESS_EVENT] = 0.0
+        elif curve_type == 3:
+            if not curve_valid[curve_number]:
+                return STATUS_UNSUPPORTED, events
+            days_into_season = doy - st[S_DOY_START_CYCLE] + 1
+            if days_into_season < 1:
+                days_into_season += 365
+            time_for_efc = max(cp[P_TIME_EFC], 1.)
+            st[S_N_PL_EC] = float(days_into_season) / time_for_efc
+            if st[S_N_PL_EC] < 1:
+                int_pl_ec = min(int(st[S_N_PL_EC] * 10.), max_line)
+                st[S_KC_BAS] = curve_kc_bas(
+                    curves, curve_number, st[S_N_PL_EC] * 10, int_pl_ec)
+                st[S_MAD] = st[S_MAD_INI]
+            else:
+                st[S_MAD] = st[S_MAD_MID]
+                days_after_efc = days_into_season - time_for_efc
+                if days_after_efc <= abs(cp[P_TIME_HARVEST]):
+                    n_days_after_efc = float(days_after_efc) / 10 + 11
+                    int_pl_ec = min(int(n_days_after_efc), max_line)
+                    st[S_KC_BAS] = curve_kc_bas(
+                        curves, curve_number, n_days_after_efc, int_pl_ec)
+                elif cp[P_TIME_HARVEST] < -0.5:
+                    st[S_KC_BAS] = st[S_KC_BAS_PREV]
+                else:
+                    st[S_IN_SEASON] = 0.0
+                    st[S_STRESS_EVENT] = 0.0
+        elif curve_type == 4:
+            if not curve_valid[curve_number]:
+                return STATUS_UNSUPPORTED, events
+            if st[S_DOY_START_CYCLE] < (trigger_doy + 195):
+                length_of_season = 2 * (
+                    trigger_doy + 195 - st[S_DOY_START_CYCLE])
+            else:
+                # Python version logs error and exits
+                return STATUS_UNSUPPORTED, events
+            if length_of_season > 366:
+                events |= EVENT_ADJUST_SEASON
+                length_of_season = 366.0
+            if class_number == 47:
+                length_of_season = max(length_of_season, 60.0)
+                if length_of_season > 90:
+                    length_of_season = 100.0
+            days_into_season = doy - st[S_DOY_START_CYCLE]
+            if days_into_season < 0:
+                days_into_season += 365
+            st[S_N_PL_EC] = float(days_into_season) / length_of_season
+            if st[S_N_PL_EC] < 0.5:
+                st[S_MAD] = st[S_MAD_INI]
+            else:
+                st[S_MAD] = st[S_MAD_MID]
+            if st[S_N_PL_EC] <= 1:
+                int_pl_ec = min(max_line, int(st[S_N_PL_EC] * 10))
+                st[S_KC_BAS] = curve_kc_bas(
+                    curves, curve_number, st[S_N_PL_EC] * 10, int_pl_ec)
+            else:
+                st[S_IN_SEASON] = 0.0
+                st[S_STRESS_EVENT] = 0.0
+
+        # Frost damage discount for alfalfa
+        if class_number < 4 or alfalfa_1st:
+            if doy > (trigger_doy + 211):
+                if tmin < -3:
+                    if math.isnan(st[S_T2DAYS]):
+                        return STATUS_UNSUPPORTED, events
+                    if st[S_T2DAYS] < 1:
+                        st[S_T2DAYS] = 1.0
+            else:
+                st[S_T2DAYS] = 0.0
+            if math.isnan(st[S_T2DAYS]):
+                return STATUS_UNSUPPORTED, events
+            if st[S_T2DAYS] > 0:
+                st[S_KC_BAS] -= st[S_T2DAYS] * 0.005
+                if st[S_KC_BAS] < 0.1:
+                    st[S_KC_BAS] = 0.1
+                st[S_T2DAYS] += 1
+
+        # Killing frost to end season
+        if doy > (trigger_doy + 211):
+            if ((tmin < cp[P_KILLING_FROST]) and
+                    (class_number < 44 or class_number > 46) and
+                    st[S_IN_SEASON] != 0):
+                events |= EVENT_KILLING_FROST
+                st[S_IN_SEASON] = 0.0
+                st[S_STRESS_EVENT] = 0.0
+            elif ((class_number == 2 or class_number == 3 or alfalfa_1st) and
+                  st[S_IN_SEASON] != 0 and month == 12 and day == 31):
+                events |= EVENT_NO_KILLING_FROST
+
+    st[S_KC_BAS_PREV] = st[S_KC_BAS]
+    if class_number == 44 or class_number == 45 or class_number == 46:
+        st[S_KC_BAS] = 0.1
+        st[S_KC_BAS_PREV] = st[S_KC_BAS]
+    elif class_number == 55 or class_number == 56 or class_number == 57:
+        if class_number == 55:
+            if cp[P_REFET_TYPE] == REFET_ETO:
+                st[S_KC_BAS] = 1.05
+            elif cp[P_REFET_TYPE] == REFET_ETR:
+                st[S_KC_BAS] = 0.875
+        elif class_number == 56:
+            # Open water evaporation is computed by python day loop
+            return STATUS_UNSUPPORTED, events
+        elif class_number == 57:
+            if cp[P_REFET_TYPE] == REFET_ETO:
+                st[S_KC_BAS] = 0.85
+            elif cp[P_REFET_TYPE] == REFET_ETR:
+                st[S_KC_BAS] = 0.7
+        st[S_KC_ACT] = st[S_KC_BAS]
+        st[S_KC_POT] = st[S_KC_BAS]
+        st[S_ETC_ACT] = st[S_KC_ACT] * etref
+        st[S_ETC_POT] = st[S_KC_POT] * etref
+        st[S_ETC_BAS] = st[S_KC_BAS] * etref
+        st[S_KC_BAS_PREV] = st[S_KC_BAS]
+    elif cp[P_CO2_FLAG] != 0:
+        st[S_KC_BAS_PREV] = st[S_KC_BAS]
+        st[S_KC_BAS] *= co2
+
+    st[S_HEIGHT] = max(st[S_HEIGHT], 0.05)
+    if cp[P_REFET_TYPE] == REFET_ETO:
+        st[S_KC_BAS] = (
+            st[S_KC_BAS] +
+            (0.04 * (u2 - 2) - 0.004 * (rh_min - 45)) *
+            (st[S_HEIGHT] / 3) ** 0.3)
+    return STATUS_OK, events
+
+
+@util.jit
+def runoff(st, precip):
+    """Curve number method for computing runoff
+
+    See runoff.runoff()
+
+    """
+    cn_ii = min(max(st[S_CN2], 10.0), 100.0)
+    cn_i = cn_ii / (2.281 - 0.01281 * cn_ii)
+    cn_iii = cn_ii / (0.427 + 0.00573 * cn_ii)
+    awc_iii = 0.5 * st[S_REW]
+    awc_i = 0.7 * st[S_REW] + 0.3 * st[S_TEW]
+    if awc_i <= awc_iii:
+        awc_i = awc_iii + 0.01
+    depl_surface = st[S_DEPL_SURFACE]
+    if depl_surface < awc_iii:
+        cn = cn_iii
+    else:
+        if depl_surface > awc_i:
+            cn = cn_i
+        else:
+            cn = (
+                ((depl_surface - awc_iii) * cn_i +
+                 (awc_i - depl_surface) * cn_iii) / (awc_i - awc_iii))
+    st[S_S] = 250 * (100 / cn - 1)
+    if st[S_IRR_FLAG] != 0:
+        ppt_net4 = max(precip - 0.2 * st[S_S4], 0.0)
+        ppt_net3 = max(precip - 0.2 * st[S_S3], 0.0)
+        ppt_net2 = max(precip - 0.2 * st[S_S2], 0.0)
+        ppt_net1 = max(precip - 0.2 * st[S_S1], 0.0)
+        st[S_SRO] = 0.25 * (
+            ppt_net4 ** 2 / (precip + 0.8 * st[S_S4]) +
+            ppt_net3 ** 2 / (precip + 0.8 * st[S_S3]) +
+            ppt_net2 ** 2 / (precip + 0.8 * st[S_S2]) +
+            ppt_net1 ** 2 / (precip + 0.8 * st[S_S1]))
+        st[S_S4] = st[S_S3]
+        st[S_S3] = st[S_S2]
+        st[S_S2] = st[S_S1]
+        st[S_S1] = st[S_S]
+    else:
+        ppt_net = max(precip - 0.2 * st[S_S], 0.0)
+        st[S_SRO] = ppt_net * ppt_net / (precip + 0.8 * st[S_S])
+
+
+@util.jit
+def grow_root(st, cp):
+    """Determine depth of root zone
+
+    See grow_root.grow_root()
+
+    """
+    fractime = 0.0
+    if cp[P_CURVE_TYPE] == 1 and cp[P_END_ROOT_FRAC] != 0.0:
+        fractime = st[S_N_CGDD] / cp[P_END_ROOT_FRAC]
+    elif cp[P_CURVE_TYPE] > 1 and cp[P_END_ROOT_FRAC] != 0.0:
+        fractime = st[S_N_PL_EC] / cp[P_END_ROOT_FRAC]
+    fractime = min(max(fractime, 0.0), 1.0)
+    zr_prev = st[S_ZR]
+    st[S_ZR] = (
+        (0.5 + 0.5 * math.sin(3.03 * fractime - 1.47)) *
+        (st[S_ZR_MAX] - st[S_ZR_MIN]) + st[S_ZR_MIN])
+    delta_zr = st[S_ZR] - zr_prev
+    if delta_zr > 0:
+        st[S_DEPL_ROOT] += delta_zr * (st[S_AW] - st[S_AW3])
+    st[S_ZR] = max(st[S_ZR], zr_prev)
+
+
+@util.jit
+def compute_crop_et(st, cp, doy, month, precip, u2, rh_min, etref,
+                    snow_depth):
+    """Crop ET and soil water balance
+
+    See compute_crop_et.compute_crop_et()
+
+    Returns
+    -------
+    status : int
+
+    events : int
+        EVENT flags for day
+
+    """
+    events = 0
+    class_number = cp[P_CLASS_NUMBER]
+    if class_number == 55 or class_number == 56 or class_number == 57:
+        return STATUS_OK, events
+    eto_flag = cp[P_REFET_TYPE] == REFET_ETO
+    bare_mulch_sod = (
+        class_number == 44 or class_number == 45 or class_number == 46)
+
+    st[S_HEIGHT] = max(0.05, st[S_HEIGHT])
+    if eto_flag:
+        kc_max = ((0.04 * (u2 - 2) - 0.004 * (rh_min - 45)) *
+                  (st[S_HEIGHT] / 3) ** 0.3)
+        if cp[P_KC_MAX] > 0.3:
+            kc_max += cp[P_KC_MAX]
+        else:
+            kc_max += 1.2
+    else:
+        if cp[P_KC_MAX] > 0.3:
+            kc_max = cp[P_KC_MAX]
+        else:
+            kc_max = 1.0
+
+    if class_number == 44:
+        st[S_FC] = 0.0
+    elif class_number == 45:
+        st[S_FC] = 0.4
+    elif class_number == 46:
+        st[S_FC] = 0.7
+
+    # Winter time (Nov-Mar) in northern hemisphere (see util.is_winter)
+    wscc = cp[P_WSCC]
+    if cp[P_LATITUDE] > 0 and (month < 4 or month > 10):
+        if not bare_mulch_sod:
+            if wscc == 1:
+                kc_max = 1.1 if eto_flag else 0.9
+            elif wscc == 2:
+                kc_max = 1.0 if eto_flag else 0.85
+            elif wscc == 3:
+                kc_max = 0.95 if eto_flag else 0.8
+        elif class_number == 44:
+            kc_max = 1.1 if eto_flag else 0.9
+            st[S_FC] = 0.0
+        elif class_number == 45:
+            kc_max = 1.0 if eto_flag else 0.85
+            st[S_FC] = 0.4
+        elif class_number == 46:
+            kc_max = 0.95 if eto_flag else 0.8
+            st[S_FC] = 0.7
+
+    if st[S_IN_SEASON] == 0:
+        if wscc != 1 and wscc != 2 and wscc != 3:
+            return STATUS_UNSUPPORTED, events
+        if class_number == 87:
+            st[S_KC_BAS] = 0.25
+        else:
+            # InitializeCropCycle.kc_bas_wscc is 0.1 for all cover classes
+            st[S_KC_BAS] = 0.1
+    kc_max = max(kc_max, st[S_KC_BAS] + 0.05)
+    st[S_KC_MIN] = 0.1
+    if not bare_mulch_sod:
+        if kc_max <= st[S_KC_MIN]:
+            kc_max = st[S_KC_MIN] + 0.001
+        if st[S_IN_SEASON] != 0:
+            if st[S_KC_BAS] > st[S_KC_MIN]:
+                st[S_FC] = (
+                    (st[S_KC_BAS] - st[S_KC_MIN]) /
+                    (kc_max - st[S_KC_MIN])) ** (1 + 0.5 * st[S_HEIGHT])
+                st[S_FC] = min(st[S_FC], 0.99)
+            else:
+                st[S_FC] = 0.001
+
+    # Effective precipitation and runoff
+    st[S_PPT_INF_PREV] = st[S_PPT_INF]
+    st[S_PPT_INF] = 0.0
+    st[S_SRO] = 0.0
+    if precip > 0:
+        st[S_DEPL_SURFACE] = (
+            st[S_WT_IRR] * st[S_DEPL_ZE] +
+            (1 - st[S_WT_IRR]) * st[S_DEPL_ZEP])
+        runoff(st, precip)
+        st[S_PPT_INF] = precip - st[S_SRO]
+
+    # Irrigations other than automatic are not currently read in
+    irr_real = 0.0
+    irr_manual = 0.0
+    irr_special = 0.0
+    if (irr_real + st[S_IRR_AUTO]) > 0:
+        st[S_FW_IRR] = st[S_FW_STD]
+    elif (irr_manual + irr_special) > 0:
+        st[S_FW_IRR] = st[S_FW_SPEC]
+
+    # Evaporation layer water balance
+    tew = st[S_TEW]
+    watin_ze = tew - st[S_DEPL_ZE]
+    if round(watin_ze, 6) <= 0.:
+        watin_ze = 0.001
+    watin_ze = min(watin_ze, tew)
+    watin_zep = tew - st[S_DEPL_ZEP]
+    if round(watin_zep, 6) <= 0.:
+        watin_zep = 0.001
+    watin_zep = min(watin_zep, tew)
+    few = 1 - st[S_FC]
+    few = min(max(few, 0.001), st[S_FW_IRR])
+    fewp = 1 - st[S_FC] - few
+    fewp = max(fewp, 0.001)
+    st[S_TOTWATIN_ZE] = (watin_ze * few + watin_zep * fewp) / (few + fewp)
+
+    if st[S_FW_IRR] > 0.0001:
+        dperc_ze = (
+            st[S_PPT_INF] + st[S_IRR_SIM] / st[S_FW_IRR] - st[S_DEPL_ZE])
+    else:
+        dperc_ze = st[S_PPT_INF] + st[S_IRR_SIM] / 1 - st[S_DEPL_ZE]
+    dperc_ze = max(dperc_ze, 0.0)
+    depl_zep_prev = st[S_PPT_INF] - st[S_DEPL_ZEP]
+    depl_zep_prev = max(depl_zep_prev, 0.0)
+    if st[S_FW_IRR] > 0.0001:
+        st[S_DEPL_ZE] = (
+            st[S_DEPL_ZE] - st[S_PPT_INF] -
+            st[S_IRR_SIM] / st[S_FW_IRR] + dperc_ze)
+    else:
+        st[S_DEPL_ZE] = (
+            st[S_DEPL_ZE] - st[S_PPT_INF] - st[S_IRR_SIM] / 1 + dperc_ze)
+    st[S_DEPL_ZE] = min(max(st[S_DEPL_ZE], 0.0), tew)
+    st[S_DEPL_ZEP] = st[S_DEPL_ZEP] - st[S_PPT_INF] + depl_zep_prev
+    st[S_DEPL_ZEP] = min(max(st[S_DEPL_ZEP], 0.0), tew)
+
+    if st[S_TEW3] < 0.1:
+        st[S_KR2] = 0.0
+    tew2use = st[S_TEW2]
+    tew3use = st[S_TEW3]
+    rew2use = st[S_REW]
+    st[S_ETREF_30] = max(0.1, st[S_ETREF_30])
+    if eto_flag:
+        etr_threshold = 5.0
+    else:
+        etr_threshold = 4.0
+    if st[S_ETREF_30] < etr_threshold:
+        tew2use = st[S_TEW2] * math.sqrt(st[S_ETREF_30] / etr_threshold)
+        tew3use = st[S_TEW3] * math.sqrt(st[S_ETREF_30] / etr_threshold)
+        if rew2use > 0.8 * tew2use:
+            rew2use = 0.8 * tew2use
+
+    kr2 = st[S_KR2]
+    if st[S_DEPL_ZE] <= rew2use:
+        kr = 1.0
+    else:
+        if st[S_DEPL_ZE] <= tew2use:
+            kr = kr2 + (1 - kr2) * (tew2use - st[S_DEPL_ZE]) / (tew2use - rew2use)
+        else:
+            if tew3use > tew2use:
+                kr = kr2 * (tew3use - st[S_DEPL_ZE]) / (tew3use - tew2use)
+            else:
+                kr = 0.0
+    if st[S_DEPL_ZEP] <= rew2use:
+        krp = 1.0
+    else:
+        if st[S_DEPL_ZEP] <= tew2use:
+            krp = kr2 + (1 - kr2) * (tew2use - st[S_DEPL_ZEP]) / (tew2use - rew2use)
+        else:
+            if tew3use > tew2use:
+                krp = kr2 * (tew3use - st[S_DEPL_ZEP]) / (tew3use - tew2use)
+            else:
+                krp = 0.0
+
+    if (few * watin_ze + fewp * watin_zep) > 0.0001:
+        st[S_WT_IRR] = few * watin_ze / (few * watin_ze + fewp * watin_zep)
+    else:
+        st[S_WT_IRR] = few * watin_ze
+    st[S_WT_IRR] = min(max(st[S_WT_IRR], 0.0), 1.0)
+
+    kc_bas = st[S_KC_BAS]
+    ke_irr = kr * (kc_max - kc_bas) * st[S_WT_IRR]
+    ke_ppt = krp * (kc_max - kc_bas) * (1 - st[S_WT_IRR])
+    ke_irr = min(max(ke_irr, 0.0), few * kc_max)
+    ke_ppt = min(max(ke_ppt, 0.0), fewp * kc_max)
+    ke = ke_irr + ke_ppt
+
+    # Transpiration water stress
+    taw = st[S_AW] * st[S_ZR]
+    taw = max(taw, 0.001)
+    raw = st[S_MAD] * taw / 100
+    if st[S_DEPL_ROOT] > raw:
+        ks = max((taw - st[S_DEPL_ROOT]) / (taw - raw), 0.0)
+    else:
+        ks = 1.0
+    if cp[P_INVOKE_STRESS] < 1:
+        ks = 1.0
+    elif cp[P_INVOKE_STRESS] == 1:
+        if ks < 0.05 and st[S_IN_SEASON] != 0 and kc_bas > 0.3:
+            st[S_STRESS_EVENT] = 1.0
+        if st[S_STRESS_EVENT] != 0:
+            ks = 0.0
+
+    # Snow cover reduction
+    kc_mult = 1.0
+    if snow_depth > 0.01:
+        k_rad = (
+            0.000000022 * doy ** 3 - 0.0000242 * doy ** 2 +
+            0.006 * doy + 0.011)
+        albedo_snow = 0.8
+        albedo_soil = 0.25
+        kc_mult = 1 - k_rad + (1 - albedo_snow) / (1 - albedo_soil) * k_rad
+        kc_mult = kc_mult * 0.7
+    ke *= kc_mult
+    ke_irr *= kc_mult
+    ke_ppt *= kc_mult
+
+    st[S_KC_ACT] = kc_mult * ks * kc_bas + ke
+    st[S_KC_POT] = kc_bas + ke
+    st[S_ETC_ACT] = st[S_KC_ACT] * etref
+    st[S_ETC_POT] = st[S_KC_POT] * etref
+    st[S_ETC_BAS] = kc_bas * etref
+
+    e_irr = ke_irr * etref
+    e_ppt = ke_ppt * etref
+
+    # Transpiration from evaporation layer
+    ze = 0.0001
+    if st[S_ZR] < 0.0001:
+        st[S_ZR] = 0.01
+    kt_prop = (ze / st[S_ZR]) ** 0.6
+    kt_prop = min(kt_prop, 1.0)
+    kt_reducer_denom = max(1 - st[S_DEPL_ROOT] / taw, 0.001)
+    kt_reducer = few * (1 - st[S_DEPL_ZE] / tew2use) / kt_reducer_denom
+    kt_prop = kt_prop * kt_reducer
+    kt_prop = min(kt_prop, 1.0)
+    te_irr = kc_mult * ks * kc_bas * etref * kt_prop
+    kt_reducer = fewp * (1 - st[S_DEPL_ZEP] / tew2use) / kt_reducer_denom
+    kt_prop = kt_prop * kt_reducer
+    kt_prop = min(kt_prop, 1.0)
+    te_ppt = kc_mult * ks * kc_bas * etref * kt_prop
+
+    depl_ze_prev = st[S_DEPL_ZE]
+    depl_zep_prev = st[S_DEPL_ZEP]
+    st[S_DEPL_ZE] = depl_ze_prev + e_irr / few + te_irr
+    if st[S_DEPL_ZE] < 0:
+        st[S_DEPL_ZE] = 0.0
+    if st[S_DEPL_ZE] > tew:
+        potential_e = st[S_DEPL_ZE] - depl_ze_prev
+        if potential_e < 0.0001:
+            potential_e = 0.0001
+        e_factor = 1 - (st[S_DEPL_ZE] - tew) / potential_e
+        e_factor = min(max(e_factor, 0.0), 1.0)
+        e_irr *= e_factor
+        te_irr *= e_factor
+        st[S_DEPL_ZE] = depl_ze_prev + e_irr / few + te_irr
+        if st[S_DEPL_ZE] > tew + 0.2:
+            # Python version fails formatting its warning here
+            return STATUS_UNSUPPORTED, events
+    st[S_DEPL_ZEP] = depl_zep_prev + e_ppt / fewp + te_ppt
+    st[S_DEPL_ZEP] = max(st[S_DEPL_ZEP], 0.0)
+    if st[S_DEPL_ZEP] > tew:
+        potential_e = st[S_DEPL_ZEP] - depl_zep_prev
+        if potential_e < 0.0001:
+            potential_e = 0.0001
+        e_factor = 1 - (st[S_DEPL_ZEP] - tew) / potential_e
+        e_factor = min(max(e_factor, 0.0), 1.0)
+        e_ppt *= e_factor
+        te_ppt *= e_factor
+        st[S_DEPL_ZEP] = depl_zep_prev + e_ppt / fewp + te_ppt
+        if st[S_DEPL_ZEP] > tew + 0.2:
+            return STATUS_UNSUPPORTED, events
+
+    etref_divisor = etref
+    if etref_divisor < 0.01:
+        etref_divisor = 0.01
+    ke_irr = e_irr / etref_divisor
+    ke_ppt = e_ppt / etref_divisor
+    ke_irr = min(max(ke_irr, 0.0), 1.5)
+    ke_ppt = min(max(ke_ppt, 0.0), 1.5)
+    ke = ke_irr + ke_ppt
+    if kc_mult > 1:
+        events |= EVENT_KC_MULT
+        return STATUS_OK, events
+    if ks > 1:
+        events |= EVENT_KS
+        return STATUS_OK, events
+    st[S_KC_ACT] = kc_mult * ks * kc_bas + ke
+    st[S_KC_POT] = kc_bas + ke
+    st[S_ETC_ACT] = st[S_KC_ACT] * etref
+    st[S_ETC_POT] = st[S_KC_POT] * etref
+    st[S_ETC_BAS] = kc_bas * etref
+    st[S_CUM_EVAP_PREV] = (
+        st[S_CUM_EVAP_PREV] + e_irr - (st[S_PPT_INF] - depl_zep_prev))
+    st[S_CUM_EVAP_PREV] = max(st[S_CUM_EVAP_PREV], 0.0)
+
+    # Root zone water balance and irrigation
+    st[S_DEPL_ROOT] += (
+        st[S_ETC_ACT] - st[S_PPT_INF] - irr_real - irr_manual - irr_special)
+    irr_sim_prev = st[S_IRR_SIM]
+    st[S_IRR_SIM] = 0.0
+    if st[S_IRR_FLAG] != 0:
+        doy_to_start_irr = st[S_DOY_START_CYCLE] + cp[P_DAYS_AFTER_PL_IRR]
+        if doy_to_start_irr > 365:
+            doy_to_start_irr -= 365
+        crop_doy = doy - st[S_DOY_START_CYCLE] + 1
+        if crop_doy < 1:
+            crop_doy += 365
+        if (crop_doy >= cp[P_DAYS_AFTER_PL_IRR] and
+                doy >= doy_to_start_irr and st[S_IN_SEASON] != 0 and
+                st[S_DEPL_ROOT] > raw and kc_bas > 0.22):
+            st[S_IRR_SIM] = st[S_DEPL_ROOT]
+            st[S_IRR_SIM] = max(st[S_IRR_SIM], st[S_IRR_MIN])
+    st[S_DEPL_ROOT] -= st[S_IRR_SIM]
+    st[S_IRR_AUTO] = st[S_IRR_SIM]
+    st[S_IRR_SIM] += irr_real + irr_manual + irr_special
+    if st[S_IRR_SIM] > 0:
+        st[S_CUM_EVAP] = st[S_CUM_EVAP_PREV]
+        st[S_CUM_EVAP_PREV] = 0.0
+
+    # Deep percolation
+    if ((st[S_IRR_SIM] + irr_sim_prev + st[S_PPT_INF] +
+            st[S_PPT_INF_PREV]) <= 0.0001 or st[S_ZR] < 0.2):
+        if st[S_DEPL_ROOT] < 0.0:
+            st[S_DPERC] = -st[S_DEPL_ROOT]
+        else:
+            st[S_DPERC] = 0.0
+    else:
+        if st[S_DEPL_ROOT] < -20:
+            st[S_DPERC] = -20.0 - st[S_DEPL_ROOT]
+        else:
+            st[S_DPERC] = 0.0
+    st[S_DEPL_ROOT] += st[S_DPERC]
+    if cp[P_INVOKE_STRESS] > 0.5 and st[S_DEPL_ROOT] > taw:
+        st[S_ETC_ACT] -= (st[S_DEPL_ROOT] - taw)
+        st[S_ETC_ACT] = max(st[S_ETC_ACT], 0.0)
+        if etref > 0.1:
+            st[S_KC_ACT] = st[S_ETC_ACT] / etref
+        st[S_DEPL_ROOT] = taw
+
+    # Layer 3 (between current and maximum root depth)
+    gross_dperc = st[S_DPERC] + 0.1 * st[S_IRR_SIM]
+    daw3 = st[S_AW3] * (st[S_ZR_MAX] - st[S_ZR])
+    taw3 = st[S_AW] * (st[S_ZR_MAX] - st[S_ZR])
+    daw3 = max(daw3, 0.0)
+    taw3 = max(taw3, 0.0)
+    daw3 += gross_dperc
+    if daw3 > taw3:
+        st[S_DPERC] = daw3 - taw3
+        daw3 = taw3
+    else:
+        st[S_DPERC] = 0.0
+    daw3 = max(daw3, 0.0)
+    if st[S_ZR_MAX] > st[S_ZR]:
+        st[S_AW3] = daw3 / (st[S_ZR_MAX] - st[S_ZR])
+    else:
+        st[S_AW3] = 0.0
+
+    # Net irrigation water requirement and effective precipitation
+    if st[S_IRR_SIM] > 0:
+        st[S_NIWR] = st[S_ETC_ACT] - (precip - st[S_SRO])
+        st[S_P_RZ] = precip - st[S_SRO]
+        st[S_P_EFT] = precip - st[S_SRO] - e_ppt
+    else:
+        st[S_NIWR] = st[S_ETC_ACT] - (precip - st[S_SRO] - st[S_DPERC])
+        st[S_P_RZ] = precip - st[S_SRO] - st[S_DPERC]
+        st[S_P_EFT] = precip - st[S_SRO] - st[S_DPERC] - e_ppt
+    if st[S_P_RZ] <= 0:
+        st[S_P_RZ] = 0.0
+    if st[S_P_EFT] <= 0:
+        st[S_P_EFT] = 0.0
+
+    if st[S_IN_SEASON] != 0:
+        grow_root(st, cp)
+    return STATUS_OK, events
+
+
+@util.jit
+def crop_day_kernel(st, cp, curves, curve_valid, lentries, etref_array,
+                    day_state, doy, year, month, day, pl_gu_doy, u2, precip,
+                    rh_min, etref, snow_depth, tmean, tmin, tmax, t30, co2,
+                    out, season, cutting, events):
+    """Run all daily timesteps for single cell and crop
+
+    Parameters
+    ---------
+    st : ndarray
+        crop cycle state (see STATE_FIELDS), updated in place
+    cp : ndarray
+        crop parameters and options (see build_crop_param_array)
+    curves, curve_valid, lentries : ndarray
+        crop curves (see build_curve_arrays)
+    etref_array : ndarray
+        DayData 30 day ETref array, updated in place
+    day_state : ndarray
+        DayData sdays and doy_prev, updated in place
+    doy, year, month, day, pl_gu_doy : ndarray
+        integer daily time series
+    u2, precip, rh_min, etref, snow_depth, tmean, tmin, tmax, t30, co2 : ndarray
+        daily climate time series
+    out : ndarray
+        daily output values [day, OUT_FIELDS]
+    season, cutting, events : ndarray
+        integer daily outputs
+
+    Returns
+    -------
+    status : int
+        STATUS_OK or STATUS_UNSUPPORTED
+    i : int
+        index of last day processed
+
+    """
+    n_days = len(doy)
+    for i in range(n_days):
+        if st[S_IN_SEASON] == 0 and st[S_DORMANT_SETUP_FLAG] != 0:
+            if setup_dormant(st, cp) != STATUS_OK:
+                return STATUS_UNSUPPORTED, i
+        day_state[0] += 1
+        compute_crop_gdd(
+            st, cp, etref_array, day_state, doy[i], etref[i], tmean[i],
+            tmin[i], tmax[i], snow_depth[i])
+        calculate_height(st, cp)
+        status, day_events = kcb_daily(
+            st, cp, curves, curve_valid, lentries, day_state[0], doy[i],
+            year[i], month[i], day[i], pl_gu_doy[i], tmin[i], t30[i], u2[i],
+            rh_min[i], etref[i], co2[i])
+        if status != STATUS_OK:
+            return status, i
+        events[i] = day_events
+        status, day_events = compute_crop_et(
+            st, cp, doy[i], month[i], precip[i], u2[i], rh_min[i], etref[i],
+            snow_depth[i])
+        if status != STATUS_OK:
+            return status, i
+        events[i] |= day_events
+
+        out[i, 0] = st[S_ETC_ACT]
+        out[i, 1] = st[S_ETC_POT]
+        out[i, 2] = st[S_ETC_BAS]
+        out[i, 3] = st[S_KC_ACT]
+        out[i, 4] = st[S_KC_BAS]
+        out[i, 5] = st[S_IRR_SIM]
+        out[i, 6] = st[S_SRO]
+        out[i, 7] = st[S_DPERC]
+        out[i, 8] = st[S_NIWR] + 0
+        out[i, 9] = st[S_P_RZ]
+        out[i, 10] = st[S_P_EFT]
+        season[i] = int(st[S_IN_SEASON])
+        cutting[i] = int(st[S_CUTTING])
+    return STATUS_OK, n_days - 1
@@ -11,8 +11,13 @@ import os
 import pandas as pd
 import sys
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                             '../../lib')))
 import crop_coefficients
+import crop_day_kernel
 import crop_parameters
+import station_cache
+import typed_ts
 import util
 
 
@@ -456,10 +461,57 @@ class CropETData:
                 logging.debug('    gs_output_folder = growing_season_stats')
                 self.gs_output_ws = 'growing_season_stats'
 
+        # Single results cube (cell x crop x day x variable) for the run
+        try:
+            self.cet_out['cube_ws'] = config.get(
+                crop_et_sec, 'results_cube_folder')
+            if self.cet_out['cube_ws'] in ['', 'None']:
+                self.cet_out['cube_ws'] = None
+        except:
+            self.cet_out['cube_ws'] = None
+        if self.cet_out['cube_ws'] is not None:
+            self.cet_out['cube_ws'] = os.path.join(
+                self.project_ws, self.cet_out['cube_ws'])
+            if not os.path.isdir(self.cet_out['cube_ws']):
+                os.makedirs(self.cet_out['cube_ws'])
+
         # cet file type specifications
-        self.cet_out['file_type'] = 'csv'
+        # csv [default], parquet or hdf5 (typed columnar files)
+        try:
+            self.cet_out['file_type'] = config.get(
+                crop_et_sec, 'output_file_type').lower()
+            if self.cet_out['file_type'] in ['', 'none']:
+                self.cet_out['file_type'] = 'csv'
+        except:
+            self.cet_out['file_type'] = 'csv'
+        if self.cet_out['file_type'] == 'h5':
+            self.cet_out['file_type'] = 'hdf5'
+        if self.cet_out['file_type'] not in ['csv', 'parquet', 'hdf5']:
+            logging.error(
+                '\nERROR: Unsupported output_file_type {}'.format(
+                    self.cet_out['file_type']))
+            sys.exit()
+        if (self.cet_out['file_type'] != 'csv' and
+                not typed_ts.file_type_available(self.cet_out['file_type'])):
+            logging.warning(
+                '  {} output requires {}, setting output_file_type = '
+                'csv'.format(
+                    self.cet_out['file_type'], ' or '.join(
+                        typed_ts.FILE_MODULES[self.cet_out['file_type']])))
+            self.cet_out['file_type'] = 'csv'
+        try:
+            self.cet_out['compression'] = config.get(
+                crop_et_sec, 'output_compression')
+            if self.cet_out['compression'] in ['', 'None']:
+                self.cet_out['compression'] = None
+        except:
+            self.cet_out['compression'] = None
         # self.cet_out['data_structure_type'] = "DRI"
-        self.cet_out['name_format'] = '%s_crop_%c.csv'
+        if self.cet_out['file_type'] == 'csv':
+            self.cet_out['name_format'] = '%s_crop_%c.csv'
+        else:
+            self.cet_out['name_format'] = '%s_crop_%c' + \
+                typed_ts.FILE_EXTENSIONS[self.cet_out['file_type']]
         self.cet_out['header_lines'] = 1
         self.cet_out['names_line'] = 1
         self.cet_out['delimiter'] = ','
@@ -513,6 +565,133 @@ class CropETData:
         except:
             self.gs_limit_flag = True
 
+        # Day loop engine
+        # True : climate pulled once into arrays, outputs preallocated
+        # False : original label based (DataFrame.at) day loop
+        try:
+            self.array_loop_flag = config.getboolean(crop_et_sec,
+                                                     'array_loop_flag')
+        except:
+            self.array_loop_flag = True
+
+        # Compiled day loop kernel (requires numba)
+        try:
+            self.jit_flag = config.getboolean(crop_et_sec, 'jit_flag')
+        except:
+            self.jit_flag = False
+        if self.jit_flag and util.numba is None:
+            logging.warning(
+                '  numba is not installed, setting jit_flag = False')
+            self.jit_flag = False
+
+        # Number of cells simulated together for each crop
+        # 1 : cells are run one at a time
+        try:
+            self.cell_batch_size = config.getint(crop_et_sec, 'cell_batch_size')
+        except:
+            self.cell_batch_size = 1
+        if self.cell_batch_size < 1:
+            self.cell_batch_size = 1
+
+        # Finished crops waiting for the background output writer
+        # 0 : output files are written before the next crop is run
+        try:
+            self.output_queue_size = config.getint(
+                crop_et_sec, 'output_queue_size')
+        except:
+            self.output_queue_size = 2
+        if self.output_queue_size < 0:
+            self.output_queue_size = 0
+
+        # Cells and crops with the same simulation inputs are run once
+        #   and the results written for each cell (see sim_memo.py)
+        try:
+            self.memoize_flag = config.getboolean(crop_et_sec, 'memoize_flag')
+        except:
+            self.memoize_flag = True
+
+        # Parsed station input frames kept in memory for cells that
+        #   share a station (0 : always read input files)
+        try:
+            self.station_cache_size = config.getint(
+                crop_et_sec, 'station_cache_size')
+        except:
+            self.station_cache_size = 30
+        self.station_cache = station_cache.StationCache(
+            max(self.station_cache_size, 0))
+
+        # Processed climate saved between runs (None : not cached)
+        try:
+            self.climate_cache_ws = config.get(
+                crop_et_sec, 'climate_cache_folder')
+            if self.climate_cache_ws in ['', 'None']:
+                self.climate_cache_ws = None
+        except:
+            self.climate_cache_ws = None
+        if self.climate_cache_ws is not None:
+            self.climate_cache_ws = os.path.join(
+                self.project_ws, self.climate_cache_ws)
+            if not os.path.isdir(self.climate_cache_ws):
+                os.makedirs(self.climate_cache_ws)
+
+        # Cells simulated in windows of whole calendar years so memory
+        #   does not grow with the period (see stream_cycle.py)
+        # 0 : full period at once
+        try:
+            self.stream_years = config.getint(crop_et_sec, 'stream_years')
+        except:
+            self.stream_years = 0
+        if self.stream_years < 0:
+            self.stream_years = 0
+        if self.stream_years and (
+                self.cet_out['file_type'] != 'csv' or
+                self.cet_out['cube_ws'] is not None):
+            logging.warning(
+                '  Streaming requires csv output files and no results cube, '
+                'setting stream_years = 0')
+            self.stream_years = 0
+
+        # Monte Carlo parameter ensemble, percentiles of the realizations
+        #   are written instead of the crop output files
+        #   (see param_ensemble.py)
+        # 0 : no ensemble
+        try:
+            self.mc_realizations = config.getint(
+                crop_et_sec, 'mc_realizations')
+        except:
+            self.mc_realizations = 0
+        if self.mc_realizations < 0:
+            self.mc_realizations = 0
+        try:
+            self.mc_seed = config.getint(crop_et_sec, 'mc_seed')
+        except:
+            self.mc_seed = 0
+        self.mc_cv = {}
+        for group in ['stn_whc', 'mad', 'cn', 'rooting_depth']:
+            try:
+                self.mc_cv[group] = config.getfloat(
+                    crop_et_sec, 'mc_cv_' + group)
+            except:
+                self.mc_cv[group] = 0.
+        try:
+            self.mc_percentiles = [
+                float(pct) for pct in config.get(
+                    crop_et_sec, 'mc_percentiles').split(',')]
+        except:
+            self.mc_percentiles = [10., 50., 90.]
+        try:
+            self.mc_output_ws = os.path.join(
+                self.project_ws, config.get(crop_et_sec, 'mc_output_folder'))
+        except:
+            self.mc_output_ws = os.path.join(self.project_ws, 'monte_carlo')
+        if self.mc_realizations:
+            if not os.path.isdir(self.mc_output_ws):
+                os.makedirs(self.mc_output_ws)
+            if self.stream_years:
+                logging.warning(
+                    '  Monte Carlo runs simulate the full period, '
+                    'setting stream_years = 0')
+                self.stream_years = 0
 
         # Spatially varying calibration
         try: self.spatial_cal_flag = config.getboolean(crop_et_sec,
@@ -1260,6 +1439,10 @@ class CropETData:
         self.crop_coeffs = \
             crop_coefficients.read_crop_coefs_txt(self)
 
+        # Curve arrays of the day loop kernels, shared by all cells and crops
+        self.crop_curves = crop_day_kernel.build_curve_arrays(
+            self.crop_coeffs)
+
     def set_crop_co2(self):
         """Set crop CO2 type using values in INI
 
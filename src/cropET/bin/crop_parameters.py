@@ -1,6 +1,6 @@
 """crop_parameters.py
 Defines CropParameters class
-Defines read_crop_parameters to read crop parameters file
+Defines read_crop_parameters to read crop parameters file, slot_items
 Called by crop_et_data.py
 
 """
@@ -18,9 +18,24 @@ class CropParameters:
 
     Notes
     -----
+    co2_type is set by CropETData.set_crop_co2()
 
     """
 
+    __slots__ = [
+        'cgdd_for_efc', 'cgdd_for_termination', 'class_number',
+        'cn_coarse_soil', 'cn_fine_soil', 'cn_medium_soil', 'co2_type',
+        'crop_fw', 'curve_name', 'curve_number', 'curve_type', 'cutting_crop',
+        'date_of_pl_or_gu', 'day_of_pl_or_gu',
+        'days_after_planting_irrigation', 'end_of_root_growth_fraction_time',
+        'flag_for_means_to_estimate_pl_or_gu', 'gdd_trigger_doy',
+        'height_initial', 'height_max', 'invoke_stress', 'irrigation_flag',
+        'is_annual', 'kc_max', 'killing_frost_temperature', 'mad_initial',
+        'mad_midseason', 'month_of_pl_or_gu', 'name', 'rooting_depth_initial',
+        'rooting_depth_max', 't30_for_pl_or_gu_or_cgdd', 'tbase',
+        'time_for_efc', 'time_for_harvest', 'winter_crop',
+        'winter_surface_cover_class']
+
     def __init__(self, crop_params_data):
 
         # If there is a comma in the string, it will also have quotes
@@ -117,8 +132,8 @@ class CropParameters:
     def __str__(self):
         """ """
         output = '  Crop {} - {}\n'.format(self.class_number, self.name)
-        for key in self.__dict__:
-            output += "    {k} = {v}\n".format(k=key, v=self.__dict__[key])
+        for key, value in slot_items(self):
+            output += "    {k} = {v}\n".format(k=key, v=value)
         return output
         # return '<%s>' % (self.name)
 
@@ -154,6 +169,13 @@ class CropParameters:
         # self.cn_fine_soil_winter   = int(crop_params_path[31])
 
 
+def slot_items(obj):
+    """Return (name, value) of the set slots of obj, like vars(obj).items()"""
+    return [
+        (name, getattr(obj, name)) for name in type(obj).__slots__
+        if hasattr(obj, name)]
+
+
 def read_crop_parameters(fn):
     """Read in the crop parameter text file
 
@@ -0,0 +1,433 @@
+"""crop_scheduler.py
+Defines run_cell_crop_pool, estimate_task_cost, init_pool_worker,
+    load_cell_task, crop_task
+Called by mod_crop_et.py
+
+Cells and crops of all runs (the project run or the scenarios of an
+    ensemble, see ensemble.py) are run on one persistent multiprocessing pool
+Each cell is loaded by a worker (set_input_timeseries) and its time series
+    are published to memory mapped files (see shared_climate.py)
+(cell, crop) tasks are then submitted longest first using a simple cost
+    model and results are collected as they complete
+Cells are loaded ahead only as far as needed to keep the pool busy so
+    loading and crop day loops overlap on mixed runs
+
+"""
+
+import collections
+import heapq
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import tempfile
+import traceback
+
+import crop_cycle
+import crop_tables
+import shared_climate
+
+# Bare soil and open water classes skip most of the crop physics
+SOIL_WATER_COST = 0.5
+
+# Relative cost added by each alfalfa cutting cycle
+CUTTING_COST = 0.1
+
+# Per worker data, cell cache and task functions state
+_worker = {}
+
+# Attached cells kept by each worker
+WORKER_CELL_CACHE = 4
+
+# Seconds between checks for tasks lost with a worker process
+WORKER_POLL_SECONDS = 5
+
+
+def run_cell_crop_pool(runs, cell_list, mp_procs):
+    """Compute crop ET for all cells and crops of all runs on one worker pool
+
+    Parameters
+    ---------
+    runs : list
+        ScenarioRun instances, finished tasks are recorded in the run
+        manifest and crop tasks also write the results of the cells with
+        the same simulation inputs (run memo) if they are set
+    cell_list : list
+        (run index, cell_count, et_cell) for each cell to run
+    mp_procs : int
+        number of cores to use for multiprocessing
+
+    Returns
+    -------
+    failed_tasks : list
+        (scenario name, cell_id, crop_num) of failed tasks, crop_num is
+        None if the cell input time series could not be read
+
+    Notes
+    -----
+    Loading a cell is itself a pool task, at most 2 * mp_procs cells are
+        loaded but not finished at once
+    Task failures are logged with the worker traceback and do not stop
+        the other tasks
+    Tasks of a worker process that exits while running them (killed, out
+        of memory, crashed) are reported as failed, the pool replaces the
+        worker
+    Station input frames are shared between workers through a temporary
+        station cache folder (see station_cache.py), the station cache is
+        shared by the scenario configurations of an ensemble
+
+    """
+
+    max_open_cells = 2 * mp_procs
+    max_queued = 2 * mp_procs
+    results = queue.Queue()
+
+    # Biggest cells (estimated from crop costs) are loaded first
+    # Cells without crops to run are not loaded
+    load_queue = collections.deque(sorted(
+        [x for x in cell_list if _cell_crops(x[2])], key=lambda x: -sum(
+            estimate_task_cost(x[2], crop, 1)
+            for crop in _cell_crops(x[2]))))
+    crop_heap = []
+    open_cells = {}
+    loading = 0
+    running = 0
+    failed_tasks = []
+    task_order = itertools.count()
+
+    station_cache = runs[0].data.station_cache
+    station_ws = None
+    if station_cache.size > 0:
+        station_ws = tempfile.mkdtemp(prefix='cet_station_')
+        station_cache.shared_ws = station_ws
+
+    # Workers report the task they start so tasks of a worker that exits
+    #   can be found (no result or error callback is called for them)
+    started_queue = mp.SimpleQueue()
+    pending = {}
+    started = {}
+    lost_flag = False
+
+    pool = mp.Pool(mp_procs, initializer=init_pool_worker,
+                   initargs=([run.data for run in runs], mp_procs,
+                             started_queue))
+    try:
+        while load_queue or crop_heap or running:
+            # Keep the pool fed, loading cells when crop tasks run short
+            while running < max_queued:
+                load_flag = (
+                    load_queue and
+                    len(open_cells) + loading < max_open_cells and
+                    len(crop_heap) < mp_procs)
+                if load_flag:
+                    run_i, cell_count, et_cell = load_queue.popleft()
+                    cell_key = (run_i, et_cell.cell_id)
+                    pending[('load', cell_key, None)] = pool.apply_async(
+                        load_cell_task, (cell_count, et_cell, run_i),
+                        callback=results.put,
+                        error_callback=_error_callback(
+                            results, 'load', cell_key, None))
+                    loading += 1
+                elif crop_heap:
+                    _, _, cell_key, crop_count, crop_num = heapq.heappop(
+                        crop_heap)
+                    light_cell, spec, _ = open_cells[cell_key]
+                    memo = runs[cell_key[0]].memo
+                    followers = (
+                        [] if memo is None else
+                        memo.followers(light_cell, crop_num))
+                    pending[('crop', cell_key, crop_num)] = pool.apply_async(
+                        crop_task,
+                        (crop_count, crop_num, light_cell, spec, followers,
+                         cell_key[0]),
+                        callback=results.put,
+                        error_callback=_error_callback(
+                            results, 'crop', cell_key, crop_num))
+                else:
+                    break
+                running += 1
+
+            _read_started(started_queue, pending, started)
+            try:
+                task_type, cell_key, crop_num, value, error = results.get(
+                    timeout=WORKER_POLL_SECONDS)
+            except queue.Empty:
+                _read_started(started_queue, pending, started)
+                for task_key in _lost_tasks(pending, started):
+                    results.put(task_key + (None, 'worker process exited'))
+                    lost_flag = True
+                continue
+            task_key = (task_type, cell_key, crop_num)
+            started.pop(task_key, None)
+            if pending.pop(task_key, None) is None:
+                # Result of a task already reported lost
+                continue
+            running -= 1
+            run = runs[cell_key[0]]
+            cell_label = run.cell_label(cell_key[1])
+            if error is not None:
+                if crop_num is None:
+                    logging.error(
+                        '\nERROR: {} input time series failed'
+                        '\n{}'.format(cell_label, error))
+                else:
+                    logging.error(
+                        '\nERROR: {} crop {} failed\n{}'.format(
+                            cell_label, crop_num, error))
+                failed_tasks.append((run.name, cell_key[1], crop_num))
+
+            if task_type == 'load':
+                loading -= 1
+                if error is not None:
+                    continue
+                light_cell, spec, days = value
+                logging.warning(cell_label)
+                crops = _cell_crops(light_cell)
+                if not crops:
+                    shared_climate.release_cell_frames(spec)
+                    continue
+                open_cells[cell_key] = [light_cell, spec, len(crops)]
+                for crop_count, crop in enumerate(crops, 1):
+                    cost = estimate_task_cost(light_cell, crop, days)
+                    heapq.heappush(crop_heap, (
+                        -cost, next(task_order),
+                        cell_key, crop_count, crop.class_number))
+            else:
+                if error is None:
+                    logging.info('  {} crop {} done'.format(
+                        cell_label, crop_num))
+                    if run.manifest is not None:
+                        light_cell = open_cells[cell_key][0]
+                        run.manifest.record(
+                            light_cell, light_cell.crop_params[crop_num])
+                        if run.memo is not None:
+                            for _, follower_cell in run.memo.followers(
+                                    light_cell, crop_num):
+                                run.manifest.record(
+                                    follower_cell,
+                                    follower_cell.crop_params[crop_num])
+                open_cells[cell_key][2] -= 1
+                if open_cells[cell_key][2] == 0:
+                    shared_climate.release_cell_frames(
+                        open_cells.pop(cell_key)[1])
+        # Pool results of lost tasks never arrive, join() would wait for
+        #   them, the pool is terminated instead
+        if not lost_flag:
+            pool.close()
+            pool.join()
+    finally:
+        pool.terminate()
+        for light_cell, spec, _ in open_cells.values():
+            shared_climate.release_cell_frames(spec)
+        if station_ws is not None:
+            station_cache.shared_ws = None
+            shutil.rmtree(station_ws, ignore_errors=True)
+    return failed_tasks
+
+
+def estimate_task_cost(et_cell, crop, days):
+    """Estimate relative run time of one cell and crop
+
+    Parameters
+    ---------
+    et_cell :
+        ETCell instance
+    crop :
+        CropParameters instance
+    days : int
+        number of days in cell time series
+
+    Returns
+    -------
+    : float
+        days x bare soil/open water x cuttings
+
+    """
+
+    if crop.class_number in [55, 56, 57]:
+        type_cost = SOIL_WATER_COST
+    else:
+        type_cost = 1.0
+    if crop.class_number == 2:
+        cuttings = et_cell.dairy_cuttings
+    elif crop.class_number == 3:
+        cuttings = et_cell.beef_cuttings
+    elif crop.cutting_crop:
+        cuttings = max(et_cell.dairy_cuttings, et_cell.beef_cuttings)
+    else:
+        cuttings = 0
+    return days * type_cost * (1 + CUTTING_COST * cuttings)
+
+
+def init_pool_worker(run_data, mp_procs, started_queue=None):
+    """Set configuration data for run_cell_crop_pool workers
+
+    Parameters
+    ---------
+    run_data : list
+        configuration data of each run, crop tables are shared by all runs
+    mp_procs : int
+        number of cores to use for multiprocessing
+    started_queue : multiprocessing.SimpleQueue
+        (task key, worker pid) of each task started is put on the queue,
+        None [default] to not report tasks
+
+    Returns
+    -------
+    None
+
+    """
+
+    _worker['run_data'] = run_data
+    _worker['mp_procs'] = mp_procs
+    _worker['started_queue'] = started_queue
+    # Cell crop tables are pickled without the shared tables
+    crop_tables.share_table('crop_params', run_data[0].crop_params)
+    crop_tables.share_table('crop_coeffs', run_data[0].crop_coeffs)
+    _worker['cells'] = collections.OrderedDict()
+
+
+def load_cell_task(cell_count, et_cell, run_i=0):
+    """Read cell input time series and publish them for crop tasks
+
+    Parameters
+    ---------
+    cell_count : int
+        count of cell being processed
+    et_cell :
+        ETCell instance without input time series
+    run_i : int
+        index of the run configuration data, 0 [default]
+
+    Returns
+    -------
+    : tuple
+        ('load', (run_i, cell_id), None, (light_cell, spec, days), error)
+
+    """
+
+    cell_key = (run_i, et_cell.cell_id)
+    _task_started(('load', cell_key, None))
+    try:
+        if not et_cell.set_input_timeseries(
+                cell_count, _worker['run_data'][run_i], None):
+            return ('load', cell_key, None, None,
+                    'set_input_timeseries() returned False')
+        light_cell, spec = shared_climate.publish_cell_frames(et_cell)
+        days = len(et_cell.climate_df.index)
+    except (Exception, SystemExit):
+        return ('load', cell_key, None, None, traceback.format_exc())
+    return ('load', cell_key, None, (light_cell, spec, days), None)
+
+
+def crop_task(crop_count, crop_num, light_cell, spec, followers=(),
+              run_i=0):
+    """Compute crop ET for one crop of a published cell
+
+    Parameters
+    ---------
+    crop_count : int
+        count of crop being computed
+    crop_num : int
+        crop class number
+    light_cell :
+        cell returned by load_cell_task()
+    spec : dict
+        memory mapped time series files
+    followers : list
+        (crop_count, ETCell) of cells with the same simulation inputs,
+        written from the results of light_cell (see sim_memo.py)
+    run_i : int
+        index of the run configuration data, 0 [default]
+
+    Returns
+    -------
+    : tuple
+        ('crop', (run_i, cell_id), crop_num, None, error)
+
+    Notes
+    -----
+    Attached cells are cached so each worker maps a cell's files once
+
+    """
+
+    cell_key = (run_i, light_cell.cell_id)
+    _task_started(('crop', cell_key, crop_num))
+    try:
+        cells = _worker['cells']
+        if cell_key in cells and cells[cell_key][1] == spec['ws']:
+            et_cell = cells[cell_key][0]
+            cells.move_to_end(cell_key)
+        else:
+            et_cell = shared_climate.attach_cell_frames(light_cell, spec)
+            cells[cell_key] = (et_cell, spec['ws'])
+            while len(cells) > WORKER_CELL_CACHE:
+                cells.popitem(last=False)
+        crop_cycle.crop_day_loop(
+            crop_count, _worker['run_data'][run_i], et_cell,
+            et_cell.crop_params[crop_num], debug_flag=False,
+            mp_procs=_worker['mp_procs'], followers=followers)
+    except (Exception, SystemExit):
+        return ('crop', cell_key, crop_num, None, traceback.format_exc())
+    return ('crop', cell_key, crop_num, None, None)
+
+
+def _error_callback(results, task_type, cell_key, crop_num):
+    """Report exceptions raised outside of the task functions
+
+    Results that cannot be pickled back to the parent would otherwise
+        never reach the results queue
+
+    """
+    def callback(e):
+        results.put((task_type, cell_key, crop_num, None, repr(e)))
+    return callback
+
+
+def _task_started(task_key):
+    """Report task started by the worker process"""
+    if _worker.get('started_queue') is not None:
+        _worker['started_queue'].put((task_key, os.getpid()))
+
+
+def _read_started(started_queue, pending, started):
+    """Record worker pid of the started tasks without result"""
+    while not started_queue.empty():
+        task_key, pid = started_queue.get()
+        if task_key in pending:
+            started[task_key] = pid
+
+
+def _lost_tasks(pending, started):
+    """Return keys of the started tasks whose worker process exited
+
+    Parameters
+    ---------
+    pending : dict
+        task key to AsyncResult of the tasks without result
+    started : dict
+        task key to worker pid, lost tasks are removed so they are
+        reported once
+
+    Returns
+    -------
+    : list
+
+    """
+
+    live_pids = set(p.pid for p in mp.active_children())
+    lost = [
+        task_key for task_key, pid in started.items()
+        if pid not in live_pids and not pending[task_key].ready()]
+    for task_key in lost:
+        del started[task_key]
+    return lost
+
+
+def _cell_crops(et_cell):
+    """Return active crops of a cell sorted by crop number"""
+    return [
+        crop for crop_num, crop in sorted(et_cell.crop_params.items())
+        if et_cell.crop_flags[crop_num] != 0]
@@ -0,0 +1,113 @@
+"""crop_tables.py
+Defines CropTableLayer class, share_table
+Called by et_cell.py and crop_scheduler.py
+
+Static crop parameters and crop coefficients are read once (CropETData)
+    and shared by all ET cells instead of being copied for every cell
+Each cell sees a shared table through a CropTableLayer, spatial calibration
+    (ETCellData.set_spatial_crop_params) overrides only the crops it
+    changes with a copy in the cell layer, the other crops stay shared
+Layers of shared tables are pickled by table name without the table
+    (pool tasks, see crop_scheduler.py), the unpickling process must have
+    called share_table() with the same table name
+
+"""
+
+import collections.abc
+import copy
+
+# Table name to shared table (crop/curve number to CropParameters/CropCoeff)
+_TABLES = {}
+
+
+def share_table(name, table):
+    """Register shared table for cell layers
+
+    Parameters
+    ---------
+    name : str
+        table name, 'crop_params' or 'crop_coeffs'
+    table : dict
+        crop number to CropParameters or curve number to CropCoeff,
+        values must not be modified once shared
+
+    Returns
+    -------
+    None
+
+    """
+
+    _TABLES[name] = table
+
+
+class CropTableLayer(collections.abc.Mapping):
+    """Read only view of a shared table with per cell overrides
+
+    Attributes
+    ----------
+    name : str
+        shared table name
+    overrides : dict
+        crop number to cell copy of the shared value
+
+    Notes
+    -----
+    Use override() to get a cell copy that can be modified
+
+    """
+
+    def __init__(self, name, overrides=None):
+        self.name = name
+        self._table = _TABLES[name]
+        self.overrides = {} if overrides is None else overrides
+
+    def __getitem__(self, key):
+        try:
+            return self.overrides[key]
+        except KeyError:
+            return self._table[key]
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __reduce__(self):
+        if _TABLES.get(self.name) is self._table:
+            return (_restore_layer, (self.name, self.overrides))
+        # Table is not shared in this process (replaced), pickle it as well
+        return (_restore_table_layer, (
+            self.name, self._table, self.overrides))
+
+    def override(self, key):
+        """Return cell copy of a shared value, made on first call
+
+        Parameters
+        ---------
+        key : int
+            crop or curve number
+
+        Returns
+        -------
+        : CropParameters or CropCoeff
+
+        """
+
+        if key not in self.overrides:
+            self.overrides[key] = copy.copy(self._table[key])
+        return self.overrides[key]
+
+
+def _restore_layer(name, overrides):
+    """Unpickle layer of a shared table"""
+    return CropTableLayer(name, overrides)
+
+
+def _restore_table_layer(name, table, overrides):
+    """Unpickle layer pickled with its table"""
+    layer = CropTableLayer.__new__(CropTableLayer)
+    layer.name = name
+    layer._table = table
+    layer.overrides = overrides
+    return layer
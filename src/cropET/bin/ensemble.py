@@ -0,0 +1,266 @@
+"""ensemble.py
+Defines ScenarioRun class, read_scenarios, scenario_data
+Called by mod_crop_et.py and crop_scheduler.py
+
+An ensemble run (mod_crop_et.py --ensemble) simulates the project for each
+    climate scenario of a scenario file
+Crop parameters, coefficients, cell properties, cuttings and spatial
+    calibration are read once and shared by all scenarios, each scenario
+    only changes the climate inputs and writes to its own output folder
+Scenario file (INI format), one section per scenario, section name is the
+    scenario name, options not set keep the project INI values:
+    refet_folder, refet_name_format : [REFET] refet_folder, name_format
+    weather_folder, weather_name_format : [WEATHER] weather_folder,
+        name_format
+    hist_temps_folder, hist_temps_name_format : [HIST] hist_temps_folder,
+        name_format
+    start_date, end_date : [CROP_ET] start_date, end_date
+    output_folder : folder of the scenario output folders, relative to the
+        project folder, scenario name [default]
+Scenario output folders have the project output folder names, the run
+    manifest of each scenario is written in its output folder
+
+"""
+
+import configparser
+import copy
+import logging
+import os
+import sys
+
+import pandas as pd
+
+import crop_cycle
+import run_manifest
+import sim_memo
+
+# Scenario option to (CropETData attribute, key) of the climate inputs
+INPUT_OPTIONS = {
+    'refet_folder': ('refet', 'ws'),
+    'refet_name_format': ('refet', 'name_format'),
+    'weather_folder': ('weather', 'ws'),
+    'weather_name_format': ('weather', 'name_format'),
+    'hist_temps_folder': ('hist_temps', 'ws'),
+    'hist_temps_name_format': ('hist_temps', 'name_format')}
+
+
+class ScenarioRun:
+    """Configuration, cells and run bookkeeping of one scenario
+
+    Attributes
+    ----------
+    name : str
+        scenario name, None for the project run
+    data :
+        configuration data of the scenario
+    cells :
+        ETCellData instance, ETCell instances are copies for a scenario so
+        crop flags turned off by one scenario do not change the others
+    run_cells : list
+        ETCell instances to run
+    manifest : RunManifest
+        None if crop output files are not written (Monte Carlo runs write
+        percentile files, see param_ensemble.py)
+    memo : SimulationMemo
+        None if INI memoize_flag is False
+
+    """
+
+    def __init__(self, data, cells, name=None, etcid_to_run='ALL',
+                 resume_flag=False):
+        """Select the cells of a run and start its run manifest
+
+        Parameters
+        ---------
+        data :
+            configuration data of the run
+        cells :
+            ETCellData instance of the project
+        name : str
+            scenario name, None [default] runs the project cells
+        etcid_to_run :
+            et cell id to run
+            All [default]
+        resume_flag : boolean
+            True : skip cell/crop outputs finished by the previous run with
+            the same effective inputs (see run_manifest.py)
+            False [default]
+
+        """
+
+        self.name = name
+        self.data = data
+        if name is None:
+            self.cells = cells
+        else:
+            self.cells = copy.copy(cells)
+            self.cells.et_cells_dict = {
+                cell_id: copy.copy(et_cell)
+                for cell_id, et_cell in cells.et_cells_dict.items()}
+
+        # Finished cell/crop outputs are recorded in the run manifest
+        self.manifest = None
+        if crop_cycle.crop_output_flag(data) and not data.mc_realizations:
+            self.manifest = run_manifest.RunManifest(data, resume_flag)
+
+        # Cells to run, crops finished by the previous run are turned off
+        self.run_cells = []
+        for cell_id, cell in sorted(self.cells.et_cells_dict.items()):
+            if etcid_to_run == 'ALL' or etcid_to_run == cell_id:
+                if (resume_flag and self.manifest is not None and
+                        not self.manifest.skip_finished(cell)):
+                    logging.info('\nSkipping finished node id ' + cell_id)
+                    continue
+                self.run_cells.append(cell)
+
+        # Cells/crops with identical inputs are simulated once
+        #   (see sim_memo.py)
+        self.memo = None
+        if data.memoize_flag and self.manifest is not None:
+            self.memo = sim_memo.SimulationMemo(data, self.run_cells)
+
+    def cell_label(self, cell_id):
+        """Return cell label of log messages"""
+        if self.name is None:
+            return 'CellID: {}'.format(cell_id)
+        return 'Scenario: {}  CellID: {}'.format(self.name, cell_id)
+
+    def finish(self):
+        """Close the run manifest and set turned off crop flags back
+
+        Returns
+        -------
+        None
+
+        """
+
+        if self.memo is not None:
+            self.memo.restore_crop_flags()
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest.restore_crop_flags(self.cells)
+
+
+def read_scenarios(scenario_path, data):
+    """Read scenario file and return configuration data of each scenario
+
+    Parameters
+    ---------
+    scenario_path : str
+        file path of the scenario file
+    data :
+        configuration data from the project INI file
+
+    Returns
+    -------
+    : list
+        (scenario name, configuration data) in file order
+
+    """
+
+    config = configparser.RawConfigParser()
+    try:
+        config.read_file(open(scenario_path))
+    except:
+        logging.error('\nERROR: Scenario file could not be read, ' +
+                      'is not an input file, or does not exist\n')
+        sys.exit()
+    if not config.sections():
+        logging.error('\nERROR: Scenario file has no scenario sections')
+        sys.exit()
+
+    scenarios = []
+    for name in config.sections():
+        scenarios.append(
+            (name, scenario_data(data, name, dict(config.items(name)))))
+    return scenarios
+
+
+def scenario_data(data, name, options):
+    """Return configuration data of a scenario
+
+    Parameters
+    ---------
+    data :
+        configuration data from the project INI file
+    name : str
+        scenario name
+    options : dict
+        scenario file options of the scenario
+
+    Returns
+    -------
+    : CropETData
+        shallow copy of data, crop tables and caches are shared with data
+
+    """
+
+    scen_data = copy.copy(data)
+    for option in options:
+        if (option not in INPUT_OPTIONS and
+                option not in ['start_date', 'end_date', 'output_folder']):
+            logging.warning(
+                '  Scenario {}: unknown option {} ignored'.format(
+                    name, option))
+
+    # Climate inputs
+    for option, (attr, key) in sorted(INPUT_OPTIONS.items()):
+        value = options.get(option)
+        if value in [None, '', 'None']:
+            continue
+        if not hasattr(data, attr):
+            logging.warning(
+                '  Scenario {}: {} not used by the project INI, '
+                'ignored'.format(name, option))
+            continue
+        if getattr(scen_data, attr) is getattr(data, attr):
+            setattr(scen_data, attr, dict(getattr(data, attr)))
+        if key == 'ws':
+            # Folders could be full or relative to the project folder
+            if not os.path.isdir(value):
+                value = os.path.join(data.project_ws, value)
+            if not os.path.isdir(value):
+                logging.error(
+                    '\nERROR: Scenario {} {} does not exist\n  {}'.format(
+                        name, option, value))
+                sys.exit()
+        getattr(scen_data, attr)[key] = value
+
+    # Simulation period
+    for option in ['start_date', 'end_date']:
+        value = options.get(option)
+        if value is None:
+            continue
+        value = None if value in ['', 'None'] else pd.to_datetime(value)
+        setattr(scen_data, option.replace('_date', '_dt'), value)
+
+    # Output folders, same sub folders as the project
+    scen_ws = options.get('output_folder', name)
+    if not os.path.isabs(scen_ws):
+        scen_ws = os.path.join(data.project_ws, scen_ws)
+    scen_data.project_ws = scen_ws
+    scen_data.cet_out = dict(data.cet_out)
+    for key in ['daily_output_ws', 'monthly_output_ws', 'annual_output_ws',
+                'cube_ws']:
+        if data.cet_out.get(key) is not None:
+            scen_data.cet_out[key] = _scenario_folder(
+                data, scen_ws, data.cet_out[key])
+    if getattr(data, 'gs_output_ws', None) is not None:
+        scen_data.gs_output_ws = _scenario_folder(
+            data, scen_ws, data.gs_output_ws)
+    if data.mc_realizations:
+        scen_data.mc_output_ws = _scenario_folder(
+            data, scen_ws, data.mc_output_ws)
+    if not os.path.isdir(scen_ws):
+        os.makedirs(scen_ws)
+    return scen_data
+
+
+def _scenario_folder(data, scen_ws, output_ws):
+    """Return scenario folder of a project output folder, created if needed"""
+    if os.path.isabs(output_ws):
+        output_ws = os.path.relpath(output_ws, data.project_ws)
+    scen_output_ws = os.path.join(scen_ws, output_ws)
+    if not os.path.isdir(scen_output_ws):
+        os.makedirs(scen_output_ws)
+    return scen_output_ws
@@ -13,18 +13,33 @@ import math
 import os
 import re
 import sys
-import copy
 import numpy as np
 import pandas as pd
 import shapefile
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),
                                              '../../lib')))
+import climate_cache
+import climate_stream
 import crop_et_data
+import crop_tables
+import station_cache
+import ts_csv
 import util
 
 mpdToMps = 3.2808399 * 5280 / 86400
 
+def window_row_filter(data, fields):
+    """Return row filter of the input files of a streaming window
+
+    Only the rows of the window (data start and end dates) are kept while
+        reading (see ts_csv.period_filter), None if not streaming
+
+    """
+    if not data.stream_years:
+        return None
+    return ts_csv.period_filter(fields, data.start_dt, data.end_dt)
+
 class ETCellData():
     """Functions for loading ET Cell data from static text files
 
@@ -346,14 +361,15 @@ class ETCellData():
 
         Notes
         -----
+        Cells share crop_params through a CropTableLayer (see crop_tables.py)
 
         """
         logging.info('\nSetting static crop parameters')
 
-        # copy crop_params
+        crop_tables.share_table('crop_params', crop_params)
         for cell_id in sorted(self.et_cells_dict.keys()):
             cell = self.et_cells_dict[cell_id]
-            cell.crop_params = copy.deepcopy(crop_params)
+            cell.crop_params = crop_tables.CropTableLayer('crop_params')
 
     def set_static_crop_coeffs(self, crop_coeffs):
         """set static crop coefficients
@@ -369,13 +385,15 @@ class ETCellData():
 
         Notes
         -----
+        Cells share crop_coeffs through a CropTableLayer (see crop_tables.py)
 
         """
 
         logging.info('Setting static crop coefficients')
+        crop_tables.share_table('crop_coeffs', crop_coeffs)
         for cell_id in sorted(self.et_cells_dict.keys()):
             cell = self.et_cells_dict[cell_id]
-            cell.crop_coeffs = copy.deepcopy(crop_coeffs)
+            cell.crop_coeffs = crop_tables.CropTableLayer('crop_coeffs')
 
     def set_spatial_crop_params(self, calibration_ws):
         """set spatial crop parameters from spatial calibration
@@ -517,9 +535,17 @@ class ETCellData():
                         cutting_name = None
                     if param_name is not None:
                         try:
-                            setattr(
-                                self.et_cells_dict[cell_id].crop_params[
-                                    crop_num], param_name, float(row_value))
+                            # Only changed crops are copied into the cell
+                            crop_params = self.et_cells_dict[
+                                cell_id].crop_params
+                            param_value = float(row_value)
+                            crop_value = getattr(
+                                crop_params[crop_num], param_name, None)
+                            if (type(crop_value) is not float or
+                                    crop_value != param_value):
+                                setattr(
+                                    crop_params.override(crop_num),
+                                    param_name, param_value)
                             # print(self.et_cells_dict[cell_id].crop_params[
                             #         crop_num], param_name, float(row_value))
 
@@ -702,7 +728,7 @@ class ETCell():
         # self.crop_flags = dict(zip(crop_numbers, data[4:]))
         self.ncrops = len(self.crop_flags)
 
-    def set_input_timeseries(self, cell_count, data, cells):
+    def set_input_timeseries(self, cell_count, data, cells, stream=None):
         """Wrapper for setting all refet and met data
 
         Parameters
@@ -713,6 +739,10 @@ class ETCell():
             configuration data from INI file
         cells : dict
             eT cells data
+        stream : ClimateStream
+            climate state carried from the previous window of a streaming
+            run, data start and end dates set the window
+            None [default] : full period
 
         Returns
         -------
@@ -722,6 +752,17 @@ class ETCell():
 
         """
 
+        # Features of the previous time series are rebuilt on demand
+        self.reset_climate_features()
+
+        # Processed climate from a previous run with the same inputs
+        # Windows of a streaming run depend on the carried state
+        climate_cache_path = None
+        if stream is None:
+            climate_cache_path = climate_cache.cache_path(data, self)
+        if climate_cache.load_climate(climate_cache_path, self):
+            return True
+
         if not self.set_refet_data(data, cells):
             return False
         if data.refet_ratios_path:
@@ -734,9 +775,88 @@ class ETCell():
                 return False
 
         # Process climate arrays
-        self.process_climate(data)
+        self.process_climate(data, stream)
+        climate_cache.save_climate(climate_cache_path, self)
         return True
 
+    def share_input_timeseries(self, et_cell):
+        """Use processed time series of a cell with the same station inputs
+
+        Parameters
+        ---------
+        et_cell :
+            ETCell instance with input time series set, station and cell
+            properties used by process_climate() must be the same
+
+        Returns
+        -------
+        None
+
+        Notes
+        -----
+        Frames are shared, not copied, crop day loops only read them
+
+        """
+
+        for name in climate_cache.FRAME_NAMES:
+            setattr(self, name, getattr(et_cell, name))
+        self.climate = et_cell.climate
+        self._climate_features = getattr(et_cell, '_climate_features', None)
+
+    def climate_features(self, data):
+        """Return daily climate features shared by all crops of the cell
+
+        Parameters
+        ---------
+        data : dict
+            configuration data from INI file
+
+        Returns
+        -------
+        : dict
+            NumPy arrays on the refet_df days, keyed by climate_df field
+            name (tdew, wind, ppt, rh_min, etref, snow_depth, the
+            temperature fields used by data.phenology_option and the CO2
+            factors if data.co2_flag), plus doy, year, month, day and
+            winter (Nov-Mar in northern hemisphere, see util.is_winter)
+
+        Notes
+        -----
+        Built on the first call once the input time series are set, crop
+            day loops index the arrays and must not modify them
+
+        """
+
+        if getattr(self, '_climate_features', None) is not None:
+            return self._climate_features
+
+        fields = ['tdew', 'wind', 'ppt', 'rh_min', 'etref', 'snow_depth']
+        # Historic temperatures are used by all or some crops if option > 0
+        if data.phenology_option in [0, 1, 2]:
+            fields.extend(['tmean', 'tmin', 'tmax', 't30'])
+        if data.phenology_option > 0:
+            fields.extend(['meant', 'mint', 'maxt', '30t'])
+        if data.co2_flag:
+            fields.extend(['co2_grass', 'co2_tree', 'co2_c4'])
+
+        dt_index = self.refet_df.index
+        clim_df = self.climate_df.loc[dt_index, fields]
+        features = {
+            field: clim_df[field].values.astype(np.float64)
+            for field in fields}
+        features['doy'] = self.refet_df['doy'].values.astype(np.int64)
+        features['year'] = dt_index.year.values.astype(np.int64)
+        features['month'] = dt_index.month.values.astype(np.int64)
+        features['day'] = dt_index.day.values.astype(np.int64)
+        features['winter'] = (self.latitude > 0) & (
+            (features['month'] < 4) | (features['month'] > 10))
+        self._climate_features = features
+        return features
+
+    def reset_climate_features(self):
+        """Drop climate features, rebuilt by climate_features() if needed"""
+        self._climate_features = None
+
     def set_refet_data(self, data, cells):
         """Read ETo/ETr data file for single station
 
@@ -757,6 +877,13 @@ class ETCell():
 
         """
 
+        # Cells sharing a station reuse the parsed frame
+        cache_key = station_cache.frame_key(
+            'refet', self.refet_id, data.refet, data.start_dt, data.end_dt)
+        self.refet_df = data.station_cache.get(cache_key)
+        if self.refet_df is not None:
+            return True
+
         logging.debug('\nRead ETo/ETr data')
 
         logging.debug('Read meteorological/climate data')
@@ -797,8 +924,8 @@ class ETCell():
                     field_key, field_units))
 
         # set date attributes
-        self.refet_df['doy'] = [int(ts.strftime('%j')) for ts in
-                                self.refet_df.index]
+        self.refet_df['doy'] = self.refet_df.index.dayofyear
+        data.station_cache.put(cache_key, self.refet_df)
         return True
 
     def SF_P_refet_data(self, data):
@@ -821,15 +948,13 @@ class ETCell():
                                   % self.refet_id)
         logging.debug('  {0}'.format(refet_path))
 
-        # Get list of 0 based line numbers to skip
-        # Ignore header but assume header was set as a 1's based index
-        skiprows = [i for i in range(data.refet['header_lines'])
-                    if i + 1 != data.refet['names_line']]
         try:
-            self.refet_df = pd.read_csv(
-                refet_path, engine='python',
-                header=data.refet['names_line'] - len(skiprows) - 1,
-                skiprows=skiprows, delimiter=data.refet['delimiter'])
+            self.refet_df = ts_csv.read_ts_csv(
+                refet_path, data.refet['header_lines'],
+                data.refet['names_line'], data.refet['delimiter'],
+                usecols=ts_csv.field_columns(data.refet['fields']),
+                dtype=ts_csv.value_dtypes(data.refet['fields']),
+                row_filter=window_row_filter(data, data.refet['fields']))
         except IOError:
             logging.error(('  IOError: RefET data file could not be read ' +
                            'and may not exist\n  {}').format(refet_path))
@@ -855,11 +980,8 @@ class ETCell():
             self.refet_df = self.refet_df.rename(columns={field_name:field_key})
 
         # Convert date strings to datetimes
-        if data.refet['fields']['date'] is not None:
-            self.refet_df['date'] = pd.to_datetime(self.refet_df['date'])
-        else:
-            self.refet_df['date'] = self.refet_df[['year', 'month', 'day']].\
-                apply(lambda s: datetime.datetime(*s), axis=1)
+        self.refet_df['date'] = ts_csv.ts_dates(
+            self.refet_df, data.refet['fields']['date'] is not None)
         self.refet_df.set_index('date', inplace=True)
 
         # truncate period
@@ -895,6 +1017,59 @@ class ETCell():
 
         """
 
+        # Ratios table is read once for all cells
+        cache_key = station_cache.frame_key(
+            'refet_ratios', data.refet_ratios_path, data.et_ratios_delimiter,
+            data.et_ratios_header_lines, data.et_ratios_name_field,
+            data.et_ratios_id_field, data.et_ratios_month_field,
+            data.et_ratios_ratio_field)
+        refet_ratios_df = data.station_cache.get(cache_key)
+        if refet_ratios_df is None:
+            refet_ratios_df = self.read_refet_ratios(data)
+            data.station_cache.put(cache_key, refet_ratios_df)
+
+        # Filter to current station
+        refet_ratios_df = refet_ratios_df[
+           refet_ratios_df[data.et_ratios_id_field] == self.refet_id]
+        if refet_ratios_df.empty:
+            logging.warning('  Empty table, ETo/ETr ratios not applied')
+            return False
+
+        # Set month as index
+        refet_ratios_df.set_index(data.et_ratios_month_field, inplace=True)
+        logging.info(refet_ratios_df)
+
+        # Scale ETo/ETr values
+        # Is 'Month' vs 'month' change needed?
+        # Input climate files have Year, Month, Day.
+        # add 'month' column if not in df for ratio join
+        if 'month' not in self.refet_df:
+            logging.info('month_field not specified in REFET section of .ini and default "month" column not found.'
+                          ' Creating month column from date/index for refet data/ratio join.')
+            self.refet_df['month'] = self.refet_df.index.month
+        self.refet_df = self.refet_df.join(refet_ratios_df, 'month')
+        self.refet_df['etref'] *= self.refet_df[data.et_ratios_ratio_field]
+        del self.refet_df[data.et_ratios_ratio_field]
+        del self.refet_df[data.et_ratios_month_field]
+        del self.refet_df[data.et_ratios_id_field]
+        return True
+
+
+    def read_refet_ratios(self, data):
+        """Read ETo/ETr ratios static file for all stations
+
+        Parameters
+        ---------
+        data : dict
+            configuration data from INI file
+
+        Returns
+        -------
+        refet_ratios_df : pandas.DataFrame
+            ratio for each station and month
+
+        """
+
         logging.info('  Reading ETo/ETr ratios')
         try:
             refet_ratios_df = pd.read_csv(data.refet_ratios_path,
@@ -931,7 +1106,7 @@ class ETCell():
             var_name=data.et_ratios_month_field,
             value_name=data.et_ratios_ratio_field)
         refet_ratios_df[data.et_ratios_ratio_field] = \
-            refet_ratios_df[data.et_ratios_ratio_field].astype(np.float)
+            refet_ratios_df[data.et_ratios_ratio_field].astype(float)
 
         # Set any missing values to 1.0
         refet_ratios_df.fillna(value=1.0, inplace=True)
@@ -940,33 +1115,7 @@ class ETCell():
         refet_ratios_df[data.et_ratios_month_field] = [
             datetime.datetime.strptime(m, '%b').month
             for m in refet_ratios_df[data.et_ratios_month_field]]
-
-        # Filter to current station
-        refet_ratios_df = refet_ratios_df[
-           refet_ratios_df[data.et_ratios_id_field] == self.refet_id]
-        if refet_ratios_df.empty:
-            logging.warning('  Empty table, ETo/ETr ratios not applied')
-            return False
-
-        # Set month as index
-        refet_ratios_df.set_index(data.et_ratios_month_field, inplace=True)
-        logging.info(refet_ratios_df)
-
-        # Scale ETo/ETr values
-        # Is 'Month' vs 'month' change needed?
-        # Input climate files have Year, Month, Day.
-        # add 'month' column if not in df for ratio join
-        if 'month' not in self.refet_df:
-            logging.info('month_field not specified in REFET section of .ini and default "month" column not found.'
-                          ' Creating month column from date/index for refet data/ratio join.')
-            self.refet_df['month'] = self.refet_df.index.month
-        self.refet_df = self.refet_df.join(refet_ratios_df, 'month')
-        self.refet_df['etref'] *= self.refet_df[data.et_ratios_ratio_field]
-        del self.refet_df[data.et_ratios_ratio_field]
-        del self.refet_df[data.et_ratios_month_field]
-        del self.refet_df[data.et_ratios_id_field]
-        return True
-
+        return refet_ratios_df
 
     def set_weather_data(self, cell_count, data, cells):
         """Read meteorological data for single station and fill missing
@@ -992,6 +1141,83 @@ class ETCell():
 
         """
 
+        # Cells sharing a station reuse the parsed frame
+        # Dew point from specific humidity depends on cell air pressure
+        #   and is always computed below
+        cache_key = station_cache.frame_key(
+            'weather', self.refet_id, data.weather, data.start_dt,
+            data.end_dt)
+        self.weather_df = data.station_cache.get(cache_key)
+        if self.weather_df is None:
+            if not self.read_weather_data(data):
+                return False
+            data.station_cache.put(cache_key, self.weather_df)
+
+        # Calculate Tdew from q or ea if tdew not input
+        if 'tdew' in self.weather_df.columns:
+            logging.info('\nUsing tdew for rh_min calculation.')
+            pass
+        elif 'ea' in self.weather_df.columns:
+            logging.info('\nUsing ea for rh_min calculation.')
+            self.weather_df['tdew'] = util.tdew_from_ea(
+                self.weather_df['ea'].values)
+        elif 'q' in self.weather_df.columns:
+            logging.info('\nUsing q for rh_min calculation.')
+            self.weather_df['tdew'] = util.tdew_from_ea(util.ea_from_q(
+                self.air_pressure, self.weather_df['q'].values))
+
+        # Compute rh_min from Tdew and Tmax
+        if ('rh_min' not in self.weather_df.columns and
+                'tdew' in self.weather_df.columns and
+                'tmax' in self.weather_df.columns):
+
+            # For now do not consider SVP over ice
+            # (it was not used in ETr or ETo computations, anyway)
+
+            self.weather_df['rh_min'] = 100 * np.clip(
+                util.es_from_t(self.weather_df['tdew'].values) /
+                util.es_from_t(self.weather_df['tmax'].values), 0, 1)
+
+        # DEADBEEF
+        # Don't default CO2 correction values to 1 if they aren't in the data
+        # CO2 corrections must be in the weather file
+        # Is this going for work for all BOR data sets?
+
+        """
+        # Set CO2 correction values to 1 if they are not in data
+
+        if 'co2_grass' not in self.weather_df.columns:
+            logging.info('  Grass CO2 factor not in weather data,
+             setting co2_grass = 1')
+            self.weather_df['co2_grass'] = 1
+        if 'co2_tree' not in self.weather_df.columns:
+            logging.info('  Tree CO2 factor not in weather data,
+             setting co2_trees = 1')
+            self.weather_df['co2_trees'] = 1
+        if 'co2_c4' not in self.weather_df.columns:
+            logging.info('  C4 CO2 factor not in weather data,
+             setting co2_c4 = 1')
+            self.weather_df['co2_c4'] = 1
+        """
+        return True
+
+    def read_weather_data(self, data):
+        """Read meteorological data for single station, convert units and
+            add default snow values
+
+        Parameters
+        ---------
+        data : dict
+            configuration data from INI file
+
+        Returns
+        -------
+        : boolean
+            True
+            False
+
+        """
+
         logging.debug('Read meteorological/climate data')
         # if data.weather['data_structure_type'].upper() == 'SF P':
         success = self.SF_P_weather_data(data)
@@ -1042,8 +1268,7 @@ class ETCell():
                               format(field_key, field_units))
 
         # set date attributes
-        self.weather_df['doy'] = [int(ts.strftime('%j')) for ts in
-                                  self.weather_df.index]
+        self.weather_df['doy'] = self.weather_df.index.dayofyear
 
         # Scale wind height to 2m if necessary
         if data.weather['wind_height'] != 2:
@@ -1055,53 +1280,6 @@ class ETCell():
             self.weather_df['snow'] = 0
         if 'snow_depth' not in self.weather_df.columns:
             self.weather_df['snow_depth'] = 0
-
-        # Calculate Tdew from q or ea if tdew not input
-        if 'tdew' in self.weather_df.columns:
-            logging.info('\nUsing tdew for rh_min calculation.')
-            pass
-        elif 'ea' in self.weather_df.columns:
-            logging.info('\nUsing ea for rh_min calculation.')
-            self.weather_df['tdew'] = util.tdew_from_ea(
-                self.weather_df['ea'].values)
-        elif 'q' in self.weather_df.columns:
-            logging.info('\nUsing q for rh_min calculation.')
-            self.weather_df['tdew'] = util.tdew_from_ea(util.ea_from_q(
-                self.air_pressure, self.weather_df['q'].values))
-
-        # Compute rh_min from Tdew and Tmax
-        if ('rh_min' not in self.weather_df.columns and
-                'tdew' in self.weather_df.columns and
-                'tmax' in self.weather_df.columns):
-
-            # For now do not consider SVP over ice
-            # (it was not used in ETr or ETo computations, anyway)
-
-            self.weather_df['rh_min'] = 100 * np.clip(
-                util.es_from_t(self.weather_df['tdew'].values) /
-                util.es_from_t(self.weather_df['tmax'].values), 0, 1)
-
-        # DEADBEEF
-        # Don't default CO2 correction values to 1 if they aren't in the data
-        # CO2 corrections must be in the weather file
-        # Is this going for work for all BOR data sets?
-
-        """
-        # Set CO2 correction values to 1 if they are not in data
-
-        if 'co2_grass' not in self.weather_df.columns:
-            logging.info('  Grass CO2 factor not in weather data,
-             setting co2_grass = 1')
-            self.weather_df['co2_grass'] = 1
-        if 'co2_tree' not in self.weather_df.columns:
-            logging.info('  Tree CO2 factor not in weather data,
-             setting co2_trees = 1')
-            self.weather_df['co2_trees'] = 1
-        if 'co2_c4' not in self.weather_df.columns:
-            logging.info('  C4 CO2 factor not in weather data,
-             setting co2_c4 = 1')
-            self.weather_df['co2_c4'] = 1
-        """
         return True
 
     def SF_P_weather_data(self, data):
@@ -1128,14 +1306,15 @@ class ETCell():
                                     data.weather['name_format'] % self.refet_id)
         logging.debug('  {0}'.format(weather_path))
 
-        # Get list of 0 based line numbers to skip
-        # Ignore header but assume header was set as 1's based index
-        skiprows = [i for i in range(data.weather['header_lines'])
-                    if i+1 != data.weather['names_line']]
+        # rh_min is used if it is in the file
         try:
-            self.weather_df = pd.read_csv(weather_path, engine='python',
-                    header=data.weather['names_line'] - len(skiprows) - 1,
-                    skiprows=skiprows, delimiter=data.weather['delimiter'])
+            self.weather_df = ts_csv.read_ts_csv(
+                weather_path, data.weather['header_lines'],
+                data.weather['names_line'], data.weather['delimiter'],
+                usecols=ts_csv.field_columns(
+                    data.weather['fields'], ['rh_min']),
+                dtype=ts_csv.value_dtypes(data.weather['fields']),
+                row_filter=window_row_filter(data, data.weather['fields']))
         except IOError:
             logging.error(('  IOError: Weather data file could not be read ' +
                            'and may not exist\n  {}').format(weather_path))
@@ -1167,12 +1346,8 @@ class ETCell():
             self.weather_df = self.weather_df.rename(columns = {field_name:field_key})
 
         # Convert date strings to datetimes
-        if data.weather['fields']['date'] is not None:
-            self.weather_df['date'] = pd.to_datetime(self.weather_df['date'])
-        else:
-            self.weather_df['date'] = self.weather_df[['year', 'month',
-                                                       'day']].apply(
-                lambda s: datetime.datetime(*s), axis=1)
+        self.weather_df['date'] = ts_csv.ts_dates(
+            self.weather_df, data.weather['fields']['date'] is not None)
         self.weather_df.set_index('date', inplace=True)
 
         # truncate period
@@ -1208,6 +1383,14 @@ class ETCell():
 
         """
 
+        # Cells sharing a station reuse the parsed frame
+        cache_key = station_cache.frame_key(
+            'hist_temps', self.refet_id, data.hist_temps, data.start_dt,
+            data.end_dt)
+        self.hist_temps_df = data.station_cache.get(cache_key)
+        if self.hist_temps_df is not None:
+            return True
+
         logging.debug('Read historical temperature data')
         # if data.hist_temps['data_structure_type'].upper() == 'SF P':
         # 'SF P' is now the only accepted data structure type
@@ -1236,8 +1419,8 @@ class ETCell():
 
         # set date attributes
 
-        self.hist_temps_df['doy'] = [int(ts.strftime('%j')) for ts in
-                                     self.hist_temps_df.index]
+        self.hist_temps_df['doy'] = self.hist_temps_df.index.dayofyear
+        data.station_cache.put(cache_key, self.hist_temps_df)
         return True
 
     def historical_temps(self, data):
@@ -1262,14 +1445,13 @@ class ETCell():
                                      self.refet_id)
         logging.debug('  {0}'.format(historic_path))
 
-        # Get list of 0 based line numbers to skip
-        # Ignore header but assume header was set as 1's based index
-        skiprows = [i for i in range(data.hist_temps['header_lines'])
-                    if i+1 != data.hist_temps['names_line']]
         try:
-            self.hist_temps_df = pd.read_csv(historic_path, engine='python',
-                    header=data.hist_temps['names_line'] - len(skiprows) - 1,
-                    skiprows=skiprows, delimiter=data.hist_temps['delimiter'])
+            self.hist_temps_df = ts_csv.read_ts_csv(
+                historic_path, data.hist_temps['header_lines'],
+                data.hist_temps['names_line'], data.hist_temps['delimiter'],
+                usecols=ts_csv.field_columns(data.hist_temps['fields']),
+                dtype=ts_csv.value_dtypes(data.hist_temps['fields']),
+                row_filter=window_row_filter(data, data.hist_temps['fields']))
         except IOError:
             logging.error(('  IOError: historic data file could not be read ' +
                            'and may not exist\n  {}').format(historic_path))
@@ -1297,14 +1479,8 @@ class ETCell():
                 field_name: field_key})
 
         # Convert date strings to datetimes
-        if data.hist_temps['fields']['date'] is not None:
-            self.hist_temps_df['date'] = pd.to_datetime(
-                self.hist_temps_df['date'])
-        else:
-            self.hist_temps_df['date'] = self.hist_temps_df[['year',
-                                                             'month',
-                                                             'day']].apply(
-                lambda s: datetime.datetime(*s), axis=1)
+        self.hist_temps_df['date'] = ts_csv.ts_dates(
+            self.hist_temps_df, data.hist_temps['fields']['date'] is not None)
         self.hist_temps_df.set_index('date', inplace=True)
 
         # truncate period
@@ -1320,7 +1496,7 @@ class ETCell():
             return False
         return True
 
-    def process_climate(self, data):
+    def process_climate(self, data, stream=None):
         """process meterological data into climate data
             a) Compute long term averages (DAY LOOP)
                 adjust and check temperature data
@@ -1338,6 +1514,11 @@ class ETCell():
         ---------
         data : dict
             data from INI file
+        stream : ClimateStream
+            climate state carried from the previous window of a streaming
+            run (see climate_stream.py), long term means are summed over
+            the windows of the first pass and used in the second pass
+            None [default] : full period
 
         Returns
         -------
@@ -1402,18 +1583,18 @@ class ETCell():
             axis=1)
         # self.climate_df['t30'] = pd.rolling_mean(self.climate_df['tmean'],
         #  window = 30, min_periods = 1)
-        self.climate_df['t30'] = self.climate_df['tmean'].rolling(
-            window=30, min_periods=1).mean()
         # self.climate_df['30t'] = pd.rolling_mean(self.climate_df['meant'],
         #  window = 30, min_periods = 1)
-        self.climate_df['30t'] = self.climate_df['meant'].rolling(
-            window=30, min_periods=1).mean()
-
-        # Accumulate T30 over period of record
-        main_t30_lt = np.array(
-            self.climate_df[['t30', 'doy']].groupby('doy').mean()['t30'])
-        hist_t30_lt = np.array(
-            self.climate_df[['30t', 'doy']].groupby('doy').mean()['30t'])
+        if stream is None:
+            self.climate_df['t30'] = self.climate_df['tmean'].rolling(
+                window=30, min_periods=1).mean()
+            self.climate_df['30t'] = self.climate_df['meant'].rolling(
+                window=30, min_periods=1).mean()
+        else:
+            self.climate_df['t30'] = stream.rolling_mean(
+                't30', self.climate_df['tmean'].values)
+            self.climate_df['30t'] = stream.rolling_mean(
+                '30t', self.climate_df['meant'].values)
 
         # Compute GDD for each day
         # self.climate_df['main_cgdd'] = self.climate_df['tmean']
@@ -1435,6 +1616,30 @@ class ETCell():
                                                         'hist_cgdd']].groupby(
             self.climate_df.index.map(lambda x: x.year)).hist_cgdd.cumsum()
 
+        # Long term means of the full period from the first streaming pass
+        if stream is not None:
+            if stream.climate is None:
+                stream.add_doy_values(
+                    self.climate_df['doy'].values,
+                    self.climate_df[climate_stream.DOY_FIELDS].values)
+                stream.snow_flag |= bool(np.any(self.climate_df['snow']))
+            self.climate = stream.climate
+            if stream.snow_flag:
+                self.climate_df['snow_depth'], stream.snow_accum = \
+                    util.snow_depth_on_ground(
+                        self.climate_df['snow'].values.astype(np.float64),
+                        self.climate_df['snow_depth'].values.astype(
+                            np.float64),
+                        self.climate_df['tmax'].values.astype(np.float64),
+                        stream.snow_accum)
+            return True
+
+        # Accumulate T30 over period of record
+        main_t30_lt = np.array(
+            self.climate_df[['t30', 'doy']].groupby('doy').mean()['t30'])
+        hist_t30_lt = np.array(
+            self.climate_df[['30t', 'doy']].groupby('doy').mean()['30t'])
+
         # Compute mean cumulative GDD for each DOY
         main_cgdd_0_lt = np.array(
             self.climate_df[['main_cgdd', 'doy']].groupby('doy').mean()[
@@ -1460,23 +1665,10 @@ class ETCell():
         # Calculate an estimated depth of snow on ground using simple
         # melt rate function))
         if np.any(self.climate_df['snow']):
-            for i, doy in self.climate_df['doy'].iteritems():
-                # Calculate an estimated depth of snow on ground using simple
-                # melt rate function
-
-                snow = self.climate_df['snow'][i]
-                snow_depth = self.climate_df['snow_depth'][i]
-
-                # Assume settle rate of 2 to 1
-
-                snow_accum += snow * 0.5  # assume a settle rate of 2 to 1
-
-                # 4 mm/day melt per degree C
-
-                snow_melt = max(4 * self.climate_df['tmax'][i], 0.0)
-                snow_accum = max(snow_accum - snow_melt, 0.0)
-                snow_depth = min(snow_depth, snow_accum)
-                self.climate_df['snow_depth'][i] = snow_depth
+            self.climate_df['snow_depth'] = util.snow_depth_on_ground(
+                self.climate_df['snow'].values.astype(np.float64),
+                self.climate_df['snow_depth'].values.astype(np.float64),
+                self.climate_df['tmax'].values.astype(np.float64))[0]
         return True
 
 if __name__ == '__main__':
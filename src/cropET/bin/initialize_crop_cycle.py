@@ -13,6 +13,24 @@ import sys
 de_initial = 10.0  # mm initial depletion for first day of crop
 
 class InitializeCropCycle:
+    # Crop cycle state is read and written many times per day, slots are
+    #   faster than an instance dict and use less memory
+    __slots__ = [
+        'ad', 'aw', 'aw3', 'cgdd', 'cgdd_at_planting', 'cgdd_penalty', 'cn2',
+        'co2', 'crop_df', 'crop_setup_flag', 'cum_evap', 'cum_evap_prev',
+        'cutting', 'cycle', 'density', 'depl_root', 'depl_surface', 'depl_ze',
+        'depl_zep', 'dormant_setup_flag', 'doy_start_cycle', 'dperc',
+        'dperc_ze', 'etc_act', 'etc_bas', 'etc_pot', 'etref_30', 'fc', 'fw',
+        'fw_irr', 'fw_spec', 'fw_std', 'gdd', 'gdd_penalty', 'height',
+        'height_max', 'height_min', 'in_season', 'irr_auto', 'irr_flag',
+        'irr_min', 'irr_sim', 'kc_act', 'kc_bas', 'kc_bas_mid', 'kc_bas_prev',
+        'kc_bas_wscc', 'kc_max', 'kc_min', 'kc_pot', 'ke', 'ke_irr', 'ke_ppt',
+        'kr2', 'ks', 'kt_reducer', 'longterm_pl', 'mad', 'mad_ini', 'mad_mid',
+        'max_lines_in_crop_curve_table', 'n_cgdd', 'n_pl_ec', 'niwr', 'p_eft',
+        'p_rz', 'ppt_inf', 'ppt_inf_prev', 'real_start', 'rew', 's', 's1',
+        's2', 's3', 's4', 'sro', 'stress_event', 'T2Days', 'tew', 'tew2',
+        'tew3', 'totwatin_ze', 'wt_irr', 'z', 'zr', 'zr_max', 'zr_min']
+
     def __init__(self):
         """Initialize for crops cycle"""
         self.ad = 0.
@@ -428,11 +428,8 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
                 int_cgdd = min(
                     foo.max_lines_in_crop_curve_table - 1,
                     int(foo.n_cgdd * 10))
-                foo.kc_bas = (
-                    et_cell.crop_coeffs[curve_number].data[int_cgdd] +
-                    (foo.n_cgdd * 10 - int_cgdd) *
-                    (et_cell.crop_coeffs[curve_number].data[int_cgdd+1] -
-                     et_cell.crop_coeffs[curve_number].data[int_cgdd]))
+                foo.kc_bas = et_cell.crop_coeffs[curve_number].kc_bas(
+                    foo.n_cgdd * 10, int_cgdd)
                 if debug_flag:
                     logging.debug(
                         'kcb_daily(): kcb %.6f  ncumGDD %d  int_cgdd %d' %
@@ -468,15 +465,12 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
                     lentry = et_cell.crop_coeffs[curve_number].lentry
                     # more entries in kcb array
                     if int_cgdd < lentry:
-                        foo.kc_bas = (
-                            et_cell.crop_coeffs[curve_number].data[int_cgdd] +
-                            (foo.n_cgdd * 10 - int_cgdd) *
-                            (et_cell.crop_coeffs[curve_number].data[int_cgdd+1] -
-                             et_cell.crop_coeffs[curve_number].data[int_cgdd]))
+                        foo.kc_bas = et_cell.crop_coeffs[curve_number].kc_bas(
+                            foo.n_cgdd * 10, int_cgdd)
                     else:
                         # Hold kcb equal to last entry until either cumGDD
                         #   terminations exceeded or killing frost
-                        foo.kc_bas = et_cell.crop_coeffs[curve_number].data[lentry]
+                        foo.kc_bas = et_cell.crop_coeffs[curve_number].kc_table[lentry]
                     if debug_flag:
                         logging.debug(
                             ('kcb_daily(): kc_bas %.6f  int_cgdd %d  ' +
@@ -512,7 +506,7 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
                         #   alfalfa height to minimum each new cycle
                         #   and to set kcb to initial kcb value for first day following cutting.
                         foo.height = foo.height_min
-                        foo.kc_bas = et_cell.crop_coeffs[curve_number].data[0]
+                        foo.kc_bas = et_cell.crop_coeffs[curve_number].kc_table[0]
                         if debug_flag:
                             logging.debug(
                                 'kcb_daily(): kc_bas %.6f  cgdd_at_planting %.6f  cutting %d' %
@@ -551,8 +545,8 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
 
             # Deal with values of zero or null - added Dec. 29, 2011, rga
 
-            crop.time_for_efc = max(crop.time_for_efc, 1.)
-            foo.n_pl_ec = float(days_into_season) / crop.time_for_efc
+            time_for_efc = max(crop.time_for_efc, 1.)
+            foo.n_pl_ec = float(days_into_season) / time_for_efc
             npl_ec100 = foo.n_pl_ec * 100
             if foo.n_pl_ec < 1:
                 foo.mad = foo.mad_ini
@@ -575,11 +569,8 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
                 int_pl_ec = min(
                     foo.max_lines_in_crop_curve_table - 1., int(foo.n_pl_ec * 10.))
 
-                foo.kc_bas = (
-                    et_cell.crop_coeffs[curve_number].data[int_pl_ec] +
-                    (foo.n_pl_ec * 10. - int_pl_ec) *
-                    (et_cell.crop_coeffs[curve_number].data[int_pl_ec + 1] -
-                     et_cell.crop_coeffs[curve_number].data[int_pl_ec]))
+                foo.kc_bas = et_cell.crop_coeffs[curve_number].kc_bas(
+                    foo.n_pl_ec * 10., int_pl_ec)
 
                 if debug_flag:
                     logging.debug(
@@ -590,7 +581,7 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
                         (foo.kc_bas, int_pl_ec, foo.n_pl_ec))
                     logging.debug(
                         'kcb_daily(): days_into_season %d  time_for_EFC %.6f' %
-                        (days_into_season, crop.time_for_efc))
+                        (days_into_season, time_for_efc))
 
 
             else:
@@ -627,16 +618,13 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
 
             # Deal with values of zero or null - added Dec. 29, 2011, rga
 
-            crop.time_for_efc = max(crop.time_for_efc, 1.)
-            foo.n_pl_ec = float(days_into_season) / crop.time_for_efc
+            time_for_efc = max(crop.time_for_efc, 1.)
+            foo.n_pl_ec = float(days_into_season) / time_for_efc
             if foo.n_pl_ec < 1:
                 int_pl_ec = min(
                     int(foo.n_pl_ec * 10.), foo.max_lines_in_crop_curve_table - 1)
-                foo.kc_bas = (
-                    et_cell.crop_coeffs[curve_number].data[int_pl_ec] +
-                    (foo.n_pl_ec * 10 - int_pl_ec) *
-                    (et_cell.crop_coeffs[curve_number].data[int_pl_ec + 1] -
-                     et_cell.crop_coeffs[curve_number].data[int_pl_ec]))
+                foo.kc_bas = et_cell.crop_coeffs[curve_number].kc_bas(
+                    foo.n_pl_ec * 10, int_pl_ec)
                 logging.debug(
                     ('kcb_daily(): kc_bas %.6f  n_pl_ec %.6f  ' +
                      'max_lines_in_crop_curve_table %d  int_pl_ec %d') %
@@ -645,7 +633,7 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
                 foo.mad = foo.mad_ini
             else:
                 foo.mad = foo.mad_mid
-                DaysafterEFC = days_into_season - crop.time_for_efc
+                DaysafterEFC = days_into_season - time_for_efc
 
                 # In next line, make sure that "System.Math.Abs()" does not
                 #   change exact value for time_for_harvest() and that it is
@@ -658,11 +646,8 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
                     nDaysafterEFC = float(DaysafterEFC) / 10 + 11
                     int_pl_ec = min(
                         int(nDaysafterEFC), foo.max_lines_in_crop_curve_table - 1)
-                    foo.kc_bas = (
-                        et_cell.crop_coeffs[curve_number].data[int_pl_ec] +
-                        (nDaysafterEFC - int_pl_ec) *
-                        (et_cell.crop_coeffs[curve_number].data[int_pl_ec + 1] -
-                         et_cell.crop_coeffs[curve_number].data[int_pl_ec]))
+                    foo.kc_bas = et_cell.crop_coeffs[curve_number].kc_bas(
+                        nDaysafterEFC, int_pl_ec)
                     logging.debug(
                         ('kcb_daily(): kc_bas %.6f  n_pl_ec %.6f  '
                          'nDaysafterEFC %.6f  int_pl_ec %.6f') %
@@ -744,11 +729,8 @@ def kcb_daily(data, et_cell, crop, foo, foo_day,
                     foo.max_lines_in_crop_curve_table - 1,
                     int(foo.n_pl_ec * 10))
                 # et_cell.crop_coeffs[curve_number].data[int_pl_ec]
-                foo.kc_bas = (
-                    et_cell.crop_coeffs[curve_number].data[int_pl_ec] +
-                    (foo.n_pl_ec * 10 - int_pl_ec) *
-                    (et_cell.crop_coeffs[curve_number].data[int_pl_ec + 1] -
-                     et_cell.crop_coeffs[curve_number].data[int_pl_ec]))
+                foo.kc_bas = et_cell.crop_coeffs[curve_number].kc_bas(
+                    foo.n_pl_ec * 10, int_pl_ec)
                 logging.debug('kcb_daily(): kc_bas %.6f' % foo.kc_bas)
             else:
                 # Beyond end of season
@@ -16,12 +16,18 @@ import pandas as pd
 
 import crop_et_data
 import crop_cycle
+import crop_scheduler
+import ensemble
 import et_cell
+import output_writer
+import param_ensemble
+import stream_cycle
+import typed_ts
 import util
 
 def main(ini_path, log_level=logging.WARNING,
          etcid_to_run='ALL', debug_flag=False,
-         cal_flag=False, mp_procs=1):
+         cal_flag=False, mp_procs=1, resume_flag=False, ensemble_path=None):
     """Main function for running crop ET model
 
     Parameters
@@ -41,6 +47,14 @@ def main(ini_path, log_level=logging.WARNING,
     mp_procs : int
         number of cores to use for multiprocessing
         1 [default]
+    resume_flag : boolean
+        True : skip cell/crop outputs finished by the previous run with the
+        same effective inputs (see run_manifest.py)
+        False [default]
+    ensemble_path : str
+        file path of a scenario file, the project is run for each climate
+        scenario of the file (see ensemble.py)
+        None [default] : project INI climate inputs
 
     Returns
     -------
@@ -74,6 +88,22 @@ def main(ini_path, log_level=logging.WARNING,
     # Read INI file
     data.read_cet_ini(ini_path, debug_flag)
 
+    # Streaming runs read and simulate one cell at a time
+    if data.stream_years:
+        logging.warning(
+            '  Streaming mode, {} year windows'.format(data.stream_years))
+        if mp_procs > 1:
+            logging.warning('  Streaming mode, disabling multiprocessing')
+            mp_procs = 1
+
+    # Monte Carlo realizations of a cell and crop are run together
+    if data.mc_realizations:
+        logging.warning('  Monte Carlo mode, {} realizations'.format(
+            data.mc_realizations))
+        if mp_procs > 1:
+            logging.warning('  Monte Carlo mode, disabling multiprocessing')
+            mp_procs = 1
+
     # Start file logging once INI file has been read
     if debug_flag:
         logger = util.file_logger(
@@ -84,105 +114,146 @@ def main(ini_path, log_level=logging.WARNING,
         logging.warning('  Setting growing_season_stats_flag = True')
         data.gs_output_flag = True
 
-    # Read crop type (aka class) specific parameters and coefficients
-    # Crop coefficients are constant for all cells
-    # Crop params can vary if CDL data are used but have base parameters
-    # File paths are read from INI
-    data.set_crop_params()
-    data.set_crop_coeffs()
-    if data.co2_flag:
-        data.set_crop_co2()
-
-    # Read cell properties, crop flags and cuttings
-    cells = et_cell.ETCellData()
-    cells.set_cell_properties(data)
-    cells.set_cell_crops(data)
-    cells.set_cell_cuttings(data)
-    cells.filter_crops(data)
-    cells.filter_cells(data)
-
-    # First apply static crop parameters to all cells
-    # Could "cell" just inherit "data" values instead ????
-    cells.set_static_crop_params(data.crop_params)
-    cells.set_static_crop_coeffs(data.crop_coeffs)
-
-    # Read spatially varying crop parameters
-    if data.spatial_cal_flag:
-        cells.set_spatial_crop_params(data.spatial_cal_ws)
+    # Read crop tables, cell properties, crop flags and cuttings
+    cells = read_project_cells(data)
 
     # print(cells.et_cells_dict['1067'])
     # print(cells.et_cells_dict['1067'].crop_params)
     # print(cells.et_cells_dict['1067'].crop_params[40])
     # sys.exit()
-    # Multiprocessing logic
-    # If cell count is low, process crops in parallel
-    # If cell count is high, process cells in parallel (crops in serial)
+    # Climate scenarios of an ensemble share the crop and cell data read
+    #   above, each scenario writes to its own output folders
+    if ensemble_path is not None:
+        scenarios = ensemble.read_scenarios(ensemble_path, data)
+        logging.warning('  Ensemble of {} climate scenarios'.format(
+            len(scenarios)))
+        runs = [
+            ensemble.ScenarioRun(
+                scen_data, cells, scen_name, etcid_to_run, resume_flag)
+            for scen_name, scen_data in scenarios]
+    else:
+        runs = [ensemble.ScenarioRun(
+            data, cells, None, etcid_to_run, resume_flag)]
 
-    cell_mp_list, cell_mp_flag, crop_mp_flag = [], False, False
+    # Multiprocessing logic
+    # All cells and crops of all runs are run on one pool, (cell, crop)
+    #   tasks are scheduled longest first (see crop_scheduler.py)
+    cell_mp_list = []
     if mp_procs > 1:
         logging.warning("\nSetting multiprocessing logic")
-        # if data.cet_out['data_structure_type'].upper() == 'RDB':
-        #     logging.warning("  Multiprocessing is not available for RDB output")
-        #     mp_procs = 1
-        # else:
-        if etcid_to_run == 'ALL':
-            cells_count = len(cells.et_cells_dict.keys())
-            crops_count = len(cells.crop_num_list)
-            logging.warning('  Cell count: {}'.format(cells_count))
-            logging.warning('  Crop count: {}'.format(crops_count))
-
-            # 0.5 multiplier is to prefer multiprocessing by cell
-            # because of 1 CPU time spent loading/processing weather data
-            # when multiprocessing by crop
-
-            # # Force cell_mp__flag to True for testing
-            # logging.warning("  Multiprocessing by cell")
-            # cell_mp_flag = True
-
-            if (0.5 * cells_count) > crops_count:
-                logging.warning("  Multiprocessing by cell")
-                cell_mp_flag = True
-            else:
-                logging.warning("  Multiprocessing by crop")
-                crop_mp_flag = True
-        else:
-            logging.warning("  Multiprocessing by crop")
-            crop_mp_flag = True
+        logging.warning('  Cell count: {}'.format(
+            len(cells.et_cells_dict.keys())
+            if etcid_to_run == 'ALL' else 1))
+        logging.warning('  Crop count: {}'.format(len(cells.crop_num_list)))
+        logging.warning("  Multiprocessing by cell and crop")
+
+    # Batch cells by crop if not multiprocessing
+    batch_flag = (
+        data.cell_batch_size > 1 and not debug_flag and mp_procs == 1 and
+        not data.stream_years and not data.mc_realizations)
+    if batch_flag:
+        logging.warning(
+            '  Running up to {} cells together'.format(data.cell_batch_size))
 
     """
     Loop through et cells
 
     """
     logging.warning("")
-    cell_count = 0
-    for cell_id, cell in sorted(cells.et_cells_dict.items()):
-        if etcid_to_run == 'ALL' or etcid_to_run == cell_id:
-            logging.info('\nProcessing node id' + cell_id + ' with name ' +
-                         cell.cell_name)
-            cell_count += 1
-            if cell_mp_flag:
-                # Multiprocessing by cell
-                cell_mp_list.append([cell_count, data, cell, mp_procs])
-            elif crop_mp_flag:
-                # Multiprocessing by crop
-                logging.warning('CellID: {}'.format(cell_id))
-                if not cell.set_input_timeseries(cell_count, data, cells):
-                    sys.exit()
-                crop_cycle.crop_cycle_mp(data, cell, mp_procs=mp_procs)
-            else:
-                logging.warning('CellID: {}'.format(cell_id))
-                if not cell.set_input_timeseries(cell_count, data, cells):
-                    sys.exit()
-                crop_cycle.crop_cycle(data, cell, debug_flag=debug_flag)
-
-    # Multiprocess all cells
-    results = []
+    for run_i, run in enumerate(runs):
+        run_data = run.data
+        memo = run.memo
+
+        # Output files are written by a background thread while the next
+        #   crop is simulated (see output_writer.py), pool workers write
+        #   directly
+        writer = None
+        if mp_procs == 1 and run.manifest is not None:
+            writer = output_writer.OutputWriter(
+                run.manifest.recording(crop_cycle.write_crop_output),
+                run_data.output_queue_size)
+
+        batch_cells = []
+        cell_count = 0
+        try:
+            for cell in run.run_cells:
+                cell_id = cell.cell_id
+                cell_count += 1
+                if memo is not None and not any(cell.crop_flags.values()):
+                    # All crops are written from the results of other cells
+                    logging.info('\nReusing results for node id ' + cell_id)
+                    continue
+                logging.info('\nProcessing node id' + cell_id +
+                             ' with name ' + cell.cell_name)
+                if run_data.mc_realizations:
+                    # Percentiles of the realizations are written instead
+                    #   of the crop output files
+                    logging.warning(run.cell_label(cell_id))
+                    if not cell.set_input_timeseries(
+                            cell_count, run_data, run.cells):
+                        sys.exit()
+                    param_ensemble.ensemble_cell(run_data, cell)
+                elif run_data.stream_years:
+                    # Cell is read and simulated window by window
+                    logging.warning(run.cell_label(cell_id))
+                    if not stream_cycle.stream_cell(
+                            cell_count, run_data, run.cells, cell,
+                            debug_flag, memo, run.manifest):
+                        sys.exit()
+                elif mp_procs > 1:
+                    # Input time series are read by the pool workers
+                    cell_mp_list.append((run_i, cell_count, cell))
+                elif batch_flag:
+                    logging.warning(run.cell_label(cell_id))
+                    if not cell.set_input_timeseries(
+                            cell_count, run_data, run.cells):
+                        sys.exit()
+                    batch_cells.append(cell)
+                    if len(batch_cells) >= run_data.cell_batch_size:
+                        crop_cycle.crop_cycle_batch(
+                            run_data, batch_cells, output_writer=writer,
+                            memo=memo)
+                        batch_cells = []
+                else:
+                    logging.warning(run.cell_label(cell_id))
+                    if not cell.set_input_timeseries(
+                            cell_count, run_data, run.cells):
+                        sys.exit()
+                    crop_cycle.crop_cycle(
+                        run_data, cell, debug_flag=debug_flag,
+                        output_writer=writer, memo=memo)
+            if batch_cells:
+                crop_cycle.crop_cycle_batch(
+                    run_data, batch_cells, output_writer=writer, memo=memo)
+        finally:
+            # Wait for all queued output files to be written
+            if writer is not None:
+                writer.join()
+        if mp_procs == 1:
+            run.finish()
+
+    # Multiprocess all cells and crops of all runs
+    failed_tasks = []
     if cell_mp_list:
-        pool = mp.Pool(mp_procs)
-        results = pool.imap(cell_mp, cell_mp_list, chunksize=1)
-        pool.close()
-        pool.join()
-        del pool, results
+        failed_tasks = crop_scheduler.run_cell_crop_pool(
+            runs, cell_mp_list, mp_procs)
+    if mp_procs > 1:
+        for run in runs:
+            run.finish()
+
+    # Outputs of failed tasks are missing, finished tasks are kept in the
+    #   run manifest so --resume only reruns the failed tasks
+    if failed_tasks:
+        logging.error('\nERROR: {} of the cell/crop tasks failed'.format(
+            len(failed_tasks)))
+        for scen_name, cell_id, crop_num in failed_tasks:
+            logging.error('  {}CellID: {}  {}'.format(
+                '' if scen_name is None else 'Scenario: {}  '.format(
+                    scen_name),
+                cell_id,
+                'input time series' if crop_num is None else
+                'Crop: {}'.format(crop_num)))
+        sys.exit(1)
 
     logging.warning('\nCROPET Run Completed')
     logging.info('\n{} seconds'.format(time.perf_counter()-clock_start))
@@ -192,77 +263,84 @@ def main(ini_path, log_level=logging.WARNING,
 
     if cal_flag and data.gs_output_flag:
         logging.warning('\nMean Annual growing season start/end dates')
-        for cell_id, cell in sorted(cells.et_cells_dict.items()):
-            logging.warning('CellID: {}'.format(cell_id))
-            for crop_num, crop in sorted(cell.crop_params.items()):
-                if cell.crop_flags[crop_num] == 0:
-                    continue
-                gs_output_path = os.path.join(
-                    data.gs_output_ws, '{0}_gs_crop_{1:02d}.csv'.format(
-                        cell_id, int(crop.class_number)))
-                gs_df = pd.read_csv(gs_output_path, header=0, comment='#',
-                                      sep=',')
-                # ignore first year to match gs summary output csv (added 8/27/2020)
-
-                # print(gs_df[1:])
-                gs_start_doy = int(round(gs_df[1:]['Start_DOY'].mean()))
-                gs_end_doy = int(round(gs_df[1:]['End_DOY'].mean()))
-                gs_start_dt = datetime.datetime.strptime(
-                    '2001_{:03d}'.format(gs_start_doy), '%Y_%j')
-                gs_end_dt = datetime.datetime.strptime(
-                    '2001_{:03d}'.format(gs_end_doy), '%Y_%j')
-                logging.warning(
-                    ('  Crop {crop:2d}:' +
-                     '  {start_dt.month}/{start_dt.day} - {end_dt.month}/'
-                     '{end_dt.day}').format(
-                        crop=crop_num, start_dt=gs_start_dt, end_dt=gs_end_dt))
-
-
-def cell_mp(tup):
-    """Pool multiprocessing friendly function
+        for run in runs:
+            for cell_id, cell in sorted(run.cells.et_cells_dict.items()):
+                logging.warning(run.cell_label(cell_id))
+                for crop_num, crop in sorted(cell.crop_params.items()):
+                    if cell.crop_flags[crop_num] == 0:
+                        continue
+                    gs_output_path = os.path.join(
+                        run.data.gs_output_ws,
+                        run.data.gs_name_format.replace(
+                            '%c', '%02d' % int(crop.class_number)) % cell_id)
+                    if run.data.cet_out['file_type'] != 'csv':
+                        gs_df = typed_ts.read_typed_ts(gs_output_path)
+                    else:
+                        gs_df = pd.read_csv(gs_output_path, header=0,
+                                            comment='#', sep=',')
+                    # ignore first year to match gs summary output csv (added 8/27/2020)
+
+                    # print(gs_df[1:])
+                    gs_start_doy = int(round(gs_df[1:]['Start_DOY'].mean()))
+                    gs_end_doy = int(round(gs_df[1:]['End_DOY'].mean()))
+                    gs_start_dt = datetime.datetime.strptime(
+                        '2001_{:03d}'.format(gs_start_doy), '%Y_%j')
+                    gs_end_dt = datetime.datetime.strptime(
+                        '2001_{:03d}'.format(gs_end_doy), '%Y_%j')
+                    logging.warning(
+                        ('  Crop {crop:2d}:' +
+                         '  {start_dt.month}/{start_dt.day} - {end_dt.month}/'
+                         '{end_dt.day}').format(
+                            crop=crop_num, start_dt=gs_start_dt, end_dt=gs_end_dt))
+
+
+def read_project_cells(data):
+    """Read crop tables and ET cell data of a project
 
     Parameters
     ---------
-    tup :
+    data :
+        configuration data from INI file, crop parameters and coefficients
+        are read into data
 
     Returns
     -------
-    :
+    cells : ETCellData
+        cells with static (and spatially calibrated) crop parameters and
+        coefficients, input time series are not read
 
     Notes
     -----
-    mp.Pool needs all inputs are packed into single tuple
-    Tuple is unpacked and and single processing version of function is called
+    Also used by crop_calibration.py
 
     """
 
-    return cell_sp(*tup)
-
-def cell_sp(cell_count, data, cell, mp_procs=1):
-    """Compute crop cycle for each cell
-
-    Parameters
-    ---------
-    cell_count : int
-        count of cell being processed
-    data : dict
-        configuration data
-    cell : dict
-        ETCell instance
-    mp_procs : int
-        number of processors
-        1 [default]
+    # Read crop type (aka class) specific parameters and coefficients
+    # Crop coefficients are constant for all cells
+    # Crop params can vary if CDL data are used but have base parameters
+    # File paths are read from INI
+    data.set_crop_params()
+    data.set_crop_coeffs()
+    if data.co2_flag:
+        data.set_crop_co2()
 
-    Returns
-    -------
-    None
+    # Read cell properties, crop flags and cuttings
+    cells = et_cell.ETCellData()
+    cells.set_cell_properties(data)
+    cells.set_cell_crops(data)
+    cells.set_cell_cuttings(data)
+    cells.filter_crops(data)
+    cells.filter_cells(data)
 
-    """
-    if not cell.set_input_timeseries(cell_count, data, cell):
-        sys.exit()
+    # First apply static crop parameters to all cells
+    # Could "cell" just inherit "data" values instead ????
+    cells.set_static_crop_params(data.crop_params)
+    cells.set_static_crop_coeffs(data.crop_coeffs)
 
-    print('CellID: {}'.format(cell.cell_id))
-    crop_cycle.crop_cycle(data, cell, debug_flag=False, mp_procs=mp_procs)
+    # Read spatially varying crop parameters
+    if data.spatial_cal_flag:
+        cells.set_spatial_crop_params(data.spatial_cal_ws)
+    return cells
 
 def is_valid_file(parser, arg):
     """checks if file is valid
@@ -356,11 +434,21 @@ def parse_args():
     parser.add_argument(
         '--cal', action='store_true', default=False,
         help="Display mean annual start/end dates to screen")
+    parser.add_argument(
+        '--resume', '--incremental', action='store_true', default=False,
+        help="Only run cells/crops whose inputs changed or that did not "
+             "finish in the previous run")
+    parser.add_argument(
+        '--ensemble', metavar='PATH', default=None,
+        type=lambda x: is_valid_file(parser, x),
+        help="Scenario file, run the project for each climate scenario")
     args = parser.parse_args()
 
     # Convert INI path to an absolute path if necessary
     if args.ini and os.path.isfile(os.path.abspath(args.ini)):
         args.ini = os.path.abspath(args.ini)
+    if args.ensemble:
+        args.ensemble = os.path.abspath(args.ensemble)
     return args
 
 
@@ -368,4 +456,5 @@ if __name__ == '__main__':
     args = parse_args()
     main(ini_path=args.ini, log_level=args.log_level,
          etcid_to_run=args.etcid, cal_flag=args.cal,
-         debug_flag=args.debug, mp_procs=args.multiprocessing)
+         debug_flag=args.debug, mp_procs=args.multiprocessing,
+         resume_flag=args.resume, ensemble_path=args.ensemble)
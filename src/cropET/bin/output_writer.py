@@ -0,0 +1,111 @@
+"""output_writer.py
+Defines OutputWriter class
+Called by mod_crop_et.py and crop_cycle.py
+
+Finished crop results are put on a bounded queue and a writer thread runs
+    the output aggregation, formatting and file writes while the next crop
+    is simulated
+The queue size bounds the number of finished crops held in memory, put()
+    blocks when the writer falls behind
+A queue size of 0 writes each crop in put() without a writer thread
+
+"""
+
+import logging
+import queue
+import sys
+import threading
+import traceback
+
+
+class OutputWriter:
+    """Background writer thread for crop output files
+
+    Attributes
+    ----------
+    write_func : function
+        called with the arguments passed to put()
+    max_queued : int
+        maximum number of finished crops waiting to be written, 0 writes
+        in put()
+    error : str
+        traceback of the first failed write, None if no write failed
+
+    Notes
+    -----
+    Cells and crop states put on the queue must not be modified afterwards,
+        crop day loops only read the cell time series so this holds for
+        crop_cycle() and crop_cycle_batch()
+    join() must be called before exiting so all files are complete
+
+    """
+
+    def __init__(self, write_func, max_queued=2):
+        self.write_func = write_func
+        self.max_queued = max_queued
+        self.error = None
+        self._failed = False
+        self._queue = None
+        self._thread = None
+        if max_queued > 0:
+            self._queue = queue.Queue(maxsize=max_queued)
+            self._thread = threading.Thread(
+                target=self._run, name='cet_output_writer', daemon=True)
+            self._thread.start()
+
+    def put(self, *args):
+        """Queue one crop output, blocking while the queue is full
+
+        Parameters
+        ---------
+        args :
+            write_func arguments
+
+        Returns
+        -------
+        None
+
+        """
+
+        if self._thread is None:
+            self.write_func(*args)
+            return
+        self._check_error()
+        self._queue.put(args)
+
+    def join(self):
+        """Write all queued outputs and stop the writer thread
+
+        Returns
+        -------
+        None
+
+        """
+
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._check_error()
+
+    def _run(self):
+        """Writer thread loop, stops on None"""
+        while True:
+            args = self._queue.get()
+            if args is None:
+                break
+            if self._failed:
+                # Drain the queue so put() never blocks after a failure
+                continue
+            try:
+                self.write_func(*args)
+            except (Exception, SystemExit):
+                self.error = traceback.format_exc()
+                self._failed = True
+
+    def _check_error(self):
+        """Exit if a queued write failed (reported once)"""
+        if self.error is not None:
+            error, self.error = self.error, None
+            logging.error('\nERROR: Writing crop output failed\n{}'.format(
+                error))
+            sys.exit()
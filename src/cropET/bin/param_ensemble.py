@@ -0,0 +1,387 @@
+"""param_ensemble.py
+Defines sample_realizations, run_realizations, ensemble_cell
+Called by mod_crop_et.py
+
+Monte Carlo runs (INI mc_realizations) simulate each cell and crop for
+    perturbed soil and crop parameters and write percentiles of the daily,
+    monthly and annual ETact and NIWR of the realizations instead of the
+    crop output files
+Realizations are the columns of the cross-cell batch day loop (see
+    crop_day_batch.py), the soil water balance state (depl_root, depl_ze,
+    zr, aw, ...) of all realizations is advanced together and the climate
+    input arrays of the cell are shared, not copied
+Perturbed parameters, multiplicative factor 1 + cv * N(0, 1) with the
+    coefficient of variation cv of the group (0 keeps the base value):
+    stn_whc : mc_cv_stn_whc, cell available water holding capacity
+    mad_initial, mad_midseason : mc_cv_mad, one factor for both
+    cn_coarse_soil, cn_medium_soil, cn_fine_soil : mc_cv_cn, one factor
+    rooting_depth_max : mc_cv_rooting_depth, depth of the root zone (cell
+        average soil depth is not used by the crop cycle)
+Factors are drawn from mc_seed for each cell and crop, so runs are
+    repeatable and cells share the same factors
+
+"""
+
+import copy
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import crop_cycle
+import crop_day_batch
+import crop_day_kernel
+import period_stats
+import text_writer
+
+# Perturbation group to (INI cv key, parameter attributes, maximum value)
+#   stn_whc is an ETCell attribute, the others CropParameters attributes
+PERTURB_GROUPS = [
+    ('stn_whc', ['stn_whc'], None),
+    ('mad', ['mad_initial', 'mad_midseason'], 100.),
+    ('cn', ['cn_coarse_soil', 'cn_medium_soil', 'cn_fine_soil'], 100.),
+    ('rooting_depth', ['rooting_depth_max'], None)]
+CELL_PARAMS = ['stn_whc']
+
+# Smallest perturbation factor, parameters stay positive
+MIN_FACTOR = 0.01
+
+# Realizations run together, bounds memory of the batch output array
+MC_CHUNK_SIZE = 500
+
+I_ET_ACT = crop_day_kernel.OUT_FIELDS.index('et_act')
+I_NIWR = crop_day_kernel.OUT_FIELDS.index('niwr')
+
+
+def sample_realizations(data, et_cell, crop):
+    """Draw perturbed parameter values of each realization
+
+    Parameters
+    ---------
+    data :
+        configuration data, mc_realizations, mc_seed and mc_cv are read
+        from INI
+    et_cell :
+        ETCell instance
+    crop :
+        CropParameters instance of et_cell
+
+    Returns
+    -------
+    : pandas.DataFrame
+        parameter values (columns) of each realization (rows)
+
+    """
+
+    n_real = data.mc_realizations
+    rng = np.random.RandomState(data.mc_seed)
+    samples = {}
+    for group, attrs, max_value in PERTURB_GROUPS:
+        # Factors are drawn for every group so a cv of 0 does not change
+        #   the draws of the groups after it
+        factor = np.maximum(
+            1 + data.mc_cv[group] * rng.standard_normal(n_real), MIN_FACTOR)
+        for attr in attrs:
+            base = getattr(et_cell if attr in CELL_PARAMS else crop, attr)
+            values = base * factor
+            if max_value is not None:
+                values = np.minimum(values, max_value)
+            samples[attr] = values
+    return pd.DataFrame(samples, index=pd.RangeIndex(n_real, name='Member'))
+
+
+def realization(et_cell, crop, params):
+    """Return copies of cell and crop with the parameters of a realization
+
+    Parameters
+    ---------
+    et_cell :
+        ETCell instance, input time series are shared with the copy
+    crop :
+        CropParameters instance of et_cell
+    params : pandas.Series
+        parameter values of the realization
+
+    Returns
+    -------
+    : tuple
+        ETCell and CropParameters copies
+
+    """
+
+    real_cell = copy.copy(et_cell)
+    real_crop = copy.copy(crop)
+    for attr, value in params.items():
+        setattr(real_cell if attr in CELL_PARAMS else real_crop, attr,
+                float(value))
+    return real_cell, real_crop
+
+
+def run_realizations(data, et_cell, crop, samples):
+    """Compute daily ETact and NIWR of each realization
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance with input time series set
+    crop :
+        CropParameters instance of et_cell
+    samples : pandas.DataFrame
+        parameter values of each realization (see sample_realizations)
+
+    Returns
+    -------
+    et_act : ndarray
+        daily ETact [day, realization]
+    niwr : ndarray
+        daily NIWR [day, realization]
+
+    Notes
+    -----
+    Realizations crop_day_batch() does not support are rerun with
+        run_crop_day_loop() one realization at a time
+
+    """
+
+    n_real = len(samples.index)
+    n_days = len(et_cell.refet_df.index)
+    et_act = np.empty((n_days, n_real))
+    niwr = np.empty((n_days, n_real))
+    inputs = None
+    curves, curve_valid, lentries = crop_cycle.crop_curve_arrays(data, et_cell)
+    for chunk_start in range(0, n_real, MC_CHUNK_SIZE):
+        # Initialize each realization, crop_df is only built if the
+        #   realization is run alone
+        runs, real_loops = [], []
+        for real_i in range(chunk_start, min(chunk_start + MC_CHUNK_SIZE,
+                                             n_real)):
+            real_cell, real_crop = realization(
+                et_cell, crop, samples.iloc[real_i])
+            foo, foo_day = crop_cycle.init_crop_day_loop(
+                data, real_cell, real_crop, dataframe_flag=False)
+            if inputs is None:
+                kernel_args = crop_cycle.kernel_inputs(
+                    data, real_cell, real_crop, foo)
+                cp = None if kernel_args is None else kernel_args[0]
+                inputs = {} if kernel_args is None else kernel_args[1]
+            else:
+                cp = crop_day_kernel.build_crop_param_array(
+                    data, real_cell, real_crop)
+            if cp is None or not inputs:
+                real_loops.append((real_i, real_cell, real_crop, foo, foo_day))
+            else:
+                runs.append((real_i, real_cell, real_crop, foo, foo_day, cp))
+        if runs:
+            # Realizations share the daily inputs of the cell
+            #   (see crop_day_batch.py)
+            n_runs = len(runs)
+            cp = np.stack([run[5] for run in runs], axis=1)
+            st = np.stack(
+                [crop_day_kernel.pack_state(run[3]) for run in runs], axis=1)
+            etref_array = np.stack(
+                [np.array(run[4].etref_array, dtype=np.float64)
+                 for run in runs], axis=1)
+            day_state = np.array(
+                [runs[0][4].sdays, runs[0][4].doy_prev], dtype=np.int64)
+            real_inputs = {
+                field: np.broadcast_to(
+                    inputs[field][:, None], (n_days, n_runs))
+                for field in ['pl_gu_doy', 'u2', 'precip', 'rh_min', 'etref',
+                              'snow_depth', 'tmean', 'tmin', 'tmax', 't30',
+                              'co2']}
+            out = np.full(
+                (n_days, len(crop_day_kernel.OUT_FIELDS), n_runs), np.nan)
+            season_array = np.zeros((n_days, n_runs), dtype=np.int64)
+            cutting_array = np.zeros((n_days, n_runs), dtype=np.int64)
+            events = np.zeros((n_days, n_runs), dtype=np.int64)
+            failed = np.full(n_runs, -1, dtype=np.int64)
+            crop_day_batch.crop_day_batch(
+                st, cp, curves, curve_valid, lentries, etref_array, day_state,
+                inputs['doy'], inputs['year'], inputs['month'], inputs['day'],
+                real_inputs['pl_gu_doy'], real_inputs['u2'],
+                real_inputs['precip'], real_inputs['rh_min'],
+                real_inputs['etref'], real_inputs['snow_depth'],
+                real_inputs['tmean'], real_inputs['tmin'],
+                real_inputs['tmax'], real_inputs['t30'], real_inputs['co2'],
+                out, season_array, cutting_array, events, failed)
+            for j, (real_i, real_cell, real_crop, foo, foo_day, _) in \
+                    enumerate(runs):
+                if failed[j] >= 0:
+                    logging.debug(
+                        '  Realization {} - batch stopped on day {}, '
+                        'running realization alone'.format(real_i, failed[j]))
+                    real_loops.append(
+                        (real_i, real_cell, real_crop, foo, foo_day))
+                    continue
+                et_act[:, real_i] = out[:, I_ET_ACT, j]
+                niwr[:, real_i] = out[:, I_NIWR, j]
+            del out, season_array, cutting_array, events
+
+        for real_i, real_cell, real_crop, foo, foo_day in real_loops:
+            foo.setup_dataframe(real_cell)
+            crop_cycle.run_crop_day_loop(
+                data, real_cell, real_crop, foo, foo_day)
+            et_act[:, real_i] = foo.crop_df['et_act'].values
+            niwr[:, real_i] = foo.crop_df['niwr'].values
+            foo.crop_df = None
+    return et_act, niwr
+
+
+def percentile_frame(dt_index, et_act, niwr, percentiles):
+    """Return percentiles of the realizations for each row
+
+    Parameters
+    ---------
+    dt_index : pandas.DatetimeIndex
+        dates of the rows
+    et_act, niwr : ndarray
+        values [row, realization]
+    percentiles : list
+        percentiles (0-100) to compute
+
+    Returns
+    -------
+    : pandas.DataFrame
+        ETact_P<n> and NIWR_P<n> fields indexed by Date
+
+    """
+
+    output_df = pd.DataFrame(index=dt_index.rename('Date'))
+    for field, values in [('ETact', et_act), ('NIWR', niwr)]:
+        pct_values = np.percentile(values, percentiles, axis=1)
+        for pct, pct_row in zip(percentiles, pct_values):
+            output_df['{}_P{:g}'.format(field, pct)] = pct_row
+    return output_df
+
+
+def period_sums(dt_index, values, freq):
+    """Return sums of each period and realization
+
+    Parameters
+    ---------
+    dt_index : pandas.DatetimeIndex
+        sorted daily dates
+    values : ndarray
+        daily values [day, realization]
+    freq : str
+        'MS' or 'AS' (see period_stats.period_bounds)
+
+    Returns
+    -------
+    labels : pandas.DatetimeIndex
+        period start dates
+    : ndarray
+        sums [period, realization], compensated as the crop output files
+
+    """
+
+    labels, starts = period_stats.period_bounds(dt_index, freq)
+    counts = np.diff(np.append(starts, len(dt_index)))
+    return labels, period_stats.compensated_sums(values, starts, counts)[0]
+
+
+def write_percentile_output(data, et_cell, crop, samples, et_act, niwr):
+    """Write percentile files and realization parameters of a cell and crop
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance
+    crop :
+        CropParameters instance of et_cell
+    samples : pandas.DataFrame
+        parameter values of each realization
+    et_act, niwr : ndarray
+        daily values [day, realization] (see run_realizations)
+
+    Returns
+    -------
+    None
+
+    """
+
+    dt_index = et_cell.refet_df.index
+    output_name = '{}_crop_{:02d}_{{}}.csv'.format(
+        et_cell.cell_id, int(crop.class_number))
+    header = '# {0:2d} - {1}, {2} realizations\n'.format(
+        crop.class_number, crop.name, len(samples.index))
+    outputs = []
+    if data.cet_out['daily_output_flag']:
+        # Daily NIWR is rounded as in the crop output files, period sums
+        #   are of the unrounded values
+        output_df = percentile_frame(
+            dt_index, et_act, np.round(niwr, 6), data.mc_percentiles)
+        output_df.insert(0, 'Year', dt_index.year)
+        output_df.insert(1, 'Month', dt_index.month)
+        output_df.insert(2, 'Day', dt_index.day)
+        output_df.insert(3, 'DOY', dt_index.dayofyear)
+        outputs.append(('daily', output_df, ['Month', 'Day', 'DOY']))
+    for output_type, freq, date_fields in [
+            ('monthly', 'MS', ['Month']), ('annual', 'AS', [])]:
+        if not data.cet_out['{}_output_flag'.format(output_type)]:
+            continue
+        labels, et_act_sums = period_sums(dt_index, et_act, freq)
+        niwr_sums = period_sums(dt_index, niwr, freq)[1]
+        output_df = percentile_frame(
+            labels, et_act_sums, niwr_sums, data.mc_percentiles)
+        output_df.insert(0, 'Year', labels.year)
+        if date_fields:
+            output_df.insert(1, 'Month', labels.month)
+        outputs.append((output_type, output_df, date_fields))
+
+    for output_type, output_df, date_fields in outputs:
+        float_format = data.cet_out['{}_float_format'.format(output_type)]
+        date_format = data.cet_out['{}_date_format'.format(output_type)]
+        formats = {}
+        if float_format is not None:
+            formats['Year'] = ' %4d'
+            formats.update({
+                field: {'Month': ' %2d', 'Day': ' %2d', 'DOY': ' %3d'}[field]
+                for field in date_fields})
+        output_path = os.path.join(
+            data.mc_output_ws, output_name.format(output_type))
+        with crop_cycle.atomic_output_path(output_path) as temp_path:
+            with open(temp_path, 'w', newline='') as output_f:
+                output_f.write(header)
+                text_writer.write_csv(
+                    output_df, output_f, float_format=float_format,
+                    date_format=date_format, formats=formats)
+
+    # Parameter values of each realization, percentiles can be traced back
+    output_path = os.path.join(
+        data.mc_output_ws, output_name.format('realizations'))
+    with crop_cycle.atomic_output_path(output_path) as temp_path:
+        with open(temp_path, 'w', newline='') as output_f:
+            output_f.write(header)
+            text_writer.write_csv(samples, output_f)
+
+
+def ensemble_cell(data, et_cell):
+    """Compute crop ET percentiles of the realizations for all crops of a cell
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance with input time series set
+
+    Returns
+    -------
+    None
+
+    """
+
+    for crop_num, crop in sorted(et_cell.crop_params.items()):
+        if et_cell.crop_flags[crop_num] == 0:
+            continue
+        logging.warning('Crop {} - {} ({} realizations)'.format(
+            crop.class_number, crop.name, data.mc_realizations))
+        samples = sample_realizations(data, et_cell, crop)
+        et_act, niwr = run_realizations(data, et_cell, crop, samples)
+        write_percentile_output(data, et_cell, crop, samples, et_act, niwr)
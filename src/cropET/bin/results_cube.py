@@ -0,0 +1,204 @@
+"""results_cube.py
+Defines ResultsCube class, write_cube_chunk, chunk_path
+Called by crop_cycle.py
+
+Daily crop results for a run are stored in one chunked array store
+    (cell x crop x day x variable) instead of per cell and crop csv files
+Store layout (a Zarr style directory, numpy only):
+    <cube_ws>/cube.json : variables and store version
+    <cube_ws>/<cell_id>/dates.npy : datetime64[D] dates of the cell
+    <cube_ws>/<cell_id>/crop_<NN>.npy : float64 array (day, variable)
+Each (cell, crop) chunk is written once to a temporary file and renamed,
+    so workers can write chunks concurrently without locking
+Chunks are opened memory mapped, slicing one cell, crop or year only
+    reads the pages needed
+
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CUBE_VERSION = 1
+
+# Crop data frame columns stored in the cube, in chunk column order
+CUBE_VARIABLES = [
+    'etref', 'et_act', 'et_pot', 'et_bas', 'kc_act', 'kc_bas', 'ppt',
+    'irrigation', 'runoff', 'dperc', 'p_rz', 'p_eft', 'niwr', 'season',
+    'cutting']
+
+CUBE_FILE = 'cube.json'
+DATES_FILE = 'dates.npy'
+
+
+def write_cube_chunk(cube_ws, cell_id, crop_num, crop_df, ppt):
+    """Write daily results of one cell and crop to the cube
+
+    Parameters
+    ---------
+    cube_ws : str
+        results cube folder
+    cell_id : str
+        ET cell ID
+    crop_num : int
+        crop class number
+    crop_df : pandas.DataFrame
+        daily crop results (crop cycle foo.crop_df)
+    ppt : pandas.Series
+        daily precipitation of the cell
+
+    Returns
+    -------
+    None
+
+    """
+
+    if not os.path.isfile(os.path.join(cube_ws, CUBE_FILE)):
+        _write_atomic(
+            os.path.join(cube_ws, CUBE_FILE),
+            json.dumps({'version': CUBE_VERSION,
+                        'variables': CUBE_VARIABLES}).encode('utf-8'))
+    cell_ws = os.path.join(cube_ws, str(cell_id))
+    if not os.path.isdir(cell_ws):
+        os.makedirs(cell_ws, exist_ok=True)
+
+    dates = crop_df.index.values.astype('datetime64[D]')
+    dates_path = os.path.join(cell_ws, DATES_FILE)
+    if not os.path.isfile(dates_path):
+        _save_atomic(dates_path, dates)
+
+    chunk = np.empty((len(dates), len(CUBE_VARIABLES)), dtype=np.float64)
+    for i, variable in enumerate(CUBE_VARIABLES):
+        if variable == 'ppt':
+            chunk[:, i] = ppt.reindex(crop_df.index).values
+        else:
+            chunk[:, i] = crop_df[variable].values
+    # This will convert negative "zeros" to positive (as daily output files)
+    niwr_i = CUBE_VARIABLES.index('niwr')
+    chunk[:, niwr_i] = np.round(chunk[:, niwr_i], 6)
+    _save_atomic(chunk_path(cube_ws, cell_id, crop_num), chunk)
+
+
+def chunk_path(cube_ws, cell_id, crop_num):
+    """Return file path of the chunk of one cell and crop"""
+    return os.path.join(cube_ws, str(cell_id), _chunk_name(crop_num))
+
+
+class ResultsCube:
+    """Read only access to a results cube written by write_cube_chunk()
+
+    Attributes
+    ----------
+    cube_ws : str
+        results cube folder
+    variables : list
+        variable names of the chunk columns
+
+    """
+
+    def __init__(self, cube_ws):
+        self.cube_ws = cube_ws
+        with open(os.path.join(cube_ws, CUBE_FILE)) as f:
+            cube_info = json.load(f)
+        self.variables = cube_info['variables']
+
+    def cells(self):
+        """Return sorted cell IDs in the cube"""
+        return sorted(
+            name for name in os.listdir(self.cube_ws)
+            if os.path.isdir(os.path.join(self.cube_ws, name)))
+
+    def crops(self, cell_id):
+        """Return sorted crop numbers of a cell"""
+        return sorted(
+            int(name[5:-4]) for name in os.listdir(
+                os.path.join(self.cube_ws, str(cell_id)))
+            if name.startswith('crop_') and name.endswith('.npy'))
+
+    def dates(self, cell_id):
+        """Return dates of a cell as a pandas.DatetimeIndex"""
+        return pd.DatetimeIndex(np.load(
+            os.path.join(self.cube_ws, str(cell_id), DATES_FILE)))
+
+    def read(self, cell_id, crop_num, start=None, end=None, variables=None):
+        """Read daily results of one cell and crop
+
+        Parameters
+        ---------
+        cell_id : str
+            ET cell ID
+        crop_num : int
+            crop class number
+        start : str or datetime
+            first date to read (inclusive), None [default] for first date
+        end : str or datetime
+            last date to read (inclusive), None [default] for last date
+        variables : list
+            variables to read, None [default] reads all variables
+
+        Returns
+        -------
+        : pandas.DataFrame
+            indexed by Date
+
+        """
+
+        dates = self.dates(cell_id)
+        start_i = 0 if start is None else dates.searchsorted(
+            pd.Timestamp(start), side='left')
+        end_i = len(dates) if end is None else dates.searchsorted(
+            pd.Timestamp(end), side='right')
+        if variables is None:
+            variables = self.variables
+        columns = [self.variables.index(variable) for variable in variables]
+        chunk = np.load(
+            os.path.join(self.cube_ws, str(cell_id), _chunk_name(crop_num)),
+            mmap_mode='r')
+        return pd.DataFrame(
+            np.array(chunk[start_i:end_i, columns]),
+            index=pd.DatetimeIndex(dates[start_i:end_i], name='Date'),
+            columns=variables)
+
+    def read_year(self, cell_id, crop_num, year, variables=None):
+        """Read one year of daily results of one cell and crop"""
+        return self.read(
+            cell_id, crop_num, start='{}-01-01'.format(year),
+            end='{}-12-31'.format(year), variables=variables)
+
+    def read_cell(self, cell_id, **kwargs):
+        """Read all crops of one cell as {crop_num: DataFrame}"""
+        return {crop_num: self.read(cell_id, crop_num, **kwargs)
+                for crop_num in self.crops(cell_id)}
+
+    def read_crop(self, crop_num, **kwargs):
+        """Read one crop of all cells as {cell_id: DataFrame}"""
+        return {cell_id: self.read(cell_id, crop_num, **kwargs)
+                for cell_id in self.cells()
+                if os.path.isfile(os.path.join(
+                    self.cube_ws, cell_id, _chunk_name(crop_num)))}
+
+
+def _chunk_name(crop_num):
+    """Return chunk file name of a crop"""
+    return 'crop_{:02d}.npy'.format(int(crop_num))
+
+
+def _save_atomic(path, array):
+    """Save array to .npy file through a temporary file"""
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, array)
+    os.replace(temp_path, path)
+
+
+def _write_atomic(path, contents):
+    """Write bytes to file through a temporary file"""
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(contents)
+    os.replace(temp_path, path)
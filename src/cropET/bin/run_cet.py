@@ -13,7 +13,8 @@ import sys
 
 def main(ini_path, bin_ws = '', verbose_flag = False,
         etcid_to_run = 'ALL', cal_flag = False,
-        debug_flag = False, mp_procs = 1):
+        debug_flag = False, mp_procs = 1, resume_flag = False,
+        ensemble_path = None):
     """Wrapper for running crop et model
 
     Arguments
@@ -33,6 +34,10 @@ def main(ini_path, bin_ws = '', verbose_flag = False,
         True : write debug level comments to debug.txt
     mp_procs : int
         number of cores to use
+    resume_flag : boolean
+        True : skip cell/crop outputs finished by the previous run
+    ensemble_path : str
+        file path of a scenario file, run the project for each scenario
 
     Returns
     -------
@@ -47,6 +52,9 @@ def main(ini_path, bin_ws = '', verbose_flag = False,
     -d, --debug, debug_flag : save debug level comments to debug.txt
     -mp, --multiprocessing, mp_procs : number of processers to use
     --cal, cal_flag : display mean annual start/end dates to screen
+    --resume, --incremental, resume_flag : only run changed or unfinished
+        cells/crops
+    --ensemble, ensemble_path : scenario file of an ensemble run
 
     """
 
@@ -80,6 +88,10 @@ def main(ini_path, bin_ws = '', verbose_flag = False,
         args_list.append('--cal')
     if mp_procs > 1:
         args_list.extend(['-mp', str(mp_procs)])
+    if resume_flag:
+        args_list.append('--resume')
+    if ensemble_path:
+        args_list.extend(['--ensemble', ensemble_path])
     subprocess.call(args_list)
 
 def parse_args():
@@ -108,11 +120,21 @@ def parse_args():
     parser.add_argument(
         '--cal', action = 'store_true', default = False,
         help = "Display mean annual start/end dates to screen")
+    parser.add_argument(
+        '--resume', '--incremental', action = 'store_true', default = False,
+        help = "Only run cells/crops whose inputs changed or that did not "
+               "finish in the previous run")
+    parser.add_argument(
+        '--ensemble', metavar='PATH', default=None,
+        type = lambda x: is_valid_file(parser, x),
+        help = "Scenario file, run the project for each climate scenario")
     args = parser.parse_args()
 
     # Convert INI path to an absolute path if necessary
     if args.ini and os.path.isfile(os.path.abspath(args.ini)):
         args.ini = os.path.abspath(args.ini)
+    if args.ensemble:
+        args.ensemble = os.path.abspath(args.ensemble)
 
     # Convert source code dir to an absolute path if necessary
     if args.bin and os.path.isfile(os.path.abspath(args.bin)):
@@ -148,4 +170,5 @@ if __name__ == '__main__':
         ini_path = get_ini_path(os.getcwd())
     main(ini_path, bin_ws = args.bin, verbose_flag=args.verbose,
         etcid_to_run = args.etcid, cal_flag = args.cal,
-        debug_flag = args.debug, mp_procs=args.multiprocessing)
+        debug_flag = args.debug, mp_procs=args.multiprocessing,
+        resume_flag = args.resume, ensemble_path = args.ensemble)
@@ -0,0 +1,397 @@
+"""run_manifest.py
+Defines RunManifest class, settings_fingerprint, cell_fingerprint,
+    task_fingerprint
+Called by mod_crop_et.py, crop_scheduler.py and sim_memo.py
+
+The run manifest records each finished (cell, crop) task with its output
+    file paths and an input fingerprint, so an interrupted or edited run
+    can be resumed (mod_crop_et.py --resume) recomputing only the tasks
+    whose inputs changed
+Task fingerprints only cover the inputs the task actually uses:
+    cell time series file contents, the cell properties and cuttings,
+    the crop parameters (after spatial calibration), the crop coefficient
+    curves and the INI settings used by the simulation
+Manifest file (JSON lines) in the project folder:
+    first line : manifest version and settings fingerprint
+    other lines : one finished task each
+A task line is appended with a single write after all of the task output
+    files have been renamed into place (see crop_cycle.atomic_output_path),
+    a line cut short by a crash is ignored when the manifest is read
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+import climate_cache
+import crop_cycle
+import crop_parameters
+
+# Increment if the manifest contents or the fingerprints change
+MANIFEST_VERSION = 3
+
+MANIFEST_NAME = 'cet_manifest.jsonl'
+
+# INI settings (CropETData attributes) used by the simulation and output
+#   formats, input file contents are fingerprinted by task
+SETTINGS_FIELDS = [
+    'start_dt', 'end_dt', 'time_step', 'ts_quantity', 'refet', 'weather',
+    'hist_temps', 'phenology_option', 'co2_flag', 'co2_grass_crops',
+    'co2_tree_crops', 'co2_c4_crops', 'crop_one_flag', 'crop_one_reducer',
+    'cutting_flag', 'kc_flag', 'niwr_flag', 'gs_limit_flag',
+    'annual_skip_flag', 'perennial_skip_flag', 'elev_units', 'cet_out',
+    'gs_name_format', 'et_ratios_delimiter', 'et_ratios_header_lines',
+    'et_ratios_names_line', 'et_ratios_name_field', 'et_ratios_id_field',
+    'et_ratios_month_field', 'et_ratios_ratio_field']
+
+# ETCell properties (ETCellsProperties and cuttings files) used by the
+#   simulation, only the sign of the latitude is used (winter months) and
+#   cell_id only names the output files
+CELL_FIELDS = [
+    'refet_id', 'air_pressure', 'aridity_rating', 'stn_whc', 'stn_soildepth',
+    'stn_hydrogroup', 'dairy_cuttings', 'beef_cuttings']
+
+# Alfalfa cutting cycles use the next two crop coefficient curves
+CURVE_OFFSETS = [0, 1, 2]
+
+
+def settings_fingerprint(data):
+    """Return fingerprint of the INI settings used by all tasks
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+
+    Returns
+    -------
+    : str
+        md5 of the SETTINGS_FIELDS values
+
+    """
+
+    fingerprint = hashlib.md5(repr([MANIFEST_VERSION]).encode('utf-8'))
+    _update_fingerprint(
+        fingerprint, [getattr(data, field, None) for field in SETTINGS_FIELDS])
+    return fingerprint.hexdigest()
+
+
+def cell_fingerprint(data, et_cell, settings_hash=None):
+    """Return fingerprint of the cell inputs shared by all crops
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance
+    settings_hash : str
+        settings_fingerprint(data), computed if None [default]
+
+    Returns
+    -------
+    : str
+        None if a cell input file is missing
+
+    Notes
+    -----
+    Cells with the same fingerprint have the same processed time series
+
+    """
+
+    if settings_hash is None:
+        settings_hash = settings_fingerprint(data)
+    fingerprint = hashlib.md5(settings_hash.encode('utf-8'))
+    for input_path in climate_cache.cell_input_paths(data, et_cell):
+        input_hash = climate_cache.file_hash(input_path)
+        if input_hash is None:
+            return None
+        fingerprint.update(input_hash.encode('utf-8'))
+    _update_fingerprint(
+        fingerprint, [getattr(et_cell, field, None) for field in CELL_FIELDS])
+    _update_fingerprint(fingerprint, [et_cell.latitude > 0])
+    return fingerprint.hexdigest()
+
+
+def task_fingerprint(data, et_cell, crop, settings_hash=None, cell_hash=None):
+    """Return fingerprint of the effective inputs of one cell and crop
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance
+    crop :
+        CropParameters instance of the cell
+    settings_hash : str
+        settings_fingerprint(data), computed if None [default]
+    cell_hash : str
+        cell_fingerprint() of et_cell, computed if None [default]
+
+    Returns
+    -------
+    : str
+        None if a cell input file is missing
+
+    Notes
+    -----
+    Cells with the same inputs (other than cell_id) get the same fingerprint
+        and the same crop results
+
+    """
+
+    if cell_hash is None:
+        cell_hash = cell_fingerprint(data, et_cell, settings_hash)
+        if cell_hash is None:
+            return None
+    fingerprint = hashlib.md5(cell_hash.encode('utf-8'))
+    _update_fingerprint(fingerprint, sorted(crop_parameters.slot_items(crop)))
+    for offset in CURVE_OFFSETS:
+        crop_coeff = et_cell.crop_coeffs.get(crop.curve_number + offset)
+        if crop_coeff is not None:
+            _update_fingerprint(
+                fingerprint, sorted(crop_parameters.slot_items(crop_coeff)))
+    return fingerprint.hexdigest()
+
+
+def _update_fingerprint(fingerprint, values):
+    """Add values to md5, arrays by their bytes (repr abbreviates them)"""
+    for value in values:
+        if isinstance(value, tuple):
+            _update_fingerprint(fingerprint, value)
+        elif isinstance(value, np.ndarray):
+            fingerprint.update('{}{}'.format(
+                value.dtype.str, value.shape).encode('utf-8'))
+            fingerprint.update(np.ascontiguousarray(value).tobytes())
+        else:
+            fingerprint.update(repr(value).encode('utf-8'))
+
+
+class RunManifest:
+    """Finished (cell, crop) tasks of a run
+
+    Attributes
+    ----------
+    path : str
+        manifest file path
+    fingerprint : str
+        settings fingerprint (see settings_fingerprint())
+    tasks : dict
+        (cell_id, crop_num) to finished task entry
+
+    Notes
+    -----
+    Tasks are recorded by the process that sees the outputs finish, the
+        output writer thread or the pool parent (see crop_scheduler.py)
+
+    """
+
+    def __init__(self, data, resume_flag=False):
+        """Start a new manifest or continue the manifest of a resumed run
+
+        Parameters
+        ---------
+        data :
+            configuration data from INI file
+        resume_flag : boolean
+            True : keep tasks finished by the previous run
+            False [default] : start a new manifest
+
+        """
+
+        self.data = data
+        self.path = os.path.join(data.project_ws, MANIFEST_NAME)
+        self.fingerprint = settings_fingerprint(data)
+        self.tasks = self.read() if resume_flag else {}
+        self._crop_flags = {}
+        self._lock = threading.Lock()
+
+        # Rewrite the kept tasks so the appended lines follow complete lines
+        lines = [json.dumps({
+            'version': MANIFEST_VERSION, 'fingerprint': self.fingerprint})]
+        lines.extend(json.dumps(entry) for entry in self.tasks.values())
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, self.path)
+        self._f = open(self.path, 'a')
+
+    def read(self):
+        """Read finished tasks of the previous run
+
+        Returns
+        -------
+        : dict
+            (cell_id, crop_num) to task entry, empty if the manifest is
+            missing or from another manifest version
+
+        """
+
+        if not os.path.isfile(self.path):
+            logging.warning(
+                '  Run manifest not found, running all cells and crops')
+            return {}
+        tasks = {}
+        with open(self.path) as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = {}
+            if header.get('version') != MANIFEST_VERSION:
+                logging.warning(
+                    '  Run manifest version changed, '
+                    'running all cells and crops')
+                return {}
+            if header.get('fingerprint') != self.fingerprint:
+                logging.warning(
+                    '  INI settings changed, running all cells and crops')
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                tasks[(entry['cell_id'], entry['crop_num'])] = entry
+        logging.warning(
+            '  Resuming run, {} cell/crop tasks recorded, tasks with changed '
+            'inputs are rerun'.format(len(tasks)))
+        return tasks
+
+    def task_fingerprint(self, et_cell, crop):
+        """Return fingerprint of one cell and crop (see task_fingerprint())"""
+        return task_fingerprint(
+            self.data, et_cell, crop, settings_hash=self.fingerprint)
+
+    def is_finished(self, et_cell, crop):
+        """Return True if the task finished with the same inputs and outputs
+
+        Parameters
+        ---------
+        et_cell :
+            ETCell instance
+        crop :
+            CropParameters instance
+
+        Returns
+        -------
+        : boolean
+
+        """
+
+        entry = self.tasks.get((str(et_cell.cell_id), int(crop.class_number)))
+        if entry is None:
+            return False
+        output_paths = sorted(crop_cycle.crop_output_paths(
+            self.data, et_cell, crop).values())
+        return (
+            entry['fingerprint'] is not None and
+            entry['fingerprint'] == self.task_fingerprint(et_cell, crop) and
+            entry['outputs'] == output_paths and
+            all(os.path.isfile(path) for path in output_paths))
+
+    def skip_finished(self, et_cell):
+        """Turn off crops of a cell that are finished
+
+        Parameters
+        ---------
+        et_cell :
+            ETCell instance, crop_flags are replaced if any crop is finished
+
+        Returns
+        -------
+        : int
+            number of crops left to run
+
+        Notes
+        -----
+        restore_crop_flags() sets the flags back once the run is done
+
+        """
+
+        crop_flags = dict(et_cell.crop_flags)
+        for crop_num, crop in et_cell.crop_params.items():
+            if crop_flags.get(crop_num, 0) and self.is_finished(
+                    et_cell, crop):
+                crop_flags[crop_num] = 0
+        if crop_flags != et_cell.crop_flags:
+            self._crop_flags[et_cell.cell_id] = et_cell.crop_flags
+            et_cell.crop_flags = crop_flags
+        return sum(
+            1 for crop_num in et_cell.crop_params.keys()
+            if crop_flags.get(crop_num, 0))
+
+    def restore_crop_flags(self, cells):
+        """Set crop flags turned off by skip_finished() back
+
+        Parameters
+        ---------
+        cells :
+            ETCellData instance
+
+        Returns
+        -------
+        None
+
+        """
+
+        for cell_id, crop_flags in self._crop_flags.items():
+            cells.et_cells_dict[cell_id].crop_flags = crop_flags
+        self._crop_flags = {}
+
+    def record(self, et_cell, crop):
+        """Append finished task to the manifest
+
+        Parameters
+        ---------
+        et_cell :
+            ETCell instance
+        crop :
+            CropParameters instance
+
+        Returns
+        -------
+        None
+
+        """
+
+        entry = {
+            'cell_id': str(et_cell.cell_id),
+            'crop_num': int(crop.class_number),
+            'fingerprint': self.task_fingerprint(et_cell, crop),
+            'outputs': sorted(crop_cycle.crop_output_paths(
+                self.data, et_cell, crop).values())}
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            self.tasks[(entry['cell_id'], entry['crop_num'])] = entry
+
+    def recording(self, write_func):
+        """Return write function that records each task once written
+
+        Parameters
+        ---------
+        write_func : function
+            crop_cycle.write_crop_output or same arguments
+
+        Returns
+        -------
+        : function
+
+        """
+
+        def write_and_record(crop_count, data, et_cell, crop, foo):
+            write_func(crop_count, data, et_cell, crop, foo)
+            self.record(et_cell, crop)
+        return write_and_record
+
+    def close(self):
+        """Close the manifest file"""
+        self._f.close()
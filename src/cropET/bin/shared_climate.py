@@ -0,0 +1,137 @@
+"""shared_climate.py
+Defines publish_cell_frames, attach_cell_frames, release_cell_frames
+Called by crop_scheduler.py
+
+ET cell time series frames are written once to memory mapped .npy files
+    so multiprocessing workers can attach to them instead of receiving
+    pickled copies of the data frames with every task.
+Workers map the files copy-on-write, pages are shared between processes
+    until a worker modifies them.
+
+"""
+
+import copy
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# ETCell time series frames used by crop day loop
+FRAME_NAMES = ['climate_df', 'refet_df']
+
+
+def publish_cell_frames(et_cell, frame_names=FRAME_NAMES):
+    """Write ET cell time series frames to memory mapped files
+
+    Parameters
+    ---------
+    et_cell : ETCell
+        cell with input time series set
+    frame_names : list
+        ETCell data frame attributes to publish
+
+    Returns
+    -------
+    light_cell : ETCell
+        shallow copy of et_cell without data frame attributes
+    spec : dict
+        file paths and columns needed by attach_cell_frames()
+
+    Notes
+    -----
+    Frames with object columns are left on light_cell and are pickled
+        as before
+    Data frames not in frame_names and climate features are dropped
+        from light_cell
+
+    """
+    ws = tempfile.mkdtemp(prefix='cet_shared_')
+    spec = {'ws': ws, 'frames': {}}
+    light_cell = copy.copy(et_cell)
+    # Climate features are rebuilt by the workers (see ETCell)
+    light_cell.reset_climate_features()
+    for name, value in vars(et_cell).items():
+        if isinstance(value, pd.DataFrame) and name not in frame_names:
+            delattr(light_cell, name)
+    for name in frame_names:
+        frame_df = getattr(et_cell, name, None)
+        if frame_df is None or (frame_df.dtypes == object).any():
+            continue
+        index_path = os.path.join(ws, '{}_index.npy'.format(name))
+        np.save(index_path, frame_df.index.values)
+
+        # One 2D array per dtype [column, row]
+        blocks = []
+        for dtype in frame_df.dtypes.unique():
+            columns = [
+                col for col in frame_df.columns
+                if frame_df[col].dtype == dtype]
+            block_path = os.path.join(
+                ws, '{}_{}.npy'.format(name, len(blocks)))
+            np.save(block_path, np.ascontiguousarray(frame_df[columns].values.T))
+            blocks.append((block_path, columns))
+        spec['frames'][name] = {
+            'index_path': index_path, 'index_name': frame_df.index.name,
+            'columns': list(frame_df.columns), 'blocks': blocks}
+        setattr(light_cell, name, None)
+    return light_cell, spec
+
+
+def attach_cell_frames(light_cell, spec):
+    """Rebuild ET cell data frames on memory mapped files
+
+    Parameters
+    ---------
+    light_cell : ETCell
+        cell returned by publish_cell_frames(), updated in place
+    spec : dict
+        spec returned by publish_cell_frames()
+
+    Returns
+    -------
+    light_cell : ETCell
+
+    """
+    for name, frame in spec['frames'].items():
+        index = pd.Index(
+            _load(frame['index_path']), name=frame['index_name'])
+        columns = frame['columns']
+        block_path, block_columns = frame['blocks'][0]
+        frame_df = pd.DataFrame(
+            _load(block_path).T, index=index, columns=block_columns,
+            copy=False)
+
+        # Remaining columns are inserted in their original order
+        inserts = []
+        for block_path, block_columns in frame['blocks'][1:]:
+            block = _load(block_path)
+            inserts.extend(
+                (columns.index(col), col, block[i])
+                for i, col in enumerate(block_columns))
+        for loc, col, values in sorted(inserts, key=lambda x: x[0]):
+            frame_df.insert(loc, col, values)
+        setattr(light_cell, name, frame_df)
+    return light_cell
+
+
+def release_cell_frames(spec):
+    """Remove memory mapped files once all workers are done
+
+    Parameters
+    ---------
+    spec : dict
+        spec returned by publish_cell_frames()
+
+    Returns
+    -------
+    None
+
+    """
+    shutil.rmtree(spec['ws'], ignore_errors=True)
+
+
+def _load(path):
+    """Map .npy file copy-on-write as plain ndarray"""
+    return np.asarray(np.load(path, mmap_mode='c'))
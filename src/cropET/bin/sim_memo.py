@@ -0,0 +1,116 @@
+"""sim_memo.py
+Defines SimulationMemo class
+Called by mod_crop_et.py, crop_cycle.py and crop_scheduler.py
+
+Cells that use the same station time series, soil properties and crop
+    parameters give bit-identical crop results
+Each (cell, crop) simulation is keyed by run_manifest.task_fingerprint(),
+    which does not include cell_id
+The first cell of each key in run order (the leader) is simulated and its
+    results are written under the name of every other cell with that key
+    (the followers), follower crops are turned off so they are not run again
+Follower cells that have no crops left to run are not read at all
+
+"""
+
+import logging
+
+import run_manifest
+
+
+class SimulationMemo:
+    """Leaders and followers of the (cell, crop) simulations of a run
+
+    Attributes
+    ----------
+    task_count : int
+        number of (cell, crop) tasks planned
+    sim_count : int
+        number of distinct simulations
+
+    """
+
+    def __init__(self, data, et_cells):
+        """Key all active (cell, crop) tasks and turn off follower crops
+
+        Parameters
+        ---------
+        data :
+            configuration data from INI file
+        et_cells : list
+            ETCell instances in run order, input time series are not needed
+
+        Notes
+        -----
+        restore_crop_flags() sets the follower crop flags back once the run
+            is done
+
+        """
+
+        settings_hash = run_manifest.settings_fingerprint(data)
+        leaders = {}
+        self._followers = {}
+        self._crop_flags = {}
+        self.task_count = 0
+        for et_cell in et_cells:
+            cell_hash = run_manifest.cell_fingerprint(
+                data, et_cell, settings_hash)
+            crop_flags = dict(et_cell.crop_flags)
+            crop_count = 0
+            for crop_num, crop in sorted(et_cell.crop_params.items()):
+                if not crop_flags.get(crop_num, 0):
+                    continue
+                crop_count += 1
+                self.task_count += 1
+                if cell_hash is None:
+                    continue
+                key = run_manifest.task_fingerprint(
+                    data, et_cell, crop, cell_hash=cell_hash)
+                if key not in leaders:
+                    leaders[key] = (et_cell.cell_id, crop_num)
+                    continue
+                self._followers.setdefault(leaders[key], []).append(
+                    (crop_count, et_cell))
+                crop_flags[crop_num] = 0
+            if crop_flags != et_cell.crop_flags:
+                self._crop_flags[et_cell.cell_id] = (
+                    et_cell, et_cell.crop_flags)
+                et_cell.crop_flags = crop_flags
+        self.sim_count = self.task_count - sum(
+            len(followers) for followers in self._followers.values())
+        if self.sim_count < self.task_count:
+            logging.warning(
+                '  {} cell/crop tasks, {} distinct simulations'.format(
+                    self.task_count, self.sim_count))
+
+    def followers(self, et_cell, crop_num):
+        """Return cells reusing the results of a leader cell and crop
+
+        Parameters
+        ---------
+        et_cell :
+            ETCell instance
+        crop_num : int
+            crop class number
+
+        Returns
+        -------
+        : list
+            (crop_count, ETCell) of each follower, empty if none
+
+        """
+
+        return self._followers.get((et_cell.cell_id, crop_num), [])
+
+    def restore_crop_flags(self):
+        """Set follower crop flags back
+
+        Returns
+        -------
+        None
+
+        """
+
+        for et_cell, crop_flags in self._crop_flags.values():
+            et_cell.crop_flags = crop_flags
+        self._crop_flags = {}
@@ -0,0 +1,157 @@
+"""station_cache.py
+Defines StationCache class and frame_key
+Called by crop_et_data.py, et_cell.py and crop_scheduler.py
+
+Parsed station input frames (RefET, weather, historical temperatures and
+    the ETo/ETr ratios table) are kept in a bounded LRU cache so ET cells
+    that share a station (refet_id) skip reading and parsing the files
+Frames are keyed by station ID and the INI settings used to read them
+
+"""
+
+import collections
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+
+def frame_key(kind, station_id, *settings):
+    """Build cache key for a station input frame
+
+    Parameters
+    ---------
+    kind : str
+        input type ('refet', 'weather', 'hist_temps', 'refet_ratios')
+    station_id :
+        station ID or file path
+    settings :
+        INI values used to read and convert the frame
+
+    Returns
+    -------
+    : tuple
+
+    """
+
+    return (kind, str(station_id), repr(settings))
+
+
+class StationCache:
+    """Bounded LRU cache of parsed station input frames
+
+    Attributes
+    ----------
+    size : int
+        maximum number of frames kept in memory, 0 disables the cache
+    shared_ws : str
+        folder shared by multiprocessing workers, None for in memory only
+    frames : collections.OrderedDict
+        cached frames, least recently used first
+
+    Notes
+    -----
+    Frames are copied on put() and get() so cells can modify them in place
+    Frames in shared_ws are written once by the first worker that reads
+        the station and are loaded by the other workers instead of
+        parsing the input files again
+    Only settings are pickled, each process has its own in memory frames
+
+    """
+
+    def __init__(self, size=30, shared_ws=None):
+        self.size = size
+        self.shared_ws = shared_ws
+        self.frames = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['frames'] = collections.OrderedDict()
+        return state
+
+    def get(self, key):
+        """Return copy of cached frame or None if it is not cached
+
+        Parameters
+        ---------
+        key : tuple
+            key from frame_key()
+
+        Returns
+        -------
+        : pandas.DataFrame or None
+
+        """
+
+        if self.size < 1:
+            return None
+        if key in self.frames:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return self.frames[key].copy()
+        if self.shared_ws is not None:
+            shared_path = self._shared_path(key)
+            if os.path.isfile(shared_path):
+                try:
+                    with open(shared_path, 'rb') as f:
+                        frame_df = pickle.load(f)
+                except Exception:
+                    logging.debug('  Unable to read cached frame {}'.format(
+                        shared_path))
+                else:
+                    self._store(key, frame_df)
+                    self.hits += 1
+                    return frame_df.copy()
+        self.misses += 1
+        return None
+
+    def put(self, key, frame_df):
+        """Add copy of frame to the cache
+
+        Parameters
+        ---------
+        key : tuple
+            key from frame_key()
+        frame_df : pandas.DataFrame
+
+        Returns
+        -------
+        None
+
+        """
+
+        if self.size < 1:
+            return
+        frame_df = frame_df.copy()
+        self._store(key, frame_df)
+        if self.shared_ws is None:
+            return
+        shared_path = self._shared_path(key)
+        if os.path.isfile(shared_path):
+            return
+
+        # Write to temporary file first so other workers never read
+        #   a partially written frame
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.shared_ws)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(frame_df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, shared_path)
+        except (IOError, OSError):
+            logging.debug('  Unable to write cached frame {}'.format(
+                shared_path))
+
+    def _store(self, key, frame_df):
+        """Add frame to in memory LRU, dropping least recently used"""
+        self.frames[key] = frame_df
+        self.frames.move_to_end(key)
+        while len(self.frames) > self.size:
+            self.frames.popitem(last=False)
+
+    def _shared_path(self, key):
+        """Return shared file path for key"""
+        return os.path.join(self.shared_ws, '{}.pkl'.format(
+            hashlib.md5(repr(key).encode('utf-8')).hexdigest()))
@@ -0,0 +1,289 @@
+"""stream_cycle.py
+Defines CropOutputStream class, stream_windows, stream_cell
+Called by mod_crop_et.py
+
+Streaming runs (INI stream_years) simulate each ET cell in windows of
+    whole calendar years so memory does not grow with the period length
+First pass : input files are read window by window (only the rows of the
+    window are kept) to sum the long term DOY means of process_climate()
+    (see climate_stream.py)
+Second pass : input files are read again window by window, each crop
+    continues its crop cycle state from the previous window and the window
+    output is appended to the crop output files before the next window is
+    read
+Windows are whole calendar years, so the monthly and annual statistics of
+    a window are complete when it is written and output files are the same
+    as for the full period run
+Growing season statistics (one row per year) are kept until the last
+    window, the mean start and end dates need all years
+
+"""
+
+import copy
+import logging
+import os
+
+import pandas as pd
+
+import climate_stream
+import crop_cycle
+import ts_csv
+
+
+class CropOutputStream:
+    """Output files of one cell and crop appended window by window
+
+    Attributes
+    ----------
+    crop_count : int
+        count of crop in cell
+    et_cell :
+        ETCell instance the files are written for
+    crop :
+        CropParameters instance
+    output_paths : dict
+        output file paths (see crop_cycle.crop_output_paths)
+    temp_paths : dict
+        daily, monthly and annual files written until close()
+    first_window : boolean
+        True until the first window is written
+    gs_frames : list
+        growing season statistics of each window
+
+    """
+
+    def __init__(self, crop_count, data, et_cell, crop):
+        """Start output files of a cell and crop
+
+        Parameters
+        ---------
+        crop_count : int
+            count of crop in cell
+        data :
+            configuration data from INI file
+        et_cell :
+            ETCell instance
+        crop :
+            CropParameters instance of et_cell
+
+        """
+
+        self.crop_count = crop_count
+        self.et_cell = et_cell
+        self.crop = crop
+        self.output_paths = crop_cycle.crop_output_paths(data, et_cell, crop)
+        self.temp_paths = {
+            output_type: '{}.{}.tmp'.format(output_path, os.getpid())
+            for output_type, output_path in self.output_paths.items()
+            if output_type in ['daily', 'monthly', 'annual']}
+        self.first_window = True
+        self.gs_frames = []
+
+    def write(self, data, et_cell, foo):
+        """Append crop results of a window
+
+        Parameters
+        ---------
+        data :
+            configuration data from INI file
+        et_cell :
+            ETCell instance simulated, its window time series are shared
+            if the stream is for another cell with the same inputs
+        foo :
+            crop cycle state, crop_df holds the window results
+
+        Returns
+        -------
+        None
+
+        """
+
+        if self.et_cell is not et_cell:
+            self.et_cell.share_input_timeseries(et_cell)
+        crop_cycle.write_crop_output(
+            self.crop_count, data, self.et_cell, self.crop, foo,
+            output_stream=self)
+        self.first_window = False
+
+    def close(self, data):
+        """Write growing season statistics and rename files into place
+
+        Parameters
+        ---------
+        data :
+            configuration data from INI file
+
+        Returns
+        -------
+        None
+
+        """
+
+        if self.gs_frames:
+            crop_cycle.write_gs_output(
+                data, self.et_cell, self.crop, pd.concat(self.gs_frames),
+                self.output_paths['gs'])
+            self.gs_frames = []
+        for output_type, temp_path in self.temp_paths.items():
+            os.replace(temp_path, self.output_paths[output_type])
+
+    def discard(self):
+        """Remove files of a stream that did not finish"""
+        for temp_path in self.temp_paths.values():
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+
+def stream_windows(data, et_cell):
+    """Return configuration data of each window of the period
+
+    Parameters
+    ---------
+    data :
+        configuration data from INI file
+    et_cell :
+        ETCell instance
+
+    Returns
+    -------
+    : list
+        copies of data with start_dt and end_dt set to each window,
+        empty if the period has no days
+
+    Notes
+    -----
+    The period is the INI start and end dates limited to the dates of the
+        reference ET file, as the full period run truncates it
+
+    """
+
+    refet_period = ts_csv.ts_period(
+        os.path.join(data.refet['ws'],
+                     data.refet['name_format'] % et_cell.refet_id),
+        data.refet['header_lines'], data.refet['names_line'],
+        data.refet['delimiter'], data.refet['fields'])
+    if refet_period is None:
+        return []
+    start_dt, end_dt = refet_period
+    if data.start_dt is not None:
+        start_dt = max(start_dt, data.start_dt)
+    if data.end_dt is not None:
+        end_dt = min(end_dt, data.end_dt)
+
+    windows = []
+    window_start_dt = start_dt
+    while window_start_dt <= end_dt:
+        window_end_dt = min(
+            pd.Timestamp(window_start_dt.year + data.stream_years - 1, 12, 31),
+            end_dt)
+        window_data = copy.copy(data)
+        window_data.start_dt = window_start_dt
+        window_data.end_dt = window_end_dt
+        windows.append(window_data)
+        window_start_dt = pd.Timestamp(window_end_dt.year + 1, 1, 1)
+    return windows
+
+
+def stream_cell(cell_count, data, cells, et_cell, debug_flag=False,
+                memo=None, manifest=None):
+    """Compute crop ET for all crops of a cell window by window
+
+    Parameters
+    ---------
+    cell_count : int
+        count of et cell being processed
+    data :
+        configuration data from INI file
+    cells :
+        ETCellData instance
+    et_cell :
+        ETCell instance
+    debug_flag : boolean
+        True : write debug level comments to debug.txt
+        False [default]
+    memo : SimulationMemo
+        If set, results are also written for the cells with the same
+        simulation inputs
+    manifest : RunManifest
+        If set, finished cells and crops are recorded
+
+    Returns
+    -------
+    : boolean
+        False if the input time series could not be read
+
+    """
+
+    windows = stream_windows(data, et_cell)
+    if not windows:
+        logging.error('No data found reading ret data')
+        return False
+    logging.info('  {} windows of up to {} years'.format(
+        len(windows), data.stream_years))
+
+    # First pass, long term DOY means of the period
+    stream = climate_stream.ClimateStream()
+    for window_data in windows:
+        if not et_cell.set_input_timeseries(
+                cell_count, window_data, cells, stream):
+            return False
+    stream.end_first_pass()
+    stream.start_pass()
+
+    # Output files of each crop and of the cells reusing its results
+    crop_runs = []
+    crop_count = 0
+    for crop_num, crop in sorted(et_cell.crop_params.items()):
+        if et_cell.crop_flags[crop_num] == 0:
+            continue
+        crop_count += 1
+        output_streams = []
+        if crop_cycle.crop_output_flag(data):
+            output_streams.append(
+                CropOutputStream(crop_count, data, et_cell, crop))
+            if memo is not None:
+                output_streams.extend(
+                    CropOutputStream(
+                        follower_count, data, follower_cell,
+                        follower_cell.crop_params[crop_num])
+                    for follower_count, follower_cell in memo.followers(
+                        et_cell, crop_num))
+        crop_runs.append([crop, None, None, output_streams])
+
+    # Second pass, crop cycle state continues from window to window
+    finished = False
+    try:
+        for window_data in windows:
+            if not et_cell.set_input_timeseries(
+                    cell_count, window_data, cells, stream):
+                return False
+            for crop_run in crop_runs:
+                crop, foo, foo_day, output_streams = crop_run
+                if foo is None:
+                    logging.warning('Crop {} - {}'.format(
+                        crop.class_number, crop.name))
+                    foo, foo_day = crop_cycle.init_crop_day_loop(
+                        data, et_cell, crop)
+                    crop_run[1:3] = foo, foo_day
+                else:
+                    foo.setup_dataframe(et_cell)
+                    if data.co2_flag:
+                        foo.setup_co2(et_cell, crop)
+                crop_cycle.run_crop_day_loop(
+                    data, et_cell, crop, foo, foo_day, debug_flag)
+                for output_stream in output_streams:
+                    output_stream.write(data, et_cell, foo)
+                foo.crop_df = None
+        finished = True
+    finally:
+        if not finished:
+            for crop_run in crop_runs:
+                for output_stream in crop_run[3]:
+                    output_stream.discard()
+
+    for crop_run in crop_runs:
+        for output_stream in crop_run[3]:
+            output_stream.close(data)
+            if manifest is not None:
+                manifest.record(output_stream.et_cell, output_stream.crop)
+    return True
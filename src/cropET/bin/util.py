@@ -11,6 +11,11 @@ import os
 import pandas as pd
 import numpy as np
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 def es_from_t(t):
     """ Tetens (1930) equation for sat. vap pressure, kPa, (T in C)
 
@@ -33,6 +38,55 @@ def es_ice_from_t(t):
     """
     return 0.6108 * np.exp((21.87 * t) / (t + 265.5))
 
+def jit(func):
+    """Compile function with numba (nopython mode) if numba is installed
+
+    Args:
+        func (function): function using only numba supported python/numpy
+
+    Returns:
+        Compiled function, or func unchanged if numba is not installed
+    """
+    if numba is None:
+        return func
+    return numba.njit(cache=True)(func)
+
+@jit
+def snow_depth_on_ground(snow, snow_depth, tmax, snow_accum=0.0):
+    """Estimate depth of snow on ground using simple melt rate function
+
+    Snow accumulates at a settle rate of 2 to 1 and melts 4 mm/day per
+    degree C of maximum temperature
+
+    Args:
+        snow (ndarray): daily snow fall [mm], float64
+        snow_depth (ndarray): daily measured snow depth [mm], float64
+        tmax (ndarray): daily maximum temperature [C], float64
+        snow_accum (float): snow accumulation before the first day [mm],
+            0 at the start of the period
+
+    Returns:
+        A float64 ndarray of daily snow depth [mm], limited to the snow
+        accumulation, and the snow accumulation after the last day [mm]
+    """
+    output = np.empty(snow.shape[0])
+    for i in range(snow.shape[0]):
+        # Assume settle rate of 2 to 1
+        snow_accum += snow[i] * 0.5
+
+        # 4 mm/day melt per degree C
+        # Comparisons keep the python max()/min() results for NaN values
+        snow_melt = 4 * tmax[i]
+        if 0.0 > snow_melt:
+            snow_melt = 0.0
+        snow_accum -= snow_melt
+        if 0.0 > snow_accum:
+            snow_accum = 0.0
+        output[i] = snow_depth[i]
+        if snow_accum < output[i]:
+            output[i] = snow_accum
+    return output, snow_accum
+
 def is_winter(et_cell, foo_day):
     """Determine ifinput day is in a winter month
 
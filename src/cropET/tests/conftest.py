@@ -0,0 +1,142 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+TESTS_WS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_WS, '..', 'bin'))
+sys.path.insert(0, os.path.join(TESTS_WS, '..', '..', 'lib'))
+import crop_et_data
+import mod_crop_et
+
+STATIC_WS = os.path.join(TESTS_WS, '..', '..', 'static')
+CLIMATE_WS = os.path.join(
+    TESTS_WS, '..', '..', '..', 'examples', 'huc8', 'climate')
+
+# Crops covering each curve type, cuttings, winter wheat, bare soil and
+#   open water
+TEST_CROPS = [1, 3, 7, 13, 21, 25, 30, 44, 55, 66]
+
+# Cell ID, station, WHC [in/ft], hydrologic group (1-3)
+TEST_CELLS = [('1000', 443927, 1.5, 2), ('1001', 455038, 2.1, 1)]
+
+INI = """[CROP_ET]
+basin_id = Test
+project_folder = {project_ws}
+daily_stats_flag = True
+monthly_stats_flag = False
+annual_stats_flag = False
+growing_season_stats_flag = False
+cutting_flag = True
+niwr_flag = True
+kc_flag = True
+co2_flag = False
+start_date = None
+end_date = None
+static_folder = static
+daily_output_folder = daily_stats
+cell_properties_name = ETCellsProperties.txt
+cell_crops_name = ETCellsCrops.txt
+cell_cuttings_name = MeanCuttings.txt
+crop_params_name = CropParams.txt
+crop_coefs_name = CropCoefs_etr.txt
+elev_units = Feet
+
+[REFET]
+refet_type = ETr
+refet_folder = {climate_ws}
+name_format = gridmet_historical_%s.csv
+header_lines = 1
+names_line = 1
+delimiter = ,
+date_field = date
+etref_field = etr_mm
+etref_units = mm/day
+
+[WEATHER]
+weather_folder = {climate_ws}
+name_format = gridmet_historical_%s.csv
+header_lines = 1
+names_line = 1
+delimiter = ,
+date_field = date
+tmin_field = tmin_c
+tmax_field = tmax_c
+ppt_field = prcp_mm
+rs_field = srad_wm2
+wind_field = u2_ms
+ea_field = ea_kpa
+tmin_units = C
+tmax_units = C
+ppt_units = mm
+rs_units = W/m2
+wind_units = m/s
+ea_units = kpa
+wind_height = 2
+"""
+
+
+def write_static(static_ws):
+    """Write cell tables of the test cells, crop tables of the repo"""
+    os.makedirs(static_ws)
+    for name in ['CropParams.txt', 'CropCoefs_etr.txt']:
+        with open(os.path.join(STATIC_WS, name), encoding='cp1252') as in_f:
+            text = in_f.read()
+        with open(os.path.join(static_ws, name), 'w',
+                  encoding='utf-8') as out_f:
+            out_f.write(text)
+
+    with open(os.path.join(STATIC_WS, 'ETCellsProperties.txt')) as in_f:
+        props = [in_f.readline().rstrip('\n')]
+    with open(os.path.join(STATIC_WS, 'ETCellsCrops.txt')) as in_f:
+        crop_rows = in_f.read().split('\n')[:3]
+    crop_numbers = crop_rows[1].split('\t')[4:]
+    cuttings = [
+        'cuttings',
+        'ET Cell ID\tET Cell Name\tLat\tNumber Dairy\tNumber Beef\tnull\tnull']
+    stations = pd.read_csv(
+        os.path.join(CLIMATE_WS, 'gridmet_huc8_stations.csv'),
+        index_col='GRIDMET_ID')
+    for cell_id, station_id, whc, hydrogroup in TEST_CELLS:
+        station = stations.loc[station_id]
+        props.append('\t'.join(str(x) for x in [
+            cell_id, 'cell' + cell_id, station_id, station['LAT'],
+            station['LON'], station['ELEV_FT'], 1.2, whc, 40, 'B',
+            hydrogroup, 50, '']))
+        flags = ['1' if (n and int(n) in TEST_CROPS) else '0'
+                 for n in crop_numbers]
+        crop_rows.append('\t'.join(
+            [cell_id, 'cell' + cell_id, str(station_id), '1'] + flags))
+        cuttings.append('\t'.join(
+            [cell_id, 'cell' + cell_id, str(station['LAT']), '4', '3', '',
+             '']))
+    for name, lines in [('ETCellsProperties.txt', props),
+                        ('ETCellsCrops.txt', crop_rows),
+                        ('MeanCuttings.txt', cuttings)]:
+        with open(os.path.join(static_ws, name), 'w') as out_f:
+            out_f.write('\n'.join(lines) + '\n')
+
+
+@pytest.fixture(scope='session')
+def cet_cells(tmp_path_factory):
+    """Configuration data and cells with input time series set
+
+    Cells use the huc8 example climate and the static crop tables
+
+    """
+    project_ws = str(tmp_path_factory.mktemp('cet_project'))
+    write_static(os.path.join(project_ws, 'static'))
+    ini_path = os.path.join(project_ws, 'cet.ini')
+    with open(ini_path, 'w') as ini_f:
+        ini_f.write(INI.format(
+            project_ws=project_ws,
+            climate_ws=os.path.abspath(CLIMATE_WS)))
+
+    data = crop_et_data.CropETData()
+    data.read_cet_ini(ini_path)
+    cells = mod_crop_et.read_project_cells(data)
+    for cell_count, (cell_id, et_cell) in enumerate(
+            sorted(cells.et_cells_dict.items()), 1):
+        assert et_cell.set_input_timeseries(cell_count, data, cells)
+    return data, cells
@@ -0,0 +1,68 @@
+import copy
+
+import numpy as np
+
+import crop_cycle
+import crop_tables
+
+OUTPUT_FIELDS = ['et_act', 'niwr', 'season']
+
+
+def test_batch_matches_df_loop(cet_cells, monkeypatch):
+    """Cross-cell batch day loop gives the same results as the DataFrame
+    day loop for each cell"""
+    data, cells = cet_cells
+    et_cells = [et_cell for _, et_cell in sorted(cells.et_cells_dict.items())]
+
+    # Keep batch results instead of writing output files
+    batch_dfs, cell_loops = {}, []
+    run_crop_day_loop = crop_cycle.run_crop_day_loop
+
+    def queue_crop_output(crop_count, data, et_cell, crop, foo,
+                          output_writer=None):
+        batch_dfs[(et_cell.cell_id, crop.class_number)] = foo.crop_df
+
+    def cell_loop(data, et_cell, crop, foo, foo_day, debug_flag=False):
+        cell_loops.append((et_cell.cell_id, crop.class_number))
+        run_crop_day_loop(data, et_cell, crop, foo, foo_day, debug_flag)
+
+    monkeypatch.setattr(crop_cycle, 'queue_crop_output', queue_crop_output)
+    monkeypatch.setattr(crop_cycle, 'run_crop_day_loop', cell_loop)
+    crop_cycle.crop_cycle_batch(data, et_cells)
+    assert len(cell_loops) < len(batch_dfs)
+
+    for et_cell in et_cells:
+        for crop_num, crop in sorted(et_cell.crop_params.items()):
+            if et_cell.crop_flags[crop_num] == 0:
+                continue
+            foo, foo_day = crop_cycle.init_crop_day_loop(data, et_cell, crop)
+            crop_cycle.crop_day_loop_df(data, et_cell, crop, foo, foo_day)
+            batch_df = batch_dfs[(et_cell.cell_id, crop_num)]
+            for field in OUTPUT_FIELDS:
+                np.testing.assert_array_equal(
+                    batch_df[field].values, foo.crop_df[field].values,
+                    err_msg='cell {} crop {} {}'.format(
+                        et_cell.cell_id, crop_num, field))
+
+
+def test_batch_groups_curve_overrides(cet_cells, monkeypatch):
+    """Cells with crop curve overrides are not batched with other cells"""
+    data, cells = cet_cells
+    et_cells = [copy.copy(et_cell)
+                for _, et_cell in sorted(cells.et_cells_dict.items())]
+    et_cells[1].crop_coeffs = crop_tables.CropTableLayer('crop_coeffs')
+    et_cells[1].crop_coeffs.override(next(iter(et_cells[1].crop_coeffs)))
+
+    groups = []
+
+    def crop_day_loop_batch(data, crop_num, cell_group, output_writer=None,
+                            memo=None):
+        groups.append(
+            (crop_num, [et_cell.cell_id for _, et_cell in cell_group]))
+
+    monkeypatch.setattr(
+        crop_cycle, 'crop_day_loop_batch', crop_day_loop_batch)
+    crop_cycle.crop_cycle_batch(data, et_cells)
+    assert groups
+    for crop_num, cell_ids in groups:
+        assert len(cell_ids) == 1
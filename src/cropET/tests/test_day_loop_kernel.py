@@ -0,0 +1,31 @@
+import numpy as np
+
+import crop_cycle
+
+OUTPUT_FIELDS = ['et_act', 'niwr', 'season']
+
+
+def test_kernel_matches_df_loop(cet_cells):
+    """Kernel day loop gives the same results as the DataFrame day loop"""
+    data, cells = cet_cells
+    kernel_crops = 0
+    for cell_id, et_cell in sorted(cells.et_cells_dict.items()):
+        for crop_num, crop in sorted(et_cell.crop_params.items()):
+            if et_cell.crop_flags[crop_num] == 0:
+                continue
+            foo, foo_day = crop_cycle.init_crop_day_loop(data, et_cell, crop)
+            crop_cycle.crop_day_loop_df(data, et_cell, crop, foo, foo_day)
+
+            kernel_foo, kernel_foo_day = crop_cycle.init_crop_day_loop(
+                data, et_cell, crop)
+            if not crop_cycle.crop_day_loop_kernel(
+                    data, et_cell, crop, kernel_foo, kernel_foo_day):
+                continue
+            kernel_crops += 1
+            for field in OUTPUT_FIELDS:
+                np.testing.assert_array_equal(
+                    kernel_foo.crop_df[field].values,
+                    foo.crop_df[field].values,
+                    err_msg='cell {} crop {} {}'.format(
+                        cell_id, crop_num, field))
+    assert kernel_crops > 0
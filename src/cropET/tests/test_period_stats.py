@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'lib'))
+import period_stats
+
+
+def daily_frame(start, end, nan_flag):
+    """Daily values over months of 28 to 31 days"""
+    index = pd.date_range(start, end, freq='D', name='Date')
+    rng = np.random.RandomState(0)
+    ts_df = pd.DataFrame({
+        'tmax': np.full(len(index), 10.),
+        'etr': rng.rand(len(index)) * 8,
+        'ppt': np.where(rng.rand(len(index)) < 0.2, rng.rand(len(index)), 0.),
+        'season': (rng.rand(len(index)) < 0.5).astype(np.int64)},
+        index=index)
+    if nan_flag:
+        ts_df.iloc[[3, 40, 100], ts_df.columns.get_loc('etr')] = np.nan
+        ts_df.iloc[[70], ts_df.columns.get_loc('tmax')] = np.nan
+    return ts_df
+
+
+def test_aggregate_resample():
+    func_map = {'tmax': np.mean, 'etr': np.sum, 'ppt': np.sum,
+                'season': np.sum}
+    for start, end in [('2000-01-01', '2000-04-30'),
+                       ('2001-01-15', '2003-08-20')]:
+        for nan_flag in [False, True]:
+            ts_df = daily_frame(start, end, nan_flag)
+            for freq in ['MS', 'AS', 'M', 'A']:
+                pd.testing.assert_frame_equal(
+                    period_stats.aggregate(ts_df, freq, func_map),
+                    ts_df.resample(freq).apply(func_map),
+                    check_freq=False)
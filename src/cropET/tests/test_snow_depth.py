@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bin'))
+import util
+
+
+def reference_snow_depth(snow, snow_depth, tmax):
+    """Day by day recurrence of ETCell.process_climate"""
+    output = []
+    snow_accum = 0.0
+    for i in range(len(snow)):
+        snow_accum += snow[i] * 0.5
+        snow_melt = max(4 * tmax[i], 0.0)
+        snow_accum = max(snow_accum - snow_melt, 0.0)
+        output.append(min(snow_depth[i], snow_accum))
+    return output
+
+
+def test_snow_depth_on_ground():
+    snow = np.array([10., 20., 0., 0., 5.])
+    snow_depth = np.array([100., 8., 100., 1., 100.])
+    tmax = np.array([-5., -2., 1., 3., -1.])
+    output, snow_accum = util.snow_depth_on_ground(snow, snow_depth, tmax)
+    np.testing.assert_array_equal(output, [5., 8., 11., 0., 2.5])
+    assert snow_accum == 2.5
+
+    # Accumulation starts at zero on each call
+    np.testing.assert_array_equal(
+        util.snow_depth_on_ground(snow, snow_depth, tmax)[0], output)
+
+    # Accumulation carried between windows of the period
+    first, snow_accum = util.snow_depth_on_ground(
+        snow[:2], snow_depth[:2], tmax[:2])
+    second, snow_accum = util.snow_depth_on_ground(
+        snow[2:], snow_depth[2:], tmax[2:], snow_accum)
+    np.testing.assert_array_equal(np.concatenate([first, second]), output)
+
+
+def test_snow_depth_on_ground_reference():
+    rng = np.random.RandomState(0)
+    snow = np.where(rng.rand(1000) < 0.3, rng.rand(1000) * 40, 0.)
+    snow_depth = rng.rand(1000) * 200
+    tmax = rng.rand(1000) * 30 - 15
+    tmax[[10, 500]] = np.nan
+    np.testing.assert_array_equal(
+        util.snow_depth_on_ground(snow, snow_depth, tmax)[0],
+        reference_snow_depth(snow, snow_depth, tmax))
@@ -9,10 +9,11 @@ import datetime
 import math
 
 import pandas as pd
-import numpy as np
 import openpyxl as op
 from openpyxl.utils.dataframe import dataframe_to_rows
 
+import text_writer
+
 def is_leap_year(year_to_test):
     """Test if year is a leap year
     
@@ -1055,21 +1056,14 @@ def csf_output_by_dataframe(file_path, delimiter, new_data_df,
     """
     logging.debug('  Posting specified data to a text column slot file')
     try:
-        if float_format is None:
-            if date_is_posted:
-                new_data_df.to_csv(path_or_buf = file_path, sep = delimiter, 
-                            date_format = date_format, na_rep = mia_value)
-            else:
-                new_data_df.to_csv(path_or_buf = file_path, sep = delimiter, 
-                            index = False, na_rep = mia_value)
-        else:    # formatted output causes loss of precision
-            if date_is_posted:
-                new_data_df.to_csv(path_or_buf = file_path, sep = delimiter, 
-                        date_format = date_format, float_format = float_format, 
-                        na_rep = mia_value)
-            else:
-                new_data_df.to_csv(path_or_buf = file_path, sep = delimiter,
-                        index = False, float_format = float_format, na_rep = mia_value)
+        # formatted output (float_format) causes loss of precision
+        if date_is_posted:
+            text_writer.write_csv(new_data_df, file_path, sep = delimiter, 
+                    date_format = date_format, float_format = float_format, 
+                    na_rep = mia_value)
+        else:
+            text_writer.write_csv(new_data_df, file_path, sep = delimiter,
+                    index = False, float_format = float_format, na_rep = mia_value)
         return True
     except:
         logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred posting csv output data')
@@ -1116,12 +1110,9 @@ def rdb_output_by_df_nodate_formatting(file_path,
         # create consolidated rdb dataframe
             
         rdb_df = pd.concat(output_dict)
-        if float_format is None:
-            rdb_df.to_csv(path_or_buf = file_path, sep = delimiter, 
-                        index = False, na_rep = mia_value)
-        else:    # formatted output causes loss of precision
-            rdb_df.to_csv(path_or_buf = file_path, sep = delimiter,
-                    index = False, float_format = float_format, na_rep = mia_value)
+        # formatted output (float_format) causes loss of precision
+        text_writer.write_csv(rdb_df, file_path, sep = delimiter,
+                index = False, float_format = float_format, na_rep = mia_value)
         return True
     except:
         logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred posting rdb output data')
@@ -1146,39 +1137,28 @@ def rdb_output_by_dataframe(file_path, delimiter,
     dates_dti = pd.to_datetime(new_data_df.index)
     dates = dates_dti.strftime(date_format)
     try:
-        # create dictionary of rdb dataframes
+        # post each station column in turn
             
-        stas = list(new_data_df.columns)
-        for staCount, sta in enumerate(stas):
-            if '.' in sta:
-                split_values = sta.split(".")
-                station = split_values[0]
-                param = split_values[1]
-            else:
-                station = sta
-                param = 'NaN'
-            column_df = pd.DataFrame(columns = ['Station', 'Parameter', 'Date', 'Value'])
-            column_df['Date'] = dates
-            column_df['Value'] = new_data_df[sta].values
-            column_df['Station'] = station
-            column_df['Parameter'] = param
-            if float_format is None:
-                if staCount == 0:
-                    column_df.to_csv(path_or_buf = file_path, sep = delimiter, 
-                                index = False, na_rep = mia_value)
-                else:
-                    column_df.to_csv(path_or_buf = file_path, sep = delimiter, 
-                                index = False, na_rep = mia_value,
-                                header = False, mode = 'a')
-            else:    # formatted output causes loss of precision
-                if staCount == 0:
-                    column_df.to_csv(path_or_buf = file_path, sep = delimiter,
-                        index = False, float_format = float_format, na_rep = mia_value)
+        with open(file_path, 'w', newline = '') as rdb_f:
+            stas = list(new_data_df.columns)
+            for staCount, sta in enumerate(stas):
+                if '.' in sta:
+                    split_values = sta.split(".")
+                    station = split_values[0]
+                    param = split_values[1]
                 else:
-                    column_df.to_csv(path_or_buf = file_path, sep = delimiter,
-                        index = False, float_format = float_format, na_rep = mia_value, 
-                        header = False, mode = 'a')
-            del column_df
+                    station = sta
+                    param = 'NaN'
+                column_df = pd.DataFrame(columns = ['Station', 'Parameter', 'Date', 'Value'])
+                column_df['Date'] = dates
+                column_df['Value'] = new_data_df[sta].values
+                column_df['Station'] = station
+                column_df['Parameter'] = param
+                # formatted output (float_format) causes loss of precision
+                text_writer.write_csv(column_df, rdb_f, sep = delimiter,
+                        index = False, float_format = float_format, na_rep = mia_value,
+                        header = staCount == 0)
+                del column_df
         return True
     except:
         logging.error('\nERROR: ' + str(sys.exc_info()[0]) + 'occurred posting rdb output data')
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+
+# Vectorized monthly, annual and growing season statistics of daily series
+
+import numpy as np
+import pandas as pd
+
+# Resample frequency to period frequency and label side
+PERIOD_FREQS = {
+    'MS': ('M', 'start'), 'M': ('M', 'end'),
+    'AS': ('A', 'start'), 'A': ('A', 'end')}
+
+# Aggregation functions by name
+SUM_FUNCS = ['sum', np.sum, np.nansum]
+MEAN_FUNCS = ['mean', np.mean, np.nanmean]
+
+
+def period_bounds(dt_index, freq):
+    """Return period labels and first row of each period
+
+    Parameters
+    ---------
+    dt_index : pandas.DatetimeIndex
+        sorted daily dates
+    freq : str
+        'MS', 'AS' (labeled by period start) or 'M', 'A' (by period end)
+
+    Returns
+    -------
+    labels : pandas.DatetimeIndex
+        every period from first to last date, as resample(freq) without
+        the freq attribute
+    starts : ndarray
+        first row of each period, empty periods start at the next period
+
+    """
+
+    period_freq, label_side = PERIOD_FREQS[freq]
+    if period_freq == 'M':
+        ordinals = dt_index.year.values * 12 + dt_index.month.values - 1
+        unit = 'datetime64[M]'
+    else:
+        ordinals = dt_index.year.values
+        unit = 'datetime64[Y]'
+    first = ordinals[0]
+    n_periods = ordinals[-1] - first + 1
+    starts = np.searchsorted(ordinals, first + np.arange(n_periods))
+
+    # Period ordinals count months or years from 1970
+    periods = (first - (1970 * 12 if period_freq == 'M' else 1970) +
+               np.arange(n_periods + 1)).astype(unit)
+    if label_side == 'start':
+        label_values = periods[:-1].astype('datetime64[D]')
+    else:
+        label_values = periods[1:].astype('datetime64[D]') - 1
+    labels = pd.DatetimeIndex(
+        label_values.astype('datetime64[ns]'), name=dt_index.name)
+    return labels, starts
+
+
+def aggregate(ts_df, freq, func_map):
+    """Sum or average daily fields by month or year
+
+    Parameters
+    ---------
+    ts_df : pandas.DataFrame
+        daily values with sorted DatetimeIndex
+    freq : str
+        'MS', 'AS', 'M' or 'A' (see period_bounds)
+    func_map : dict
+        field name to np.sum or np.mean ('sum' or 'mean')
+
+    Returns
+    -------
+    : pandas.DataFrame
+        same values, labels and dtypes as ts_df.resample(freq).apply(func_map)
+
+    Notes
+    -----
+    NaN values are skipped, periods without values sum to 0 and average
+        to NaN
+    Integer sums use np.add.reduceat
+    Float sums use compensated (Kahan) summation, as pandas does, so text
+        output written at full precision does not change
+    All periods are summed together, one step per day of the longest
+        period
+
+    """
+
+    if not ts_df.index.is_monotonic_increasing:
+        return ts_df.resample(freq).apply(func_map)
+    labels, starts = period_bounds(ts_df.index, freq)
+    counts = np.diff(np.append(starts, len(ts_df.index)))
+
+    sum_fields, mean_fields = [], []
+    for field, func in func_map.items():
+        if any(func is f for f in SUM_FUNCS):
+            sum_fields.append(field)
+        elif any(func is f for f in MEAN_FUNCS):
+            mean_fields.append(field)
+        else:
+            return ts_df.resample(freq).apply(func_map)
+
+    dtypes = ts_df.dtypes
+    int_fields = [
+        field for field in sum_fields
+        if np.issubdtype(dtypes[field], np.integer)]
+    float_fields = [
+        field for field in func_map.keys() if field not in int_fields]
+    for field in float_fields:
+        if not np.issubdtype(dtypes[field], np.number):
+            return ts_df.resample(freq).apply(func_map)
+
+    output = {}
+    if int_fields:
+        int_sums = np.add.reduceat(
+            ts_df[int_fields].values, starts, axis=0)
+        int_sums[counts == 0] = 0
+        for i, field in enumerate(int_fields):
+            output[field] = int_sums[:, i]
+    if float_fields:
+        sums, nobs = compensated_sums(
+            ts_df[float_fields].values.astype(np.float64), starts, counts)
+        for i, field in enumerate(float_fields):
+            if field in mean_fields:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    output[field] = np.where(
+                        nobs[:, i] > 0, sums[:, i] / nobs[:, i], np.nan)
+            else:
+                output[field] = sums[:, i]
+    return pd.DataFrame(
+        {field: output[field] for field in func_map.keys()}, index=labels)
+
+
+def compensated_sums(values, starts, counts):
+    """Kahan sums of each period, skipping NaN
+
+    Parameters
+    ---------
+    values : ndarray
+        (day, field) float values
+    starts : ndarray
+        first row of each period
+    counts : ndarray
+        number of rows in each period
+
+    Returns
+    -------
+    sums : ndarray
+        (period, field) sums
+    nobs : ndarray
+        (period, field) number of non NaN values
+
+    """
+
+    # Lay out values by (day of period, period)
+    # Shorter periods are padded at the start with zeros, adding zeros to
+    #   zero sums and compensations leaves them unchanged
+    n_periods, n_fields = len(starts), values.shape[1]
+    max_count = counts.max() if n_periods else 0
+    period_i = np.repeat(np.arange(n_periods), counts)
+    offset_i = (np.arange(len(period_i)) - np.repeat(starts, counts) +
+                np.repeat(max_count - counts, counts))
+    padded = np.zeros((max_count, n_periods, n_fields))
+    padded[offset_i, period_i] = values[:len(period_i)]
+    data_rows = np.zeros((max_count, n_periods, 1), dtype=bool)
+    data_rows[offset_i, period_i] = True
+
+    sums = np.zeros((n_periods, n_fields))
+    compensation = np.zeros((n_periods, n_fields))
+    y = np.empty((n_periods, n_fields))
+    t = np.empty((n_periods, n_fields))
+    valid = padded == padded
+    if valid.all():
+        nobs = np.repeat(counts[:, np.newaxis], n_fields, axis=1)
+        for day_values in padded:
+            np.subtract(day_values, compensation, out=y)
+            np.add(sums, y, out=t)
+            np.subtract(t, sums, out=compensation)
+            compensation -= y
+            sums, t = t, sums
+        return sums, nobs
+
+    # NaN values are skipped, padding zeros are not counted
+    valid &= data_rows
+    nobs = valid.sum(axis=0)
+    for day_values, day_valid in zip(padded, valid):
+        np.subtract(day_values, compensation, out=y)
+        y[~day_valid] = 0.0
+        np.add(sums, y, out=t)
+        compensation = np.where(day_valid, (t - sums) - y, compensation)
+        sums, t = t, sums
+    return sums, nobs
+
+
+def season_stats(dt_index, doy, season):
+    """Growing season start, end and length of each year
+
+    Parameters
+    ---------
+    dt_index : pandas.DatetimeIndex
+        sorted daily dates
+    doy : ndarray
+        day of year of each date
+    season : ndarray
+        growing season flag (0 or 1) of each date
+
+    Returns
+    -------
+    : pandas.DataFrame
+        'start_doy', 'end_doy', 'length' indexed by year start, NaN for
+        years where the season flag is never set
+
+    Notes
+    -----
+    Start is the DOY of the first 0 to 1 change in the year (first DOY of
+        the year if there is none)
+    End is the DOY of the first day after the first 1 to 0 change in the
+        year (last DOY of the year if there is none)
+
+    """
+
+    labels, starts = period_bounds(dt_index, 'AS')
+    n_days = len(dt_index)
+    ends = np.append(starts[1:], n_days)
+    counts = ends - starts
+    doy = np.asarray(doy)
+    season = np.asarray(season)
+
+    # Changes between days of the same year
+    # Change i is between day i and i + 1, label by year of day i + 1
+    season_diff = np.diff(season)
+    change_year = np.searchsorted(starts, np.arange(1, n_days), side='right') - 1
+    same_year = starts[change_year] <= np.arange(n_days - 1)
+
+    def first_change(change_value):
+        first_day = np.full(len(starts), n_days)
+        change_i = np.nonzero((season_diff == change_value) & same_year)[0]
+        # Changes are sorted, keep first change of each year
+        np.minimum.at(first_day, change_year[change_i], change_i + 1)
+        return first_day
+
+    start_day = first_change(1)
+    end_day = first_change(-1)
+    nonempty = counts > 0
+    safe_starts = np.minimum(starts, n_days - 1)
+    doy_min = np.where(
+        nonempty, np.minimum.reduceat(doy, safe_starts), 0)
+    doy_max = np.where(
+        nonempty, np.maximum.reduceat(doy, safe_starts), 0)
+    length = np.where(
+        nonempty, np.add.reduceat(season, safe_starts), 0)
+    active = np.where(
+        nonempty, np.add.reduceat(season != 0, safe_starts), 0) > 0
+
+    start_doy = np.where(
+        start_day < n_days, doy[np.minimum(start_day, n_days - 1)], doy_min)
+    end_doy = np.where(
+        end_day < n_days, doy[np.minimum(end_day, n_days - 1)], doy_max)
+    return pd.DataFrame({
+        'start_doy': np.where(active, start_doy, np.nan),
+        'end_doy': np.where(active, end_doy, np.nan),
+        'length': np.where(active, length, np.nan)}, index=labels)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+
+# Column at a time CSV writer producing the same text as DataFrame.to_csv
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Rows joined and written per write() call
+CHUNK_ROWS = 20000
+
+# printf style integer spec with optional literal prefix, e.g. ' %4d'
+INT_FORMAT_RE = re.compile(r'^([^%]*)%(\d*)d$')
+
+# Characters that make csv.writer quote a field (QUOTE_MINIMAL)
+QUOTE_CHARS = ['"', '\r', '\n']
+
+# Characters of numbers formatted with the default float format
+NUMBER_CHARS = '0123456789.-+eEinfaINFTrueFals'
+
+# Date formats written directly from numpy datetime64 values
+ISO_DATE_UNITS = {
+    '%Y-%m-%d': 'datetime64[D]', '%Y-%m': 'datetime64[M]',
+    '%Y': 'datetime64[Y]'}
+
+
+def format_ints(values, int_format):
+    """Format integer values with a printf style spec
+
+    Parameters
+    ---------
+    values : ndarray
+        integer values
+    int_format : str
+        printf spec such as ' %4d'
+
+    Returns
+    -------
+    : list
+        formatted strings, same as [int_format % x for x in values]
+
+    """
+
+    values = np.asarray(values)
+    match = INT_FORMAT_RE.match(int_format)
+    if match is None or not np.issubdtype(values.dtype, np.integer):
+        return [int_format % x for x in values.tolist()]
+    prefix, width = match.groups()
+    text = values.astype(str)
+    if width and len(text):
+        # rjust truncates values longer than width, only pad shorter values
+        width = int(width)
+        lengths = np.char.str_len(text)
+        short = lengths < width
+        if short.any():
+            text = text.astype('U{}'.format(max(width, lengths.max())))
+            text[short] = np.char.rjust(text[short], width)
+    if prefix:
+        text = np.char.add(prefix, text)
+    return text.tolist()
+
+
+def format_values(values, float_format=None, na_rep=''):
+    """Format column values as DataFrame.to_csv does
+
+    Parameters
+    ---------
+    values : ndarray
+        column values
+    float_format : str
+        printf spec for floats, None [default] uses shortest repr
+    na_rep : str
+        missing value text
+
+    Returns
+    -------
+    : list
+        formatted strings, None if the column needs DataFrame.to_csv
+
+    """
+
+    dtype = values.dtype
+    if np.issubdtype(dtype, np.floating):
+        mask = np.isnan(values)
+        if float_format is None:
+            # Python repr of float64 is the same shortest repr as astype(str)
+            if dtype == np.float64:
+                text = list(map(repr, values.tolist()))
+            else:
+                text = values.astype(str).tolist()
+            if mask.any():
+                for i in np.nonzero(mask)[0].tolist():
+                    text[i] = na_rep
+            return text
+        text = [na_rep if isnan else float_format % x
+                for x, isnan in zip(values.tolist(), mask.tolist())]
+        return text
+    elif np.issubdtype(dtype, np.integer) or dtype == np.bool_:
+        return values.astype(str).tolist()
+    elif dtype == object:
+        text = []
+        for x in values.tolist():
+            if isinstance(x, str):
+                text.append(x)
+            elif x is None or (isinstance(x, float) and x != x):
+                text.append(na_rep)
+            elif isinstance(x, (int, float)):
+                text.append(str(x))
+            else:
+                return None
+        return text
+    return None
+
+
+def format_index(index, date_format=None, na_rep=''):
+    """Format index values as DataFrame.to_csv does
+
+    Returns None if the index needs DataFrame.to_csv
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is not None or index.hasnans:
+            return None
+        if date_format is None:
+            if not (index == index.normalize()).all():
+                return None
+            date_format = '%Y-%m-%d'
+        # numpy ISO dates match strftime for 4 digit years
+        if (date_format in ISO_DATE_UNITS and len(index) and
+                index.min().year >= 1000 and index.max().year <= 9999):
+            return index.values.astype(
+                ISO_DATE_UNITS[date_format]).astype(str).tolist()
+        return index.strftime(date_format).tolist()
+    elif isinstance(index, pd.MultiIndex):
+        return None
+    return format_values(np.asarray(index), na_rep=na_rep)
+
+
+def write_csv(df, f, sep=',', header=True, index=True, columns=None,
+              float_format=None, date_format=None, na_rep='', formats=None):
+    """Write data frame to delimited text file
+
+    Parameters
+    ---------
+    df : pandas.DataFrame
+    f : str or file object
+        file path or file opened with newline=''
+    sep : str
+        field delimiter
+    header : boolean
+        True [default] writes field names
+    index : boolean
+        True [default] writes index as first field
+    columns : list
+        fields to write, None [default] writes all fields
+    float_format : str
+        printf spec for floats, None [default] uses shortest repr
+    date_format : str
+        strftime spec for DatetimeIndex
+    na_rep : str
+        missing value text
+    formats : dict
+        field name to printf integer spec (e.g. ' %4d'), applied to the
+        values instead of float_format
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Arguments are the DataFrame.to_csv arguments of the same names and
+        the text is the same, whole columns are formatted at once and
+        rows are joined in chunks
+    Frames with fields that would need quoting are written by
+        DataFrame.to_csv
+
+    """
+
+    if columns is None:
+        columns = list(df.columns)
+    if formats is None:
+        formats = {}
+
+    # Numbers only need to be checked for quoting through their formats
+    fields, text_fields = [], []
+    if index:
+        fields.append(format_index(df.index, date_format, na_rep))
+        text_fields.append(fields[-1])
+    for column in columns:
+        values = df[column].values
+        if column in formats:
+            fields.append(format_ints(values, formats[column]))
+        else:
+            fields.append(format_values(values, float_format, na_rep))
+            if values.dtype == object:
+                text_fields.append(fields[-1])
+
+    if header:
+        header_fields = []
+        if index:
+            header_fields.append(
+                '' if df.index.name is None else str(df.index.name))
+        header_fields.extend(str(column) for column in columns)
+        text_fields.append(header_fields)
+    number_formats = [na_rep, float_format or ''] + list(formats.values())
+
+    if (any(field is None for field in fields) or len(fields) < 2 or
+            sep in NUMBER_CHARS or
+            _needs_quotes(number_formats, sep) or
+            any(_needs_quotes(field, sep) for field in text_fields)):
+        _to_csv(df, f, sep, header, index, columns, float_format,
+                date_format, na_rep, formats)
+        return
+
+    lines = []
+    if header:
+        lines.append(sep.join(header_fields))
+    rows = zip(*fields)
+    line_end = os.linesep
+    if isinstance(f, str):
+        with open(f, 'w', newline='') as output_f:
+            _write_rows(output_f, lines, rows, sep, line_end)
+    else:
+        _write_rows(f, lines, rows, sep, line_end)
+
+
+def _write_rows(f, lines, rows, sep, line_end):
+    """Write header lines and rows in chunks"""
+    join = sep.join
+    chunk = lines
+    for row in rows:
+        chunk.append(join(row))
+        if len(chunk) >= CHUNK_ROWS:
+            f.write(line_end.join(chunk) + line_end)
+            chunk = []
+    if chunk:
+        f.write(line_end.join(chunk) + line_end)
+
+
+def _needs_quotes(field, sep):
+    """Return True if csv.writer would quote any value"""
+    text = ''.join(field)
+    return any(c in text for c in [sep] + QUOTE_CHARS)
+
+
+def _to_csv(df, f, sep, header, index, columns, float_format, date_format,
+            na_rep, formats):
+    """Write data frame with DataFrame.to_csv"""
+    if formats:
+        df = df[columns].copy()
+        for column, int_format in formats.items():
+            df[column] = format_ints(df[column].values, int_format)
+    df.to_csv(f, sep=sep, header=header, index=index, columns=columns,
+              float_format=float_format, date_format=date_format,
+              na_rep=na_rep)
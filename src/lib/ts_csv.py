@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+
+# Time series CSV ingestion shared by cropET, refET and areaET readers
+
+import pandas as pd
+
+import typed_ts
+
+# Rows parsed per chunk when rows are filtered while reading
+CHUNK_ROWS = 20000
+
+
+def read_ts_csv(file_path, header_lines, names_line, delimiter,
+                usecols=None, dtype=None, comment=None, na_values=None,
+                row_filter=None):
+    """Read delimited time series file with the C parser
+
+    Parameters
+    ---------
+    file_path : str
+        time series file path
+    header_lines : int
+        number of header lines (INI header_lines)
+    names_line : int
+        1's based line of field names (INI names_line)
+    delimiter : str
+        field delimiter (INI delimiter)
+    usecols : list
+        field names to read, fields not in file are ignored
+        None [default] reads all fields
+    dtype : dict
+        field name to dtype, fields not in file are ignored
+    comment : str
+        comment character
+    na_values : str or list
+        additional strings to recognize as NaN
+    row_filter : function
+        returns boolean mask of the rows to keep for a frame of rows
+        (see period_filter), the file is read CHUNK_ROWS rows at a time so
+        only the kept rows are held in memory
+        None [default] keeps all rows
+
+    Returns
+    -------
+    : pandas.DataFrame
+
+    Notes
+    -----
+    Header lines other than names_line are skipped, as for the original
+        engine='python' readers
+    Parquet and HDF5 files (see typed_ts.py) are read directly, header and
+        delimiter settings do not apply
+    The python engine is only used for regular expression delimiters
+    Floats are parsed with round_trip precision to match python float()
+
+    """
+
+    if typed_ts.file_type_from_path(file_path) is not None:
+        ts_df = typed_ts.read_typed_ts(file_path, usecols=usecols)
+        if row_filter is not None:
+            ts_df = ts_df[row_filter(ts_df)]
+        return ts_df
+
+    # Get list of 0 based line numbers to skip
+    # Ignore header but assume header was set as 1's based index
+    skiprows = [i for i in range(header_lines) if i + 1 != names_line]
+    kwargs = {
+        'header': names_line - len(skiprows) - 1, 'skiprows': skiprows,
+        'sep': delimiter, 'comment': comment, 'na_values': na_values}
+    if usecols is not None:
+        usecols = set(usecols)
+        kwargs['usecols'] = lambda field_name: field_name in usecols
+    if dtype:
+        kwargs['dtype'] = dtype
+    if len(delimiter) == 1 or delimiter == r'\s+':
+        kwargs['engine'] = 'c'
+        kwargs['float_precision'] = 'round_trip'
+    else:
+        kwargs['engine'] = 'python'
+    if row_filter is None:
+        return pd.read_csv(file_path, **kwargs)
+    with pd.read_csv(file_path, chunksize=CHUNK_ROWS, **kwargs) as reader:
+        chunks = [chunk[row_filter(chunk)] for chunk in reader]
+    if not chunks:
+        return pd.read_csv(file_path, nrows=0, **kwargs)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def period_filter(fields, start_dt=None, end_dt=None):
+    """Return row filter keeping the dates of a period (see read_ts_csv)
+
+    Parameters
+    ---------
+    fields : dict
+        INI field key to file field name, 'date' or 'year', 'month' and
+        'day' fields are used
+    start_dt : datetime
+        first date kept, None [default] for no limit
+    end_dt : datetime
+        last date kept, None [default] for no limit
+
+    Returns
+    -------
+    : function
+
+    """
+
+    date_flag, date_names = _date_names(fields)
+
+    def row_filter(ts_df):
+        dates = ts_dates(ts_df.rename(columns=date_names), date_flag)
+        keep = pd.Series(True, index=ts_df.index)
+        if start_dt is not None:
+            keep &= dates >= start_dt
+        if end_dt is not None:
+            keep &= dates <= end_dt
+        return keep.values
+    return row_filter
+
+
+def ts_dates(ts_df, date_flag, hourly_flag=False):
+    """Build datetimes from date strings or year, month and day fields
+
+    Parameters
+    ---------
+    ts_df : pandas.DataFrame
+        time series with fields renamed to 'date' or 'year', 'month', 'day'
+        (and 'hour')
+    date_flag : boolean
+        True : parse 'date' field
+        False : assemble from 'year', 'month', 'day' fields
+    hourly_flag : boolean
+        True : include 'hour' field
+        False [default]
+
+    Returns
+    -------
+    : pandas.Series
+        datetime64 values
+
+    """
+
+    if date_flag:
+        return pd.to_datetime(ts_df['date'])
+    date_fields = ['year', 'month', 'day']
+    if hourly_flag:
+        date_fields.append('hour')
+    return pd.to_datetime(ts_df[date_fields])
+
+
+def value_dtypes(fields, date_fields=('date', 'year', 'month', 'day')):
+    """Return float64 dtypes for value fields
+
+    Parameters
+    ---------
+    fields : dict
+        INI field key to file field name
+    date_fields : tuple
+        field keys not read as floats
+
+    Returns
+    -------
+    : dict
+        file field name to dtype
+
+    """
+
+    return {
+        field_name: 'float64' for field_key, field_name in fields.items()
+        if field_name is not None and field_key not in date_fields}
+
+
+def field_columns(fields, extra_fields=()):
+    """Return file field names needed for INI fields
+
+    Parameters
+    ---------
+    fields : dict
+        INI field key to file field name
+    extra_fields : tuple
+        other field names used if present in file
+
+    Returns
+    -------
+    : list
+        field names and field keys (files may already use the key names)
+
+    """
+
+    columns = [name for name in fields.values() if name is not None]
+    columns.extend(fields.keys())
+    columns.extend(extra_fields)
+    return columns
+
+
+def ts_period(file_path, header_lines, names_line, delimiter, fields):
+    """Return first and last date of time series file
+
+    Parameters
+    ---------
+    file_path : str
+        time series file path
+    header_lines : int
+        number of header lines (INI header_lines)
+    names_line : int
+        1's based line of field names (INI names_line)
+    delimiter : str
+        field delimiter (INI delimiter)
+    fields : dict
+        INI field key to file field name, 'date' or 'year', 'month' and
+        'day' fields are read
+
+    Returns
+    -------
+    : tuple
+        first and last date, None if the file has no rows
+
+    Notes
+    -----
+    Only the date fields are read, CHUNK_ROWS rows at a time
+
+    """
+
+    date_flag, date_names = _date_names(fields)
+    period = []
+
+    def first_last(ts_df):
+        dates = ts_dates(ts_df.rename(columns=date_names), date_flag)
+        if len(dates):
+            period.extend([dates.min(), dates.max()])
+        return pd.Series(False, index=ts_df.index).values
+
+    read_ts_csv(
+        file_path, header_lines, names_line, delimiter,
+        usecols=list(date_names.keys()) + list(date_names.values()),
+        row_filter=first_last)
+    if not period:
+        return None
+    return min(period), max(period)
+
+
+def _date_names(fields):
+    """Return date flag (see ts_dates) and file field name to date key"""
+    date_flag = fields.get('date') is not None
+    date_keys = ['date'] if date_flag else ['year', 'month', 'day']
+    return date_flag, {
+        fields[key]: key for key in date_keys if fields.get(key) is not None}
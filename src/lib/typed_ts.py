@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+# Typed columnar time series files (Parquet and HDF5)
+
+import importlib
+import os
+
+import pandas as pd
+
+# Output file type to file extension
+FILE_EXTENSIONS = {'parquet': '.parquet', 'hdf5': '.h5'}
+
+# Modules that can back each file type (first one found is used)
+FILE_MODULES = {'parquet': ['pyarrow', 'fastparquet'], 'hdf5': ['tables']}
+
+# HDF5 node holding the time series
+HDF5_KEY = 'data'
+
+
+def file_type_from_path(file_path):
+    """Return typed file type from file extension
+
+    Parameters
+    ---------
+    file_path : str
+
+    Returns
+    -------
+    : str or None
+        'parquet', 'hdf5' or None for other (text) files
+
+    """
+
+    ext = os.path.splitext(file_path)[1].lower()
+    for file_type, file_ext in FILE_EXTENSIONS.items():
+        if ext == file_ext:
+            return file_type
+    return None
+
+
+def file_type_available(file_type):
+    """Check that a module for writing the file type is installed
+
+    Parameters
+    ---------
+    file_type : str
+        'parquet' or 'hdf5'
+
+    Returns
+    -------
+    : boolean
+
+    """
+
+    for module_name in FILE_MODULES.get(file_type, []):
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            continue
+        return True
+    return False
+
+
+def write_typed_ts(ts_df, file_path, file_type, compression=None):
+    """Write data frame columns to typed file
+
+    Parameters
+    ---------
+    ts_df : pandas.DataFrame
+        fields to write, index is not written
+    file_path : str
+    file_type : str
+        'parquet' or 'hdf5'
+    compression : str
+        parquet codec ('snappy', 'gzip', 'brotli', 'zstd') or
+        HDF5 complib ('zlib', 'blosc', 'bzip2', 'lzo')
+        None [default] : not compressed
+
+    Returns
+    -------
+    None
+
+    """
+
+    if file_type == 'parquet':
+        ts_df.to_parquet(file_path, index=False, compression=compression)
+    elif file_type == 'hdf5':
+        ts_df.reset_index(drop=True).to_hdf(
+            file_path, key=HDF5_KEY, mode='w', format='table',
+            complib=compression, complevel=9 if compression else None)
+    else:
+        raise ValueError('Unsupported typed file type {}'.format(file_type))
+
+
+def read_typed_ts(file_path, usecols=None):
+    """Read typed file written by write_typed_ts()
+
+    Parameters
+    ---------
+    file_path : str
+    usecols : list
+        field names to read, fields not in file are ignored
+        None [default] reads all fields
+
+    Returns
+    -------
+    : pandas.DataFrame
+
+    """
+
+    file_type = file_type_from_path(file_path)
+    if file_type == 'parquet':
+        ts_df = pd.read_parquet(file_path)
+    elif file_type == 'hdf5':
+        ts_df = pd.read_hdf(file_path, key=HDF5_KEY)
+    else:
+        raise ValueError('Unsupported typed file {}'.format(file_path))
+    if usecols is not None:
+        usecols = set(usecols)
+        ts_df = ts_df[[col for col in ts_df.columns if col in usecols]]
+    return ts_df
@@ -14,6 +14,9 @@ import pandas as pd
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../lib')))
 import ref_et_data
 import ret_utils
+import period_stats
+import text_writer
+import ts_csv
 
 
 # MOVE TO UNIT CONVERSION SCRIPT / SECTION
@@ -486,14 +489,9 @@ class MetNode():
             logging.error('ERROR:  input met file {} does not exist'.format(input_met_path))
             return False
         logging.debug('  {0}'.format(input_met_path))
-        # Get list of 0 based line numbers to skip
-        # Ignore header but assume header was set as 1's based index
-        data_skip = [i for i in range(cfg.input_met['header_lines']) if i + 1 != cfg.input_met['names_line']]
-#        self.input_met_df = pd.read_csv(input_met_path, engine = 'python',
-        self.input_met_df = pd.read_csv(input_met_path, engine = 'python',
-                header = cfg.input_met['names_line'] - len(data_skip) - 1,
-                skiprows = data_skip, sep = cfg.input_met['delimiter'],
-                na_values = 'NaN')
+        self.input_met_df = ts_csv.read_ts_csv(input_met_path,
+                cfg.input_met['header_lines'], cfg.input_met['names_line'],
+                cfg.input_met['delimiter'], na_values = 'NaN')
         logging.debug('  Columns: {0}'.format(', '.join(list(self.input_met_df.columns))))
 
         # Check fields
@@ -512,15 +510,9 @@ class MetNode():
 
         # Convert date strings to datetimes and index on date
 
-        if cfg.input_met['fields']['date'] is not None:
-            self.input_met_df['date'] = pd.to_datetime(self.input_met_df['date'])
-        else:
-            if cfg.time_step == 'day':
-                self.input_met_df['date'] = self.input_met_df[['year', 'month', 'day']].apply(
-                    lambda s : datetime.datetime(*s),axis = 1)
-            else:
-                self.input_met_df['date'] = self.input_met_df[['year', 'month', 'day', 'hour']].apply(
-                    lambda s : datetime.datetime(*s),axis = 1)
+        self.input_met_df['date'] = ts_csv.ts_dates(self.input_met_df,
+                cfg.input_met['fields']['date'] is not None,
+                cfg.time_step != 'day')
         self.input_met_df.set_index('date', inplace = True)
 
         # verify period
@@ -674,9 +666,9 @@ class MetNode():
                 elif "solar" in field_name: aggregation_func.update({fn: np.mean})
                 else: aggregation_func.update({fn: np.sum})
             if cfg.monthly_refet_flag:
-                monthly_refet_df = daily_refet_df.resample('MS').apply( aggregation_func)
+                monthly_refet_df = period_stats.aggregate(daily_refet_df, 'MS', aggregation_func)
             if cfg.annual_refet_flag:
-                annual_refet_df = daily_refet_df.resample('AS').apply( aggregation_func)
+                annual_refet_df = period_stats.aggregate(daily_refet_df, 'AS', aggregation_func)
 
             # set up output fields
             if cfg.daily_refet_flag:
@@ -712,19 +704,16 @@ class MetNode():
             if cfg.daily_refet_flag:
                 # format date attributes if values are formatted
 
+                daily_formats = {}
                 if cfg.refet_out['daily_float_format'] is not None:
                     if 'year' in cfg.used_refet_out_fields:
-                        daily_refet_df[cfg.refet_out['fields']['year']] = \
-                            daily_refet_df[cfg.refet_out['fields']['year']].map(lambda x: ' %4d' % x)
+                        daily_formats[cfg.refet_out['fields']['year']] = ' %4d'
                     if 'month' in cfg.used_refet_out_fields:
-                        daily_refet_df[cfg.refet_out['fields']['month']] = \
-                            daily_refet_df[cfg.refet_out['fields']['month']].map(lambda x: ' %2d' % x)
+                        daily_formats[cfg.refet_out['fields']['month']] = ' %2d'
                     if 'day' in cfg.used_refet_out_fields:
-                        daily_refet_df[cfg.refet_out['fields']['day']] = \
-                            daily_refet_df[cfg.refet_out['fields']['day']].map(lambda x: ' %2d' % x)
+                        daily_formats[cfg.refet_out['fields']['day']] = ' %2d'
                 if 'doy' in cfg.used_refet_out_fields:
-                        daily_refet_df[cfg.refet_out['fields']['doy']] = \
-                            daily_refet_df[cfg.refet_out['fields']['doy']].map(lambda x: ' %3d' % x)
+                    daily_formats[cfg.refet_out['fields']['doy']] = ' %3d'
 
                 # post daily output
 
@@ -734,33 +723,19 @@ class MetNode():
                     daily_refet_f.write(cfg.refet_out['daily_header1'] + '\n')
                     if cfg.refet_out['header_lines'] == 2:
                         daily_refet_f.write(cfg.refet_out['daily_header2'] + '\n')
-                    if cfg.refet_out['daily_float_format'] is None:
-                        if 'date' in cfg.used_refet_out_fields:
-                            daily_refet_df.to_csv(daily_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['daily_date_format'],
-                                columns = adj_daily_fields)
-                        else:
-                            daily_refet_df.to_csv(daily_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_daily_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refet_out_fields:
-                            daily_refet_df.to_csv(daily_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['daily_date_format'],
-                                float_format = cfg.refet_out['daily_float_format'],
-                                columns = adj_daily_fields)
-                        else:
-                            daily_refet_df.to_csv(daily_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_daily_fields,
-                                float_format = cfg.refet_out['daily_float_format'])
+                    text_writer.write_csv(daily_refet_df, daily_refet_f, sep = cfg.refet_out['delimiter'],
+                        header = False, index = 'date' in cfg.used_refet_out_fields,
+                        date_format = cfg.refet_out['daily_date_format'],
+                        float_format = cfg.refet_out['daily_float_format'],
+                        columns = adj_daily_fields, formats = daily_formats)
                 del daily_refet_df, daily_refet_path, adj_daily_fields
             if cfg.monthly_refet_flag:
+                monthly_formats = {}
                 if cfg.refet_out['monthly_float_format'] is not None:
                     if 'year' in cfg.used_refet_out_fields:
-                        monthly_refet_df[cfg.refet_out['fields']['year']] = \
-                            monthly_refet_df[cfg.refet_out['fields']['year']].map(lambda x: ' %4d' % x)
+                        monthly_formats[cfg.refet_out['fields']['year']] = ' %4d'
                     if 'month' in cfg.used_refet_out_fields:
-                        monthly_refet_df[cfg.refet_out['fields']['month']] = \
-                            monthly_refet_df[cfg.refet_out['fields']['month']].map(lambda x: ' %2d' % x)
+                        monthly_formats[cfg.refet_out['fields']['month']] = ' %2d'
 
                 # post monthly output
                 monthly_refet_path = os.path.join(cfg.monthly_refet_ws, cfg.refet_out['name_format'] % self.met_node_id)
@@ -769,32 +744,19 @@ class MetNode():
                     monthly_refet_f.write(cfg.refet_out['monthly_header1'] + '\n')
                     if cfg.refet_out['header_lines'] == 2:
                         monthly_refet_f.write(cfg.refet_out['monthly_header2'] + '\n')
-                    if cfg.refet_out['monthly_float_format'] is None:
-                        if 'date' in cfg.used_refet_out_fields:
-                            monthly_refet_df.to_csv(monthly_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['monthly_date_format'],
-                                columns = adj_monthly_fields)
-                        else:
-                            monthly_refet_df.to_csv(monthly_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_monthly_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refet_out_fields:
-                            monthly_refet_df.to_csv(monthly_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['monthly_date_format'],
-                                float_format = cfg.refet_out['monthly_float_format'],
-                                columns = adj_monthly_fields)
-                        else:
-                            monthly_refet_df.to_csv(monthly_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_monthly_fields,
-                                float_format = cfg.refet_out['monthly_float_format'])
+                    text_writer.write_csv(monthly_refet_df, monthly_refet_f, sep = cfg.refet_out['delimiter'],
+                        header = False, index = 'date' in cfg.used_refet_out_fields,
+                        date_format = cfg.refet_out['monthly_date_format'],
+                        float_format = cfg.refet_out['monthly_float_format'],
+                        columns = adj_monthly_fields, formats = monthly_formats)
                 del monthly_refet_df, monthly_refet_path, adj_monthly_fields
             if cfg.annual_refet_flag:
                 # format date attributes if values are formatted
 
+                annual_formats = {}
                 if cfg.refet_out['annual_float_format'] is not None:
                     if 'year' in cfg.used_refet_out_fields:
-                        annual_refet_df[cfg.refet_out['fields']['year']] = \
-                            annual_refet_df[cfg.refet_out['fields']['year']].map(lambda x: ' %4d' % x)
+                        annual_formats[cfg.refet_out['fields']['year']] = ' %4d'
 
                 # post annual output
                 annual_refet_path = os.path.join(cfg.annual_refet_ws, cfg.refet_out['name_format'] % self.met_node_id)
@@ -803,24 +765,11 @@ class MetNode():
                     annual_refet_f.write(cfg.refet_out['annual_header1'] + '\n')
                     if cfg.refet_out['header_lines'] == 2:
                         annual_refet_f.write(cfg.refet_out['annual_header2'] + '\n')
-                    if cfg.refet_out['annual_float_format'] is None:
-                        if 'date' in cfg.used_refet_out_fields:
-                            annual_refet_df.to_csv(annual_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['annual_date_format'],
-                                columns = adj_annual_fields)
-                        else:
-                            annual_refet_df.to_csv(annual_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_annual_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refet_out_fields:
-                            annual_refet_df.to_csv(annual_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, date_format = cfg.refet_out['annual_date_format'],
-                                float_format = cfg.refet_out['annual_float_format'],
-                                columns = adj_annual_fields)
-                        else:
-                            annual_refet_df.to_csv(annual_refet_f, sep = cfg.refet_out['delimiter'],
-                                header = False, index = False, columns = adj_annual_fields,
-                                float_format = cfg.refet_out['annual_float_format'])
+                    text_writer.write_csv(annual_refet_df, annual_refet_f, sep = cfg.refet_out['delimiter'],
+                        header = False, index = 'date' in cfg.used_refet_out_fields,
+                        date_format = cfg.refet_out['annual_date_format'],
+                        float_format = cfg.refet_out['annual_float_format'],
+                        columns = adj_annual_fields, formats = annual_formats)
                 del annual_refet_df, annual_refet_path, adj_annual_fields
 
             ## Post Alternative Ref ET Calcs
@@ -889,9 +838,9 @@ class MetNode():
                 elif "solar" in field_name: aggregation_func.update({fn: np.mean})
                 else: aggregation_func.update({fn: np.sum})
             if cfg.monthly_refetalt_flag:
-                monthly_refetalt_df = daily_refetalt_df.resample('MS').apply( aggregation_func)
+                monthly_refetalt_df = period_stats.aggregate(daily_refetalt_df, 'MS', aggregation_func)
             if cfg.annual_refetalt_flag:
-                annual_refetalt_df = daily_refetalt_df.resample('AS').apply( aggregation_func)
+                annual_refetalt_df = period_stats.aggregate(daily_refetalt_df, 'AS', aggregation_func)
 
             # set up output fields
 
@@ -928,19 +877,16 @@ class MetNode():
             if cfg.daily_refetalt_flag:
                 # format date attributes if values are formatted
 
+                daily_formats = {}
                 if cfg.refetalt_out['daily_float_format'] is not None:
                     if 'year' in cfg.used_refetalt_out_fields:
-                        daily_refetalt_df[cfg.refetalt_out['fields']['year']] = \
-                            daily_refetalt_df[cfg.refetalt_out['fields']['year']].map(lambda x: ' %4d' % x)
+                        daily_formats[cfg.refetalt_out['fields']['year']] = ' %4d'
                     if 'month' in cfg.used_refetalt_out_fields:
-                        daily_refetalt_df[cfg.refetalt_out['fields']['month']] = \
-                            daily_refetalt_df[cfg.refetalt_out['fields']['month']].map(lambda x: ' %2d' % x)
+                        daily_formats[cfg.refetalt_out['fields']['month']] = ' %2d'
                     if 'day' in cfg.used_refetalt_out_fields:
-                        daily_refetalt_df[cfg.refetalt_out['fields']['day']] = \
-                            daily_refetalt_df[cfg.refetalt_out['fields']['day']].map(lambda x: ' %2d' % x)
+                        daily_formats[cfg.refetalt_out['fields']['day']] = ' %2d'
                 if 'doy' in cfg.used_refetalt_out_fields:
-                        daily_refetalt_df[cfg.refetalt_out['fields']['doy']] = \
-                            daily_refetalt_df[cfg.refetalt_out['fields']['doy']].map(lambda x: ' %3d' % x)
+                    daily_formats[cfg.refetalt_out['fields']['doy']] = ' %3d'
 
                 # post daily output
 
@@ -950,33 +896,19 @@ class MetNode():
                     daily_refetalt_f.write(cfg.refetalt_out['daily_header1'] + '\n')
                     if cfg.refetalt_out['header_lines'] == 2:
                         daily_refetalt_f.write(cfg.refetalt_out['daily_header2'] + '\n')
-                    if cfg.refetalt_out['daily_float_format'] is None:
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            daily_refetalt_df.to_csv(daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['daily_date_format'],
-                                columns = adj_daily_fields)
-                        else:
-                            daily_refetalt_df.to_csv(daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_daily_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            daily_refetalt_df.to_csv(daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['daily_date_format'],
-                                float_format = cfg.refetalt_out['daily_float_format'],
-                                columns = adj_daily_fields)
-                        else:
-                            daily_refetalt_df.to_csv(daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_daily_fields,
-                                float_format = cfg.refetalt_out['daily_float_format'])
+                    text_writer.write_csv(daily_refetalt_df, daily_refetalt_f, sep = cfg.refetalt_out['delimiter'],
+                        header = False, index = 'date' in cfg.used_refetalt_out_fields,
+                        date_format = cfg.refetalt_out['daily_date_format'],
+                        float_format = cfg.refetalt_out['daily_float_format'],
+                        columns = adj_daily_fields, formats = daily_formats)
                 del daily_refetalt_df, daily_refetalt_path, adj_daily_fields
             if cfg.monthly_refetalt_flag:
+                monthly_formats = {}
                 if cfg.refetalt_out['monthly_float_format'] is not None:
                     if 'year' in cfg.used_refetalt_out_fields:
-                        monthly_refetalt_df[cfg.refetalt_out['fields']['year']] = \
-                            monthly_refetalt_df[cfg.refetalt_out['fields']['year']].map(lambda x: ' %4d' % x)
+                        monthly_formats[cfg.refetalt_out['fields']['year']] = ' %4d'
                     if 'month' in cfg.used_refetalt_out_fields:
-                        monthly_refetalt_df[cfg.refetalt_out['fields']['month']] = \
-                            monthly_refetalt_df[cfg.refetalt_out['fields']['month']].map(lambda x: ' %2d' % x)
+                        monthly_formats[cfg.refetalt_out['fields']['month']] = ' %2d'
 
                 # post monthly output
 
@@ -986,32 +918,19 @@ class MetNode():
                     monthly_refetalt_f.write(cfg.refetalt_out['monthly_header1'] + '\n')
                     if cfg.refetalt_out['header_lines'] == 2:
                         monthly_refetalt_f.write(cfg.refetalt_out['monthly_header2'] + '\n')
-                    if cfg.refetalt_out['monthly_float_format'] is None:
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            monthly_refetalt_df.to_csv(monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['monthly_date_format'],
-                                columns = adj_monthly_fields)
-                        else:
-                            monthly_refetalt_df.to_csv(monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_monthly_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            monthly_refetalt_df.to_csv(monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['monthly_date_format'],
-                                float_format = cfg.refetalt_out['monthly_float_format'],
-                                columns = adj_monthly_fields)
-                        else:
-                            monthly_refetalt_df.to_csv(monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_monthly_fields,
-                                float_format = cfg.refetalt_out['monthly_float_format'])
+                    text_writer.write_csv(monthly_refetalt_df, monthly_refetalt_f, sep = cfg.refetalt_out['delimiter'],
+                        header = False, index = 'date' in cfg.used_refetalt_out_fields,
+                        date_format = cfg.refetalt_out['monthly_date_format'],
+                        float_format = cfg.refetalt_out['monthly_float_format'],
+                        columns = adj_monthly_fields, formats = monthly_formats)
                 del monthly_refetalt_df, monthly_refetalt_path, adj_monthly_fields
             if cfg.annual_refetalt_flag:
                 # format date attributes if values are formatted
 
+                annual_formats = {}
                 if cfg.refetalt_out['annual_float_format'] is not None:
                     if 'year' in cfg.used_refetalt_out_fields:
-                        annual_refetalt_df[cfg.refetalt_out['fields']['year']] = \
-                            annual_refetalt_df[cfg.refetalt_out['fields']['year']].map(lambda x: ' %4d' % x)
+                        annual_formats[cfg.refetalt_out['fields']['year']] = ' %4d'
 
                 # post annual output
 
@@ -1021,24 +940,11 @@ class MetNode():
                     annual_refetalt_f.write(cfg.refetalt_out['annual_header1'] + '\n')
                     if cfg.refetalt_out['header_lines'] == 2:
                         annual_refetalt_f.write(cfg.refetalt_out['annual_header2'] + '\n')
-                    if cfg.refetalt_out['annual_float_format'] is None:
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            annual_refetalt_df.to_csv(annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['annual_date_format'],
-                                columns = adj_annual_fields)
-                        else:
-                            annual_refetalt_df.to_csv(annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_annual_fields)
-                    else:    # formatted output causes loss of precision in crop et computations
-                        if 'date' in cfg.used_refetalt_out_fields:
-                            annual_refetalt_df.to_csv(annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, date_format = cfg.refetalt_out['annual_date_format'],
-                                float_format = cfg.refetalt_out['annual_float_format'],
-                                columns = adj_annual_fields)
-                        else:
-                            annual_refetalt_df.to_csv(annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
-                                header = False, index = False, columns = adj_annual_fields,
-                                float_format = cfg.refetalt_out['annual_float_format'])
+                    text_writer.write_csv(annual_refetalt_df, annual_refetalt_f, sep = cfg.refetalt_out['delimiter'],
+                        header = False, index = 'date' in cfg.used_refetalt_out_fields,
+                        date_format = cfg.refetalt_out['annual_date_format'],
+                        float_format = cfg.refetalt_out['annual_float_format'],
+                        columns = adj_annual_fields, formats = annual_formats)
                 del annual_refetalt_df, annual_refetalt_path, adj_annual_fields
             return True;
         except:
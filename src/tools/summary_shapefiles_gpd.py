@@ -94,7 +94,8 @@ def main(ini_path, time_filter, start_doy, end_doy, year_filter=''):
     logging.info('\nGIS Workspace:      {0}'.format(gis_ws))
 
     # Regular expressions
-    data_re = re.compile('(?P<CELLID>\w+)_crop_(?P<CROP>\d+).csv$', re.I)
+    data_re = re.compile(
+        '(?P<CELLID>\w+)_crop_(?P<CROP>\d+).(csv|parquet|h5)$', re.I)
     #data_re = re.compile('(?P<CELLID>\w+)_daily_crop_(?P<CROP>\d+).csv$', re.I)
     
     # Build list of all data files
@@ -176,15 +177,13 @@ def main(ini_path, time_filter, start_doy, end_doy, year_filter=''):
         output_df = None
         for station in unique_stations:
             #Build File Path
-            file_path = os.path.join(daily_ws,
-                                     '{}_crop_{:02d}.csv').format(station,
-                                                                  crop)
+            file_path = util.crop_output_path(daily_ws, station, crop)
             # Only process files that exists (crop/cell combinations)
-            if not os.path.exists(file_path):
+            if file_path is None:
                 continue
 
             # Read file into df
-            daily_df = pd.read_csv(file_path, skiprows=1)
+            daily_df = util.read_crop_output(file_path)
             # Add more DOY columns to simplify start/end DOY agg below
             daily_df['Start'] = daily_df.DOY.copy()
             daily_df['End'] = daily_df.DOY.copy()
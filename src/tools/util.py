@@ -16,6 +16,11 @@ import os
 # import tkFileDialog
 import sys
 
+import pandas as pd
+
+# Crop output file extensions (see cropET output_file_type)
+CROP_OUTPUT_EXTENSIONS = ['.csv', '.parquet', '.h5']
+
 
 # def get_path(workspace, title_str, file_types=[('INI files', '.ini')]):
 #     """"""
@@ -163,3 +168,26 @@ def doy_2_date(test_year, test_doy):
 def list_re_or(input_list):
     """"""
     return '(' + '|'.join(map(str, input_list)) + ')'
+
+
+def crop_output_path(output_ws, cell_id, crop_num):
+    """Return daily crop output file path for any output file type
+
+    Returns None if there is no output file for the cell and crop
+    """
+    for ext in CROP_OUTPUT_EXTENSIONS:
+        file_path = os.path.join(
+            output_ws, '{}_crop_{:02d}{}'.format(cell_id, crop_num, ext))
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+
+def read_crop_output(file_path):
+    """Read cropET output csv, parquet or hdf5 file"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.parquet':
+        return pd.read_parquet(file_path)
+    elif ext == '.h5':
+        return pd.read_hdf(file_path, key='data')
+    return pd.read_csv(file_path, skiprows=1)